@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Benchmark SQLite ingest throughput and read latency under concurrent writes per storage profile."""
+
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add the src directory to the path so we can import our modules
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from homelab_mcp.database import SQLITE_PROFILES, SQLiteAdapter
+
+
+def make_devices(start: int, count: int) -> list:
+    """Build flat device records with distinct keys."""
+    return [
+        {
+            'hostname': f'bench-{i}',
+            'connection_ip': f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}',
+            'last_seen': datetime.now().isoformat(),
+            'status': 'success',
+            'cpu_cores': 4,
+            'memory_total': '8.0G',
+            'os_info': 'Ubuntu 22.04'
+        }
+        for i in range(start, start + count)
+    ]
+
+
+def bench_ingest(db_path: str, profile: str, devices: int, batch_size: int) -> tuple:
+    """Return devices/sec for single-row commits and for bulk batches."""
+    adapter = SQLiteAdapter(db_path, profile)
+    adapter.init_schema()
+    
+    start = time.perf_counter()
+    for device in make_devices(0, devices):
+        adapter.store_device(device)
+    single = devices / (time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    for offset in range(devices, 2 * devices, batch_size):
+        adapter.store_devices_bulk(make_devices(offset, min(batch_size, 2 * devices - offset)))
+    bulk = devices / (time.perf_counter() - start)
+    
+    adapter.close()
+    return single, bulk
+
+
+def bench_reads_under_writes(db_path: str, profile: str, seconds: float, readers: int) -> dict:
+    """Time get_devices_page calls from reader threads while a writer keeps upserting."""
+    stop = threading.Event()
+    latencies = []
+    latencies_lock = threading.Lock()
+    written = [0]
+    
+    def writer():
+        adapter = SQLiteAdapter(db_path, profile)
+        offset = 10_000_000
+        while not stop.is_set():
+            adapter.store_devices_bulk(make_devices(offset, 50))
+            offset += 50
+            written[0] += 50
+        adapter.close()
+    
+    def reader():
+        # Each thread gets its own adapter, as the async layer's reader pool does
+        adapter = SQLiteAdapter(db_path, profile)
+        local = []
+        while not stop.is_set():
+            start = time.perf_counter()
+            adapter.get_devices_page(fields=['status', 'os_info'], limit=100)
+            local.append((time.perf_counter() - start) * 1000)
+        adapter.close()
+        with latencies_lock:
+            latencies.extend(local)
+    
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    
+    latencies.sort()
+    return {
+        'reads': len(latencies),
+        'p50': statistics.median(latencies),
+        'p95': latencies[int(len(latencies) * 0.95) - 1],
+        'max': latencies[-1],
+        'writes_per_sec': written[0] / seconds
+    }
+
+
+def main():
+    """Main CLI interface."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Benchmark SQLite storage profiles")
+    parser.add_argument('--devices', type=int, default=2000, help='Devices to ingest per mode')
+    parser.add_argument('--batch-size', type=int, default=500, help='Devices per bulk upsert')
+    parser.add_argument('--seconds', type=float, default=5.0, help='Duration of the concurrent phase')
+    parser.add_argument('--readers', type=int, default=4, help='Concurrent reader threads')
+    args = parser.parse_args()
+    
+    print(f"{'profile':<10}{'single/s':>10}{'bulk/s':>10}{'reads':>8}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'writes/s':>10}")
+    for profile in SQLITE_PROFILES:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = str(Path(tmp_dir) / 'bench.db')
+            single, bulk = bench_ingest(db_path, profile, args.devices, args.batch_size)
+            reads = bench_reads_under_writes(db_path, profile, args.seconds, args.readers)
+        print(f"{profile:<10}{single:>10.0f}{bulk:>10.0f}{reads['reads']:>8}"
+              f"{reads['p50']:>9.2f}{reads['p95']:>9.2f}{reads['max']:>9.2f}{reads['writes_per_sec']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
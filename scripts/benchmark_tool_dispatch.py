@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Benchmark per-call overhead of execute_tool with per-call vs shared instances."""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add the src directory to the path so we can import our modules
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from homelab_mcp import tools
+from homelab_mcp.sitemap import NetworkDevice
+
+
+async def time_calls(tool_name: str, arguments: dict, iterations: int, per_call: bool) -> float:
+    """Return mean microseconds per execute_tool call."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        if per_call:
+            # Reproduce the old behaviour: fresh sitemap/installer on every call
+            tools.reset_shared_instances()
+        await tools.execute_tool(tool_name, arguments)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def run(iterations: int, devices: int) -> None:
+    """Seed a scratch database and time a few representative tools."""
+    sitemap = tools.get_sitemap()
+    for i in range(devices):
+        sitemap.store_device(NetworkDevice(
+            hostname=f"bench-{i}",
+            connection_ip=f"10.0.{i // 256}.{i % 256}",
+            last_seen=datetime.now().isoformat(),
+            status="success",
+            cpu_cores=4,
+            memory_total="8.0G",
+            os_info="Ubuntu 22.04"
+        ))
+    
+    cases = [
+        ("get_network_sitemap", {}),
+        ("analyze_network_topology", {}),
+        ("list_available_services", {}),
+    ]
+    
+    print(f"{'tool':<28}{'per-call (us)':>16}{'shared (us)':>14}{'speedup':>10}")
+    for tool_name, arguments in cases:
+        before = await time_calls(tool_name, arguments, iterations, per_call=True)
+        after = await time_calls(tool_name, arguments, iterations, per_call=False)
+        print(f"{tool_name:<28}{before:>16.1f}{after:>14.1f}{before / after:>9.1f}x")
+
+
+def main():
+    """Main CLI interface."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Benchmark execute_tool per-call overhead")
+    parser.add_argument('--iterations', type=int, default=200, help='Calls per tool and mode')
+    parser.add_argument('--devices', type=int, default=50, help='Devices to seed into the scratch database')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Keep the benchmark away from the real sitemap database
+        os.environ['DATABASE_TYPE'] = 'sqlite'
+        os.environ['SQLITE_PATH'] = str(Path(tmp_dir) / 'bench.db')
+        asyncio.run(run(args.iterations, args.devices))
+        tools.reset_shared_instances()
+
+
+if __name__ == "__main__":
+    main()
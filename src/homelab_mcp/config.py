@@ -4,6 +4,9 @@ import os
 from typing import Dict, Any, Optional, List
 from pathlib import Path
 
+from .history_codec import COMPRESSIONS
+from .snapshots import DEFAULT_VOLATILE_FIELDS, parse_volatile_fields
+
 
 class DatabaseConfig:
     """Database configuration settings."""
@@ -19,6 +22,9 @@ class DatabaseConfig:
             mcp_dir.mkdir(exist_ok=True)
             self.sqlite_path = str(mcp_dir / 'sitemap.db')
         
+        # SQLite storage profile (see database.SQLITE_PROFILES)
+        self.sqlite_profile = os.getenv('SQLITE_PROFILE', 'tuned').lower()
+        
         # PostgreSQL configuration
         self.postgres_config = {
             'host': os.getenv('POSTGRES_HOST', 'localhost'),
@@ -27,6 +33,13 @@ class DatabaseConfig:
             'user': os.getenv('POSTGRES_USER', 'postgres'),
             'password': os.getenv('POSTGRES_PASSWORD', 'password')
         }
+        
+        # Metric samples kept per device; older ones are pruned on insert (0 keeps all)
+        self.metrics_retention = int(os.getenv('DEVICE_METRICS_RETENTION', '1000'))
+        
+        # Discovery history encoding: payload compression and rows between full keyframes
+        self.history_compression = os.getenv('HISTORY_COMPRESSION', 'zlib').lower()
+        self.history_keyframe_interval = int(os.getenv('HISTORY_KEYFRAME_INTERVAL', '20'))
     
     def get_database_params(self) -> Dict[str, Any]:
         """Get database parameters for the current configuration."""
@@ -64,11 +77,31 @@ class MCPConfig:
         # SSH configuration
         self.ssh_timeout = int(os.getenv('SSH_TIMEOUT', '10'))
         self.ssh_retries = int(os.getenv('SSH_RETRIES', '3'))
+        self.ssh_pool_idle_ttl = float(os.getenv('SSH_POOL_IDLE_TTL', '300'))
+        self.ssh_pool_max_per_host = int(os.getenv('SSH_POOL_MAX_PER_HOST', '4'))
+        
+        # PostgreSQL connection pool configuration
+        self.postgres_pool_min = int(os.getenv('POSTGRES_POOL_MIN', '1'))
+        self.postgres_pool_max = int(os.getenv('POSTGRES_POOL_MAX', '10'))
+        self.postgres_pool_timeout = float(os.getenv('POSTGRES_POOL_TIMEOUT', '30'))
+        self.postgres_statement_timeout_ms = int(os.getenv('POSTGRES_STATEMENT_TIMEOUT_MS', '30000'))
         
         # Discovery configuration
         self.discovery_batch_size = int(os.getenv('DISCOVERY_BATCH_SIZE', '10'))
         self.discovery_timeout = int(os.getenv('DISCOVERY_TIMEOUT', '300'))  # 5 minutes
         
+        # Discovery history configuration
+        self.history_volatile_fields = parse_volatile_fields(
+            os.getenv('HISTORY_VOLATILE_FIELDS', DEFAULT_VOLATILE_FIELDS)
+        )
+        
+        # Device lookup cache (entries; 0 disables it)
+        self.device_cache_size = int(os.getenv('DEVICE_CACHE_SIZE', '1024'))
+        
+        # Request dispatch configuration
+        self.max_concurrent_requests = int(os.getenv('MCP_MAX_CONCURRENT_REQUESTS', '16'))
+        self.tool_concurrency_limits = parse_tool_limits(os.getenv('MCP_TOOL_CONCURRENCY', ''))
+        
         # Feature flags
         self.enable_postgresql = os.getenv('ENABLE_POSTGRESQL', 'false').lower() == 'true'
         self.enable_resource_pools = os.getenv('ENABLE_RESOURCE_POOLS', 'false').lower() == 'true'
@@ -89,16 +122,70 @@ class MCPConfig:
                 errors.append("PostgreSQL selected but psycopg2 is not installed. "
                              "Install with: pip install psycopg2-binary")
         
+        from .database import SQLITE_PROFILES
+        if self.database.sqlite_profile not in SQLITE_PROFILES:
+            errors.append(f"SQLITE_PROFILE must be one of: {', '.join(SQLITE_PROFILES)}")
+        
+        if self.database.metrics_retention < 0:
+            errors.append("DEVICE_METRICS_RETENTION must not be negative")
+        
+        if self.database.history_compression not in COMPRESSIONS:
+            errors.append(f"HISTORY_COMPRESSION must be one of: {', '.join(COMPRESSIONS)}")
+        
+        if self.database.history_keyframe_interval <= 0:
+            errors.append("HISTORY_KEYFRAME_INTERVAL must be greater than 0")
+        
         # Timeout validation
         if self.ssh_timeout <= 0:
             errors.append("SSH_TIMEOUT must be greater than 0")
         
+        if self.ssh_pool_max_per_host <= 0:
+            errors.append("SSH_POOL_MAX_PER_HOST must be greater than 0")
+        
+        if self.postgres_pool_max <= 0:
+            errors.append("POSTGRES_POOL_MAX must be greater than 0")
+        
+        if not 0 <= self.postgres_pool_min <= self.postgres_pool_max:
+            errors.append("POSTGRES_POOL_MIN must be between 0 and POSTGRES_POOL_MAX")
+        
+        if self.postgres_statement_timeout_ms < 0:
+            errors.append("POSTGRES_STATEMENT_TIMEOUT_MS must not be negative")
+        
         if self.discovery_timeout <= 0:
             errors.append("DISCOVERY_TIMEOUT must be greater than 0")
         
+        if self.device_cache_size < 0:
+            errors.append("DEVICE_CACHE_SIZE must not be negative")
+        
+        if self.max_concurrent_requests <= 0:
+            errors.append("MCP_MAX_CONCURRENT_REQUESTS must be greater than 0")
+        
+        for tool_name, limit in self.tool_concurrency_limits.items():
+            if limit <= 0:
+                errors.append(f"MCP_TOOL_CONCURRENCY limit for {tool_name} must be greater than 0")
+        
+        for path, bucket in self.history_volatile_fields.items():
+            if bucket is not None and bucket <= 0:
+                errors.append(f"HISTORY_VOLATILE_FIELDS bucket for {path} must be greater than 0")
+        
         return errors
 
 
+def parse_tool_limits(spec: str) -> Dict[str, int]:
+    """Parse a per-tool limit spec such as 'install_service=1,bulk_discover_and_map=2'."""
+    limits = {}
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry or '=' not in entry:
+            continue
+        tool_name, limit = entry.split('=', 1)
+        try:
+            limits[tool_name.strip()] = int(limit)
+        except ValueError:
+            continue
+    return limits
+
+
 def get_config() -> MCPConfig:
     """Get the current MCP configuration."""
     return MCPConfig()
@@ -136,6 +223,7 @@ def print_config_info(config: Optional[MCPConfig] = None) -> None:
     print(f"Log Level: {config.log_level}")
     print(f"SSH Timeout: {config.ssh_timeout}s")
     print(f"Discovery Batch Size: {config.discovery_batch_size}")
+    print(f"Max Concurrent Requests: {config.max_concurrent_requests}")
     
     # Validate configuration
     errors = config.validate()
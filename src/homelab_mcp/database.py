@@ -1,14 +1,32 @@
 """Database abstraction layer for network sitemap functionality."""
 
 import os
+import io
+import hashlib
 import json
 import sqlite3
-import hashlib
+import ipaddress
+import asyncio
+import functools
+import inspect
+import threading
+import uuid
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, Any, List, Optional, Tuple, Union
+from typing import Dict, Any, AsyncIterator, Callable, Iterable, Iterator, List, Optional, Tuple, Union
 from pathlib import Path
 
+from .config import DatabaseConfig
+from .device_search import SearchTerm, compile_search, ipv4_int
+from .hardware import HARDWARE_TABLES, HardwareInventory, compile_hardware_query, extract_inventory
+from .history_codec import HistoryCodec, decode_chain, parse_snapshot, stored_size
+from .history_search import fts5_match, search_text
+from .pg_pool import PostgreSQLConnectionPool, acquire_pg_pool, release_pg_pool
+from .resources import RESOURCE_COLUMNS, ResourceCondition, compile_resource_conditions, resource_columns
+from .snapshots import VolatileFields, canonical_data_hash
+
 try:
     import psycopg2
     import psycopg2.extras
@@ -17,6 +35,265 @@ except ImportError:
     POSTGRESQL_AVAILABLE = False
 
 
+# Stored history columns copied verbatim between backends, in load order
+HISTORY_LOAD_COLUMNS = ('data_hash', 'discovery_data', 'encoding', 'payload', 'discovered_at')
+
+# Stored metrics columns copied between backends, in load order
+METRICS_LOAD_COLUMNS = ('metrics', 'collected_at')
+
+
+def _metrics_json(value: Any) -> str:
+    """Metrics as JSON text, whether read back as text (SQLite) or parsed (PostgreSQL)."""
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def _metrics_digests(device_ids: List[int], rows: Iterable[Tuple[int, Any, Any]]) -> Dict[int, str]:
+    """Fold (device_id, metrics, collected_at) rows, in id order, into one digest per device.
+    
+    Metrics and timestamps are canonicalized first, so SQLite text and PostgreSQL
+    JSONB/TIMESTAMP values of the same sample digest alike.
+    """
+    digests = {device_id: hashlib.sha256() for device_id in device_ids}
+    for device_id, metrics, collected_at in rows:
+        if isinstance(metrics, str):
+            metrics = json.loads(metrics)
+        if isinstance(collected_at, str):
+            collected_at = datetime.fromisoformat(collected_at)
+        sample = json.dumps([metrics, collected_at.isoformat()], sort_keys=True, separators=(',', ':'))
+        digests[device_id].update(sample.encode())
+    return {device_id: digest.hexdigest() for device_id, digest in digests.items()}
+
+
+def _copy_field(value: Any) -> str:
+    """Render one value for PostgreSQL's COPY text format."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        # bytea hex input, with the backslash escaped for COPY
+        return '\\\\x' + bytes(value).hex()
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return (
+        str(value).replace('\\', '\\\\').replace('\t', '\\t')
+        .replace('\n', '\\n').replace('\r', '\\r')
+    )
+
+
+# SQLite storage profiles: pragmas applied to every connection. "default" keeps
+# SQLite's rollback journal and synchronous=FULL; "tuned" uses WAL so readers on
+# their own connection never wait for the writer, and fsyncs only at checkpoints.
+SQLITE_PROFILES = {
+    'default': {},
+    'tuned': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # Negative means KiB: 64 MiB
+        'busy_timeout': 5000,
+        'temp_store': 'MEMORY'
+    }
+}
+
+# Prepared statements kept per connection, keyed by SQL text
+SQLITE_STATEMENT_CACHE_SIZE = 256
+
+# Change-capture triggers: name -> (event, table, row id expression, device id expression).
+# Inventory rows are captured too: a snapshot history already holds (A -> B -> A)
+# replaces the inventory without adding a history row.
+CHANGE_CAPTURE_TRIGGERS = {
+    'capture_devices_insert': ('INSERT', 'devices', 'NEW.id', 'NEW.id'),
+    'capture_devices_update': ('UPDATE', 'devices', 'NEW.id', 'NEW.id'),
+    'capture_history_insert': ('INSERT', 'discovery_history', 'NEW.id', 'NEW.device_id'),
+    'capture_metrics_insert': ('INSERT', 'device_metrics', 'NEW.id', 'NEW.device_id'),
+    **{
+        f'capture_{table}_{event.lower()}': (event, table, f'{row}.id', f'{row}.device_id')
+        for table, _ in HARDWARE_TABLES.values()
+        for event, row in (('INSERT', 'NEW'), ('DELETE', 'OLD'))
+    }
+}
+
+# Table behind each data_versions scope; triggers bump the scope on every write,
+# whichever process or adapter makes it, so caches can key on it
+DATA_VERSION_TABLES = {'devices': 'devices', 'history': 'discovery_history'}
+
+
+# Device columns written on upsert, in bind order (SQLite layout)
+DEVICE_COLUMNS = (
+    'hostname', 'connection_ip', 'last_seen', 'status', 'cpu_model', 'cpu_cores',
+    'memory_total', 'memory_used', 'memory_free', 'memory_available',
+    'disk_filesystem', 'disk_size', 'disk_used', 'disk_available',
+    'disk_use_percent', 'disk_mount', 'network_interfaces',
+    'uptime', 'os_info', 'error_message'
+)
+
+# Upsert bind order for SQLite: reported columns, the typed resource columns, then
+# the integer IPv4 address that subnet search ranges over
+SQLITE_UPSERT_COLUMNS = DEVICE_COLUMNS + RESOURCE_COLUMNS + ('connection_ipv4',)
+
+# Native upsert keyed on the devices UNIQUE(hostname, connection_ip) constraint
+SQLITE_UPSERT_DEVICE_SQL = '''
+    INSERT INTO devices ({columns}, updated_at)
+    VALUES ({placeholders}, ?)
+    ON CONFLICT(hostname, connection_ip) DO UPDATE SET
+        {assignments}, updated_at = excluded.updated_at
+'''.format(
+    columns=', '.join(SQLITE_UPSERT_COLUMNS),
+    placeholders=', '.join('?' * len(SQLITE_UPSERT_COLUMNS)),
+    assignments=', '.join(f'{c} = excluded.{c}' for c in SQLITE_UPSERT_COLUMNS[2:])
+)
+
+# PostgreSQL device columns; system_info is flattened into the SQLite layout in Python
+POSTGRES_DEVICE_SELECT_SQL = '''
+    SELECT 
+        id, hostname, host(connection_ip) as connection_ip, last_seen, status,
+        system_info, network_interfaces, error_message, created_at, updated_at,
+        memory_total_bytes, disk_total_bytes, disk_use_ratio
+    FROM devices
+'''
+
+# Fields a device page can project, in SQLite column layout
+DEVICE_PAGE_FIELDS = ('id',) + DEVICE_COLUMNS + RESOURCE_COLUMNS + ('created_at', 'updated_at')
+
+# Fields a device page can filter on by equality
+DEVICE_FILTER_FIELDS = ('hostname', 'connection_ip', 'status', 'os_info', 'cpu_model', 'cpu_cores')
+
+# Select expression per page field on the PostgreSQL schema
+POSTGRES_PAGE_FIELDS = {
+    **{field: field for field in DEVICE_PAGE_FIELDS},
+    'connection_ip': 'host(connection_ip)',
+    'cpu_model': "system_info->'cpu'->'model'",
+    'memory_total': "system_info->'memory'->'total'",
+    'memory_used': "system_info->'memory'->'used'",
+    'memory_free': "system_info->'memory'->'free'",
+    'memory_available': "system_info->'memory'->'available'",
+    'disk_filesystem': "system_info->'disk'->'filesystem'",
+    'disk_size': "system_info->'disk'->'size'",
+    'disk_used': "system_info->'disk'->'used'",
+    'disk_available': "system_info->'disk'->'available'",
+    'disk_use_percent': "system_info->'disk'->'use_percent'",
+    'disk_mount': "system_info->'disk'->'mount'",
+    'uptime': "system_info->'uptime'",
+    'os_info': "system_info->'os'"
+}
+
+# Equality condition per filter field on each schema
+SQLITE_FILTER_SQL = {field: f'{field} = ?' for field in DEVICE_FILTER_FIELDS}
+POSTGRES_FILTER_SQL = {
+    **{field: f'{field} = %s' for field in DEVICE_FILTER_FIELDS},
+    'connection_ip': 'connection_ip = %s::inet',
+    'os_info': "system_info->>'os' = %s",
+    'cpu_model': "system_info->'cpu'->>'model' = %s"
+}
+
+# Dimensions kept as running counters in the topology_counters table
+TOPOLOGY_DIMENSIONS = ('status', 'os', 'cpu', 'segment', 'disk_usage')
+
+
+def _ipv4_segment(connection_ip: Optional[str]) -> Optional[str]:
+    """Get the /24 network of an IPv4 address, or None for anything else."""
+    try:
+        address = ipaddress.ip_address(connection_ip)
+    except ValueError:
+        return None
+    if address.version != 4:
+        return None
+    return str(ipaddress.ip_network(f"{address}/24", strict=False))
+
+
+def topology_contributions(device: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """List the (dimension, value) counters one device adds to the topology summary.
+    
+    Every device counts towards its status; only online devices count towards the
+    OS, CPU model, /24 segment and disk usage (10% buckets) histograms.
+    """
+    contributions = [('status', device['status'])]
+    if device['status'] != 'success':
+        return contributions
+    
+    contributions.append(('os', device.get('os_info') or 'Unknown'))
+    contributions.append(('cpu', device.get('cpu_model') or 'Unknown'))
+    segment = _ipv4_segment(device.get('connection_ip'))
+    if segment:
+        contributions.append(('segment', segment))
+    ratio = device.get('disk_use_ratio')
+    if ratio is not None:
+        bucket = min(max(int(ratio * 10), 0), 9) * 10
+        contributions.append(('disk_usage', f"{bucket}-{bucket + 10}%"))
+    return contributions
+
+
+def topology_deltas(
+    previous: Iterable[Dict[str, Any]],
+    current: Iterable[Dict[str, Any]]
+) -> Dict[Tuple[str, str], int]:
+    """Net counter changes from replacing the previous device rows with the current ones."""
+    deltas: Dict[Tuple[str, str], int] = {}
+    for device in previous:
+        for key in topology_contributions(device):
+            deltas[key] = deltas.get(key, 0) - 1
+    for device in current:
+        for key in topology_contributions(device):
+            deltas[key] = deltas.get(key, 0) + 1
+    return {key: delta for key, delta in deltas.items() if delta}
+
+
+def _topology_summary(rows: Iterable[Tuple[str, str, int]]) -> Dict[str, Dict[str, int]]:
+    """Group (dimension, value, devices) rows into one count map per dimension."""
+    summary: Dict[str, Dict[str, int]] = {dimension: {} for dimension in TOPOLOGY_DIMENSIONS}
+    for dimension, value, devices in rows:
+        if devices > 0:
+            summary.setdefault(dimension, {})[value] = devices
+    return summary
+
+
+def _page_fields(fields: Optional[List[str]]) -> List[str]:
+    """Validate projected fields; id and hostname always lead since they form the cursor."""
+    if not fields:
+        return list(DEVICE_PAGE_FIELDS)
+    unknown = [field for field in fields if field not in DEVICE_PAGE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown device fields: {', '.join(unknown)}")
+    selected = ['id', 'hostname']
+    for field in fields:
+        if field not in selected:
+            selected.append(field)
+    return selected
+
+
+def _device_page_where(
+    filters: Optional[Dict[str, Any]],
+    after: Optional[Tuple[str, int]],
+    dialect: str,
+    search: Optional[List[SearchTerm]] = None
+) -> Tuple[str, List[Any]]:
+    """Compile equality filters, search terms and the (hostname, id) keyset into a WHERE clause."""
+    filter_sql = SQLITE_FILTER_SQL if dialect == 'sqlite' else POSTGRES_FILTER_SQL
+    placeholder = '?' if dialect == 'sqlite' else '%s'
+    clauses = []
+    params: List[Any] = []
+    if search:
+        search_where, search_params = compile_search(search, dialect)
+        clauses.append(search_where)
+        params.extend(search_params)
+    for field, value in (filters or {}).items():
+        if field not in filter_sql:
+            raise ValueError(f"Unsupported device filter: {field}")
+        clauses.append(filter_sql[field])
+        params.append(value)
+    if after is not None:
+        clauses.append(f'(hostname, id) > ({placeholder}, {placeholder})')
+        params.extend(after)
+    return ' AND '.join(clauses) or '1 = 1', params
+
+
+def _latest_per_device(devices: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Collapse records for the same (hostname, connection_ip), keeping the last one."""
+    latest = {}
+    for device in devices:
+        latest[(device['hostname'], device['connection_ip'])] = device
+    return list(latest.values())
+
+
 class DatabaseAdapter(ABC):
     """Abstract base class for database adapters."""
     
@@ -40,11 +317,66 @@ class DatabaseAdapter(ABC):
         """Store or update a device record."""
         pass
     
+    @abstractmethod
+    def store_devices_bulk(self, devices: List[Dict[str, Any]]) -> List[int]:
+        """Upsert many device records in one transaction; returns ids in input order."""
+        pass
+    
     @abstractmethod
     def get_all_devices(self) -> List[Dict[str, Any]]:
         """Get all devices from the database."""
         pass
     
+    @abstractmethod
+    def iter_devices(self, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Yield every device by (hostname, connection_ip) in byte order, batch_size rows at a time.
+        
+        The order uses only natural keys so two backends' streams can be merged
+        (verify_migration); AsyncDatabaseAdapter.iter_devices pages by (hostname, id) instead.
+        """
+        pass
+    
+    @abstractmethod
+    def get_devices_page(
+        self,
+        fields: Optional[List[str]] = None,
+        limit: int = 100,
+        after: Optional[Tuple[str, int]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        search: Optional[List[SearchTerm]] = None
+    ) -> List[Dict[str, Any]]:
+        """Get up to limit devices ordered by (hostname, id), starting after the given key."""
+        pass
+    
+    @abstractmethod
+    def count_devices(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        search: Optional[List[SearchTerm]] = None
+    ) -> int:
+        """Count devices matching the equality filters and search terms."""
+        pass
+    
+    @abstractmethod
+    def get_device(self, device_id: int) -> Optional[Dict[str, Any]]:
+        """Get one device by primary key."""
+        pass
+    
+    @abstractmethod
+    def get_device_by_ip(self, connection_ip: str) -> Optional[Dict[str, Any]]:
+        """Get the most recently seen device with this connection IP."""
+        pass
+    
+    @abstractmethod
+    def get_device_by_hostname(self, hostname: str) -> Optional[Dict[str, Any]]:
+        """Get the most recently seen device with this hostname."""
+        pass
+    
+    @abstractmethod
+    def update_device_status(self, device_id: int, status: str) -> bool:
+        """Set a device's status; returns False if the device does not exist."""
+        pass
+    
     @abstractmethod
     def store_discovery_history(self, device_id: int, discovery_data: str, data_hash: str) -> None:
         """Store discovery history record."""
@@ -55,6 +387,121 @@ class DatabaseAdapter(ABC):
         """Get change history for a device."""
         pass
     
+    @abstractmethod
+    def iter_history_rows(
+        self,
+        device_id: int,
+        batch_size: int = 1000,
+        from_id: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield a device's stored history rows, still encoded, oldest first.
+        
+        With from_id, start at the keyframe that row's chain decodes from.
+        """
+        pass
+    
+    @abstractmethod
+    def get_history_hashes(self, device_ids: List[int]) -> Dict[int, List[str]]:
+        """Get each device's history data hashes, oldest first."""
+        pass
+    
+    @abstractmethod
+    def get_metrics_digests(self, device_ids: List[int]) -> Dict[int, str]:
+        """Get one digest per device over its metrics samples, comparable across backends."""
+        pass
+    
+    @abstractmethod
+    def load_discovery_history(
+        self,
+        device_id: int,
+        rows: List[Dict[str, Any]],
+        snapshots: List[Any]
+    ) -> int:
+        """Append already-encoded history rows with their decoded snapshots; returns rows added.
+        
+        Rows whose data_hash the device already has are skipped, so reloading is safe.
+        """
+        pass
+    
+    @abstractmethod
+    def iter_metrics_rows(
+        self,
+        device_id: int,
+        batch_size: int = 1000,
+        from_id: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield a device's stored metrics samples oldest first, from row from_id if given."""
+        pass
+    
+    @abstractmethod
+    def load_device_metrics(self, device_id: int, rows: List[Dict[str, Any]]) -> int:
+        """Append metrics samples read from another database; returns rows added.
+        
+        Samples the device already has (same collected_at and metrics) are skipped,
+        so reloading is safe; the retention limit applies as on insert.
+        """
+        pass
+    
+    @abstractmethod
+    def reencode_history(self, device_id: Optional[int] = None, codec: Optional[HistoryCodec] = None) -> Dict[str, int]:
+        """Rewrite stored history rows with the given keyframe/delta codec."""
+        pass
+    
+    @abstractmethod
+    def store_device_metrics(self, device_id: int, metrics: Dict[str, Any]) -> None:
+        """Store a sample of volatile metrics (uptime, usage) for a device."""
+        pass
+    
+    @abstractmethod
+    def get_device_metrics(self, device_id: int, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get recent volatile metric samples for a device, newest first."""
+        pass
+    
+    @abstractmethod
+    def get_topology_summary(self) -> Dict[str, Dict[str, int]]:
+        """Read the running device counts by status, OS, CPU model, /24 segment and disk usage."""
+        pass
+    
+    @abstractmethod
+    def get_data_versions(self) -> Dict[str, int]:
+        """Get the write counter of each data_versions scope ('devices', 'history')."""
+        pass
+    
+    @abstractmethod
+    def rebuild_topology_counters(self) -> None:
+        """Recompute the topology counters from the devices table."""
+        pass
+    
+    @abstractmethod
+    def find_devices_by_resources(self, conditions: List[ResourceCondition]) -> List[Dict[str, Any]]:
+        """Get online devices matching every resource condition, ordered by hostname."""
+        pass
+    
+    @abstractmethod
+    def search_history(
+        self,
+        phrases: List[str],
+        device_id: Optional[int] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Get history snapshots containing every phrase, best match first."""
+        pass
+    
+    @abstractmethod
+    def find_hardware(self, kind: str, criteria: Dict[str, Any], limit: int = 100) -> List[Dict[str, Any]]:
+        """Get USB, PCI or block inventory rows matching the criteria, with their device."""
+        pass
+    
+    @abstractmethod
+    def get_hardware_inventory(self, device_id: int) -> HardwareInventory:
+        """Get a device's current inventory rows per kind, in HARDWARE_TABLES column order."""
+        pass
+    
+    @abstractmethod
+    def replace_hardware_inventory(self, device_id: int, inventory: HardwareInventory) -> None:
+        """Swap a device's inventory for the given rows, e.g. one read from another database."""
+        pass
+    
     @abstractmethod
     def execute_query(self, query: str, params: Optional[Tuple] = None) -> List[Dict[str, Any]]:
         """Execute a query and return results."""
@@ -64,7 +511,7 @@ class DatabaseAdapter(ABC):
 class SQLiteAdapter(DatabaseAdapter):
     """SQLite database adapter."""
     
-    def __init__(self, db_path: Optional[str] = None):
+    def __init__(self, db_path: Optional[str] = None, profile: Optional[str] = None):
         if db_path is None:
             # Default to ~/.mcp/sitemap.db
             home_dir = Path.home()
@@ -72,16 +519,63 @@ class SQLiteAdapter(DatabaseAdapter):
             mcp_dir.mkdir(exist_ok=True)
             db_path = str(mcp_dir / 'sitemap.db')
         
+        config = DatabaseConfig()
+        profile = profile or config.sqlite_profile
+        if profile not in SQLITE_PROFILES:
+            raise ValueError(f"Unknown SQLite profile: {profile}")
+        
         self.db_path = db_path
+        self.profile = profile
+        self.pragmas = SQLITE_PROFILES[profile]
         self.connection = None
+        self.read_connection = None
+        self.history_codec = HistoryCodec(config.history_compression, config.history_keyframe_interval)
+        self.metrics_retention = config.metrics_retention
+        # Cleared by init_schema when this SQLite build has no FTS5
+        self.history_fts_available = True
     
     def connect(self) -> None:
-        """Establish SQLite connection."""
-        self.connection = sqlite3.connect(self.db_path)
-        self.connection.row_factory = sqlite3.Row
+        """Establish the SQLite write connection."""
+        self.connection = self._open_connection()
+    
+    def _open_connection(self, query_only: bool = False) -> sqlite3.Connection:
+        """Open a connection configured with the adapter's storage profile."""
+        # The connection is opened on one thread and may be driven from the DB worker thread
+        connection = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=SQLITE_STATEMENT_CACHE_SIZE
+        )
+        connection.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            # journal_mode is stored in the database file, so only the writer sets it
+            if name == 'journal_mode' and query_only:
+                continue
+            connection.execute(f'PRAGMA {name} = {value}')
+        if query_only:
+            connection.execute('PRAGMA query_only = ON')
+        return connection
+    
+    @property
+    def separate_reads(self) -> bool:
+        """Whether reads get their own connection (WAL on a database file)."""
+        return self.db_path != ':memory:' and self.pragmas.get('journal_mode') == 'WAL'
+    
+    def _reader(self) -> sqlite3.Connection:
+        """Get the connection read-only queries go through."""
+        if not self.separate_reads:
+            if not self.connection:
+                self.connect()
+            return self.connection
+        if self.read_connection is None:
+            self.read_connection = self._open_connection(query_only=True)
+        return self.read_connection
     
     def close(self) -> None:
-        """Close SQLite connection."""
+        """Close SQLite connections."""
+        if self.read_connection:
+            self.read_connection.close()
+            self.read_connection = None
         if self.connection:
             self.connection.close()
             self.connection = None
@@ -117,12 +611,33 @@ class SQLiteAdapter(DatabaseAdapter):
                 uptime TEXT,
                 os_info TEXT,
                 error_message TEXT,
+                memory_total_bytes INTEGER,
+                disk_total_bytes INTEGER,
+                disk_use_ratio REAL,
+                connection_ipv4 INTEGER,
                 created_at TEXT DEFAULT CURRENT_TIMESTAMP,
                 updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
                 UNIQUE(hostname, connection_ip)
             )
         ''')
         
+        # Databases created before typed resource columns get them added and backfilled
+        cursor.execute('PRAGMA table_info(devices)')
+        device_columns = {row[1] for row in cursor.fetchall()}
+        missing_columns = [c for c in RESOURCE_COLUMNS if c not in device_columns]
+        for column in missing_columns:
+            column_type = 'REAL' if column == 'disk_use_ratio' else 'INTEGER'
+            cursor.execute(f'ALTER TABLE devices ADD COLUMN {column} {column_type}')
+        if missing_columns:
+            self._backfill_resource_columns(cursor)
+        if 'connection_ipv4' not in device_columns:
+            cursor.execute('ALTER TABLE devices ADD COLUMN connection_ipv4 INTEGER')
+            cursor.execute('SELECT id, connection_ip FROM devices')
+            cursor.executemany(
+                'UPDATE devices SET connection_ipv4 = ? WHERE id = ?',
+                [(ipv4_int(row['connection_ip']), row['id']) for row in cursor.fetchall()]
+            )
+        
         # Create discovery history table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS discovery_history (
@@ -131,166 +646,1012 @@ class SQLiteAdapter(DatabaseAdapter):
                 discovery_data TEXT,
                 data_hash TEXT,
                 discovered_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                encoding TEXT,
+                payload BLOB,
                 FOREIGN KEY (device_id) REFERENCES devices (id)
             )
         ''')
         
+        # Databases created before delta encoding lack the codec columns
+        cursor.execute('PRAGMA table_info(discovery_history)')
+        history_columns = {row[1] for row in cursor.fetchall()}
+        if 'encoding' not in history_columns:
+            cursor.execute('ALTER TABLE discovery_history ADD COLUMN encoding TEXT')
+        if 'payload' not in history_columns:
+            cursor.execute('ALTER TABLE discovery_history ADD COLUMN payload BLOB')
+        
         # Create indexes
         cursor.execute('''
             CREATE INDEX IF NOT EXISTS idx_devices_hostname_ip 
             ON devices (hostname, connection_ip)
         ''')
         
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_devices_connection_ip 
+            ON devices (connection_ip)
+        ''')
+        
+        # Keyset pagination walks devices in (hostname, id) order
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_devices_hostname_id 
+            ON devices (hostname, id)
+        ''')
+        
+        # Resource indexes back the topology and deployment analytics
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_devices_status_resources 
+            ON devices (status, cpu_cores, memory_total_bytes)
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_devices_status_disk 
+            ON devices (status, disk_use_ratio)
+        ''')
+        
+        # Search indexes: OS prefix match, subnet range and last_seen age
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_devices_os_lower 
+            ON devices (lower(os_info))
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_devices_connection_ipv4 
+            ON devices (connection_ipv4)
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_devices_last_seen 
+            ON devices (last_seen)
+        ''')
+        
         cursor.execute('''
             CREATE INDEX IF NOT EXISTS idx_history_device_id 
             ON discovery_history (device_id)
         ''')
         
-        self.connection.commit()
-    
-    def store_device(self, device_data: Dict[str, Any]) -> int:
-        """Store or update a device in SQLite."""
-        if not self.connection:
-            self.connect()
-        
-        cursor = self.connection.cursor()
+        # Volatile metrics live apart from history so history only grows on real changes
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS device_metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                device_id INTEGER,
+                metrics TEXT NOT NULL,
+                collected_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (device_id) REFERENCES devices (id)
+            )
+        ''')
         
-        # Check if device exists
         cursor.execute('''
-            SELECT id FROM devices 
-            WHERE hostname = ? AND connection_ip = ?
-        ''', (device_data['hostname'], device_data['connection_ip']))
+            CREATE INDEX IF NOT EXISTS idx_metrics_device_time 
+            ON device_metrics (device_id, collected_at)
+        ''')
         
-        existing = cursor.fetchone()
+        self._ensure_history_dedup_index(cursor)
         
-        if existing:
-            # Update existing device
-            device_id = existing[0]
-            cursor.execute('''
-                UPDATE devices SET
-                    last_seen = ?, status = ?, cpu_model = ?, cpu_cores = ?,
-                    memory_total = ?, memory_used = ?, memory_free = ?, memory_available = ?,
-                    disk_filesystem = ?, disk_size = ?, disk_used = ?, disk_available = ?,
-                    disk_use_percent = ?, disk_mount = ?, network_interfaces = ?,
-                    uptime = ?, os_info = ?, error_message = ?, updated_at = ?
-                WHERE id = ?
-            ''', (
-                device_data['last_seen'], device_data['status'], device_data.get('cpu_model'),
-                device_data.get('cpu_cores'), device_data.get('memory_total'), device_data.get('memory_used'),
-                device_data.get('memory_free'), device_data.get('memory_available'), device_data.get('disk_filesystem'),
-                device_data.get('disk_size'), device_data.get('disk_used'), device_data.get('disk_available'),
-                device_data.get('disk_use_percent'), device_data.get('disk_mount'), device_data.get('network_interfaces'),
-                device_data.get('uptime'), device_data.get('os_info'), device_data.get('error_message'),
-                datetime.now().isoformat(), device_id
-            ))
-        else:
-            # Insert new device
+        # Full-text index of every snapshot, keyed by history id; contentless so the
+        # compressed history is not stored again as plain text
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'history_fts'"
+        )
+        fts_exists = cursor.fetchone() is not None
+        try:
             cursor.execute('''
-                INSERT INTO devices (
-                    hostname, connection_ip, last_seen, status, cpu_model, cpu_cores,
-                    memory_total, memory_used, memory_free, memory_available,
-                    disk_filesystem, disk_size, disk_used, disk_available,
-                    disk_use_percent, disk_mount, network_interfaces,
-                    uptime, os_info, error_message
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                device_data['hostname'], device_data['connection_ip'], device_data['last_seen'],
-                device_data['status'], device_data.get('cpu_model'), device_data.get('cpu_cores'),
-                device_data.get('memory_total'), device_data.get('memory_used'), device_data.get('memory_free'),
-                device_data.get('memory_available'), device_data.get('disk_filesystem'), device_data.get('disk_size'),
-                device_data.get('disk_used'), device_data.get('disk_available'), device_data.get('disk_use_percent'),
-                device_data.get('disk_mount'), device_data.get('network_interfaces'), device_data.get('uptime'),
-                device_data.get('os_info'), device_data.get('error_message')
-            ))
-            device_id = cursor.lastrowid
+                CREATE VIRTUAL TABLE IF NOT EXISTS history_fts 
+                USING fts5(content, content='')
+            ''')
+        except sqlite3.OperationalError:
+            self.history_fts_available = False
+        if self.history_fts_available and not fts_exists:
+            self._backfill_history_search(cursor)
         
-        self.connection.commit()
-        return device_id
-    
-    def get_all_devices(self) -> List[Dict[str, Any]]:
-        """Get all devices from SQLite."""
-        if not self.connection:
-            self.connect()
+        # Hardware inventory, replaced from each new snapshot at ingest
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'hardware_usb'"
+        )
+        inventory_exists = cursor.fetchone() is not None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS hardware_usb (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                device_id INTEGER NOT NULL,
+                vendor_id TEXT,
+                product_id TEXT,
+                bus TEXT,
+                device_number TEXT,
+                description TEXT,
+                FOREIGN KEY (device_id) REFERENCES devices (id)
+            )
+        ''')
         
-        cursor = self.connection.cursor()
-        cursor.execute('SELECT * FROM devices ORDER BY hostname, connection_ip')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS hardware_pci (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                device_id INTEGER NOT NULL,
+                slot TEXT,
+                pci_class TEXT,
+                device_type TEXT,
+                description TEXT,
+                FOREIGN KEY (device_id) REFERENCES devices (id)
+            )
+        ''')
         
-        devices = []
-        for row in cursor.fetchall():
-            device_dict = dict(row)
-            # Parse network interfaces JSON
-            if device_dict.get('network_interfaces'):
-                try:
-                    device_dict['network_interfaces'] = json.loads(device_dict['network_interfaces'])
-                except json.JSONDecodeError:
-                    device_dict['network_interfaces'] = []
-            
-            devices.append(device_dict)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS hardware_block (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                device_id INTEGER NOT NULL,
+                name TEXT,
+                model TEXT,
+                size TEXT,
+                size_bytes INTEGER,
+                FOREIGN KEY (device_id) REFERENCES devices (id)
+            )
+        ''')
         
-        return devices
-    
-    def store_discovery_history(self, device_id: int, discovery_data: str, data_hash: str) -> None:
-        """Store discovery history in SQLite."""
-        if not self.connection:
-            self.connect()
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_hardware_usb_ids 
+            ON hardware_usb (vendor_id, product_id)
+        ''')
         
-        cursor = self.connection.cursor()
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_hardware_pci_class 
+            ON hardware_pci (pci_class)
+        ''')
         
-        # Check if this exact data was already stored recently
         cursor.execute('''
-            SELECT id FROM discovery_history 
-            WHERE device_id = ? AND data_hash = ?
-            ORDER BY discovered_at DESC LIMIT 1
-        ''', (device_id, data_hash))
+            CREATE INDEX IF NOT EXISTS idx_hardware_pci_type 
+            ON hardware_pci (device_type)
+        ''')
         
-        if not cursor.fetchone():
-            cursor.execute('''
-                INSERT INTO discovery_history (device_id, discovery_data, data_hash)
-                VALUES (?, ?, ?)
-            ''', (device_id, discovery_data, data_hash))
-            self.connection.commit()
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_hardware_block_model 
+            ON hardware_block (lower(model))
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_hardware_block_size 
+            ON hardware_block (size_bytes)
+        ''')
+        
+        for table, _ in HARDWARE_TABLES.values():
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_device ON {table} (device_id)')
+        if not inventory_exists:
+            self._backfill_hardware_inventory(cursor)
+        
+        # Running topology counts, kept in step with devices on every write
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'topology_counters'"
+        )
+        counters_exist = cursor.fetchone() is not None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS topology_counters (
+                dimension TEXT NOT NULL,
+                value TEXT NOT NULL,
+                devices INTEGER NOT NULL,
+                PRIMARY KEY (dimension, value)
+            )
+        ''')
+        if not counters_exist:
+            self._rebuild_topology_counters(cursor)
+        
+        # Write counters maintained by triggers, so writes from any connection show up
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS data_versions (
+                scope TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        for scope, table in DATA_VERSION_TABLES.items():
+            cursor.execute('INSERT OR IGNORE INTO data_versions (scope) VALUES (?)', (scope,))
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS version_{table}_{event.lower()}
+                    AFTER {event} ON {table}
+                    BEGIN
+                        UPDATE data_versions SET version = version + 1 WHERE scope = '{scope}';
+                    END
+                ''')
+        
+        self.connection.commit()
     
-    def get_device_changes(self, device_id: int, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get device change history from SQLite."""
-        if not self.connection:
-            self.connect()
+    def _ensure_history_dedup_index(self, cursor) -> None:
+        """Collapse duplicate history rows once, then enforce uniqueness with an index."""
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_history_device_hash'"
+        )
+        if cursor.fetchone():
+            return
         
-        cursor = self.connection.cursor()
+        # Keep the earliest snapshot for each (device_id, data_hash)
         cursor.execute('''
-            SELECT discovery_data, discovered_at FROM discovery_history
-            WHERE device_id = ?
-            ORDER BY discovered_at DESC LIMIT ?
-        ''', (device_id, limit))
+            DELETE FROM discovery_history
+            WHERE id NOT IN (
+                SELECT MIN(id) FROM discovery_history GROUP BY device_id, data_hash
+            )
+        ''')
         
-        changes = []
+        cursor.execute('''
+            CREATE UNIQUE INDEX idx_history_device_hash 
+            ON discovery_history (device_id, data_hash)
+        ''')
+    
+    def _backfill_resource_columns(self, cursor) -> None:
+        """Fill the typed resource columns from the reported text columns."""
+        cursor.execute('''
+            SELECT id, cpu_cores, memory_total, disk_size, disk_used, disk_use_percent
+            FROM devices
+        ''')
+        updates = []
         for row in cursor.fetchall():
-            try:
-                data = json.loads(row[0])
-                changes.append({
-                    'data': data,
-                    'discovered_at': row[1]
-                })
-            except json.JSONDecodeError:
-                pass
-        
-        return changes
+            columns = resource_columns(dict(row))
+            updates.append((
+                columns['cpu_cores'], columns['memory_total_bytes'],
+                columns['disk_total_bytes'], columns['disk_use_ratio'], row['id']
+            ))
+        cursor.executemany('''
+            UPDATE devices
+            SET cpu_cores = ?, memory_total_bytes = ?, disk_total_bytes = ?, disk_use_ratio = ?
+            WHERE id = ?
+        ''', updates)
     
-    def execute_query(self, query: str, params: Optional[Tuple] = None) -> List[Dict[str, Any]]:
-        """Execute a query and return results."""
+    def store_device(self, device_data: Dict[str, Any]) -> int:
+        """Store or update a device in SQLite."""
+        return self.store_devices_bulk([device_data])[0]
+    
+    def store_devices_bulk(self, devices: List[Dict[str, Any]]) -> List[int]:
+        """Upsert devices in SQLite with a single executemany and one commit."""
+        if not devices:
+            return []
         if not self.connection:
             self.connect()
         
+        updated_at = datetime.now().isoformat()
+        interfaces_index = DEVICE_COLUMNS.index('network_interfaces')
+        records = []
+        rows = []
+        for device_data in _latest_per_device(devices):
+            record = {
+                **device_data,
+                **resource_columns(device_data),
+                'connection_ipv4': ipv4_int(device_data.get('connection_ip'))
+            }
+            row = [record.get(column) for column in SQLITE_UPSERT_COLUMNS]
+            # Accept already-parsed interfaces (e.g. rows read back from another adapter)
+            if isinstance(row[interfaces_index], (list, dict)):
+                row[interfaces_index] = json.dumps(row[interfaces_index])
+            row.append(updated_at)
+            records.append(record)
+            rows.append(row)
+        keys = [(row[0], row[1]) for row in rows]
+        
         cursor = self.connection.cursor()
-        if params:
-            cursor.execute(query, params)
-        else:
+        try:
+            # Take the write lock before reading the rows whose counts we replace
+            if not self.connection.in_transaction:
+                cursor.execute('BEGIN IMMEDIATE')
+            previous = self._select_devices_by_key(
+                cursor, keys, 'status, os_info, cpu_model, disk_use_ratio'
+            )
+            cursor.executemany(SQLITE_UPSERT_DEVICE_SQL, rows)
+            self._apply_topology_deltas(cursor, topology_deltas(previous, records))
+            device_ids = {
+                (row['hostname'], row['connection_ip']): row['id']
+                for row in self._select_devices_by_key(cursor, keys, 'id')
+            }
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        
+        return [device_ids[(d['hostname'], d['connection_ip'])] for d in devices]
+    
+    def _select_devices_by_key(
+        self,
+        cursor,
+        keys: List[Tuple[str, str]],
+        columns: str
+    ) -> List[Dict[str, Any]]:
+        """Select columns for (hostname, connection_ip) keys, in chunks under the bind limit."""
+        rows = []
+        for start in range(0, len(keys), 400):
+            chunk = keys[start:start + 400]
+            cursor.execute(
+                f'SELECT hostname, connection_ip, {columns} FROM devices '
+                'WHERE (hostname, connection_ip) IN (VALUES ' + ', '.join(['(?, ?)'] * len(chunk)) + ')',
+                [value for key in chunk for value in key]
+            )
+            rows.extend(dict(row) for row in cursor.fetchall())
+        return rows
+    
+    def _apply_topology_deltas(self, cursor, deltas: Dict[Tuple[str, str], int]) -> None:
+        """Add counter deltas to topology_counters and drop counters that reach zero."""
+        if not deltas:
+            return
+        cursor.executemany('''
+            INSERT INTO topology_counters (dimension, value, devices) VALUES (?, ?, ?)
+            ON CONFLICT(dimension, value) DO UPDATE SET devices = devices + excluded.devices
+        ''', [(dimension, value, delta) for (dimension, value), delta in deltas.items()])
+        cursor.execute('DELETE FROM topology_counters WHERE devices <= 0')
+    
+    def _rebuild_topology_counters(self, cursor) -> None:
+        """Replace the topology counters with counts from a full devices scan."""
+        cursor.execute('SELECT status, os_info, cpu_model, connection_ip, disk_use_ratio FROM devices')
+        deltas = topology_deltas([], (dict(row) for row in cursor.fetchall()))
+        cursor.execute('DELETE FROM topology_counters')
+        self._apply_topology_deltas(cursor, deltas)
+    
+    def rebuild_topology_counters(self) -> None:
+        """Recompute the SQLite topology counters from the devices table."""
+        if not self.connection:
+            self.connect()
+        
+        cursor = self.connection.cursor()
+        try:
+            self._rebuild_topology_counters(cursor)
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+    
+    def get_all_devices(self) -> List[Dict[str, Any]]:
+        """Get all devices from SQLite."""
+        if not self.connection:
+            self.connect()
+        
+        return list(self.iter_devices())
+    
+    def iter_devices(self, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Stream devices from SQLite, fetching batch_size rows per step."""
+        cursor = self._reader().cursor()
+        try:
+            cursor.execute('SELECT * FROM devices ORDER BY hostname, connection_ip')
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self._device_from_row(row)
+        finally:
+            cursor.close()
+    
+    def _device_from_row(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """Convert a devices row to a dict with parsed network interfaces."""
+        device_dict = dict(row)
+        # Parse network interfaces JSON
+        if device_dict.get('network_interfaces'):
+            try:
+                device_dict['network_interfaces'] = json.loads(device_dict['network_interfaces'])
+            except json.JSONDecodeError:
+                device_dict['network_interfaces'] = []
+        return device_dict
+    
+    def get_devices_page(
+        self,
+        fields: Optional[List[str]] = None,
+        limit: int = 100,
+        after: Optional[Tuple[str, int]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        search: Optional[List[SearchTerm]] = None
+    ) -> List[Dict[str, Any]]:
+        """Get a page of devices from SQLite, selecting only the requested fields."""
+        columns = _page_fields(fields)
+        where, params = _device_page_where(filters, after, 'sqlite', search)
+        cursor = self._reader().cursor()
+        cursor.execute(
+            f'SELECT {", ".join(columns)} FROM devices WHERE {where} ORDER BY hostname, id LIMIT ?',
+            params + [limit]
+        )
+        return [self._device_from_row(row) for row in cursor.fetchall()]
+    
+    def count_devices(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        search: Optional[List[SearchTerm]] = None
+    ) -> int:
+        """Count devices matching the filters in SQLite."""
+        where, params = _device_page_where(filters, None, 'sqlite', search)
+        cursor = self._reader().cursor()
+        cursor.execute(f'SELECT COUNT(*) FROM devices WHERE {where}', params)
+        return cursor.fetchone()[0]
+    
+    def _get_one_device(self, where: str, params: Tuple) -> Optional[Dict[str, Any]]:
+        """Fetch the newest device matching an indexed WHERE clause."""
+        cursor = self._reader().cursor()
+        cursor.execute(
+            f'SELECT * FROM devices WHERE {where} ORDER BY last_seen DESC, id DESC LIMIT 1',
+            params
+        )
+        row = cursor.fetchone()
+        return self._device_from_row(row) if row else None
+    
+    def get_device(self, device_id: int) -> Optional[Dict[str, Any]]:
+        """Get one device from SQLite by primary key."""
+        return self._get_one_device('id = ?', (device_id,))
+    
+    def get_device_by_ip(self, connection_ip: str) -> Optional[Dict[str, Any]]:
+        """Get the most recently seen device with this connection IP from SQLite."""
+        return self._get_one_device('connection_ip = ?', (connection_ip,))
+    
+    def get_device_by_hostname(self, hostname: str) -> Optional[Dict[str, Any]]:
+        """Get the most recently seen device with this hostname from SQLite."""
+        return self._get_one_device('hostname = ?', (hostname,))
+    
+    def update_device_status(self, device_id: int, status: str) -> bool:
+        """Set a device's status in SQLite."""
+        if not self.connection:
+            self.connect()
+        
+        cursor = self.connection.cursor()
+        try:
+            if not self.connection.in_transaction:
+                cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute(
+                'SELECT status, os_info, cpu_model, connection_ip, disk_use_ratio FROM devices WHERE id = ?',
+                (device_id,)
+            )
+            row = cursor.fetchone()
+            if row is None:
+                self.connection.rollback()
+                return False
+            
+            previous = dict(row)
+            cursor.execute(
+                'UPDATE devices SET status = ?, updated_at = ? WHERE id = ?',
+                (status, datetime.now().isoformat(), device_id)
+            )
+            self._apply_topology_deltas(
+                cursor, topology_deltas([previous], [{**previous, 'status': status}])
+            )
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        return True
+    
+    def _history_rows(self, cursor, device_id: int, from_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get a device's history rows, oldest first, from the keyframe covering from_id.
+        
+        With no from_id this is the chain ending at the latest row.
+        """
+        cursor.execute('''
+            SELECT id, discovery_data, discovered_at, encoding, payload
+            FROM discovery_history
+            WHERE device_id = ? AND id >= COALESCE((
+                SELECT MAX(id) FROM discovery_history
+                WHERE device_id = ? AND id <= COALESCE(?, id)
+                  AND (encoding IS NULL OR encoding LIKE 'keyframe%')
+            ), 0)
+            ORDER BY id
+        ''', (device_id, device_id, from_id))
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def _replace_hardware_inventory(self, cursor, device_id: int, snapshot: Any) -> None:
+        """Swap a device's USB, PCI and block inventory for the rows in a snapshot."""
+        self._write_hardware_inventory(cursor, device_id, extract_inventory(snapshot))
+    
+    def _write_hardware_inventory(self, cursor, device_id: int, inventory: HardwareInventory) -> None:
+        """Swap a device's inventory for the given rows of each kind."""
+        for kind, rows in inventory.items():
+            table, columns = HARDWARE_TABLES[kind]
+            cursor.execute(f'DELETE FROM {table} WHERE device_id = ?', (device_id,))
+            if rows:
+                cursor.executemany(
+                    f'INSERT INTO {table} (device_id, {", ".join(columns)}) '
+                    f'VALUES ({", ".join("?" * (len(columns) + 1))})',
+                    [(device_id,) + row for row in rows]
+                )
+    
+    def _backfill_history_search(self, cursor) -> None:
+        """Index every stored snapshot for full-text search."""
+        cursor.execute('SELECT DISTINCT device_id FROM discovery_history')
+        for device_id in [row[0] for row in cursor.fetchall()]:
+            cursor.execute('''
+                SELECT id, discovery_data, encoding, payload FROM discovery_history
+                WHERE device_id = ? ORDER BY id
+            ''', (device_id,))
+            rows = [dict(row) for row in cursor.fetchall()]
+            cursor.executemany(
+                'INSERT INTO history_fts (rowid, content) VALUES (?, ?)',
+                [(row['id'], search_text(snapshot)) for row, snapshot in zip(rows, decode_chain(rows))]
+            )
+    
+    def _backfill_hardware_inventory(self, cursor) -> None:
+        """Build the inventory from each device's latest stored snapshot."""
+        cursor.execute('SELECT DISTINCT device_id FROM discovery_history')
+        for device_id in [row[0] for row in cursor.fetchall()]:
+            chain = self._history_rows(cursor, device_id)
+            if chain:
+                self._replace_hardware_inventory(cursor, device_id, decode_chain(chain)[-1])
+    
+    def store_discovery_history(self, device_id: int, discovery_data: str, data_hash: str) -> None:
+        """Store discovery history in SQLite as a keyframe or a delta against the last row."""
+        if not self.connection:
+            self.connect()
+        
+        cursor = self.connection.cursor()
+        try:
+            # Same as the newest snapshot: history and inventory are already current
+            cursor.execute('''
+                SELECT data_hash FROM discovery_history WHERE device_id = ?
+                ORDER BY id DESC LIMIT 1
+            ''', (device_id,))
+            newest = cursor.fetchone()
+            if newest and newest[0] == data_hash:
+                return
+            
+            # Any other snapshot sets the inventory, even one history already holds (A -> B -> A)
+            snapshot = parse_snapshot(discovery_data)
+            self._replace_hardware_inventory(cursor, device_id, snapshot)
+            
+            # Known snapshot: nothing to encode
+            cursor.execute('''
+                SELECT 1 FROM discovery_history WHERE device_id = ? AND data_hash = ?
+            ''', (device_id, data_hash))
+            if cursor.fetchone():
+                self.connection.commit()
+                return
+            
+            chain = self._history_rows(cursor, device_id)
+            previous = decode_chain(chain)[-1] if chain else None
+            encoding, payload = self.history_codec.encode(
+                snapshot, previous, len(chain) - 1 if chain else None
+            )
+            
+            # The unique (device_id, data_hash) index still guards against races
+            cursor.execute('''
+                INSERT OR IGNORE INTO discovery_history (device_id, data_hash, encoding, payload)
+                VALUES (?, ?, ?, ?)
+            ''', (device_id, data_hash, encoding, payload))
+            if cursor.rowcount == 1 and self.history_fts_available:
+                cursor.execute(
+                    'INSERT INTO history_fts (rowid, content) VALUES (?, ?)',
+                    (cursor.lastrowid, search_text(snapshot))
+                )
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+    
+    def enable_change_capture(self) -> None:
+        """Start logging device and history writes to change_log for replication."""
+        if not self.connection:
+            self.connect()
+        
+        cursor = self.connection.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                device_id INTEGER NOT NULL
+            )
+        ''')
+        # Triggers live in the database file, so writes from every process are captured
+        for name, (event, table, row_id, device_id) in CHANGE_CAPTURE_TRIGGERS.items():
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table}
+                BEGIN
+                    INSERT INTO change_log (table_name, row_id, device_id)
+                    VALUES ('{table}', {row_id}, {device_id});
+                END
+            ''')
+        self.connection.commit()
+    
+    def disable_change_capture(self) -> None:
+        """Drop the capture triggers and the change log after cut-over."""
+        if not self.connection:
+            self.connect()
+        
+        cursor = self.connection.cursor()
+        for name in CHANGE_CAPTURE_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute('DROP TABLE IF EXISTS change_log')
+        self.connection.commit()
+    
+    def read_changes(self, limit: int = 500) -> List[Dict[str, Any]]:
+        """Get the oldest unacknowledged captured changes."""
+        if not self.connection:
+            self.connect()
+        
+        cursor = self.connection.cursor()
+        cursor.execute(
+            'SELECT seq, table_name, row_id, device_id FROM change_log ORDER BY seq LIMIT ?',
+            (limit,)
+        )
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def ack_changes(self, up_to_seq: int) -> None:
+        """Discard captured changes that have been applied to the replica."""
+        if not self.connection:
+            self.connect()
+        
+        self.connection.execute('DELETE FROM change_log WHERE seq <= ?', (up_to_seq,))
+        self.connection.commit()
+    
+    def iter_history_rows(
+        self,
+        device_id: int,
+        batch_size: int = 1000,
+        from_id: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream a device's encoded history rows from SQLite, batch_size rows per fetch."""
+        cursor = self._reader().cursor()
+        try:
+            cursor.execute(f'''
+                SELECT id, {', '.join(HISTORY_LOAD_COLUMNS)} FROM discovery_history
+                WHERE device_id = ? AND id >= COALESCE((
+                    SELECT MAX(id) FROM discovery_history
+                    WHERE device_id = ? AND id <= ?
+                      AND (encoding IS NULL OR encoding LIKE 'keyframe%')
+                ), 0)
+                ORDER BY id
+            ''', (device_id, device_id, from_id))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+        finally:
+            cursor.close()
+    
+    def get_history_hashes(self, device_ids: List[int]) -> Dict[int, List[str]]:
+        """Get history data hashes for several devices from SQLite in one query."""
+        hashes: Dict[int, List[str]] = {device_id: [] for device_id in device_ids}
+        if not device_ids:
+            return hashes
+        cursor = self._reader().cursor()
+        cursor.execute(f'''
+            SELECT device_id, data_hash FROM discovery_history
+            WHERE device_id IN ({', '.join('?' * len(device_ids))})
+            ORDER BY device_id, id
+        ''', list(device_ids))
+        for device_id, data_hash in cursor.fetchall():
+            hashes[device_id].append(data_hash)
+        return hashes
+    
+    def get_metrics_digests(self, device_ids: List[int]) -> Dict[int, str]:
+        """Digest several devices' metrics samples from SQLite in one streamed query."""
+        if not device_ids:
+            return {}
+        cursor = self._reader().cursor()
+        cursor.execute(f'''
+            SELECT device_id, metrics, collected_at FROM device_metrics
+            WHERE device_id IN ({', '.join('?' * len(device_ids))})
+            ORDER BY device_id, id
+        ''', list(device_ids))
+        return _metrics_digests(device_ids, cursor)
+    
+    def load_discovery_history(
+        self,
+        device_id: int,
+        rows: List[Dict[str, Any]],
+        snapshots: List[Any]
+    ) -> int:
+        """Append encoded history rows to SQLite in one transaction."""
+        if not self.connection:
+            self.connect()
+        
+        cursor = self.connection.cursor()
+        loaded = 0
+        try:
+            for row, snapshot in zip(rows, snapshots):
+                cursor.execute(f'''
+                    INSERT OR IGNORE INTO discovery_history (device_id, {', '.join(HISTORY_LOAD_COLUMNS)})
+                    VALUES (?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+                ''', (device_id,) + tuple(row[column] for column in HISTORY_LOAD_COLUMNS))
+                if cursor.rowcount == 1:
+                    loaded += 1
+                    if self.history_fts_available:
+                        cursor.execute(
+                            'INSERT INTO history_fts (rowid, content) VALUES (?, ?)',
+                            (cursor.lastrowid, search_text(snapshot))
+                        )
+            if snapshots:
+                self._replace_hardware_inventory(cursor, device_id, snapshots[-1])
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        return loaded
+    
+    def get_device_changes(self, device_id: int, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get device change history from SQLite, rebuilding delta-encoded rows."""
+        cursor = self._reader().cursor()
+        cursor.execute('''
+            SELECT MIN(id) FROM (
+                SELECT id FROM discovery_history
+                WHERE device_id = ?
+                ORDER BY id DESC LIMIT ?
+            )
+        ''', (device_id, limit))
+        oldest_id = cursor.fetchone()[0]
+        if oldest_id is None:
+            return []
+        
+        rows = self._history_rows(cursor, device_id, oldest_id)
+        changes = [
+            {'data': snapshot, 'discovered_at': row['discovered_at']}
+            for row, snapshot in zip(rows, decode_chain(rows))
+            if row['id'] >= oldest_id
+        ]
+        changes.reverse()
+        return changes
+    
+    def reencode_history(self, device_id: Optional[int] = None, codec: Optional[HistoryCodec] = None) -> Dict[str, int]:
+        """Rewrite SQLite history rows with a codec, one transaction per device."""
+        if not self.connection:
+            self.connect()
+        
+        codec = codec or self.history_codec
+        cursor = self.connection.cursor()
+        
+        if device_id is None:
+            cursor.execute('SELECT DISTINCT device_id FROM discovery_history')
+            device_ids = [row[0] for row in cursor.fetchall()]
+        else:
+            device_ids = [device_id]
+        
+        stats = {'devices': 0, 'rows': 0, 'bytes_before': 0, 'bytes_after': 0}
+        for current_id in device_ids:
+            cursor.execute('''
+                SELECT id, discovery_data, encoding, payload FROM discovery_history
+                WHERE device_id = ? ORDER BY id
+            ''', (current_id,))
+            rows = [dict(row) for row in cursor.fetchall()]
+            encoded = codec.reencode(rows)
+            
+            cursor.executemany('''
+                UPDATE discovery_history SET encoding = ?, payload = ?, discovery_data = NULL
+                WHERE id = ?
+            ''', [(encoding, payload, row['id']) for row, (encoding, payload) in zip(rows, encoded)])
+            self.connection.commit()
+            
+            stats['devices'] += 1
+            stats['rows'] += len(rows)
+            stats['bytes_before'] += sum(stored_size(row) for row in rows)
+            stats['bytes_after'] += sum(len(payload) for _, payload in encoded)
+        
+        return stats
+    
+    def store_device_metrics(self, device_id: int, metrics: Dict[str, Any]) -> None:
+        """Store a volatile metrics sample in SQLite."""
+        if not self.connection:
+            self.connect()
+        
+        cursor = self.connection.cursor()
+        cursor.execute('''
+            INSERT INTO device_metrics (device_id, metrics)
+            VALUES (?, ?)
+        ''', (device_id, json.dumps(metrics)))
+        self._prune_device_metrics(cursor, device_id)
+        self.connection.commit()
+    
+    def _prune_device_metrics(self, cursor, device_id: int) -> None:
+        """Keep only the newest metrics_retention samples for a device."""
+        if not self.metrics_retention:
+            return
+        cursor.execute('''
+            DELETE FROM device_metrics
+            WHERE device_id = ? AND id <= (
+                SELECT id FROM device_metrics WHERE device_id = ?
+                ORDER BY id DESC LIMIT 1 OFFSET ?
+            )
+        ''', (device_id, device_id, self.metrics_retention))
+    
+    def iter_metrics_rows(
+        self,
+        device_id: int,
+        batch_size: int = 1000,
+        from_id: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream a device's metrics samples from SQLite, batch_size rows per fetch."""
+        cursor = self._reader().cursor()
+        try:
+            cursor.execute(f'''
+                SELECT id, {', '.join(METRICS_LOAD_COLUMNS)} FROM device_metrics
+                WHERE device_id = ? AND id >= ?
+                ORDER BY id
+            ''', (device_id, from_id or 0))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+        finally:
+            cursor.close()
+    
+    def load_device_metrics(self, device_id: int, rows: List[Dict[str, Any]]) -> int:
+        """Append metrics samples to SQLite in one transaction."""
+        if not self.connection:
+            self.connect()
+        
+        cursor = self.connection.cursor()
+        loaded = 0
+        try:
+            for row in rows:
+                metrics = _metrics_json(row['metrics'])
+                cursor.execute('''
+                    INSERT INTO device_metrics (device_id, metrics, collected_at)
+                    SELECT ?, ?, COALESCE(?, CURRENT_TIMESTAMP)
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM device_metrics
+                        WHERE device_id = ? AND collected_at = ? AND metrics = ?
+                    )
+                ''', (device_id, metrics, row['collected_at'], device_id, row['collected_at'], metrics))
+                loaded += cursor.rowcount
+            self._prune_device_metrics(cursor, device_id)
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        return loaded
+    
+    def get_device_metrics(self, device_id: int, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get recent volatile metrics samples from SQLite."""
+        cursor = self._reader().cursor()
+        cursor.execute('''
+            SELECT metrics, collected_at FROM device_metrics
+            WHERE device_id = ?
+            ORDER BY collected_at DESC, id DESC LIMIT ?
+        ''', (device_id, limit))
+        
+        return [
+            {'metrics': json.loads(row[0]), 'collected_at': row[1]}
+            for row in cursor.fetchall()
+        ]
+    
+    def get_topology_summary(self) -> Dict[str, Dict[str, int]]:
+        """Read the running topology counters from SQLite."""
+        cursor = self._reader().cursor()
+        cursor.execute('SELECT dimension, value, devices FROM topology_counters')
+        return _topology_summary(tuple(row) for row in cursor.fetchall())
+    
+    def get_data_versions(self) -> Dict[str, int]:
+        """Read the data_versions write counters from SQLite."""
+        cursor = self._reader().cursor()
+        cursor.execute('SELECT scope, version FROM data_versions')
+        return {row[0]: row[1] for row in cursor.fetchall()}
+    
+    def find_devices_by_resources(self, conditions: List[ResourceCondition]) -> List[Dict[str, Any]]:
+        """Get online devices matching every resource condition from SQLite."""
+        where, params = compile_resource_conditions(conditions, '?')
+        cursor = self._reader().cursor()
+        cursor.execute(f'''
+            SELECT hostname, connection_ip, os_info, cpu_cores, memory_total,
+                   memory_total_bytes, disk_use_percent, disk_use_ratio
+            FROM devices
+            WHERE status = 'success' AND {where}
+            ORDER BY hostname, connection_ip
+        ''', params)
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def search_history(
+        self,
+        phrases: List[str],
+        device_id: Optional[int] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Search history snapshots through the FTS5 index, ranked by BM25."""
+        if not self.history_fts_available:
+            raise RuntimeError("History search needs an SQLite build with FTS5")
+        
+        params: List[Any] = [fts5_match(phrases)]
+        device_clause = ''
+        if device_id is not None:
+            device_clause = 'AND h.device_id = ?'
+            params.append(device_id)
+        cursor = self._reader().cursor()
+        cursor.execute(f'''
+            SELECT h.id AS history_id, h.device_id, d.hostname, d.connection_ip,
+                   h.discovered_at, -bm25(history_fts) AS score
+            FROM history_fts
+            JOIN discovery_history h ON h.id = history_fts.rowid
+            JOIN devices d ON d.id = h.device_id
+            WHERE history_fts MATCH ? {device_clause}
+            ORDER BY bm25(history_fts), h.id DESC
+            LIMIT ?
+        ''', params + [limit])
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def find_hardware(self, kind: str, criteria: Dict[str, Any], limit: int = 100) -> List[Dict[str, Any]]:
+        """Look up USB, PCI or block inventory in SQLite through its indexes."""
+        query, params = compile_hardware_query(kind, criteria, 'sqlite')
+        cursor = self._reader().cursor()
+        cursor.execute(query, params + [limit])
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def get_hardware_inventory(self, device_id: int) -> HardwareInventory:
+        """Read a device's inventory rows from SQLite."""
+        cursor = self._reader().cursor()
+        inventory: HardwareInventory = {}
+        for kind, (table, columns) in HARDWARE_TABLES.items():
+            cursor.execute(
+                f'SELECT {", ".join(columns)} FROM {table} WHERE device_id = ? ORDER BY id',
+                (device_id,)
+            )
+            inventory[kind] = [tuple(row) for row in cursor.fetchall()]
+        return inventory
+    
+    def replace_hardware_inventory(self, device_id: int, inventory: HardwareInventory) -> None:
+        """Swap a device's inventory in SQLite in one transaction."""
+        if not self.connection:
+            self.connect()
+        
+        cursor = self.connection.cursor()
+        try:
+            self._write_hardware_inventory(cursor, device_id, inventory)
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+    
+    def execute_query(self, query: str, params: Optional[Tuple] = None) -> List[Dict[str, Any]]:
+        """Execute a query and return results."""
+        if not self.connection:
+            self.connect()
+        
+        cursor = self.connection.cursor()
+        if params:
+            cursor.execute(query, params)
+        else:
             cursor.execute(query)
         
         return [dict(row) for row in cursor.fetchall()]
 
 
+def _pooled_call(method: Callable) -> Callable:
+    """Run an adapter method on a connection checked out from the pool for that call.
+    
+    Calls made while a connection is already bound (nested calls, or one set
+    explicitly on the adapter) use it directly.
+    """
+    if inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def generator_wrapper(self, *args, **kwargs):
+            if self.connection is not None:
+                yield from method(self, *args, **kwargs)
+                return
+            # Generators keep their checkout until they are exhausted or closed, but it
+            # is bound only while their body runs: calls made between items get their
+            # own connection rather than committing the transaction holding the cursor
+            with self.pool.connection() as conn:
+                inner = method(self, *args, **kwargs)
+                try:
+                    while True:
+                        with self._bound(conn):
+                            try:
+                                item = next(inner)
+                            except StopIteration:
+                                return
+                        yield item
+                finally:
+                    with self._bound(conn):
+                        inner.close()
+        return generator_wrapper
+    
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.connection is not None:
+            return method(self, *args, **kwargs)
+        with self.pool.connection() as conn, self._bound(conn):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _checkout_per_call(cls):
+    """Wrap every DatabaseAdapter operation of cls so it runs on its own pooled checkout."""
+    for name in DatabaseAdapter.__abstractmethods__ - {'connect', 'close'}:
+        setattr(cls, name, _pooled_call(getattr(cls, name)))
+    return cls
+
+
+@_checkout_per_call
 class PostgreSQLAdapter(DatabaseAdapter):
-    """PostgreSQL database adapter with JSONB support."""
+    """PostgreSQL database adapter with JSONB support.
+    
+    Connections come from a process-wide pool shared by adapters with the same
+    parameters. Each operation checks one out for its duration and the connection
+    is bound per thread, so one adapter can serve concurrent callers.
+    """
     
     def __init__(self, connection_params: Optional[Dict[str, Any]] = None):
         if not POSTGRESQL_AVAILABLE:
@@ -307,18 +1668,56 @@ class PostgreSQLAdapter(DatabaseAdapter):
             }
         
         self.connection_params = connection_params
-        self.connection = None
+        self._local = threading.local()
+        self._pool: Optional[PostgreSQLConnectionPool] = None
+        self._pool_lock = threading.Lock()
+        config = DatabaseConfig()
+        self.history_codec = HistoryCodec(config.history_compression, config.history_keyframe_interval)
+        self.metrics_retention = config.metrics_retention
+    
+    @property
+    def connection(self) -> Any:
+        """Connection bound to the current thread, if an operation is running on it."""
+        return getattr(self._local, 'connection', None)
+    
+    @connection.setter
+    def connection(self, value: Any) -> None:
+        # Set from outside, the connection is the caller's rather than the pool's
+        self._local.connection = value
+        self._local.pooled = False
+    
+    @contextmanager
+    def _bound(self, conn: Any) -> Iterator[None]:
+        """Bind a checked-out connection to the current thread for the block."""
+        previous = (self.connection, getattr(self._local, 'pooled', False))
+        self._local.connection, self._local.pooled = conn, True
+        try:
+            yield
+        finally:
+            self._local.connection, self._local.pooled = previous
+    
+    @property
+    def pool(self) -> PostgreSQLConnectionPool:
+        """Shared connection pool for this adapter's parameters."""
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = acquire_pg_pool(self.connection_params)
+            return self._pool
     
     def connect(self) -> None:
-        """Establish PostgreSQL connection."""
-        self.connection = psycopg2.connect(**self.connection_params)
-        self.connection.autocommit = False
+        """Open the pool's minimum connections."""
+        self.pool.warm()
     
     def close(self) -> None:
-        """Close PostgreSQL connection."""
-        if self.connection:
+        """Release this adapter's use of the shared pool and close an explicitly set connection."""
+        # A pooled checkout goes back through the pool when its call ends
+        if self.connection is not None and not getattr(self._local, 'pooled', False):
             self.connection.close()
             self.connection = None
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            release_pg_pool(pool)
     
     def init_schema(self) -> None:
         """Initialize PostgreSQL schema with JSONB support."""
@@ -361,6 +1760,17 @@ class PostgreSQLAdapter(DatabaseAdapter):
             ON devices (hostname, connection_ip)
         ''')
         
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_devices_connection_ip 
+            ON devices (connection_ip)
+        ''')
+        
+        # Keyset pagination walks devices in (hostname, id) order
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_devices_hostname_id 
+            ON devices (hostname, id)
+        ''')
+        
         cursor.execute('''
             CREATE INDEX IF NOT EXISTS idx_devices_status 
             ON devices (status)
@@ -386,89 +1796,338 @@ class PostgreSQLAdapter(DatabaseAdapter):
             ON discovery_history USING GIN (discovery_data)
         ''')
         
-        self.connection.commit()
-    
-    def store_device(self, device_data: Dict[str, Any]) -> int:
-        """Store or update a device in PostgreSQL with JSONB."""
-        if not self.connection:
-            self.connect()
+        # Typed resource columns mirror system_info so analytics can run as SQL aggregates
+        cursor.execute('''
+            SELECT column_name FROM information_schema.columns
+            WHERE table_name = 'devices'
+        ''')
+        device_columns = {row[0] for row in cursor.fetchall()}
+        missing_columns = [
+            c for c in ('cpu_cores',) + RESOURCE_COLUMNS if c not in device_columns
+        ]
+        cursor.execute('ALTER TABLE devices ADD COLUMN IF NOT EXISTS cpu_cores INTEGER')
+        cursor.execute('ALTER TABLE devices ADD COLUMN IF NOT EXISTS memory_total_bytes BIGINT')
+        cursor.execute('ALTER TABLE devices ADD COLUMN IF NOT EXISTS disk_total_bytes BIGINT')
+        cursor.execute('ALTER TABLE devices ADD COLUMN IF NOT EXISTS disk_use_ratio REAL')
+        if missing_columns:
+            self._backfill_resource_columns(cursor)
         
-        cursor = self.connection.cursor()
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_devices_status_resources 
+            ON devices (status, cpu_cores, memory_total_bytes)
+        ''')
         
-        # Prepare system info JSONB
-        system_info = {
-            'cpu': {
-                'model': device_data.get('cpu_model'),
-                'cores': device_data.get('cpu_cores')
-            },
-            'memory': {
-                'total': device_data.get('memory_total'),
-                'used': device_data.get('memory_used'),
-                'free': device_data.get('memory_free'),
-                'available': device_data.get('memory_available')
-            },
-            'disk': {
-                'filesystem': device_data.get('disk_filesystem'),
-                'size': device_data.get('disk_size'),
-                'used': device_data.get('disk_used'),
-                'available': device_data.get('disk_available'),
-                'use_percent': device_data.get('disk_use_percent'),
-                'mount': device_data.get('disk_mount')
-            },
-            'uptime': device_data.get('uptime'),
-            'os': device_data.get('os_info')
-        }
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_devices_status_disk 
+            ON devices (status, disk_use_ratio)
+        ''')
         
-        # Parse network interfaces
-        network_interfaces = []
-        if device_data.get('network_interfaces'):
-            if isinstance(device_data['network_interfaces'], str):
-                try:
-                    network_interfaces = json.loads(device_data['network_interfaces'])
-                except json.JSONDecodeError:
-                    network_interfaces = []
-            elif isinstance(device_data['network_interfaces'], list):
-                network_interfaces = device_data['network_interfaces']
+        # Search indexes: OS prefix LIKE needs pattern ops; subnet search uses the INET B-tree
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_devices_os_lower 
+            ON devices (lower(system_info->>'os') text_pattern_ops)
+        ''')
         
-        # Check if device exists
         cursor.execute('''
-            SELECT id FROM devices 
-            WHERE hostname = %s AND connection_ip = %s
-        ''', (device_data['hostname'], device_data['connection_ip']))
+            CREATE INDEX IF NOT EXISTS idx_devices_last_seen 
+            ON devices (last_seen)
+        ''')
         
-        existing = cursor.fetchone()
+        # Delta-encoded rows keep their data in payload instead of discovery_data
+        cursor.execute('ALTER TABLE discovery_history ADD COLUMN IF NOT EXISTS encoding VARCHAR(32)')
+        cursor.execute('ALTER TABLE discovery_history ADD COLUMN IF NOT EXISTS payload BYTEA')
+        cursor.execute('ALTER TABLE discovery_history ALTER COLUMN discovery_data DROP NOT NULL')
         
-        if existing:
-            # Update existing device
-            device_id = existing[0]
-            cursor.execute('''
-                UPDATE devices SET
-                    last_seen = %s, status = %s, system_info = %s,
-                    network_interfaces = %s, error_message = %s, updated_at = NOW()
-                WHERE id = %s
-            ''', (
-                device_data['last_seen'], device_data['status'],
-                json.dumps(system_info), json.dumps(network_interfaces),
-                device_data.get('error_message'), device_id
-            ))
-        else:
-            # Insert new device
-            cursor.execute('''
+        # Full-text vector of each snapshot, filled at insert and served by a GIN index
+        cursor.execute('ALTER TABLE discovery_history ADD COLUMN IF NOT EXISTS search_vector TSVECTOR')
+        cursor.execute("SELECT to_regclass('idx_history_search')")
+        search_index = cursor.fetchone()
+        if not (search_index and search_index[0]):
+            self._backfill_history_search()
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_history_search 
+            ON discovery_history USING GIN (search_vector)
+        ''')
+        
+        # Volatile metrics live apart from history so history only grows on real changes
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS device_metrics (
+                id SERIAL PRIMARY KEY,
+                device_id INTEGER REFERENCES devices(id),
+                metrics JSONB NOT NULL,
+                collected_at TIMESTAMP DEFAULT NOW()
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_metrics_device_time 
+            ON device_metrics (device_id, collected_at)
+        ''')
+        
+        self._ensure_history_dedup_index(cursor)
+        
+        # Hardware inventory, replaced from each new snapshot at ingest
+        cursor.execute("SELECT to_regclass('hardware_usb')")
+        inventory_exists = cursor.fetchone()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS hardware_usb (
+                id SERIAL PRIMARY KEY,
+                device_id INTEGER NOT NULL REFERENCES devices(id) ON DELETE CASCADE,
+                vendor_id VARCHAR(8),
+                product_id VARCHAR(8),
+                bus VARCHAR(8),
+                device_number VARCHAR(8),
+                description TEXT
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS hardware_pci (
+                id SERIAL PRIMARY KEY,
+                device_id INTEGER NOT NULL REFERENCES devices(id) ON DELETE CASCADE,
+                slot VARCHAR(32),
+                pci_class TEXT,
+                device_type VARCHAR(32),
+                description TEXT
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS hardware_block (
+                id SERIAL PRIMARY KEY,
+                device_id INTEGER NOT NULL REFERENCES devices(id) ON DELETE CASCADE,
+                name VARCHAR(64),
+                model TEXT,
+                size VARCHAR(32),
+                size_bytes BIGINT
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_hardware_usb_ids 
+            ON hardware_usb (vendor_id, product_id)
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_hardware_pci_class 
+            ON hardware_pci (pci_class)
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_hardware_pci_type 
+            ON hardware_pci (device_type)
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_hardware_block_model 
+            ON hardware_block (lower(model) text_pattern_ops)
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_hardware_block_size 
+            ON hardware_block (size_bytes)
+        ''')
+        
+        for table, _ in HARDWARE_TABLES.values():
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_device ON {table} (device_id)')
+        if not (inventory_exists and inventory_exists[0]):
+            self._backfill_hardware_inventory()
+        
+        # Running topology counts, kept in step with devices on every write
+        cursor.execute("SELECT to_regclass('topology_counters')")
+        existing = cursor.fetchone()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS topology_counters (
+                dimension VARCHAR(32) NOT NULL,
+                value TEXT NOT NULL,
+                devices INTEGER NOT NULL,
+                PRIMARY KEY (dimension, value)
+            )
+        ''')
+        if not (existing and existing[0]):
+            self._rebuild_topology_counters(cursor)
+        
+        # Write counters maintained by statement triggers, so writes from any client show up
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS data_versions (
+                scope VARCHAR(32) PRIMARY KEY,
+                version BIGINT NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE OR REPLACE FUNCTION bump_data_version() RETURNS trigger AS $$
+            BEGIN
+                UPDATE data_versions SET version = version + 1 WHERE scope = TG_ARGV[0];
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        for scope, table in DATA_VERSION_TABLES.items():
+            cursor.execute(
+                'INSERT INTO data_versions (scope) VALUES (%s) ON CONFLICT DO NOTHING', (scope,)
+            )
+            cursor.execute(f'DROP TRIGGER IF EXISTS version_{table} ON {table}')
+            cursor.execute(f'''
+                CREATE TRIGGER version_{table}
+                AFTER INSERT OR UPDATE OR DELETE ON {table}
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version('{scope}')
+            ''')
+        
+        self.connection.commit()
+    
+    def _ensure_history_dedup_index(self, cursor) -> None:
+        """Collapse duplicate history rows once, then enforce uniqueness with an index."""
+        cursor.execute("SELECT to_regclass('idx_history_device_hash')")
+        existing = cursor.fetchone()
+        if existing and existing[0]:
+            return
+        
+        # Keep the earliest snapshot for each (device_id, data_hash)
+        cursor.execute('''
+            DELETE FROM discovery_history newer
+            USING discovery_history older
+            WHERE newer.device_id = older.device_id
+              AND newer.data_hash = older.data_hash
+              AND newer.id > older.id
+        ''')
+        
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_history_device_hash 
+            ON discovery_history (device_id, data_hash)
+        ''')
+    
+    def _backfill_resource_columns(self, cursor) -> None:
+        """Fill the typed resource columns from each device's system_info."""
+        cursor.execute('SELECT id, system_info FROM devices')
+        updates = []
+        for row in cursor.fetchall():
+            system_info = row[1] or {}
+            columns = resource_columns({
+                'cpu_cores': system_info.get('cpu', {}).get('cores'),
+                'memory_total': system_info.get('memory', {}).get('total'),
+                'disk_size': system_info.get('disk', {}).get('size'),
+                'disk_used': system_info.get('disk', {}).get('used'),
+                'disk_use_percent': system_info.get('disk', {}).get('use_percent')
+            })
+            updates.append((
+                columns['cpu_cores'], columns['memory_total_bytes'],
+                columns['disk_total_bytes'], columns['disk_use_ratio'], row[0]
+            ))
+        psycopg2.extras.execute_batch(cursor, '''
+            UPDATE devices
+            SET cpu_cores = %s, memory_total_bytes = %s, disk_total_bytes = %s, disk_use_ratio = %s
+            WHERE id = %s
+        ''', updates)
+    
+    def _device_row(self, device_data: Dict[str, Any]) -> Tuple:
+        """Build the devices row (with JSONB system info) for a flat device record."""
+        # Prepare system info JSONB
+        system_info = {
+            'cpu': {
+                'model': device_data.get('cpu_model'),
+                'cores': device_data.get('cpu_cores')
+            },
+            'memory': {
+                'total': device_data.get('memory_total'),
+                'used': device_data.get('memory_used'),
+                'free': device_data.get('memory_free'),
+                'available': device_data.get('memory_available')
+            },
+            'disk': {
+                'filesystem': device_data.get('disk_filesystem'),
+                'size': device_data.get('disk_size'),
+                'used': device_data.get('disk_used'),
+                'available': device_data.get('disk_available'),
+                'use_percent': device_data.get('disk_use_percent'),
+                'mount': device_data.get('disk_mount')
+            },
+            'uptime': device_data.get('uptime'),
+            'os': device_data.get('os_info')
+        }
+        
+        # Parse network interfaces
+        network_interfaces = []
+        if device_data.get('network_interfaces'):
+            if isinstance(device_data['network_interfaces'], str):
+                try:
+                    network_interfaces = json.loads(device_data['network_interfaces'])
+                except json.JSONDecodeError:
+                    network_interfaces = []
+            elif isinstance(device_data['network_interfaces'], list):
+                network_interfaces = device_data['network_interfaces']
+        
+        resources = resource_columns(device_data)
+        return (
+            device_data['hostname'], device_data['connection_ip'],
+            device_data['last_seen'], device_data['status'],
+            json.dumps(system_info), json.dumps(network_interfaces),
+            device_data.get('error_message'),
+            resources['cpu_cores'], resources['memory_total_bytes'],
+            resources['disk_total_bytes'], resources['disk_use_ratio']
+        )
+    
+    def store_device(self, device_data: Dict[str, Any]) -> int:
+        """Store or update a device in PostgreSQL with JSONB."""
+        return self.store_devices_bulk([device_data])[0]
+    
+    def store_devices_bulk(self, devices: List[Dict[str, Any]], page_size: int = 500) -> List[int]:
+        """Upsert devices in PostgreSQL with execute_values in one transaction."""
+        if not devices:
+            return []
+        if not self.connection:
+            self.connect()
+        
+        # ON CONFLICT can't touch the same row twice in one statement
+        unique_devices = _latest_per_device(devices)
+        
+        cursor = self.connection.cursor()
+        try:
+            # Serialize counter updates so concurrent writers can't both replace the same rows
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext('topology_counters'))")
+            previous = self._select_topology_rows(
+                cursor,
+                'WHERE (hostname, connection_ip) IN %s',
+                (tuple((d['hostname'], d['connection_ip']) for d in unique_devices),)
+            )
+            returned = psycopg2.extras.execute_values(
+                cursor,
+                '''
                 INSERT INTO devices (
                     hostname, connection_ip, last_seen, status,
-                    system_info, network_interfaces, error_message
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    system_info, network_interfaces, error_message,
+                    cpu_cores, memory_total_bytes, disk_total_bytes, disk_use_ratio
+                ) VALUES %s
+                ON CONFLICT (hostname, connection_ip) DO UPDATE SET
+                    last_seen = EXCLUDED.last_seen,
+                    status = EXCLUDED.status,
+                    system_info = EXCLUDED.system_info,
+                    network_interfaces = EXCLUDED.network_interfaces,
+                    error_message = EXCLUDED.error_message,
+                    cpu_cores = EXCLUDED.cpu_cores,
+                    memory_total_bytes = EXCLUDED.memory_total_bytes,
+                    disk_total_bytes = EXCLUDED.disk_total_bytes,
+                    disk_use_ratio = EXCLUDED.disk_use_ratio,
+                    updated_at = NOW()
                 RETURNING id
-            ''', (
-                device_data['hostname'], device_data['connection_ip'],
-                device_data['last_seen'], device_data['status'],
-                json.dumps(system_info), json.dumps(network_interfaces),
-                device_data.get('error_message')
-            ))
-            device_id = cursor.fetchone()[0]
+                ''',
+                [self._device_row(device_data) for device_data in unique_devices],
+                page_size=page_size,
+                fetch=True
+            )
+            self._apply_topology_deltas(cursor, topology_deltas(previous, [
+                {**device_data, **resource_columns(device_data)} for device_data in unique_devices
+            ]))
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
         
-        self.connection.commit()
-        return device_id
+        # RETURNING yields one row per VALUES tuple, in order
+        device_ids = {
+            (device_data['hostname'], device_data['connection_ip']): row[0]
+            for device_data, row in zip(unique_devices, returned)
+        }
+        return [device_ids[(d['hostname'], d['connection_ip'])] for d in devices]
     
     def get_all_devices(self) -> List[Dict[str, Any]]:
         """Get all devices from PostgreSQL."""
@@ -476,89 +2135,719 @@ class PostgreSQLAdapter(DatabaseAdapter):
             self.connect()
         
         cursor = self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        cursor.execute('''
-            SELECT 
-                id, hostname, connection_ip::text as connection_ip, last_seen, status,
-                system_info, network_interfaces, error_message, created_at, updated_at
-            FROM devices 
+        cursor.execute(f'''
+            {POSTGRES_DEVICE_SELECT_SQL}
             ORDER BY hostname, connection_ip
         ''')
         
-        devices = []
-        for row in cursor.fetchall():
-            device_dict = dict(row)
-            
-            # Flatten system_info for backward compatibility
-            if device_dict.get('system_info'):
-                system_info = device_dict['system_info']
-                device_dict.update({
-                    'cpu_model': system_info.get('cpu', {}).get('model'),
-                    'cpu_cores': system_info.get('cpu', {}).get('cores'),
-                    'memory_total': system_info.get('memory', {}).get('total'),
-                    'memory_used': system_info.get('memory', {}).get('used'),
-                    'memory_free': system_info.get('memory', {}).get('free'),
-                    'memory_available': system_info.get('memory', {}).get('available'),
-                    'disk_filesystem': system_info.get('disk', {}).get('filesystem'),
-                    'disk_size': system_info.get('disk', {}).get('size'),
-                    'disk_used': system_info.get('disk', {}).get('used'),
-                    'disk_available': system_info.get('disk', {}).get('available'),
-                    'disk_use_percent': system_info.get('disk', {}).get('use_percent'),
-                    'disk_mount': system_info.get('disk', {}).get('mount'),
-                    'uptime': system_info.get('uptime'),
-                    'os_info': system_info.get('os')
-                })
+        return [self._device_from_row(row) for row in cursor.fetchall()]
+    
+    def iter_devices(self, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Stream devices from PostgreSQL through a named server-side cursor."""
+        if not self.connection:
+            self.connect()
+        
+        # Named cursors keep the result set on the server and fetch itersize rows per round trip
+        cursor = self.connection.cursor(
+            name=f'iter_devices_{uuid.uuid4().hex}',
+            cursor_factory=psycopg2.extras.RealDictCursor
+        )
+        cursor.itersize = batch_size
+        try:
+            # Byte-order collation so the sequence matches SQLite's for merge comparisons
+            cursor.execute(f'''
+                {POSTGRES_DEVICE_SELECT_SQL}
+                ORDER BY hostname COLLATE "C", host(connection_ip) COLLATE "C"
+            ''')
+            for row in cursor:
+                yield self._device_from_row(row)
+        finally:
+            cursor.close()
+    
+    def _device_from_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a devices row to a flat device dict."""
+        device_dict = dict(row)
+        
+        # Flatten system_info for backward compatibility
+        if device_dict.get('system_info'):
+            system_info = device_dict['system_info']
+            device_dict.update({
+                'cpu_model': system_info.get('cpu', {}).get('model'),
+                'cpu_cores': system_info.get('cpu', {}).get('cores'),
+                'memory_total': system_info.get('memory', {}).get('total'),
+                'memory_used': system_info.get('memory', {}).get('used'),
+                'memory_free': system_info.get('memory', {}).get('free'),
+                'memory_available': system_info.get('memory', {}).get('available'),
+                'disk_filesystem': system_info.get('disk', {}).get('filesystem'),
+                'disk_size': system_info.get('disk', {}).get('size'),
+                'disk_used': system_info.get('disk', {}).get('used'),
+                'disk_available': system_info.get('disk', {}).get('available'),
+                'disk_use_percent': system_info.get('disk', {}).get('use_percent'),
+                'disk_mount': system_info.get('disk', {}).get('mount'),
+                'uptime': system_info.get('uptime'),
+                'os_info': system_info.get('os')
+            })
+        
+        return device_dict
+    
+    def _postgres_page_filters(self, filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Reject connection_ip filters that are not addresses before they reach the ::inet cast."""
+        if filters and 'connection_ip' in filters:
+            try:
+                ipaddress.ip_address(filters['connection_ip'])
+            except ValueError:
+                raise ValueError(f"Invalid connection_ip filter: {filters['connection_ip']}")
+        return filters
+    
+    def get_devices_page(
+        self,
+        fields: Optional[List[str]] = None,
+        limit: int = 100,
+        after: Optional[Tuple[str, int]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        search: Optional[List[SearchTerm]] = None
+    ) -> List[Dict[str, Any]]:
+        """Get a page of devices from PostgreSQL, selecting only the requested fields."""
+        if not self.connection:
+            self.connect()
+        
+        columns = _page_fields(fields)
+        where, params = _device_page_where(
+            self._postgres_page_filters(filters), after, 'postgresql', search
+        )
+        select = ', '.join(f'{POSTGRES_PAGE_FIELDS[c]} AS {c}' for c in columns)
+        cursor = self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute(f'''
+            SELECT {select} FROM devices
+            WHERE {where}
+            ORDER BY hostname, id LIMIT %s
+        ''', params + [limit])
+        
+        # Timestamps are returned as ISO strings, matching the SQLite layout
+        return [
+            {k: v.isoformat() if isinstance(v, datetime) else v for k, v in row.items()}
+            for row in cursor.fetchall()
+        ]
+    
+    def count_devices(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        search: Optional[List[SearchTerm]] = None
+    ) -> int:
+        """Count devices matching the filters in PostgreSQL."""
+        if not self.connection:
+            self.connect()
+        
+        where, params = _device_page_where(
+            self._postgres_page_filters(filters), None, 'postgresql', search
+        )
+        cursor = self.connection.cursor()
+        cursor.execute(f'SELECT COUNT(*) FROM devices WHERE {where}', params)
+        return cursor.fetchone()[0]
+    
+    def _get_one_device(self, where: str, params: Tuple) -> Optional[Dict[str, Any]]:
+        """Fetch the newest device matching an indexed WHERE clause."""
+        if not self.connection:
+            self.connect()
+        
+        cursor = self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute(f'''
+            {POSTGRES_DEVICE_SELECT_SQL}
+            WHERE {where}
+            ORDER BY last_seen DESC, id DESC LIMIT 1
+        ''', params)
+        row = cursor.fetchone()
+        return self._device_from_row(row) if row else None
+    
+    def get_device(self, device_id: int) -> Optional[Dict[str, Any]]:
+        """Get one device from PostgreSQL by primary key."""
+        return self._get_one_device('id = %s', (device_id,))
+    
+    def get_device_by_ip(self, connection_ip: str) -> Optional[Dict[str, Any]]:
+        """Get the most recently seen device with this connection IP from PostgreSQL."""
+        # Compare as INET so the index is used; text that isn't an address can't match
+        try:
+            ipaddress.ip_address(connection_ip)
+        except ValueError:
+            return None
+        return self._get_one_device('connection_ip = %s::inet', (connection_ip,))
+    
+    def get_device_by_hostname(self, hostname: str) -> Optional[Dict[str, Any]]:
+        """Get the most recently seen device with this hostname from PostgreSQL."""
+        return self._get_one_device('hostname = %s', (hostname,))
+    
+    def update_device_status(self, device_id: int, status: str) -> bool:
+        """Set a device's status in PostgreSQL."""
+        if not self.connection:
+            self.connect()
+        
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext('topology_counters'))")
+            previous = self._select_topology_rows(cursor, 'WHERE id = %s', (device_id,))
+            if not previous:
+                self.connection.rollback()
+                return False
             
-            devices.append(device_dict)
+            cursor.execute(
+                'UPDATE devices SET status = %s, updated_at = NOW() WHERE id = %s',
+                (status, device_id)
+            )
+            self._apply_topology_deltas(
+                cursor, topology_deltas(previous, [{**previous[0], 'status': status}])
+            )
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        return True
+    
+    def _select_topology_rows(self, cursor, where: str, params: Tuple) -> List[Dict[str, Any]]:
+        """Select the fields topology counters are derived from, for matching devices."""
+        cursor.execute(f'''
+            SELECT status, system_info->>'os' AS os_info,
+                   system_info->'cpu'->>'model' AS cpu_model,
+                   host(connection_ip) AS connection_ip, disk_use_ratio
+            FROM devices {where}
+        ''', params)
+        columns = ('status', 'os_info', 'cpu_model', 'connection_ip', 'disk_use_ratio')
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
+    def _apply_topology_deltas(self, cursor, deltas: Dict[Tuple[str, str], int]) -> None:
+        """Add counter deltas to topology_counters and drop counters that reach zero."""
+        if not deltas:
+            return
+        # Deltas cover a handful of distinct counters even for large batches
+        cursor.executemany('''
+            INSERT INTO topology_counters (dimension, value, devices) VALUES (%s, %s, %s)
+            ON CONFLICT (dimension, value) DO UPDATE
+            SET devices = topology_counters.devices + EXCLUDED.devices
+        ''', [(dimension, value, delta) for (dimension, value), delta in deltas.items()])
+        cursor.execute('DELETE FROM topology_counters WHERE devices <= 0')
+    
+    def _rebuild_topology_counters(self, cursor) -> None:
+        """Replace the topology counters with counts from a full devices scan."""
+        deltas = topology_deltas([], self._select_topology_rows(cursor, '', ()))
+        cursor.execute('DELETE FROM topology_counters')
+        self._apply_topology_deltas(cursor, deltas)
+    
+    def rebuild_topology_counters(self) -> None:
+        """Recompute the PostgreSQL topology counters from the devices table."""
+        if not self.connection:
+            self.connect()
         
-        return devices
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext('topology_counters'))")
+            self._rebuild_topology_counters(cursor)
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+    
+    def _history_rows(self, cursor, device_id: int, from_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get a device's history rows, oldest first, from the keyframe covering from_id.
+        
+        With no from_id this is the chain ending at the latest row.
+        """
+        cursor.execute('''
+            SELECT id, discovery_data, discovered_at, encoding, payload
+            FROM discovery_history
+            WHERE device_id = %s AND id >= COALESCE((
+                SELECT MAX(id) FROM discovery_history
+                WHERE device_id = %s AND id <= COALESCE(%s, id)
+                  AND (encoding IS NULL OR encoding LIKE 'keyframe%%')
+            ), 0)
+            ORDER BY id
+        ''', (device_id, device_id, from_id))
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def _replace_hardware_inventory(self, cursor, device_id: int, snapshot: Any) -> None:
+        """Swap a device's USB, PCI and block inventory for the rows in a snapshot."""
+        self._write_hardware_inventory(cursor, device_id, extract_inventory(snapshot))
+    
+    def _write_hardware_inventory(self, cursor, device_id: int, inventory: HardwareInventory) -> None:
+        """Swap a device's inventory for the given rows of each kind."""
+        for kind, rows in inventory.items():
+            table, columns = HARDWARE_TABLES[kind]
+            cursor.execute(f'DELETE FROM {table} WHERE device_id = %s', (device_id,))
+            if rows:
+                cursor.executemany(
+                    f'INSERT INTO {table} (device_id, {", ".join(columns)}) '
+                    f'VALUES ({", ".join(["%s"] * (len(columns) + 1))})',
+                    [(device_id,) + row for row in rows]
+                )
+    
+    def _backfill_history_search(self) -> None:
+        """Fill search_vector for snapshots stored before history search existed."""
+        cursor = self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute('SELECT DISTINCT device_id FROM discovery_history WHERE search_vector IS NULL')
+        for device_id in [row['device_id'] for row in cursor.fetchall()]:
+            cursor.execute('''
+                SELECT id, discovery_data, encoding, payload FROM discovery_history
+                WHERE device_id = %s ORDER BY id
+            ''', (device_id,))
+            rows = [dict(row) for row in cursor.fetchall()]
+            cursor.executemany(
+                "UPDATE discovery_history SET search_vector = to_tsvector('simple', %s) WHERE id = %s",
+                [(search_text(snapshot), row['id']) for row, snapshot in zip(rows, decode_chain(rows))]
+            )
+    
+    def _backfill_hardware_inventory(self) -> None:
+        """Build the inventory from each device's latest stored snapshot."""
+        cursor = self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute('SELECT DISTINCT device_id FROM discovery_history')
+        for device_id in [row['device_id'] for row in cursor.fetchall()]:
+            chain = self._history_rows(cursor, device_id)
+            if chain:
+                self._replace_hardware_inventory(cursor, device_id, decode_chain(chain)[-1])
     
     def store_discovery_history(self, device_id: int, discovery_data: str, data_hash: str) -> None:
-        """Store discovery history in PostgreSQL."""
+        """Store discovery history in PostgreSQL as a keyframe or a delta against the last row."""
         if not self.connection:
             self.connect()
         
-        cursor = self.connection.cursor()
+        cursor = self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        try:
+            # Deltas chain off the previous row, so serialize writers per device
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', (device_id,))
+            
+            # Same as the newest snapshot: history and inventory are already current
+            cursor.execute('''
+                SELECT data_hash FROM discovery_history WHERE device_id = %s
+                ORDER BY id DESC LIMIT 1
+            ''', (device_id,))
+            newest = cursor.fetchone()
+            if newest and newest['data_hash'] == data_hash:
+                self.connection.commit()
+                return
+            
+            # Any other snapshot sets the inventory, even one history already holds (A -> B -> A)
+            snapshot = parse_snapshot(discovery_data)
+            self._replace_hardware_inventory(cursor, device_id, snapshot)
+            
+            # Known snapshot: nothing to encode
+            cursor.execute('''
+                SELECT 1 FROM discovery_history WHERE device_id = %s AND data_hash = %s
+            ''', (device_id, data_hash))
+            if cursor.fetchone():
+                self.connection.commit()
+                return
+            
+            chain = self._history_rows(cursor, device_id)
+            previous = decode_chain(chain)[-1] if chain else None
+            encoding, payload = self.history_codec.encode(
+                snapshot, previous, len(chain) - 1 if chain else None
+            )
+            
+            # The unique (device_id, data_hash) index still guards against races
+            cursor.execute('''
+                INSERT INTO discovery_history (device_id, data_hash, encoding, payload, search_vector)
+                VALUES (%s, %s, %s, %s, to_tsvector('simple', %s))
+                ON CONFLICT (device_id, data_hash) DO NOTHING
+            ''', (device_id, data_hash, encoding, payload, search_text(snapshot)))
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+    
+    def iter_history_rows(
+        self,
+        device_id: int,
+        batch_size: int = 1000,
+        from_id: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream a device's encoded history rows through a named server-side cursor."""
+        if not self.connection:
+            self.connect()
         
-        # Parse discovery data to JSONB
+        cursor = self.connection.cursor(
+            name=f'iter_history_{uuid.uuid4().hex}',
+            cursor_factory=psycopg2.extras.RealDictCursor
+        )
+        cursor.itersize = batch_size
         try:
-            discovery_json = json.loads(discovery_data)
-        except json.JSONDecodeError:
-            discovery_json = {"raw_data": discovery_data}
+            cursor.execute(f'''
+                SELECT id, {', '.join(HISTORY_LOAD_COLUMNS)} FROM discovery_history
+                WHERE device_id = %s AND id >= COALESCE((
+                    SELECT MAX(id) FROM discovery_history
+                    WHERE device_id = %s AND id <= %s
+                      AND (encoding IS NULL OR encoding LIKE 'keyframe%%')
+                ), 0)
+                ORDER BY id
+            ''', (device_id, device_id, from_id))
+            for row in cursor:
+                yield dict(row)
+        finally:
+            cursor.close()
+    
+    def get_history_hashes(self, device_ids: List[int]) -> Dict[int, List[str]]:
+        """Get history data hashes for several devices from PostgreSQL in one query."""
+        if not self.connection:
+            self.connect()
         
-        # Check if this exact data was already stored recently
+        hashes: Dict[int, List[str]] = {device_id: [] for device_id in device_ids}
+        if not device_ids:
+            return hashes
+        cursor = self.connection.cursor()
         cursor.execute('''
-            SELECT id FROM discovery_history 
-            WHERE device_id = %s AND data_hash = %s
-            ORDER BY discovered_at DESC LIMIT 1
-        ''', (device_id, data_hash))
+            SELECT device_id, data_hash FROM discovery_history
+            WHERE device_id = ANY(%s)
+            ORDER BY device_id, id
+        ''', (list(device_ids),))
+        for device_id, data_hash in cursor.fetchall():
+            hashes[device_id].append(data_hash)
+        return hashes
+    
+    def get_metrics_digests(self, device_ids: List[int]) -> Dict[int, str]:
+        """Digest several devices' metrics samples from PostgreSQL in one query."""
+        if not self.connection:
+            self.connect()
+        
+        if not device_ids:
+            return {}
+        cursor = self.connection.cursor()
+        cursor.execute('''
+            SELECT device_id, metrics, collected_at FROM device_metrics
+            WHERE device_id = ANY(%s)
+            ORDER BY device_id, id
+        ''', (list(device_ids),))
+        return _metrics_digests(device_ids, cursor)
+    
+    def load_discovery_history(
+        self,
+        device_id: int,
+        rows: List[Dict[str, Any]],
+        snapshots: List[Any]
+    ) -> int:
+        """COPY encoded history rows into a staging table, then append the new ones."""
+        if not self.connection:
+            self.connect()
+        
+        buffer = io.StringIO()
+        for seq, (row, snapshot) in enumerate(zip(rows, snapshots)):
+            fields = [row[column] for column in HISTORY_LOAD_COLUMNS] + [search_text(snapshot), seq]
+            buffer.write('\t'.join(_copy_field(value) for value in fields) + '\n')
+        buffer.seek(0)
         
-        if not cursor.fetchone():
+        cursor = self.connection.cursor()
+        try:
             cursor.execute('''
-                INSERT INTO discovery_history (device_id, discovery_data, data_hash)
-                VALUES (%s, %s, %s)
-            ''', (device_id, json.dumps(discovery_json), data_hash))
+                CREATE TEMP TABLE IF NOT EXISTS history_load (
+                    data_hash VARCHAR(64),
+                    discovery_data JSONB,
+                    encoding TEXT,
+                    payload BYTEA,
+                    discovered_at TIMESTAMP,
+                    search_text TEXT,
+                    seq INTEGER
+                ) ON COMMIT DELETE ROWS
+            ''')
+            cursor.copy_expert(
+                f"COPY history_load ({', '.join(HISTORY_LOAD_COLUMNS)}, search_text, seq) FROM STDIN",
+                buffer
+            )
+            # COPY cannot skip conflicts itself, so dedupe on the way out of staging
+            cursor.execute(f'''
+                INSERT INTO discovery_history (device_id, {', '.join(HISTORY_LOAD_COLUMNS)}, search_vector)
+                SELECT %s, data_hash, discovery_data, encoding, payload,
+                       COALESCE(discovered_at, NOW()), to_tsvector('simple', search_text)
+                FROM history_load
+                ORDER BY seq
+                ON CONFLICT (device_id, data_hash) DO NOTHING
+            ''', (device_id,))
+            loaded = cursor.rowcount
+            if snapshots:
+                self._replace_hardware_inventory(cursor, device_id, snapshots[-1])
             self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        return loaded
     
     def get_device_changes(self, device_id: int, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get device change history from PostgreSQL."""
+        """Get device change history from PostgreSQL, rebuilding delta-encoded rows."""
         if not self.connection:
             self.connect()
         
         cursor = self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
         cursor.execute('''
-            SELECT discovery_data, discovered_at FROM discovery_history
+            SELECT MIN(id) AS oldest_id FROM (
+                SELECT id FROM discovery_history
+                WHERE device_id = %s
+                ORDER BY id DESC LIMIT %s
+            ) recent
+        ''', (device_id, limit))
+        oldest_id = cursor.fetchone()['oldest_id']
+        if oldest_id is None:
+            return []
+        
+        rows = self._history_rows(cursor, device_id, oldest_id)
+        changes = [
+            {'data': snapshot, 'discovered_at': row['discovered_at'].isoformat()}
+            for row, snapshot in zip(rows, decode_chain(rows))
+            if row['id'] >= oldest_id
+        ]
+        changes.reverse()
+        return changes
+    
+    def reencode_history(self, device_id: Optional[int] = None, codec: Optional[HistoryCodec] = None) -> Dict[str, int]:
+        """Rewrite PostgreSQL history rows with a codec, one transaction per device."""
+        if not self.connection:
+            self.connect()
+        
+        codec = codec or self.history_codec
+        cursor = self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        
+        if device_id is None:
+            cursor.execute('SELECT DISTINCT device_id FROM discovery_history')
+            device_ids = [row['device_id'] for row in cursor.fetchall()]
+        else:
+            device_ids = [device_id]
+        
+        stats = {'devices': 0, 'rows': 0, 'bytes_before': 0, 'bytes_after': 0}
+        for current_id in device_ids:
+            try:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', (current_id,))
+                cursor.execute('''
+                    SELECT id, discovery_data, encoding, payload FROM discovery_history
+                    WHERE device_id = %s ORDER BY id
+                ''', (current_id,))
+                rows = [dict(row) for row in cursor.fetchall()]
+                encoded = codec.reencode(rows)
+                
+                psycopg2.extras.execute_batch(cursor, '''
+                    UPDATE discovery_history SET encoding = %s, payload = %s, discovery_data = NULL
+                    WHERE id = %s
+                ''', [(encoding, payload, row['id']) for row, (encoding, payload) in zip(rows, encoded)])
+                self.connection.commit()
+            except Exception:
+                self.connection.rollback()
+                raise
+            
+            stats['devices'] += 1
+            stats['rows'] += len(rows)
+            stats['bytes_before'] += sum(stored_size(row) for row in rows)
+            stats['bytes_after'] += sum(len(payload) for _, payload in encoded)
+        
+        return stats
+    
+    def store_device_metrics(self, device_id: int, metrics: Dict[str, Any]) -> None:
+        """Store a volatile metrics sample in PostgreSQL."""
+        if not self.connection:
+            self.connect()
+        
+        cursor = self.connection.cursor()
+        cursor.execute('''
+            INSERT INTO device_metrics (device_id, metrics)
+            VALUES (%s, %s)
+        ''', (device_id, json.dumps(metrics)))
+        self._prune_device_metrics(cursor, device_id)
+        self.connection.commit()
+    
+    def _prune_device_metrics(self, cursor, device_id: int) -> None:
+        """Keep only the newest metrics_retention samples for a device."""
+        if not self.metrics_retention:
+            return
+        cursor.execute('''
+            DELETE FROM device_metrics
+            WHERE device_id = %s AND id <= (
+                SELECT id FROM device_metrics WHERE device_id = %s
+                ORDER BY id DESC LIMIT 1 OFFSET %s
+            )
+        ''', (device_id, device_id, self.metrics_retention))
+    
+    def iter_metrics_rows(
+        self,
+        device_id: int,
+        batch_size: int = 1000,
+        from_id: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream a device's metrics samples through a named server-side cursor."""
+        if not self.connection:
+            self.connect()
+        
+        cursor = self.connection.cursor(
+            name=f'iter_metrics_{uuid.uuid4().hex}',
+            cursor_factory=psycopg2.extras.RealDictCursor
+        )
+        cursor.itersize = batch_size
+        try:
+            cursor.execute(f'''
+                SELECT id, {', '.join(METRICS_LOAD_COLUMNS)} FROM device_metrics
+                WHERE device_id = %s AND id >= %s
+                ORDER BY id
+            ''', (device_id, from_id or 0))
+            for row in cursor:
+                yield dict(row)
+        finally:
+            cursor.close()
+    
+    def load_device_metrics(self, device_id: int, rows: List[Dict[str, Any]]) -> int:
+        """COPY metrics samples into a staging table, then append the new ones."""
+        if not self.connection:
+            self.connect()
+        
+        buffer = io.StringIO()
+        for seq, row in enumerate(rows):
+            fields = [_metrics_json(row['metrics']), row['collected_at'], seq]
+            buffer.write('\t'.join(_copy_field(value) for value in fields) + '\n')
+        buffer.seek(0)
+        
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute('''
+                CREATE TEMP TABLE IF NOT EXISTS metrics_load (
+                    metrics JSONB,
+                    collected_at TIMESTAMP,
+                    seq INTEGER
+                ) ON COMMIT DELETE ROWS
+            ''')
+            cursor.copy_expert(
+                f"COPY metrics_load ({', '.join(METRICS_LOAD_COLUMNS)}, seq) FROM STDIN",
+                buffer
+            )
+            # Samples have no natural key, so skip ones already stored with the same time
+            cursor.execute('''
+                INSERT INTO device_metrics (device_id, metrics, collected_at)
+                SELECT %s, l.metrics, COALESCE(l.collected_at, NOW())
+                FROM metrics_load l
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM device_metrics m
+                    WHERE m.device_id = %s AND m.collected_at = l.collected_at AND m.metrics = l.metrics
+                )
+                ORDER BY l.seq
+            ''', (device_id, device_id))
+            loaded = cursor.rowcount
+            self._prune_device_metrics(cursor, device_id)
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        return loaded
+    
+    def get_device_metrics(self, device_id: int, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get recent volatile metrics samples from PostgreSQL."""
+        if not self.connection:
+            self.connect()
+        
+        cursor = self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute('''
+            SELECT metrics, collected_at FROM device_metrics
             WHERE device_id = %s
-            ORDER BY discovered_at DESC LIMIT %s
+            ORDER BY collected_at DESC, id DESC LIMIT %s
         ''', (device_id, limit))
         
-        changes = []
-        for row in cursor.fetchall():
-            changes.append({
-                'data': row['discovery_data'],
-                'discovered_at': row['discovered_at'].isoformat()
-            })
+        return [
+            {'metrics': row['metrics'], 'collected_at': row['collected_at'].isoformat()}
+            for row in cursor.fetchall()
+        ]
+    
+    def get_topology_summary(self) -> Dict[str, Dict[str, int]]:
+        """Read the running topology counters from PostgreSQL."""
+        if not self.connection:
+            self.connect()
         
-        return changes
+        cursor = self.connection.cursor()
+        cursor.execute('SELECT dimension, value, devices FROM topology_counters')
+        return _topology_summary(tuple(row) for row in cursor.fetchall())
+    
+    def get_data_versions(self) -> Dict[str, int]:
+        """Read the data_versions write counters from PostgreSQL."""
+        if not self.connection:
+            self.connect()
+        
+        cursor = self.connection.cursor()
+        cursor.execute('SELECT scope, version FROM data_versions')
+        return {row[0]: row[1] for row in cursor.fetchall()}
+    
+    def find_devices_by_resources(self, conditions: List[ResourceCondition]) -> List[Dict[str, Any]]:
+        """Get online devices matching every resource condition from PostgreSQL."""
+        if not self.connection:
+            self.connect()
+        
+        where, params = compile_resource_conditions(conditions, '%s')
+        cursor = self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute(f'''
+            SELECT hostname, host(connection_ip) AS connection_ip,
+                   system_info->>'os' AS os_info, cpu_cores,
+                   system_info->'memory'->>'total' AS memory_total, memory_total_bytes,
+                   system_info->'disk'->>'use_percent' AS disk_use_percent, disk_use_ratio
+            FROM devices
+            WHERE status = 'success' AND {where}
+            ORDER BY hostname, connection_ip
+        ''', params)
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def search_history(
+        self,
+        phrases: List[str],
+        device_id: Optional[int] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Search history snapshots through the tsvector GIN index, ranked by ts_rank."""
+        if not self.connection:
+            self.connect()
+        
+        tsquery = ' && '.join(["phraseto_tsquery('simple', %s)"] * len(phrases))
+        params: List[Any] = list(phrases)
+        device_clause = ''
+        if device_id is not None:
+            device_clause = 'AND h.device_id = %s'
+            params.append(device_id)
+        cursor = self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute(f'''
+            SELECT h.id AS history_id, h.device_id, d.hostname, host(d.connection_ip) AS connection_ip,
+                   h.discovered_at, ts_rank(h.search_vector, q.query) AS score
+            FROM discovery_history h
+            JOIN devices d ON d.id = h.device_id
+            CROSS JOIN (SELECT {tsquery} AS query) q
+            WHERE h.search_vector @@ q.query {device_clause}
+            ORDER BY score DESC, h.id DESC
+            LIMIT %s
+        ''', params + [limit])
+        return [
+            {**row, 'discovered_at': row['discovered_at'].isoformat() if row['discovered_at'] else None}
+            for row in cursor.fetchall()
+        ]
+    
+    def find_hardware(self, kind: str, criteria: Dict[str, Any], limit: int = 100) -> List[Dict[str, Any]]:
+        """Look up USB, PCI or block inventory in PostgreSQL through its indexes."""
+        if not self.connection:
+            self.connect()
+        
+        query, params = compile_hardware_query(kind, criteria, 'postgresql')
+        cursor = self.connection.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cursor.execute(query, params + [limit])
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def get_hardware_inventory(self, device_id: int) -> HardwareInventory:
+        """Read a device's inventory rows from PostgreSQL."""
+        if not self.connection:
+            self.connect()
+        
+        cursor = self.connection.cursor()
+        inventory: HardwareInventory = {}
+        for kind, (table, columns) in HARDWARE_TABLES.items():
+            cursor.execute(
+                f'SELECT {", ".join(columns)} FROM {table} WHERE device_id = %s ORDER BY id',
+                (device_id,)
+            )
+            inventory[kind] = [tuple(row) for row in cursor.fetchall()]
+        return inventory
+    
+    def replace_hardware_inventory(self, device_id: int, inventory: HardwareInventory) -> None:
+        """Swap a device's inventory in PostgreSQL in one transaction."""
+        if not self.connection:
+            self.connect()
+        
+        cursor = self.connection.cursor()
+        try:
+            self._write_hardware_inventory(cursor, device_id, inventory)
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
     
     def execute_query(self, query: str, params: Optional[Tuple] = None) -> List[Dict[str, Any]]:
         """Execute a query and return results."""
@@ -574,6 +2863,258 @@ class PostgreSQLAdapter(DatabaseAdapter):
         return [dict(row) for row in cursor.fetchall()]
 
 
+class AsyncDatabaseAdapter:
+    """Async facade over a DatabaseAdapter that keeps blocking calls off the event loop.
+    
+    Every call is queued to a dedicated executor. SQLite uses a single worker thread
+    that owns the connection, so writes are serialized without a lock; in WAL mode
+    read-only calls go to a separate pool of reader threads from
+    ``read_adapter_factory`` so they never queue behind ingest. PostgreSQL uses a
+    small pool of workers, each with its own connection from ``adapter_factory``, so
+    independent queries overlap with each other and with SSH traffic.
+    """
+    
+    # Calls that only read and may run on a reader thread
+    READ_METHODS = frozenset({
+        'get_all_devices', 'get_devices_page', 'count_devices', 'get_device',
+        'get_device_by_ip', 'get_device_by_hostname', 'get_device_changes',
+        'get_device_metrics', 'get_topology_summary', 'find_devices_by_resources',
+        'search_history', 'find_hardware', 'get_data_versions'
+    })
+    
+    def __init__(
+        self,
+        adapter: DatabaseAdapter,
+        max_workers: int = 1,
+        adapter_factory: Optional[Callable[[], DatabaseAdapter]] = None,
+        read_workers: int = 0,
+        read_adapter_factory: Optional[Callable[[], DatabaseAdapter]] = None
+    ):
+        if max_workers > 1 and adapter_factory is None:
+            raise ValueError("adapter_factory is required when max_workers > 1")
+        if read_workers > 0 and read_adapter_factory is None:
+            raise ValueError("read_adapter_factory is required when read_workers > 0")
+        
+        self.adapter = adapter
+        self.max_workers = max_workers
+        self._adapter_factory = adapter_factory
+        self._read_adapter_factory = read_adapter_factory
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='mcp-db')
+        self._read_executor = (
+            ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix='mcp-db-read')
+            if read_workers > 0 else None
+        )
+        self._local = threading.local()
+        self._worker_adapters: List[DatabaseAdapter] = []
+        self._worker_adapters_lock = threading.Lock()
+    
+    def _get_worker_adapter(
+        self,
+        factory: Optional[Callable[[], DatabaseAdapter]] = None
+    ) -> DatabaseAdapter:
+        """Get the adapter owned by the current worker thread."""
+        if factory is None:
+            return self.adapter
+        
+        adapter = getattr(self._local, 'adapter', None)
+        if adapter is None:
+            adapter = factory()
+            self._local.adapter = adapter
+            with self._worker_adapters_lock:
+                self._worker_adapters.append(adapter)
+        return adapter
+    
+    def _call(
+        self,
+        method: str,
+        args: Tuple,
+        kwargs: Dict[str, Any],
+        factory: Optional[Callable[[], DatabaseAdapter]] = None
+    ) -> Any:
+        """Invoke an adapter method on the current worker thread."""
+        return getattr(self._get_worker_adapter(factory), method)(*args, **kwargs)
+    
+    async def run(self, method: str, *args, **kwargs) -> Any:
+        """Run ``adapter.<method>(*args, **kwargs)`` on a DB worker thread."""
+        loop = asyncio.get_running_loop()
+        if self._read_executor is not None and method in self.READ_METHODS:
+            return await loop.run_in_executor(
+                self._read_executor, self._call, method, args, kwargs, self._read_adapter_factory
+            )
+        return await loop.run_in_executor(
+            self._executor, self._call, method, args, kwargs, self._adapter_factory
+        )
+    
+    async def connect(self) -> None:
+        """Establish the worker's database connection."""
+        await self.run('connect')
+    
+    async def close(self) -> None:
+        """Close every worker connection and stop the worker threads."""
+        if self._adapter_factory is None:
+            await self.run('close')
+        with self._worker_adapters_lock:
+            adapters, self._worker_adapters = self._worker_adapters, []
+        for adapter in adapters:
+            adapter.close()
+        self._executor.shutdown(wait=False)
+        if self._read_executor is not None:
+            self._read_executor.shutdown(wait=False)
+    
+    async def init_schema(self) -> None:
+        """Initialize database schema."""
+        await self.run('init_schema')
+    
+    async def store_device(self, device_data: Dict[str, Any]) -> int:
+        """Store or update a device record."""
+        return await self.run('store_device', device_data)
+    
+    async def store_devices_bulk(self, devices: List[Dict[str, Any]]) -> List[int]:
+        """Upsert many device records in one transaction; returns ids in input order."""
+        return await self.run('store_devices_bulk', devices)
+    
+    async def get_all_devices(self) -> List[Dict[str, Any]]:
+        """Get all devices from the database."""
+        return await self.run('get_all_devices')
+    
+    async def iter_devices(self, batch_size: int = 500) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every device in (hostname, id) order, one keyset page per worker call.
+        
+        Unlike the sync iter_devices, which orders by (hostname, connection_ip),
+        each page is keyed on (hostname, id): the unique key get_devices_page resumes from.
+        """
+        after = None
+        while True:
+            batch = await self.get_devices_page(None, batch_size, after)
+            for device in batch:
+                yield device
+            if len(batch) < batch_size:
+                return
+            after = (batch[-1]['hostname'], batch[-1]['id'])
+    
+    async def get_devices_page(
+        self,
+        fields: Optional[List[str]] = None,
+        limit: int = 100,
+        after: Optional[Tuple[str, int]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        search: Optional[List[SearchTerm]] = None
+    ) -> List[Dict[str, Any]]:
+        """Get up to limit devices ordered by (hostname, id), starting after the given key."""
+        return await self.run('get_devices_page', fields, limit, after, filters, search)
+    
+    async def count_devices(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        search: Optional[List[SearchTerm]] = None
+    ) -> int:
+        """Count devices matching the equality filters and search terms."""
+        return await self.run('count_devices', filters, search)
+    
+    async def get_device(self, device_id: int) -> Optional[Dict[str, Any]]:
+        """Get one device by primary key."""
+        return await self.run('get_device', device_id)
+    
+    async def get_device_by_ip(self, connection_ip: str) -> Optional[Dict[str, Any]]:
+        """Get the most recently seen device with this connection IP."""
+        return await self.run('get_device_by_ip', connection_ip)
+    
+    async def get_device_by_hostname(self, hostname: str) -> Optional[Dict[str, Any]]:
+        """Get the most recently seen device with this hostname."""
+        return await self.run('get_device_by_hostname', hostname)
+    
+    async def update_device_status(self, device_id: int, status: str) -> bool:
+        """Set a device's status; returns False if the device does not exist."""
+        return await self.run('update_device_status', device_id, status)
+    
+    async def store_discovery_history(self, device_id: int, discovery_data: str, data_hash: str) -> None:
+        """Store discovery history record."""
+        await self.run('store_discovery_history', device_id, discovery_data, data_hash)
+    
+    async def get_device_changes(self, device_id: int, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get change history for a device."""
+        return await self.run('get_device_changes', device_id, limit)
+    
+    async def reencode_history(self, device_id: Optional[int] = None, codec: Optional[HistoryCodec] = None) -> Dict[str, int]:
+        """Rewrite stored history rows with the given keyframe/delta codec."""
+        return await self.run('reencode_history', device_id, codec)
+    
+    async def store_device_metrics(self, device_id: int, metrics: Dict[str, Any]) -> None:
+        """Store a sample of volatile metrics (uptime, usage) for a device."""
+        await self.run('store_device_metrics', device_id, metrics)
+    
+    async def get_device_metrics(self, device_id: int, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get recent volatile metric samples for a device, newest first."""
+        return await self.run('get_device_metrics', device_id, limit)
+    
+    async def get_topology_summary(self) -> Dict[str, Dict[str, int]]:
+        """Read the running device counts by status, OS, CPU model, /24 segment and disk usage."""
+        return await self.run('get_topology_summary')
+    
+    async def get_data_versions(self) -> Dict[str, int]:
+        """Get the write counter of each data_versions scope ('devices', 'history')."""
+        return await self.run('get_data_versions')
+    
+    async def rebuild_topology_counters(self) -> None:
+        """Recompute the topology counters from the devices table."""
+        await self.run('rebuild_topology_counters')
+    
+    async def find_devices_by_resources(self, conditions: List[ResourceCondition]) -> List[Dict[str, Any]]:
+        """Get online devices matching every resource condition, ordered by hostname."""
+        return await self.run('find_devices_by_resources', conditions)
+    
+    async def search_history(
+        self,
+        phrases: List[str],
+        device_id: Optional[int] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Get history snapshots containing every phrase, best match first."""
+        return await self.run('search_history', phrases, device_id, limit)
+    
+    async def find_hardware(self, kind: str, criteria: Dict[str, Any], limit: int = 100) -> List[Dict[str, Any]]:
+        """Get USB, PCI or block inventory rows matching the criteria, with their device."""
+        return await self.run('find_hardware', kind, criteria, limit)
+    
+    async def execute_query(self, query: str, params: Optional[Tuple] = None) -> List[Dict[str, Any]]:
+        """Execute a query and return results."""
+        return await self.run('execute_query', query, params)
+
+
+def get_async_database_adapter(
+    adapter: DatabaseAdapter,
+    max_workers: Optional[int] = None
+) -> AsyncDatabaseAdapter:
+    """Wrap a sync adapter in the async layer suited to its backend."""
+    if POSTGRESQL_AVAILABLE and isinstance(adapter, PostgreSQLAdapter):
+        # Worker adapters share the process-wide pool, so they cost no extra connects
+        if max_workers is None:
+            max_workers = int(os.getenv('DB_ASYNC_WORKERS', '4'))
+        return AsyncDatabaseAdapter(
+            adapter,
+            max_workers=max(1, max_workers),
+            adapter_factory=lambda: PostgreSQLAdapter(adapter.connection_params)
+        )
+    
+    # SQLite: one dedicated thread owns the write connection
+    if isinstance(adapter, SQLiteAdapter) and adapter.separate_reads:
+        read_workers = int(os.getenv('DB_READ_WORKERS', '2'))
+        if read_workers > 0:
+            return AsyncDatabaseAdapter(
+                adapter,
+                read_workers=read_workers,
+                read_adapter_factory=lambda: _sqlite_read_adapter(adapter)
+            )
+    return AsyncDatabaseAdapter(adapter)
+
+
+def _sqlite_read_adapter(adapter: SQLiteAdapter) -> SQLiteAdapter:
+    """Open another adapter on the same database file for a reader thread."""
+    reader = SQLiteAdapter(adapter.db_path, adapter.profile)
+    reader.history_fts_available = adapter.history_fts_available
+    return reader
+
+
 def get_database_adapter(db_type: str = None, **kwargs) -> DatabaseAdapter:
     """Factory function to get the appropriate database adapter."""
     if db_type is None:
@@ -593,6 +3134,6 @@ def get_database_adapter(db_type: str = None, **kwargs) -> DatabaseAdapter:
         raise ValueError(f"Unsupported database type: {db_type}")
 
 
-def calculate_data_hash(discovery_data: str) -> str:
-    """Calculate hash of discovery data for change detection."""
-    return hashlib.sha256(discovery_data.encode()).hexdigest()
\ No newline at end of file
+def calculate_data_hash(discovery_data: str, volatile_fields: Optional[VolatileFields] = None) -> str:
+    """Calculate canonical hash of discovery data for change detection."""
+    return canonical_data_hash(discovery_data, volatile_fields)
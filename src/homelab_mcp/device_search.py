@@ -0,0 +1,178 @@
+"""Device search grammar compiled to parameterized SQL for each database backend."""
+
+import ipaddress
+import re
+import shlex
+import sys
+from datetime import datetime, timedelta
+from typing import Any, List, Optional, Tuple
+
+from .resources import parse_cores, parse_ratio, parse_size_bytes
+
+# A single parsed search term, e.g. ('cores', '>=', 8)
+SearchTerm = Tuple[str, str, Any]
+
+SEARCH_FIELDS = ('os', 'cores', 'memory', 'disk', 'subnet', 'status', 'seen')
+
+# Fields that only take ':' (match) rather than comparisons
+_MATCH_FIELDS = ('os', 'subnet', 'status')
+
+# Typed numeric column behind each comparable field
+_NUMERIC_COLUMNS = {
+    'cores': 'cpu_cores',
+    'memory': 'memory_total_bytes',
+    'disk': 'disk_use_ratio'
+}
+
+_TERM_PATTERN = re.compile(r'^([a-z]+)(<=|>=|<|>|:|=)(.*)$', re.IGNORECASE)
+_DURATION_PATTERN = re.compile(r'^([0-9]*\.?[0-9]+)\s*([smhdw])$', re.IGNORECASE)
+_DURATION_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+# "seen<1h" (seen less than an hour ago) means last_seen is after the cutoff
+_AGE_TO_TIMESTAMP = {'<': '>', '<=': '>=', '>': '<', '>=': '<=', '=': '>='}
+
+
+def ipv4_int(address: Any) -> Optional[int]:
+    """Get an IPv4 address as an integer, or None for anything else."""
+    try:
+        parsed = ipaddress.ip_address(address)
+    except ValueError:
+        return None
+    return int(parsed) if parsed.version == 4 else None
+
+
+def parse_duration(value: str) -> Optional[timedelta]:
+    """Parse an age like "90s", "15m", "1h", "7d" or "2w"."""
+    match = _DURATION_PATTERN.match(value.strip())
+    if not match:
+        return None
+    number, unit = match.groups()
+    return timedelta(seconds=float(number) * _DURATION_SECONDS[unit.lower()])
+
+
+def _parse_value(field: str, raw: str) -> Any:
+    """Convert a term's raw text to the value its column is compared with."""
+    if field == 'cores':
+        value = parse_cores(raw)
+    elif field == 'memory':
+        value = parse_size_bytes(raw)
+    elif field == 'disk':
+        value = parse_ratio(raw)
+    elif field == 'seen':
+        value = parse_duration(raw)
+    elif field == 'subnet':
+        try:
+            value = ipaddress.ip_network(raw, strict=False)
+        except ValueError:
+            value = None
+    elif field == 'os':
+        value = raw.lower() or None
+    else:
+        value = raw or None
+    
+    if value is None:
+        raise ValueError(f"Invalid value for {field}: {raw!r}")
+    return value
+
+
+def parse_search(query: str) -> List[SearchTerm]:
+    """Parse a query like ``os:ubuntu cores>=8 disk<50% subnet:192.168.10.0/24 seen<1h``.
+    
+    Terms are AND-ed together; quote values that contain spaces (``os:"ubuntu 22"``).
+    """
+    try:
+        tokens = shlex.split(query)
+    except ValueError as e:
+        raise ValueError(f"Invalid search query: {e}")
+    
+    terms = []
+    for token in tokens:
+        match = _TERM_PATTERN.match(token)
+        if not match:
+            raise ValueError(f"Invalid search term: {token}")
+        field, operator, raw = match.group(1).lower(), match.group(2), match.group(3).strip()
+        if field not in SEARCH_FIELDS:
+            raise ValueError(f"Unknown search field: {field}")
+        if operator == ':':
+            operator = '='
+        if field in _MATCH_FIELDS and operator != '=':
+            raise ValueError(f"Search field {field} only supports ':'")
+        terms.append((field, operator, _parse_value(field, raw)))
+    return terms
+
+
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    """A string greater than every string starting with prefix, or None if no such string exists."""
+    # Trailing maximal code points cannot be incremented; bump the character before them
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    if not prefix:
+        return None
+    code_point = ord(prefix[-1]) + 1
+    if 0xD800 <= code_point <= 0xDFFF:
+        # Surrogates are not encodable; the next valid code point sorts after them anyway
+        code_point = 0xE000
+    return prefix[:-1] + chr(code_point)
+
+
+def prefix_range(expression: str, prefix: str) -> Tuple[str, List[Any]]:
+    """Index-friendly SQLite range condition matching values of expression starting with prefix."""
+    upper = prefix_upper_bound(prefix)
+    if upper is None:
+        return f'{expression} >= ?', [prefix]
+    return f'{expression} >= ? AND {expression} < ?', [prefix, upper]
+
+
+def escape_like(value: str) -> str:
+    """Escape LIKE wildcards so the value matches literally."""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def compile_search(
+    terms: List[SearchTerm],
+    dialect: str,
+    now: Optional[datetime] = None
+) -> Tuple[str, List[Any]]:
+    """Compile parsed terms into an AND-ed SQL fragment and its parameters.
+    
+    Every condition is written so an index can serve it: ``os`` is a case-insensitive
+    prefix match on lower(os), ``subnet`` a range on the integer IPv4 column (SQLite)
+    or an INET containment test (PostgreSQL), ``seen`` a bound on last_seen.
+    """
+    if dialect not in ('sqlite', 'postgresql'):
+        raise ValueError(f"Unsupported search dialect: {dialect}")
+    sqlite = dialect == 'sqlite'
+    placeholder = '?' if sqlite else '%s'
+    now = now or datetime.now()
+    
+    clauses = []
+    params: List[Any] = []
+    for field, operator, value in terms:
+        if field == 'os':
+            if sqlite:
+                clause, bounds = prefix_range('lower(os_info)', value)
+                clauses.append(clause)
+                params.extend(bounds)
+            else:
+                clauses.append("lower(system_info->>'os') LIKE %s")
+                params.append(escape_like(value) + '%')
+        elif field in _NUMERIC_COLUMNS:
+            clauses.append(f'{_NUMERIC_COLUMNS[field]} {operator} {placeholder}')
+            params.append(value)
+        elif field == 'status':
+            clauses.append(f'status = {placeholder}')
+            params.append(value)
+        elif field == 'subnet':
+            if sqlite:
+                if value.version != 4:
+                    raise ValueError("IPv6 subnet search requires PostgreSQL")
+                clauses.append('connection_ipv4 BETWEEN ? AND ?')
+                params.extend([int(value.network_address), int(value.broadcast_address)])
+            else:
+                clauses.append('connection_ip <<= %s::inet')
+                params.append(str(value))
+        elif field == 'seen':
+            cutoff = now - value
+            clauses.append(f'last_seen {_AGE_TO_TIMESTAMP[operator]} {placeholder}')
+            # SQLite keeps last_seen as ISO text, which orders like the timestamp
+            params.append(cutoff.isoformat() if sqlite else cutoff)
+    return ' AND '.join(clauses) or '1 = 1', params
@@ -0,0 +1,124 @@
+"""Normalized USB, PCI and block device inventory taken from discovery snapshots."""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from .device_search import escape_like, prefix_range
+from .resources import parse_size_bytes
+
+HARDWARE_KINDS = ('usb', 'pci', 'block')
+
+# Inventory table and its columns (after device_id) for each kind, in bind order
+HARDWARE_TABLES = {
+    'usb': ('hardware_usb', ('vendor_id', 'product_id', 'bus', 'device_number', 'description')),
+    'pci': ('hardware_pci', ('slot', 'pci_class', 'device_type', 'description')),
+    'block': ('hardware_block', ('name', 'model', 'size', 'size_bytes'))
+}
+
+# Criteria find_hardware accepts per kind; description is a substring match
+HARDWARE_CRITERIA = {
+    'usb': ('vendor_id', 'product_id', 'description'),
+    'pci': ('pci_class', 'device_type', 'description'),
+    'block': ('model', 'min_size', 'max_size')
+}
+
+# Inventory rows per kind, as tuples in HARDWARE_TABLES column order
+HardwareInventory = Dict[str, List[Tuple]]
+
+
+def _entries(data: Dict[str, Any], key: str) -> List[Dict[str, Any]]:
+    """Get the dict entries of one hardware list from a snapshot's data."""
+    return [entry for entry in data.get(key) or [] if isinstance(entry, dict)]
+
+
+def _lower(value: Any) -> Optional[str]:
+    """Lowercase a string value, passing None through."""
+    return str(value).lower() if value is not None else None
+
+
+def extract_inventory(snapshot: Any) -> HardwareInventory:
+    """Pull normalized USB, PCI and block device rows out of an ssh_discover_system snapshot.
+    
+    USB ids and PCI classes are lowercased so lookups are exact index matches.
+    """
+    data = snapshot.get('data') if isinstance(snapshot, dict) else None
+    if not isinstance(data, dict):
+        return {kind: [] for kind in HARDWARE_KINDS}
+    
+    return {
+        'usb': [
+            (_lower(d.get('vendor_id')), _lower(d.get('product_id')),
+             d.get('bus'), d.get('device'), d.get('description'))
+            for d in _entries(data, 'usb_devices')
+        ],
+        'pci': [
+            (d.get('slot'), _lower(d.get('class')), d.get('type'), d.get('description'))
+            for d in _entries(data, 'pci_devices')
+        ],
+        'block': [
+            (d.get('name'), d.get('model'), d.get('size'), parse_size_bytes(d.get('size')))
+            for d in _entries(data, 'block_devices')
+        ]
+    }
+
+
+def compile_hardware_query(
+    kind: str,
+    criteria: Dict[str, Any],
+    dialect: str
+) -> Tuple[str, List[Any]]:
+    """Build the SELECT for find_hardware, joined to devices and ending in a LIMIT placeholder.
+    
+    USB ids, PCI class and type, block size and the block model prefix are served by
+    indexes; description is a substring filter applied to the rows they select.
+    """
+    if kind not in HARDWARE_KINDS:
+        raise ValueError(f"Unknown hardware kind: {kind}")
+    unknown = [key for key in criteria if key not in HARDWARE_CRITERIA[kind]]
+    if unknown:
+        raise ValueError(f"Unsupported {kind} criteria: {', '.join(unknown)}")
+    
+    sqlite = dialect == 'sqlite'
+    placeholder = '?' if sqlite else '%s'
+    clauses = []
+    params: List[Any] = []
+    for key, value in criteria.items():
+        if key in ('vendor_id', 'product_id', 'pci_class'):
+            clauses.append(f'h.{key} = {placeholder}')
+            params.append(str(value).lower())
+        elif key == 'device_type':
+            clauses.append(f'h.device_type = {placeholder}')
+            params.append(value)
+        elif key == 'model':
+            prefix = str(value).lower()
+            if not prefix:
+                # An empty prefix matches every model
+                continue
+            if sqlite:
+                clause, bounds = prefix_range('lower(h.model)', prefix)
+                clauses.append(clause)
+                params.extend(bounds)
+            else:
+                clauses.append('lower(h.model) LIKE %s')
+                params.append(escape_like(prefix) + '%')
+        elif key in ('min_size', 'max_size'):
+            size_bytes = parse_size_bytes(value)
+            if size_bytes is None:
+                raise ValueError(f"Invalid size for {key}: {value!r}")
+            clauses.append(f"h.size_bytes {'>=' if key == 'min_size' else '<='} {placeholder}")
+            params.append(size_bytes)
+        elif key == 'description':
+            # Explicit ESCAPE so '%' and '_' match literally on both backends
+            clauses.append(f"lower(h.description) LIKE {placeholder} ESCAPE '\\'")
+            params.append('%' + escape_like(str(value).lower()) + '%')
+    
+    table, columns = HARDWARE_TABLES[kind]
+    connection_ip = 'd.connection_ip' if sqlite else 'host(d.connection_ip)'
+    query = f'''
+        SELECT d.id AS device_id, d.hostname, {connection_ip} AS connection_ip, d.status,
+               {', '.join(f'h.{column}' for column in columns)}
+        FROM {table} h JOIN devices d ON d.id = h.device_id
+        WHERE {' AND '.join(clauses) or '1 = 1'}
+        ORDER BY d.hostname, d.id, h.id
+        LIMIT {placeholder}
+    '''
+    return query, params
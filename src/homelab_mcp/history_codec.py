@@ -0,0 +1,177 @@
+"""Keyframe + JSON-patch delta encoding for discovery history rows."""
+
+import copy
+import json
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+KEYFRAME = 'keyframe'
+DELTA = 'delta'
+COMPRESSIONS = ('none', 'zlib', 'zstd')
+
+
+def _escape_pointer(key: str) -> str:
+    """Escape a key for use in a JSON pointer (RFC 6901)."""
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def _unescape_pointer(token: str) -> str:
+    """Undo JSON pointer escaping (RFC 6901)."""
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def make_patch(old: Any, new: Any, path: str = '') -> List[Dict[str, Any]]:
+    """Build a JSON patch (RFC 6902 add/remove/replace) turning old into new.
+    
+    Objects are diffed key by key; lists and scalars are replaced whole, which
+    keeps patches small for the mostly-static lists discovery produces.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({'op': 'remove', 'path': f"{path}/{_escape_pointer(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{_escape_pointer(key)}"
+            if key not in old:
+                ops.append({'op': 'add', 'path': child, 'value': value})
+            else:
+                ops.extend(make_patch(old[key], value, child))
+        return ops
+    
+    if old == new and type(old) is type(new):
+        return []
+    return [{'op': 'replace', 'path': path, 'value': new}]
+
+
+def apply_patch(document: Any, patch: Iterable[Dict[str, Any]]) -> Any:
+    """Apply a patch from make_patch, returning a new document."""
+    result = copy.deepcopy(document)
+    for op in patch:
+        tokens = [_unescape_pointer(t) for t in op['path'].split('/')[1:]]
+        if not tokens:
+            # Whole-document replace
+            result = copy.deepcopy(op['value'])
+            continue
+        
+        parent = result
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        leaf = tokens[-1]
+        if isinstance(parent, list):
+            leaf = int(leaf)
+        
+        if op['op'] == 'remove':
+            del parent[leaf]
+        else:
+            parent[leaf] = copy.deepcopy(op['value'])
+    return result
+
+
+def parse_snapshot(discovery_data: Any) -> Any:
+    """Turn stored or incoming discovery data into a JSON value."""
+    if isinstance(discovery_data, (dict, list)):
+        return discovery_data
+    try:
+        return json.loads(discovery_data)
+    except (json.JSONDecodeError, TypeError):
+        return {'raw_data': discovery_data}
+
+
+def pack(kind: str, value: Any, compression: str = 'none') -> Tuple[str, bytes]:
+    """Serialize a keyframe or delta; returns (encoding, payload)."""
+    payload = json.dumps(value, separators=(',', ':')).encode()
+    if compression == 'zstd' and not ZSTD_AVAILABLE:
+        compression = 'zlib'
+    if compression == 'zlib':
+        return f"{kind}+zlib", zlib.compress(payload, 6)
+    if compression == 'zstd':
+        return f"{kind}+zstd", zstandard.ZstdCompressor().compress(payload)
+    return kind, payload
+
+
+def unpack(encoding: str, payload: bytes) -> Tuple[str, Any]:
+    """Inverse of pack; returns (kind, value)."""
+    kind, _, compression = encoding.partition('+')
+    payload = bytes(payload)
+    if compression == 'zlib':
+        payload = zlib.decompress(payload)
+    elif compression == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise ImportError("zstandard is required to read zstd-compressed history")
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    return kind, json.loads(payload)
+
+
+def is_keyframe(encoding: Optional[str]) -> bool:
+    """Check whether a row starts a chain (legacy full rows count as keyframes)."""
+    return encoding is None or encoding.split('+', 1)[0] == KEYFRAME
+
+
+def decode_chain(rows: Iterable[Dict[str, Any]], previous: Any = None) -> List[Any]:
+    """Rebuild full snapshots for rows ordered by id, starting at a keyframe.
+    
+    Each row needs ``encoding``, ``payload`` and ``discovery_data``; rows with no
+    encoding are legacy full snapshots stored in ``discovery_data``. To continue a
+    chain decoded earlier, pass its last snapshot as previous.
+    """
+    snapshots = []
+    current = previous
+    for row in rows:
+        if row.get('encoding') is None:
+            current = parse_snapshot(row.get('discovery_data'))
+        else:
+            kind, value = unpack(row['encoding'], row['payload'])
+            current = apply_patch(current, value) if kind == DELTA else value
+        snapshots.append(current)
+    return snapshots
+
+
+def stored_size(row: Dict[str, Any]) -> int:
+    """Bytes a history row occupies for its snapshot data."""
+    if row.get('payload') is not None:
+        return len(bytes(row['payload']))
+    data = row.get('discovery_data')
+    if data is None:
+        return 0
+    return len(data if isinstance(data, str) else json.dumps(data))
+
+
+class HistoryCodec:
+    """Chooses between keyframes and deltas and applies compression."""
+    
+    def __init__(self, compression: str = 'zlib', keyframe_interval: int = 20):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unsupported history compression: {compression}")
+        self.compression = compression
+        self.keyframe_interval = max(1, keyframe_interval)
+    
+    def encode(
+        self,
+        snapshot: Any,
+        previous: Any = None,
+        deltas_since_keyframe: Optional[int] = None
+    ) -> Tuple[str, bytes]:
+        """Encode a snapshot as a delta against previous, or as a fresh keyframe."""
+        if (previous is None or deltas_since_keyframe is None or
+                deltas_since_keyframe + 1 >= self.keyframe_interval):
+            return pack(KEYFRAME, snapshot, self.compression)
+        return pack(DELTA, make_patch(previous, snapshot), self.compression)
+    
+    def reencode(self, rows: List[Dict[str, Any]]) -> List[Tuple[str, bytes]]:
+        """Re-encode a device's whole history (rows ordered by id) with this codec."""
+        encoded = []
+        previous = None
+        deltas_since_keyframe = None
+        for snapshot in decode_chain(rows):
+            encoding, payload = self.encode(snapshot, previous, deltas_since_keyframe)
+            deltas_since_keyframe = 0 if is_keyframe(encoding) else deltas_since_keyframe + 1
+            encoded.append((encoding, payload))
+            previous = snapshot
+        return encoded
@@ -0,0 +1,56 @@
+"""Full-text search documents and queries for discovery history."""
+
+import re
+import shlex
+from typing import Any, List
+
+# Anything but letters and digits separates tokens, so "10.0.5.23" indexes as 10 0 5 23
+# in both FTS5 and PostgreSQL's simple configuration
+_SEPARATORS = re.compile(r'[\W_]+')
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase text and reduce it to space-separated alphanumeric tokens."""
+    return _SEPARATORS.sub(' ', text).strip().lower()
+
+
+def _leaves(value: Any, parts: List[str]) -> None:
+    """Collect keys and scalar values of a snapshot in document order."""
+    if isinstance(value, dict):
+        for key, child in value.items():
+            parts.append(str(key))
+            _leaves(child, parts)
+    elif isinstance(value, list):
+        for child in value:
+            _leaves(child, parts)
+    elif value is not None:
+        parts.append(str(value))
+
+
+def search_text(snapshot: Any) -> str:
+    """Flatten a snapshot into the token text indexed for history search."""
+    parts: List[str] = []
+    _leaves(snapshot, parts)
+    return normalize_text(' '.join(parts))
+
+
+def parse_history_query(query: str) -> List[str]:
+    """Split a query into normalized phrases that must all match.
+    
+    Quote words that must appear together (``"10.0.5"``); ``enp3s0 "10.0.5"`` finds
+    snapshots with that interface and an address in 10.0.5.x.
+    """
+    try:
+        terms = shlex.split(query)
+    except ValueError as e:
+        raise ValueError(f"Invalid history query: {e}")
+    phrases = [phrase for phrase in (normalize_text(term) for term in terms) if phrase]
+    if not phrases:
+        raise ValueError("No searchable terms in history query")
+    return phrases
+
+
+def fts5_match(phrases: List[str]) -> str:
+    """Build an FTS5 MATCH expression requiring every phrase."""
+    # Phrases are already reduced to alphanumerics, so quoting is all the escaping needed
+    return ' AND '.join(f'"{phrase}"' for phrase in phrases)
@@ -1,33 +1,34 @@
 """Infrastructure CRUD operations for complete network management."""
 
 import asyncio
-import asyncssh
 import json
 import uuid
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 
 from .sitemap import NetworkSiteMap
-from .ssh_tools import ssh_discover_system
+from .ssh_tools import run_remote_command, ssh_discover_system
+from .ssh_pool import ssh_connection
+from .tools import get_sitemap
 
 
 class InfrastructureManager:
     """Manages CRUD operations for infrastructure components."""
     
     def __init__(self):
-        self.sitemap = NetworkSiteMap()
+        # Share the server's sitemap so its device cache and write tracking apply
+        self.sitemap: NetworkSiteMap = get_sitemap()
     
     async def get_device_connection_info(self, device_id: int) -> Optional[Dict[str, Any]]:
         """Get SSH connection info for a device from the sitemap."""
-        devices = self.sitemap.get_all_devices()
-        for device in devices:
-            if device.get('id') == device_id:
-                return {
-                    'hostname': device.get('connection_ip', device.get('hostname')),
-                    'username': 'mcp_admin',  # Use the admin account we set up
-                    'port': 22
-                }
-        return None
+        device = await self.sitemap.get_device_async(device_id)
+        if device is None:
+            return None
+        return {
+            'hostname': device.get('connection_ip', device.get('hostname')),
+            'username': 'mcp_admin',  # Use the admin account we set up
+            'port': 22
+        }
 
 
 async def deploy_infrastructure_plan(
@@ -145,7 +146,7 @@ async def update_device_configuration(
                 backup_id = backup_data.get('backup_id')
         
         # Apply configuration changes
-        async with asyncssh.connect(
+        async with ssh_connection(
             connection_info['hostname'],
             username=connection_info['username'],
             known_hosts=None
@@ -244,7 +245,7 @@ async def decommission_network_device(
             decommission_results.extend(migration_results)
         
         # Remove device from active service
-        async with asyncssh.connect(
+        async with ssh_connection(
             connection_info['hostname'],
             username=connection_info['username'],
             known_hosts=None
@@ -259,7 +260,7 @@ async def decommission_network_device(
             decommission_results.append(removal_result)
         
         # Update sitemap to mark device as decommissioned
-        manager.sitemap.update_device_status(device_id, "decommissioned")
+        await manager.sitemap.update_device_status_async(device_id, "decommissioned")
         
         return json.dumps({
             "status": "success",
@@ -417,8 +418,9 @@ async def create_infrastructure_backup(
         
         # Determine which devices to backup
         if backup_scope == "full":
-            devices = manager.sitemap.get_all_devices()
-            target_device_ids = [device['id'] for device in devices]
+            target_device_ids = [
+                device['id'] async for device in manager.sitemap.iter_devices_async()
+            ]
         elif device_ids:
             target_device_ids = device_ids
         else:
@@ -599,7 +601,7 @@ async def _deploy_service(manager: InfrastructureManager, service: Dict[str, Any
         if not connection_info:
             return {"status": "error", "service": service['name'], "error": f"Device {device_id} not found"}
         
-        async with asyncssh.connect(
+        async with ssh_connection(
             connection_info['hostname'],
             username=connection_info['username'],
             known_hosts=None
@@ -633,7 +635,7 @@ async def _deploy_service(manager: InfrastructureManager, service: Dict[str, Any
                 
                 cmd_parts.append(docker_image)
                 
-                result = await conn.run(' '.join(cmd_parts))
+                result = await run_remote_command(conn, ' '.join(cmd_parts))
                 if result.exit_status == 0:
                     return {"status": "success", "service": service_name, "container_id": result.stdout.strip()}
                 else:
@@ -644,7 +646,7 @@ async def _deploy_service(manager: InfrastructureManager, service: Dict[str, Any
                 lxd_image = config.get('image', 'ubuntu:22.04')
                 
                 # Launch LXD container
-                result = await conn.run(f'lxc launch {lxd_image} {service_name}')
+                result = await run_remote_command(conn, f'lxc launch {lxd_image} {service_name}')
                 if result.exit_status == 0:
                     return {"status": "success", "service": service_name, "container": service_name}
                 else:
@@ -657,10 +659,10 @@ async def _deploy_service(manager: InfrastructureManager, service: Dict[str, Any
                     return {"status": "error", "service": service_name, "error": "Service file content required"}
                 
                 # Write service file
-                await conn.run(f'echo "{service_file}" | sudo tee /etc/systemd/system/{service_name}.service')
-                await conn.run('sudo systemctl daemon-reload')
-                await conn.run(f'sudo systemctl enable {service_name}')
-                result = await conn.run(f'sudo systemctl start {service_name}')
+                await run_remote_command(conn, f'echo "{service_file}" | sudo tee /etc/systemd/system/{service_name}.service')
+                await run_remote_command(conn, 'sudo systemctl daemon-reload')
+                await run_remote_command(conn, f'sudo systemctl enable {service_name}')
+                result = await run_remote_command(conn, f'sudo systemctl start {service_name}')
                 
                 if result.exit_status == 0:
                     return {"status": "success", "service": service_name, "systemd_service": service_name}
@@ -746,13 +748,13 @@ async def _update_service_config(conn, service_name: str, config: Dict[str, Any]
         if service_type == 'docker':
             # Update Docker container configuration
             # Check if container exists
-            result = await conn.run(f'docker inspect {service_name}')
+            result = await run_remote_command(conn, f'docker inspect {service_name}')
             if result.exit_status != 0:
                 return {"status": "error", "service": service_name, "error": "Container not found"}
             
             # Stop existing container
-            await conn.run(f'docker stop {service_name}')
-            await conn.run(f'docker rm {service_name}')
+            await run_remote_command(conn, f'docker stop {service_name}')
+            await run_remote_command(conn, f'docker rm {service_name}')
             
             # Recreate with new configuration
             docker_image = config.get('image', 'nginx:latest')
@@ -771,7 +773,7 @@ async def _update_service_config(conn, service_name: str, config: Dict[str, Any]
             
             cmd_parts.append(docker_image)
             
-            result = await conn.run(' '.join(cmd_parts))
+            result = await run_remote_command(conn, ' '.join(cmd_parts))
             if result.exit_status == 0:
                 return {"status": "success", "service": service_name, "action": "updated"}
             else:
@@ -781,9 +783,9 @@ async def _update_service_config(conn, service_name: str, config: Dict[str, Any]
             # Update systemd service configuration
             service_file = config.get('service_file', '')
             if service_file:
-                await conn.run(f'echo "{service_file}" | sudo tee /etc/systemd/system/{service_name}.service')
-                await conn.run('sudo systemctl daemon-reload')
-                result = await conn.run(f'sudo systemctl restart {service_name}')
+                await run_remote_command(conn, f'echo "{service_file}" | sudo tee /etc/systemd/system/{service_name}.service')
+                await run_remote_command(conn, 'sudo systemctl daemon-reload')
+                result = await run_remote_command(conn, f'sudo systemctl restart {service_name}')
                 
                 if result.exit_status == 0:
                     return {"status": "success", "service": service_name, "action": "updated"}
@@ -793,15 +795,15 @@ async def _update_service_config(conn, service_name: str, config: Dict[str, Any]
             # Update service state
             if 'enabled' in config:
                 if config['enabled']:
-                    await conn.run(f'sudo systemctl enable {service_name}')
+                    await run_remote_command(conn, f'sudo systemctl enable {service_name}')
                 else:
-                    await conn.run(f'sudo systemctl disable {service_name}')
+                    await run_remote_command(conn, f'sudo systemctl disable {service_name}')
             
             if 'running' in config:
                 if config['running']:
-                    result = await conn.run(f'sudo systemctl start {service_name}')
+                    result = await run_remote_command(conn, f'sudo systemctl start {service_name}')
                 else:
-                    result = await conn.run(f'sudo systemctl stop {service_name}')
+                    result = await run_remote_command(conn, f'sudo systemctl stop {service_name}')
                     
                 if result.exit_status == 0:
                     return {"status": "success", "service": service_name, "action": "state_updated"}
@@ -842,20 +844,20 @@ async def _analyze_device_dependencies(manager: InfrastructureManager, device_id
         critical_services = []
         dependent_devices = []
         
-        async with asyncssh.connect(
+        async with ssh_connection(
             connection_info['hostname'],
             username=connection_info['username'],
             known_hosts=None
         ) as conn:
             
             # Check for running Docker containers
-            docker_result = await conn.run('docker ps --format "{{.Names}}"')
+            docker_result = await run_remote_command(conn, 'docker ps --format "{{.Names}}"')
             if docker_result.exit_status == 0 and docker_result.stdout.strip():
                 container_names = docker_result.stdout.strip().split('\n')
                 for container_name in container_names:
                     if container_name.strip():
                         # Check if container has exposed ports (likely critical)
-                        port_result = await conn.run(f'docker port {container_name}')
+                        port_result = await run_remote_command(conn, f'docker port {container_name}')
                         if port_result.exit_status == 0 and port_result.stdout.strip():
                             critical_services.append({
                                 "name": container_name,
@@ -865,7 +867,7 @@ async def _analyze_device_dependencies(manager: InfrastructureManager, device_id
                             })
             
             # Check for running LXD containers
-            lxd_result = await conn.run('lxc list --format csv -c ns | grep RUNNING')
+            lxd_result = await run_remote_command(conn, 'lxc list --format csv -c ns | grep RUNNING')
             if lxd_result.exit_status == 0 and lxd_result.stdout.strip():
                 for line in lxd_result.stdout.strip().split('\n'):
                     if line.strip():
@@ -883,7 +885,7 @@ async def _analyze_device_dependencies(manager: InfrastructureManager, device_id
             ]
             
             for pattern in critical_service_patterns:
-                service_result = await conn.run(f'systemctl is-active {pattern} 2>/dev/null')
+                service_result = await run_remote_command(conn, f'systemctl is-active {pattern} 2>/dev/null')
                 if service_result.exit_status == 0 and service_result.stdout.strip() == 'active':
                     critical_services.append({
                         "name": pattern,
@@ -892,7 +894,7 @@ async def _analyze_device_dependencies(manager: InfrastructureManager, device_id
                     })
             
             # Check for services listening on network ports
-            netstat_result = await conn.run('ss -tlnp 2>/dev/null | grep LISTEN')
+            netstat_result = await run_remote_command(conn, 'ss -tlnp 2>/dev/null | grep LISTEN')
             if netstat_result.exit_status == 0:
                 listening_ports = []
                 for line in netstat_result.stdout.strip().split('\n'):
@@ -916,10 +918,9 @@ async def _analyze_device_dependencies(manager: InfrastructureManager, device_id
         # Analyze network dependencies (simplified)
         # In a real implementation, this would check the network topology
         # and identify devices that depend on this device for routing, DNS, etc.
-        all_devices = manager.sitemap.get_all_devices()
         device_ip = connection_info['hostname']
         
-        for device in all_devices:
+        async for device in manager.sitemap.iter_devices_async():
             if device.get('id') != device_id:
                 # Check if this device might be a gateway or DNS server for others
                 device_subnet = '.'.join(device_ip.split('.')[:-1])
@@ -973,22 +974,22 @@ async def _execute_migration_plan(manager: InfrastructureManager, device_id: int
                     continue
                 
                 # Connect to source device to get service configuration
-                async with asyncssh.connect(
+                async with ssh_connection(
                     source_connection_info['hostname'],
                     username=source_connection_info['username'],
                     known_hosts=None
                 ) as source_conn:
                     
                     # Get Docker container configuration
-                    inspect_result = await source_conn.run(f'docker inspect {service_name}')
+                    inspect_result = await run_remote_command(source_conn, f'docker inspect {service_name}')
                     if inspect_result.exit_status == 0:
                         # Export container and configuration
-                        export_result = await source_conn.run(f'docker commit {service_name} {service_name}_migration')
-                        save_result = await source_conn.run(f'docker save {service_name}_migration | gzip > /tmp/{service_name}_migration.tar.gz')
+                        export_result = await run_remote_command(source_conn, f'docker commit {service_name} {service_name}_migration')
+                        save_result = await run_remote_command(source_conn, f'docker save {service_name}_migration | gzip > /tmp/{service_name}_migration.tar.gz')
                         
                         if save_result.exit_status == 0:
                             # Connect to target device
-                            async with asyncssh.connect(
+                            async with ssh_connection(
                                 target_connection_info['hostname'],
                                 username=target_connection_info['username'],
                                 known_hosts=None
@@ -1002,13 +1003,13 @@ async def _execute_migration_plan(manager: InfrastructureManager, device_id: int
                                     await target_sftp.put(f'/tmp/{service_name}_migration.tar.gz', f'/tmp/{service_name}_migration.tar.gz')
                                 
                                 # Load and start container on target
-                                load_result = await target_conn.run(f'gunzip -c /tmp/{service_name}_migration.tar.gz | docker load')
-                                run_result = await target_conn.run(f'docker run -d --name {service_name} {service_name}_migration')
+                                load_result = await run_remote_command(target_conn, f'gunzip -c /tmp/{service_name}_migration.tar.gz | docker load')
+                                run_result = await run_remote_command(target_conn, f'docker run -d --name {service_name} {service_name}_migration')
                                 
                                 if run_result.exit_status == 0:
                                     # Stop container on source
-                                    await source_conn.run(f'docker stop {service_name}')
-                                    await source_conn.run(f'docker rm {service_name}')
+                                    await run_remote_command(source_conn, f'docker stop {service_name}')
+                                    await run_remote_command(source_conn, f'docker rm {service_name}')
                                     
                                     results.append({
                                         "status": "success", 
@@ -1029,21 +1030,21 @@ async def _execute_migration_plan(manager: InfrastructureManager, device_id: int
                             })
                     else:
                         # Try LXD container
-                        lxc_result = await source_conn.run(f'lxc info {service_name}')
+                        lxc_result = await run_remote_command(source_conn, f'lxc info {service_name}')
                         if lxc_result.exit_status == 0:
                             # Copy LXD container
-                            copy_result = await source_conn.run(f'lxc copy {service_name} {target_connection_info["hostname"]}:{service_name}')
+                            copy_result = await run_remote_command(source_conn, f'lxc copy {service_name} {target_connection_info["hostname"]}:{service_name}')
                             if copy_result.exit_status == 0:
                                 # Start on target and stop on source
-                                async with asyncssh.connect(
+                                async with ssh_connection(
                                     target_connection_info['hostname'],
                                     username=target_connection_info['username'],
                                     known_hosts=None
                                 ) as target_conn:
-                                    await target_conn.run(f'lxc start {service_name}')
+                                    await run_remote_command(target_conn, f'lxc start {service_name}')
                                 
-                                await source_conn.run(f'lxc stop {service_name}')
-                                await source_conn.run(f'lxc delete {service_name}')
+                                await run_remote_command(source_conn, f'lxc stop {service_name}')
+                                await run_remote_command(source_conn, f'lxc delete {service_name}')
                                 
                                 results.append({
                                     "status": "success", 
@@ -1127,19 +1128,19 @@ async def _backup_device(manager: InfrastructureManager, device_id: int, include
             "backed_up_at": datetime.now().isoformat()
         }
         
-        async with asyncssh.connect(
+        async with ssh_connection(
             connection_info['hostname'],
             username=connection_info['username'],
             known_hosts=None
         ) as conn:
             
             # Backup Docker containers
-            docker_result = await conn.run('docker ps -a --format "{{.Names}}"')
+            docker_result = await run_remote_command(conn, 'docker ps -a --format "{{.Names}}"')
             if docker_result.exit_status == 0 and docker_result.stdout.strip():
                 container_names = docker_result.stdout.strip().split('\n')
                 for container_name in container_names:
                     if container_name.strip():
-                        inspect_result = await conn.run(f'docker inspect {container_name}')
+                        inspect_result = await run_remote_command(conn, f'docker inspect {container_name}')
                         if inspect_result.exit_status == 0:
                             backup_data["services"][container_name] = {
                                 "type": "docker",
@@ -1149,16 +1150,16 @@ async def _backup_device(manager: InfrastructureManager, device_id: int, include
                             
                             if include_data:
                                 # Export container data
-                                export_result = await conn.run(f'docker export {container_name} | gzip > /tmp/backup_{container_name}.tar.gz')
+                                export_result = await run_remote_command(conn, f'docker export {container_name} | gzip > /tmp/backup_{container_name}.tar.gz')
                                 backup_data["services"][container_name]["data_backup"] = export_result.exit_status == 0
             
             # Backup LXD containers
-            lxd_result = await conn.run('lxc list --format csv -c n')
+            lxd_result = await run_remote_command(conn, 'lxc list --format csv -c n')
             if lxd_result.exit_status == 0 and lxd_result.stdout.strip():
                 container_names = lxd_result.stdout.strip().split('\n')
                 for container_name in container_names:
                     if container_name.strip():
-                        info_result = await conn.run(f'lxc config show {container_name}')
+                        info_result = await run_remote_command(conn, f'lxc config show {container_name}')
                         if info_result.exit_status == 0:
                             backup_data["services"][container_name] = {
                                 "type": "lxd",
@@ -1168,11 +1169,11 @@ async def _backup_device(manager: InfrastructureManager, device_id: int, include
                             
                             if include_data:
                                 # Export LXD container
-                                export_result = await conn.run(f'lxc export {container_name} /tmp/backup_{container_name}.tar.gz')
+                                export_result = await run_remote_command(conn, f'lxc export {container_name} /tmp/backup_{container_name}.tar.gz')
                                 backup_data["services"][container_name]["data_backup"] = export_result.exit_status == 0
             
             # Backup systemd services
-            systemd_result = await conn.run('systemctl list-units --type=service --state=loaded --no-pager --plain | grep -v LOAD')
+            systemd_result = await run_remote_command(conn, 'systemctl list-units --type=service --state=loaded --no-pager --plain | grep -v LOAD')
             if systemd_result.exit_status == 0:
                 service_lines = systemd_result.stdout.strip().split('\n')
                 for line in service_lines:
@@ -1181,7 +1182,7 @@ async def _backup_device(manager: InfrastructureManager, device_id: int, include
                         if not service_name.endswith('.service'):
                             continue
                         
-                        service_file_result = await conn.run(f'systemctl cat {service_name}')
+                        service_file_result = await run_remote_command(conn, f'systemctl cat {service_name}')
                         if service_file_result.exit_status == 0:
                             backup_data["services"][service_name] = {
                                 "type": "systemd",
@@ -1193,17 +1194,17 @@ async def _backup_device(manager: InfrastructureManager, device_id: int, include
             network_configs = {}
             
             # Network interfaces
-            interfaces_result = await conn.run('cat /etc/netplan/*.yaml 2>/dev/null || cat /etc/network/interfaces 2>/dev/null || echo "No network config found"')
+            interfaces_result = await run_remote_command(conn, 'cat /etc/netplan/*.yaml 2>/dev/null || cat /etc/network/interfaces 2>/dev/null || echo "No network config found"')
             if interfaces_result.exit_status == 0:
                 network_configs["interfaces"] = interfaces_result.stdout
             
             # Firewall rules
-            ufw_result = await conn.run('sudo ufw status numbered 2>/dev/null || echo "UFW not available"')
+            ufw_result = await run_remote_command(conn, 'sudo ufw status numbered 2>/dev/null || echo "UFW not available"')
             if ufw_result.exit_status == 0:
                 network_configs["firewall"] = ufw_result.stdout
             
             # DNS configuration
-            dns_result = await conn.run('cat /etc/resolv.conf')
+            dns_result = await run_remote_command(conn, 'cat /etc/resolv.conf')
             if dns_result.exit_status == 0:
                 network_configs["dns"] = dns_result.stdout
             
@@ -1213,12 +1214,12 @@ async def _backup_device(manager: InfrastructureManager, device_id: int, include
             system_configs = {}
             
             # Crontab
-            cron_result = await conn.run('crontab -l 2>/dev/null || echo "No crontab"')
+            cron_result = await run_remote_command(conn, 'crontab -l 2>/dev/null || echo "No crontab"')
             if cron_result.exit_status == 0:
                 system_configs["crontab"] = cron_result.stdout
             
             # SSH configuration
-            ssh_result = await conn.run('sudo cat /etc/ssh/sshd_config')
+            ssh_result = await run_remote_command(conn, 'sudo cat /etc/ssh/sshd_config')
             if ssh_result.exit_status == 0:
                 system_configs["ssh"] = ssh_result.stdout
             
@@ -1,12 +1,18 @@
 """Database migration utilities for moving from SQLite to PostgreSQL."""
 
+import hashlib
 import json
+import os
 import sys
-from typing import Dict, Any, List, Optional, Tuple
+import threading
+import time
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime
 
 from .database import SQLiteAdapter, PostgreSQLAdapter, get_database_adapter
 from .config import DatabaseConfig, get_config
+from .hardware import HARDWARE_TABLES
+from .history_codec import decode_chain
 
 
 class DatabaseMigrator:
@@ -15,19 +21,42 @@ class DatabaseMigrator:
     def __init__(self, source_adapter, target_adapter):
         self.source = source_adapter
         self.target = target_adapter
+        self.rows_per_second = 0.0
+        # Devices that failed in the last completed migrate_devices run (None until one completes)
+        self.error_count: Optional[int] = None
+        self.mismatched_ranges: List[Dict[str, Any]] = []
     
-    def migrate_devices(self) -> Tuple[int, int]:
-        """Migrate device records from source to target database."""
-        print("Migrating device records...")
+    def migrate_devices(
+        self,
+        batch_size: int = 500,
+        checkpoint_path: Optional[str] = None
+    ) -> Tuple[int, int]:
+        """Migrate device records, their full history and metrics in keyset-ordered batches.
         
-        # Get all devices from source
-        devices = self.source.get_all_devices()
+        With a checkpoint_path, progress is saved after every batch and an
+        interrupted run picks up after the last completed batch. The checkpoint
+        never moves past a device that failed, so a rerun retries it.
+        """
+        print("Migrating device records...")
         
-        migrated_count = 0
-        error_count = 0
+        checkpoint = self._load_checkpoint(checkpoint_path)
+        after = tuple(checkpoint['after']) if checkpoint['after'] else None
+        migrated_count = checkpoint['devices']
+        error_count = checkpoint['errors']
+        history_count = checkpoint['history_rows']
+        metrics_count = checkpoint['metric_rows']
+        if after:
+            print(f"  Resuming after {after[0]} ({migrated_count} devices already migrated)")
         
-        for device in devices:
-            try:
+        started = time.monotonic()
+        run_rows = 0
+        checkpoint_blocked = False
+        while True:
+            batch = self.source.get_devices_page(limit=batch_size, after=after)
+            if not batch:
+                break
+            
+            for device in batch:
                 # Convert timestamps to proper format for PostgreSQL
                 if 'last_seen' in device and isinstance(device['last_seen'], str):
                     # Convert ISO string to datetime if needed
@@ -36,97 +65,388 @@ class DatabaseMigrator:
                     except ValueError:
                         # If parsing fails, use current time
                         device['last_seen'] = datetime.now().isoformat()
-                
-                # Store in target database
-                device_id = self.target.store_device(device)
-                
-                # Migrate discovery history for this device
-                if 'id' in device:
-                    self._migrate_device_history(device['id'], device_id)
-                
+            
+            for device, loaded in zip(batch, self._migrate_batch(batch)):
+                if loaded is None:
+                    # Hold the checkpoint before this device so a rerun retries it
+                    error_count += 1
+                    checkpoint_blocked = True
+                    continue
+                history_rows, metric_rows = loaded
                 migrated_count += 1
-                
-                if migrated_count % 10 == 0:
-                    print(f"  Migrated {migrated_count} devices...")
-                    
-            except Exception as e:
-                print(f"  ERROR migrating device {device.get('hostname', 'unknown')}: {e}")
-                error_count += 1
+                history_count += history_rows
+                metrics_count += metric_rows
+                run_rows += 1 + history_rows + metric_rows
+                if not checkpoint_blocked:
+                    checkpoint = {
+                        'after': [device['hostname'], device['id']],
+                        'devices': migrated_count,
+                        'errors': error_count,
+                        'history_rows': history_count,
+                        'metric_rows': metrics_count
+                    }
+            after = (batch[-1]['hostname'], batch[-1]['id'])
+            self._save_checkpoint(checkpoint_path, checkpoint)
+            
+            rate = run_rows / max(time.monotonic() - started, 1e-9)
+            print(f"  Migrated {migrated_count} devices, {history_count} history rows, "
+                  f"{metrics_count} metrics rows ({rate:.0f} rows/sec)")
         
-        print(f"Device migration complete: {migrated_count} migrated, {error_count} errors")
+        self.rows_per_second = run_rows / max(time.monotonic() - started, 1e-9)
+        self.error_count = error_count
+        print(f"Device migration complete: {migrated_count} migrated, {error_count} errors, "
+              f"{history_count} history rows, {metrics_count} metrics rows")
         return migrated_count, error_count
     
-    def _migrate_device_history(self, source_device_id: int, target_device_id: int) -> None:
-        """Migrate discovery history for a specific device."""
+    def _load_checkpoint(self, checkpoint_path: Optional[str]) -> Dict[str, Any]:
+        """Read saved progress, or start from the beginning."""
+        checkpoint = {'after': None, 'devices': 0, 'errors': 0, 'history_rows': 0, 'metric_rows': 0}
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                checkpoint.update(json.load(f))
+        return checkpoint
+    
+    def _save_checkpoint(self, checkpoint_path: Optional[str], checkpoint: Dict[str, Any]) -> None:
+        """Atomically record progress after a completed batch."""
+        if not checkpoint_path:
+            return
+        temp_path = f"{checkpoint_path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(temp_path, checkpoint_path)
+    
+    def _migrate_batch(self, batch: List[Dict[str, Any]]) -> List[Optional[Tuple[int, int]]]:
+        """Write one batch of devices with their history and metrics to the target.
+        
+        Returns the (history, metrics) rows loaded for each device, or None where
+        the device, its history or its metrics failed.
+        """
+        # Store the whole batch in one upsert transaction
         try:
-            changes = self.source.get_device_changes(source_device_id, limit=1000)
-            
-            for change in changes:
-                # Convert change data to JSON string if needed
-                if isinstance(change['data'], dict):
-                    discovery_data = json.dumps(change['data'])
-                else:
-                    discovery_data = str(change['data'])
-                
-                # Calculate hash for the data
-                from .database import calculate_data_hash
-                data_hash = calculate_data_hash(discovery_data)
-                
-                # Store in target database
-                self.target.store_discovery_history(target_device_id, discovery_data, data_hash)
-                
+            target_ids = self.target.store_devices_bulk(batch)
         except Exception as e:
-            print(f"    Warning: Could not migrate history for device {source_device_id}: {e}")
+            # Fall back to row-by-row so one bad record doesn't sink the batch
+            print(f"  Batch write failed ({e}), retrying devices individually...")
+            target_ids = []
+            for device in batch:
+                try:
+                    target_ids.append(self.target.store_device(device))
+                except Exception as e:
+                    print(f"  ERROR migrating device {device.get('hostname', 'unknown')}: {e}")
+                    target_ids.append(None)
+        
+        results: List[Optional[Tuple[int, int]]] = []
+        for device, device_id in zip(batch, target_ids):
+            if device_id is None:
+                results.append(None)
+                continue
+            if 'id' not in device:
+                results.append((0, 0))
+                continue
+            
+            # Migrate discovery history and metrics samples for this device
+            try:
+                results.append((
+                    self._migrate_device_history(device['id'], device_id),
+                    self._migrate_device_metrics(device['id'], device_id)
+                ))
+            except Exception as e:
+                print(f"  ERROR migrating history or metrics for {device.get('hostname', 'unknown')}: {e}")
+                results.append(None)
+        
+        return results
     
-    def verify_migration(self) -> bool:
-        """Verify that migration was successful."""
-        print("Verifying migration...")
+    def _migrate_device_history(
+        self,
+        source_device_id: int,
+        target_device_id: int,
+        batch_size: int = 1000,
+        from_id: Optional[int] = None
+    ) -> int:
+        """Copy a device's history rows as stored, decoding each once to index it.
         
-        source_devices = self.source.get_all_devices()
-        target_devices = self.target.get_all_devices()
+        With from_id, only the chain containing that row onwards is sent.
+        """
+        loaded = 0
+        previous = None
+        batch = []
+        for row in self.source.iter_history_rows(source_device_id, batch_size, from_id):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                snapshots = decode_chain(batch, previous)
+                loaded += self.target.load_discovery_history(target_device_id, batch, snapshots)
+                previous = snapshots[-1]
+                batch = []
+        if batch:
+            loaded += self.target.load_discovery_history(
+                target_device_id, batch, decode_chain(batch, previous)
+            )
+        return loaded
+    
+    def _migrate_device_metrics(
+        self,
+        source_device_id: int,
+        target_device_id: int,
+        batch_size: int = 1000,
+        from_id: Optional[int] = None
+    ) -> int:
+        """Copy a device's metrics samples in batches, from row from_id if given."""
+        loaded = 0
+        batch = []
+        for row in self.source.iter_metrics_rows(source_device_id, batch_size, from_id):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                loaded += self.target.load_device_metrics(target_device_id, batch)
+                batch = []
+        if batch:
+            loaded += self.target.load_device_metrics(target_device_id, batch)
+        return loaded
+    
+    def replicate(
+        self,
+        batch_size: int = 500,
+        poll_interval: float = 1.0,
+        stop: Optional[threading.Event] = None,
+        checkpoint_path: Optional[str] = None
+    ) -> int:
+        """Bulk-copy the source, then keep applying its captured writes until stop is set.
         
-        print(f"Source devices: {len(source_devices)}")
-        print(f"Target devices: {len(target_devices)}")
+        Capture starts before the copy, so writes made during it are replayed
+        (re-applying is harmless). Once stop is set the change log is drained
+        and the number of changes applied is returned.
+        """
+        self.source.enable_change_capture()
+        self.migrate_devices(batch_size, checkpoint_path)
+        return self.tail_changes(batch_size, poll_interval, stop)
+    
+    def tail_changes(
+        self,
+        batch_size: int = 500,
+        poll_interval: float = 1.0,
+        stop: Optional[threading.Event] = None
+    ) -> int:
+        """Apply captured source writes as they arrive, draining the log once stop is set."""
+        stop = stop or threading.Event()
+        print("Tailing source changes...")
+        applied = 0
+        while not stop.is_set():
+            pending = self.apply_pending_changes(batch_size)
+            applied += pending
+            if not pending:
+                stop.wait(poll_interval)
+        applied += self.apply_pending_changes(batch_size)
+        print(f"Replication stopped: {applied} changes applied")
+        return applied
+    
+    def apply_pending_changes(self, batch_size: int = 500) -> int:
+        """Apply every captured change to the target in batches; returns changes applied."""
+        applied = 0
+        while True:
+            changes = self.source.read_changes(batch_size)
+            if not changes:
+                return applied
+            self._apply_changes(changes)
+            self.source.ack_changes(changes[-1]['seq'])
+            applied += len(changes)
+            print(f"  Applied {applied} changes")
+    
+    def _apply_changes(self, changes: List[Dict[str, Any]]) -> None:
+        """Upsert the current state of changed devices and send their new history, metrics and inventory."""
+        # Every change needs its device on the target, even a history-only one
+        devices = []
+        for device_id in dict.fromkeys(change['device_id'] for change in changes):
+            device = self.source.get_device(device_id)
+            if device is not None:
+                devices.append(device)
+        if not devices:
+            return
+        target_ids = dict(zip(
+            (device['id'] for device in devices),
+            self.target.store_devices_bulk(devices)
+        ))
         
-        if len(source_devices) != len(target_devices):
-            print("ERROR: Device count mismatch!")
-            return False
+        first_history_ids: Dict[int, int] = {}
+        first_metrics_ids: Dict[int, int] = {}
+        for change in changes:
+            first_ids = {
+                'discovery_history': first_history_ids,
+                'device_metrics': first_metrics_ids
+            }.get(change['table_name'])
+            if first_ids is not None:
+                device_id = change['device_id']
+                first_ids[device_id] = min(first_ids.get(device_id, change['row_id']), change['row_id'])
+        for device_id, from_id in first_history_ids.items():
+            if device_id in target_ids:
+                self._migrate_device_history(device_id, target_ids[device_id], from_id=from_id)
+        for device_id, from_id in first_metrics_ids.items():
+            if device_id in target_ids:
+                self._migrate_device_metrics(device_id, target_ids[device_id], from_id=from_id)
         
-        # Verify a few random devices
-        import random
-        sample_size = min(5, len(source_devices))
-        sample_devices = random.sample(source_devices, sample_size)
+        # Copy the current inventory, which needn't be the newest history row's (A -> B -> A)
+        inventory_tables = {table for table, _ in HARDWARE_TABLES.values()}
+        for device_id in dict.fromkeys(
+            change['device_id'] for change in changes if change['table_name'] in inventory_tables
+        ):
+            if device_id in target_ids:
+                self.target.replace_hardware_inventory(
+                    target_ids[device_id], self.source.get_hardware_inventory(device_id)
+                )
+    
+    def verify_migration(self, chunk_size: int = 500) -> bool:
+        """Verify every device, its history and its metrics by comparing per-chunk checksums.
         
-        for source_device in sample_devices:
-            # Find corresponding device in target
-            target_device = None
-            for td in target_devices:
-                if (td['hostname'] == source_device['hostname'] and 
-                    td['connection_ip'] == source_device['connection_ip']):
-                    target_device = td
-                    break
-            
-            if not target_device:
-                print(f"ERROR: Device {source_device['hostname']} not found in target!")
-                return False
-            
-            # Compare key fields
-            key_fields = ['hostname', 'connection_ip', 'status', 'cpu_model', 'os_info']
-            for field in key_fields:
-                if source_device.get(field) != target_device.get(field):
-                    print(f"ERROR: Field mismatch for {source_device['hostname']}.{field}")
-                    return False
+        Both databases are streamed in key order and merged, so each chunk covers the
+        same (hostname, connection_ip) range on both sides. Chunks whose digests differ
+        are reported with the keys that are missing, extra or changed.
+        """
+        print("Verifying migration...")
         
-        print("✓ Migration verification successful")
-        return True
+        self.mismatched_ranges = []
+        source_root = hashlib.sha256()
+        target_root = hashlib.sha256()
+        source_count = 0
+        target_count = 0
+        chunk_count = 0
+        
+        for chunk in _chunks(self._merge_devices(chunk_size), chunk_size):
+            source_digest, target_digest, differences = self._compare_chunk(chunk)
+            source_root.update(source_digest)
+            target_root.update(target_digest)
+            source_count += sum(1 for _, source_device, _ in chunk if source_device)
+            target_count += sum(1 for _, _, target_device in chunk if target_device)
+            chunk_count += 1
+            if source_digest != target_digest:
+                self.mismatched_ranges.append({
+                    'first_key': list(chunk[0][0]),
+                    'last_key': list(chunk[-1][0]),
+                    **differences
+                })
+        
+        print(f"Source devices: {source_count}")
+        print(f"Target devices: {target_count}")
+        print(f"Source checksum: {source_root.hexdigest()}")
+        print(f"Target checksum: {target_root.hexdigest()}")
+        
+        if not self.mismatched_ranges:
+            print(f"✓ Migration verification successful ({chunk_count} chunks match)")
+            return True
+        
+        print(f"ERROR: {len(self.mismatched_ranges)} of {chunk_count} chunks differ")
+        for mismatch in self.mismatched_ranges:
+            print(f"  Range {mismatch['first_key']} .. {mismatch['last_key']}:")
+            for kind in ('missing', 'extra', 'changed'):
+                if mismatch[kind]:
+                    print(f"    {kind}: {', '.join('/'.join(key) for key in mismatch[kind])}")
+        return False
+    
+    def _merge_devices(self, batch_size: int) -> Iterator[Tuple[Tuple[str, str], Optional[Dict], Optional[Dict]]]:
+        """Merge both key-ordered device streams into (key, source, target) triples."""
+        source_devices = self.source.iter_devices(batch_size)
+        target_devices = self.target.iter_devices(batch_size)
+        source_device = next(source_devices, None)
+        target_device = next(target_devices, None)
+        while source_device is not None or target_device is not None:
+            source_key = _device_key(source_device) if source_device is not None else None
+            target_key = _device_key(target_device) if target_device is not None else None
+            if target_key is None or (source_key is not None and source_key < target_key):
+                yield source_key, source_device, None
+                source_device = next(source_devices, None)
+            elif source_key is None or target_key < source_key:
+                yield target_key, None, target_device
+                target_device = next(target_devices, None)
+            else:
+                yield source_key, source_device, target_device
+                source_device = next(source_devices, None)
+                target_device = next(target_devices, None)
+    
+    def _compare_chunk(self, chunk: List[Tuple]) -> Tuple[bytes, bytes, Dict[str, List]]:
+        """Digest one aligned chunk on each side and list the keys that differ."""
+        source_ids = [s['id'] for _, s, _ in chunk if s]
+        target_ids = [t['id'] for _, _, t in chunk if t]
+        source_history = self.source.get_history_hashes(source_ids)
+        target_history = self.target.get_history_hashes(target_ids)
+        source_metrics = self.source.get_metrics_digests(source_ids)
+        target_metrics = self.target.get_metrics_digests(target_ids)
+        source_digest = hashlib.sha256()
+        target_digest = hashlib.sha256()
+        differences: Dict[str, List] = {'missing': [], 'extra': [], 'changed': []}
+        for key, source_device, target_device in chunk:
+            source_row = target_row = None
+            if source_device:
+                source_row = _row_digest(
+                    source_device, source_history[source_device['id']], source_metrics[source_device['id']]
+                )
+                source_digest.update(source_row)
+            if target_device:
+                target_row = _row_digest(
+                    target_device, target_history[target_device['id']], target_metrics[target_device['id']]
+                )
+                target_digest.update(target_row)
+            if target_row is None:
+                differences['missing'].append(key)
+            elif source_row is None:
+                differences['extra'].append(key)
+            elif source_row != target_row:
+                differences['changed'].append(key)
+        return source_digest.digest(), target_digest.digest(), differences
+
+
+# Device fields compared by verify_migration, in digest order
+VERIFY_FIELDS = (
+    'hostname', 'connection_ip', 'last_seen', 'status', 'cpu_model', 'cpu_cores',
+    'memory_total', 'disk_size', 'disk_use_percent', 'os_info', 'network_interfaces'
+)
+
+
+def _device_key(device: Dict[str, Any]) -> Tuple[str, str]:
+    """Natural key both backends order devices by."""
+    return device['hostname'], str(device['connection_ip'])
+
+
+def _canonical_timestamp(value: Any) -> Any:
+    """Render a timestamp the same way whether it came back as text or a datetime."""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return value
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _row_digest(device: Dict[str, Any], history_hashes: List[str], metrics_digest: str) -> bytes:
+    """Digest a device's canonicalized fields with its ordered history hashes and metrics digest."""
+    fields = [device.get(field) for field in VERIFY_FIELDS]
+    fields[VERIFY_FIELDS.index('last_seen')] = _canonical_timestamp(device.get('last_seen'))
+    fields[VERIFY_FIELDS.index('connection_ip')] = str(device.get('connection_ip'))
+    canonical = json.dumps([fields, history_hashes, metrics_digest], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).digest()
+
+
+def _chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Group an iterable into lists of at most size items."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
 
 def migrate_sqlite_to_postgresql(
     sqlite_path: Optional[str] = None,
     postgres_params: Optional[Dict[str, Any]] = None,
-    dry_run: bool = False
+    dry_run: bool = False,
+    batch_size: int = 500,
+    checkpoint_path: Optional[str] = None,
+    replicate: bool = False
 ) -> bool:
-    """Migrate data from SQLite to PostgreSQL."""
+    """Migrate data from SQLite to PostgreSQL, resuming from checkpoint_path if present.
+    
+    With replicate, source writes keep being applied after the copy until interrupted
+    (Ctrl+C), so discovery can stay up until cut-over.
+    """
     
     print("=== SQLite to PostgreSQL Migration ===")
     
@@ -154,10 +474,12 @@ def migrate_sqlite_to_postgresql(
         # Test connections
         print("Testing source connection...")
         source.connect()
-        source_devices = source.get_all_devices()
-        print(f"Found {len(source_devices)} devices in source database")
+        # Bring databases written by older versions up to the columns the reads expect
+        source.init_schema()
+        source_count = source.count_devices()
+        print(f"Found {source_count} devices in source database")
         
-        if len(source_devices) == 0:
+        if source_count == 0:
             print("No devices found in source database - nothing to migrate")
             return True
         
@@ -170,11 +492,28 @@ def migrate_sqlite_to_postgresql(
             
             # Perform migration
             migrator = DatabaseMigrator(source, target)
-            migrated_count, error_count = migrator.migrate_devices()
+            if replicate:
+                try:
+                    migrator.replicate(batch_size, checkpoint_path=checkpoint_path)
+                except KeyboardInterrupt:
+                    if migrator.error_count is None:
+                        # Interrupted during the copy: the checkpoint resumes it next run
+                        raise
+                    # Stop discovery before interrupting so nothing lands after this drain
+                    print("Interrupted, applying remaining changes...")
+                    migrator.apply_pending_changes(batch_size)
+                finally:
+                    source.disable_change_capture()
+                error_count = migrator.error_count
+            else:
+                migrated_count, error_count = migrator.migrate_devices(batch_size, checkpoint_path)
             
             if error_count == 0:
                 # Verify migration
                 if migrator.verify_migration():
+                    # Finished runs start over next time
+                    if checkpoint_path and os.path.exists(checkpoint_path):
+                        os.remove(checkpoint_path)
                     print("✓ Migration completed successfully!")
                     return True
                 else:
@@ -294,6 +633,10 @@ def main():
     migrate_parser = subparsers.add_parser('migrate', help='Migrate from SQLite to PostgreSQL')
     migrate_parser.add_argument('--sqlite-path', help='Path to SQLite database')
     migrate_parser.add_argument('--dry-run', action='store_true', help='Test migration without making changes')
+    migrate_parser.add_argument('--batch-size', type=int, default=500, help='Devices per batch')
+    migrate_parser.add_argument('--checkpoint', help='Progress file for resuming an interrupted migration')
+    migrate_parser.add_argument('--replicate', action='store_true',
+                                help='Keep applying source writes after the copy until Ctrl+C (for cut-over)')
     migrate_parser.add_argument('--host', default='localhost', help='PostgreSQL host')
     migrate_parser.add_argument('--port', type=int, default=5432, help='PostgreSQL port')
     migrate_parser.add_argument('--database', default='homelab_mcp', help='Database name')
@@ -329,7 +672,10 @@ def main():
         success = migrate_sqlite_to_postgresql(
             sqlite_path=args.sqlite_path,
             postgres_params=postgres_params,
-            dry_run=args.dry_run
+            dry_run=args.dry_run,
+            batch_size=args.batch_size,
+            checkpoint_path=args.checkpoint,
+            replicate=args.replicate
         )
         sys.exit(0 if success else 1)
         
@@ -0,0 +1,272 @@
+"""Process-wide pools of PostgreSQL connections shared by database adapters."""
+
+import hashlib
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+from .config import get_config
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+
+class PostgreSQLConnectionPool:
+    """Thread-safe pool of PostgreSQL connections for one set of connection parameters.
+    
+    At most ``max_size`` connections are open at once; ``warm`` opens ``min_size``
+    up front. A checkout waits up to ``acquire_timeout`` seconds for a free
+    connection. Every connection runs with ``statement_timeout_ms``, and each
+    checkout is its own transaction: committed when the block succeeds and rolled
+    back when it raises.
+    """
+    
+    def __init__(
+        self,
+        connection_params: Dict[str, Any],
+        min_size: int = 1,
+        max_size: int = 10,
+        statement_timeout_ms: int = 30000,
+        acquire_timeout: float = 30.0
+    ):
+        if max_size < 1 or not 0 <= min_size <= max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+        
+        self.connection_params = connection_params
+        self.min_size = min_size
+        self.max_size = max_size
+        self.statement_timeout_ms = statement_timeout_ms
+        self.acquire_timeout = acquire_timeout
+        
+        self._idle: List[Any] = []
+        self._size = 0  # Open connections, idle and checked out
+        self._in_use = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._stats = {
+            'created': 0, 'reused': 0, 'discarded': 0,
+            'checkouts': 0, 'waits': 0, 'timeouts': 0, 'rollbacks': 0
+        }
+        self._wait_seconds = 0.0
+    
+    def _connect(self) -> Any:
+        """Open a new connection with the pool's statement timeout."""
+        params = dict(self.connection_params)
+        if self.statement_timeout_ms:
+            options = params.get('options', '')
+            params['options'] = f"{options} -c statement_timeout={self.statement_timeout_ms}".strip()
+        conn = psycopg2.connect(**params)
+        conn.autocommit = False
+        with self._condition:
+            self._stats['created'] += 1
+        return conn
+    
+    def warm(self) -> None:
+        """Open connections until min_size exist."""
+        with self._condition:
+            needed = max(0, self.min_size - self._size)
+            self._size += needed
+        
+        opened = []
+        try:
+            for _ in range(needed):
+                opened.append(self._connect())
+        finally:
+            with self._condition:
+                self._size -= needed - len(opened)
+                self._idle.extend(opened)
+                self._condition.notify_all()
+    
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Check out a connection for one transaction: ``with pool.connection() as conn``."""
+        conn = self._acquire()
+        try:
+            yield conn
+        except BaseException:
+            self._release(conn, commit=False)
+            raise
+        else:
+            self._release(conn, commit=True)
+    
+    def _acquire(self) -> Any:
+        """Take an idle connection, open one if below max_size, or wait for a release."""
+        started = time.monotonic()
+        deadline = started + self.acquire_timeout
+        waited = False
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("PostgreSQL connection pool is closed")
+                if self._idle:
+                    conn = self._idle.pop()
+                    if conn.closed:
+                        # Dropped by the server while idle
+                        self._size -= 1
+                        self._stats['discarded'] += 1
+                        continue
+                    self._stats['reused'] += 1
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn = None
+                    break
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise TimeoutError(
+                        f"No PostgreSQL connection free within {self.acquire_timeout}s "
+                        f"(pool max_size={self.max_size})"
+                    )
+                if not waited:
+                    self._stats['waits'] += 1
+                    waited = True
+                self._condition.wait(remaining)
+            
+            if waited:
+                self._wait_seconds += time.monotonic() - started
+            self._stats['checkouts'] += 1
+            self._in_use += 1
+        
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._condition:
+                    self._size -= 1
+                    self._in_use -= 1
+                    self._condition.notify()
+                raise
+        return conn
+    
+    def _release(self, conn: Any, commit: bool) -> None:
+        """End the checkout's transaction and return the connection, or drop it if broken."""
+        try:
+            if commit:
+                conn.commit()
+            else:
+                conn.rollback()
+                with self._condition:
+                    self._stats['rollbacks'] += 1
+        except Exception:
+            self._discard(conn)
+            # A failed rollback leaves the block's own exception to propagate
+            if commit:
+                raise
+            return
+        
+        if conn.closed:
+            self._discard(conn)
+            return
+        with self._condition:
+            self._in_use -= 1
+            if self._closed:
+                self._size -= 1
+                conn.close()
+            else:
+                self._idle.append(conn)
+            self._condition.notify()
+    
+    def _discard(self, conn: Any) -> None:
+        """Close a checked-out connection without returning it to the pool."""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._size -= 1
+            self._in_use -= 1
+            self._stats['discarded'] += 1
+            self._condition.notify()
+    
+    def close(self) -> None:
+        """Close idle connections now and checked-out ones when they are returned."""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for conn in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+    
+    @property
+    def closed(self) -> bool:
+        """Whether close() has been called."""
+        return self._closed
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool counters plus current size, idle and in-use connections."""
+        with self._condition:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats.update({
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'wait_seconds': round(self._wait_seconds, 6)
+            })
+        return stats
+
+
+_pools: Dict[str, PostgreSQLConnectionPool] = {}
+_pool_users: Dict[str, int] = {}
+_pools_lock = threading.Lock()
+
+
+def make_pool_key(connection_params: Dict[str, Any]) -> str:
+    """Build the registry key for a set of connection parameters (password included, hashed)."""
+    canonical = json.dumps(connection_params, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def acquire_pg_pool(connection_params: Dict[str, Any]) -> PostgreSQLConnectionPool:
+    """Get the shared pool for these parameters, registering one more user of it."""
+    key = make_pool_key(connection_params)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.closed:
+            config = get_config()
+            pool = PostgreSQLConnectionPool(
+                connection_params,
+                min_size=config.postgres_pool_min,
+                max_size=config.postgres_pool_max,
+                statement_timeout_ms=config.postgres_statement_timeout_ms,
+                acquire_timeout=config.postgres_pool_timeout
+            )
+            _pools[key] = pool
+            _pool_users[key] = 0
+        _pool_users[key] += 1
+    return pool
+
+
+def release_pg_pool(pool: PostgreSQLConnectionPool) -> None:
+    """Drop one user of a shared pool, closing it when the last one is gone."""
+    key = make_pool_key(pool.connection_params)
+    with _pools_lock:
+        if _pools.get(key) is not pool:
+            return
+        _pool_users[key] -= 1
+        if _pool_users[key] > 0:
+            return
+        del _pools[key]
+        del _pool_users[key]
+    pool.close()
+
+
+def close_pg_pools() -> None:
+    """Close every shared pool (at shutdown)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+        _pool_users.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,120 @@
+"""Normalization of device resource figures into typed numeric columns."""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+GIB = 1024 ** 3
+
+# Numeric columns filled at ingest so analytics can filter and aggregate in SQL
+RESOURCE_COLUMNS = ('memory_total_bytes', 'disk_total_bytes', 'disk_use_ratio')
+
+# Columns and operators accepted by resource filters
+FILTERABLE_COLUMNS = ('cpu_cores',) + RESOURCE_COLUMNS
+FILTER_OPERATORS = ('<', '<=', '>', '>=', '=')
+
+# A single resource condition, e.g. ('disk_use_ratio', '>', 0.8)
+ResourceCondition = Tuple[str, str, float]
+
+# Analytics thresholds (memory in bytes, disk usage as a 0-1 ratio)
+HIGH_DISK_RATIO = 0.8
+LOW_RESOURCE_CORES = 2
+LOW_RESOURCE_MEMORY = 2 * GIB
+LOAD_BALANCER_MIN_CORES = 4
+LOAD_BALANCER_MIN_MEMORY = 4 * GIB
+DATABASE_MAX_DISK_RATIO = 0.5
+DATABASE_MIN_MEMORY = 8 * GIB
+UPGRADE_MAX_CORES = 2
+UPGRADE_MAX_MEMORY = 4 * GIB
+
+# free -h / df -h style sizes: "16G", "15Gi", "1.5T", "512 MiB", "8GB"
+_SIZE_PATTERN = re.compile(r'^\s*([0-9]*\.?[0-9]+)\s*([KMGTPE]?)(i?B?|B)?\s*$', re.IGNORECASE)
+_UNIT_EXPONENTS = {'': 0, 'K': 1, 'M': 2, 'G': 3, 'T': 4, 'P': 5, 'E': 6}
+
+
+def parse_size_bytes(value: Any) -> Optional[int]:
+    """Convert a size to bytes; bare numbers are bytes, unit suffixes are binary multiples."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    
+    match = _SIZE_PATTERN.match(str(value))
+    if not match:
+        return None
+    number, unit, _ = match.groups()
+    return int(float(number) * 1024 ** _UNIT_EXPONENTS[unit.upper()])
+
+
+def parse_ratio(value: Any) -> Optional[float]:
+    """Convert a usage figure like "45%" or 45 to a 0-1 ratio."""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        number = float(str(value).strip().rstrip('%'))
+    except ValueError:
+        return None
+    # Bare numbers above 1 are percentages
+    if (isinstance(value, str) and value.strip().endswith('%')) or number > 1:
+        number /= 100
+    return number
+
+
+def parse_cores(value: Any) -> Optional[int]:
+    """Convert a core count to an int."""
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def resource_columns(device: Dict[str, Any]) -> Dict[str, Any]:
+    """Compute the typed resource columns for a flat device record."""
+    disk_total = parse_size_bytes(device.get('disk_size'))
+    disk_use_ratio = parse_ratio(device.get('disk_use_percent'))
+    if disk_use_ratio is None and disk_total:
+        # Fall back to used / size when no percentage was reported
+        disk_used = parse_size_bytes(device.get('disk_used'))
+        if disk_used is not None:
+            disk_use_ratio = disk_used / disk_total
+    
+    return {
+        'cpu_cores': parse_cores(device.get('cpu_cores')),
+        'memory_total_bytes': parse_size_bytes(device.get('memory_total')),
+        'disk_total_bytes': disk_total,
+        'disk_use_ratio': disk_use_ratio
+    }
+
+
+def format_size(size_bytes: Optional[int]) -> str:
+    """Render a byte count the way free -h does (e.g. "15.6Gi")."""
+    if size_bytes is None:
+        return 'Unknown'
+    if size_bytes < 1024:
+        return f"{size_bytes}B"
+    size = float(size_bytes)
+    for unit in ('Ki', 'Mi', 'Gi', 'Ti'):
+        size /= 1024
+        if size < 1024 or unit == 'Ti':
+            break
+    return f"{size:.1f}{unit}"
+
+
+def compile_resource_conditions(
+    conditions: List[ResourceCondition],
+    placeholder: str
+) -> Tuple[str, List[float]]:
+    """Compile resource conditions into an AND-ed SQL fragment and its parameters.
+    
+    Column names and operators come from fixed whitelists; values are always bound.
+    Rows with a NULL column never match a condition on it.
+    """
+    clauses = []
+    params = []
+    for column, operator, value in conditions:
+        if column not in FILTERABLE_COLUMNS:
+            raise ValueError(f"Unsupported resource column: {column}")
+        if operator not in FILTER_OPERATORS:
+            raise ValueError(f"Unsupported resource operator: {operator}")
+        clauses.append(f"{column} {operator} {placeholder}")
+        params.append(value)
+    return ' AND '.join(clauses) or '1 = 1', params
@@ -6,18 +6,47 @@ MCP (Model Context Protocol) server for homelab system management.
 import asyncio
 import json
 import sys
-from typing import Any, Dict, Optional
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Set
 
+from .config import get_config
 from .tools import get_available_tools, execute_tool
 from .ssh_tools import ensure_mcp_ssh_key
+from .pg_pool import close_pg_pools
+from .ssh_pool import get_ssh_pool
 
 
 class HomelabMCPServer:
     """MCP Server for homelab system discovery and monitoring."""
     
-    def __init__(self):
+    def __init__(
+        self,
+        max_concurrent_requests: Optional[int] = None,
+        tool_concurrency_limits: Optional[Dict[str, int]] = None
+    ):
         self.tools = get_available_tools()
         self.ssh_key_initialized = False
+        
+        if max_concurrent_requests is None or tool_concurrency_limits is None:
+            config = get_config()
+            if max_concurrent_requests is None:
+                max_concurrent_requests = config.max_concurrent_requests
+            if tool_concurrency_limits is None:
+                tool_concurrency_limits = config.tool_concurrency_limits
+        
+        # Concurrency caps for tool calls: one global, plus optional per-tool limits
+        self.max_concurrent_requests = max_concurrent_requests
+        self._request_slots = asyncio.Semaphore(max_concurrent_requests)
+        self._tool_slots = {
+            name: asyncio.Semaphore(limit)
+            for name, limit in tool_concurrency_limits.items()
+        }
+        
+        # In-flight request tasks (also indexed by request id for cancellation)
+        # and the lock serializing stdout writes
+        self._in_flight: Set[asyncio.Task] = set()
+        self._in_flight_by_id: Dict[Any, asyncio.Task] = {}
+        self._write_lock = asyncio.Lock()
     
     async def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """Handle incoming MCP requests."""
@@ -59,7 +88,8 @@ class HomelabMCPServer:
                 if tool_name not in self.tools:
                     return self._error_response(request_id, f"Unknown tool: {tool_name}")
                 
-                result = await execute_tool(tool_name, tool_args)
+                async with self._tool_slot(tool_name):
+                    result = await execute_tool(tool_name, tool_args)
                 return self._success_response(request_id, result)
             
             else:
@@ -68,6 +98,18 @@ class HomelabMCPServer:
         except Exception as e:
             return self._error_response(request_id, str(e))
     
+    @asynccontextmanager
+    async def _tool_slot(self, tool_name: str) -> AsyncIterator[None]:
+        """Hold a per-tool slot (if limited) and a global slot while a tool runs."""
+        tool_slot = self._tool_slots.get(tool_name)
+        if tool_slot is None:
+            async with self._request_slots:
+                yield
+        else:
+            async with tool_slot:
+                async with self._request_slots:
+                    yield
+    
     def _success_response(self, request_id: Any, result: Any) -> Dict[str, Any]:
         """Create a successful JSON-RPC response."""
         return {
@@ -87,15 +129,46 @@ class HomelabMCPServer:
             }
         }
     
-    async def run_stdio(self):
-        """Run the MCP server using stdio (stdin/stdout)."""
-        reader = asyncio.StreamReader()
-        protocol = asyncio.StreamReaderProtocol(reader)
-        await asyncio.get_event_loop().connect_read_pipe(lambda: protocol, sys.stdin)
+    async def _write_message(self, message: Dict[str, Any]) -> None:
+        """Write one JSON-RPC message to stdout as a single, untorn line."""
+        async with self._write_lock:
+            sys.stdout.write(json.dumps(message) + "\n")
+            sys.stdout.flush()
+    
+    async def _respond(self, request: Dict[str, Any]) -> None:
+        """Handle a request and write its response as soon as it is ready."""
+        # A cancelled request propagates CancelledError and gets no response
+        response = await self.handle_request(request)
+        await self._write_message(response)
+    
+    def _dispatch(self, request: Dict[str, Any]) -> asyncio.Task:
+        """Run a request as an independent task so slow tools don't block others."""
+        request_id = request.get("id")
+        task = asyncio.create_task(self._respond(request))
+        self._in_flight.add(task)
+        self._in_flight_by_id[request_id] = task
         
+        def _forget(done: asyncio.Task) -> None:
+            self._in_flight.discard(done)
+            if self._in_flight_by_id.get(request_id) is done:
+                del self._in_flight_by_id[request_id]
+        
+        task.add_done_callback(_forget)
+        return task
+    
+    def cancel_request(self, request_id: Any) -> bool:
+        """Cancel an in-flight request; the cancellation reaches any remote SSH process."""
+        task = self._in_flight_by_id.get(request_id)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+    
+    async def process_stream(self, reader: asyncio.StreamReader) -> None:
+        """Read JSON-RPC messages from a stream and dispatch them concurrently."""
         while True:
             try:
-                # Read line from stdin
+                # Read line from the stream
                 line_bytes = await reader.readline()
                 if not line_bytes:
                     break
@@ -114,30 +187,42 @@ class HomelabMCPServer:
                     if method == "notifications/initialized":
                         # Client is ready, we can proceed
                         pass
+                    elif method == "notifications/cancelled":
+                        # Client gave up on a request: stop its tool task
+                        self.cancel_request(request.get("params", {}).get("requestId"))
                     # Don't send any response for notifications
                     continue
                 
-                # Handle request
-                response = await self.handle_request(request)
-                
-                # Send response to stdout
-                print(json.dumps(response))
-                sys.stdout.flush()
+                # Handle request in the background; responses are matched by id
+                self._dispatch(request)
                 
             except json.JSONDecodeError as e:
                 error_response = self._error_response(None, f"Invalid JSON: {str(e)}", -32700)
-                print(json.dumps(error_response))
-                sys.stdout.flush()
+                await self._write_message(error_response)
             except Exception as e:
                 error_response = self._error_response(None, f"Server error: {str(e)}")
-                print(json.dumps(error_response))
-                sys.stdout.flush()
-
+                await self._write_message(error_response)
+        
+        # Input closed: let in-flight requests finish and deliver their responses
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+    
+    async def run_stdio(self):
+        """Run the MCP server using stdio (stdin/stdout)."""
+        reader = asyncio.StreamReader()
+        protocol = asyncio.StreamReaderProtocol(reader)
+        await asyncio.get_event_loop().connect_read_pipe(lambda: protocol, sys.stdin)
+        
+        await self.process_stream(reader)
 
 async def main():
     """Main entry point."""
     server = HomelabMCPServer()
-    await server.run_stdio()
+    try:
+        await server.run_stdio()
+    finally:
+        await get_ssh_pool().close_all()
+        close_pg_pools()
 
 
 if __name__ == "__main__":
@@ -1,11 +1,66 @@
 """Network site mapping and device tracking functionality."""
 
+import asyncio
+import base64
+import binascii
+import copy
 import json
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, Iterator, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 
-from .database import get_database_adapter, calculate_data_hash, DatabaseAdapter
+from .config import get_config
+from .database import (
+    get_database_adapter, get_async_database_adapter,
+    AsyncDatabaseAdapter, DatabaseAdapter
+)
+from .device_search import SearchTerm, parse_search
+from .history_codec import HistoryCodec
+from .history_search import parse_history_query
+from . import resources
+from .resources import format_size
+from .snapshots import VolatileFields, hash_snapshot
+
+# Resource conditions behind the topology and deployment analytics
+HIGH_DISK_USAGE = [('disk_use_ratio', '>', resources.HIGH_DISK_RATIO)]
+LOW_RESOURCES = [
+    ('cpu_cores', '<=', resources.LOW_RESOURCE_CORES),
+    ('memory_total_bytes', '<=', resources.LOW_RESOURCE_MEMORY)
+]
+LOAD_BALANCER_CANDIDATES = [
+    ('cpu_cores', '>=', resources.LOAD_BALANCER_MIN_CORES),
+    ('memory_total_bytes', '>=', resources.LOAD_BALANCER_MIN_MEMORY)
+]
+DATABASE_CANDIDATES = [
+    ('disk_use_ratio', '<', resources.DATABASE_MAX_DISK_RATIO),
+    ('memory_total_bytes', '>=', resources.DATABASE_MIN_MEMORY)
+]
+UPGRADE_CANDIDATES = [
+    ('cpu_cores', '<=', resources.UPGRADE_MAX_CORES),
+    ('memory_total_bytes', '<=', resources.UPGRADE_MAX_MEMORY)
+]
+
+# Device page sizes for get_network_sitemap
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(hostname: str, device_id: int) -> str:
+    """Encode a (hostname, id) keyset position as an opaque page cursor."""
+    return base64.urlsafe_b64encode(json.dumps([hostname, device_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Decode a page cursor back into its (hostname, id) keyset position."""
+    try:
+        hostname, device_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if not isinstance(hostname, str) or not isinstance(device_id, int):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return hostname, device_id
 
 
 @dataclass
@@ -33,22 +88,94 @@ class NetworkDevice:
     error_message: Optional[str] = None
 
 
+class DeviceCache:
+    """LRU of device lookups keyed by id, IP or hostname, valid for one devices data version."""
+    
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._entries: 'OrderedDict[Tuple[str, Any], Optional[Dict[str, Any]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by clear() so lookups that started before a write don't cache stale rows
+        self.generation = 0
+        # Devices data version the entries were read at
+        self.data_version: Optional[int] = None
+    
+    def get(self, key: Tuple[str, Any]) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """Return (hit, device); misses for unknown devices are cached too."""
+        with self._lock:
+            if key not in self._entries:
+                return False, None
+            self._entries.move_to_end(key)
+            return True, copy.deepcopy(self._entries[key])
+    
+    def put(self, key: Tuple[str, Any], device: Optional[Dict[str, Any]], generation: int) -> None:
+        """Cache a lookup result unless a write happened since it was read."""
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = copy.deepcopy(device)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Drop every cached lookup."""
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+    
+    def sync(self, data_version: int) -> None:
+        """Drop every cached lookup if the devices table has been written since they were read."""
+        with self._lock:
+            if data_version == self.data_version:
+                return
+            self._entries.clear()
+            self.generation += 1
+            self.data_version = data_version
+
+
 class NetworkSiteMap:
     """Manages the network site map database."""
     
-    def __init__(self, db_path: Optional[str] = None, db_type: Optional[str] = None, **db_kwargs):
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        db_type: Optional[str] = None,
+        volatile_fields: Optional[VolatileFields] = None,
+        device_cache_size: Optional[int] = None,
+        **db_kwargs
+    ):
         """Initialize the site map with database connection."""
         self.db_adapter = get_database_adapter(
             db_type=db_type,
             db_path=db_path,
             **db_kwargs
         )
+        if volatile_fields is None:
+            volatile_fields = get_config().history_volatile_fields
+        self.volatile_fields = volatile_fields
+        if device_cache_size is None:
+            device_cache_size = get_config().device_cache_size
+        # Checked against the database's data versions on every lookup, so writes made
+        # through other instances or processes invalidate it; size 0 turns it off
+        self.device_cache = DeviceCache(device_cache_size) if device_cache_size > 0 else None
+        # Memoized analytics, valid only for the write version they were computed at
+        self._analysis_cache: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        self._analysis_lock = threading.Lock()
+        self._async_db: Optional[AsyncDatabaseAdapter] = None
         self._init_database()
     
     def _init_database(self) -> None:
         """Initialize the database schema."""
         self.db_adapter.init_schema()
     
+    @property
+    def async_db(self) -> AsyncDatabaseAdapter:
+        """Async view of the database whose calls run on DB worker threads."""
+        if self._async_db is None:
+            self._async_db = get_async_database_adapter(self.db_adapter)
+        return self._async_db
+    
     def parse_discovery_output(self, discovery_json: str) -> NetworkDevice:
         """Parse SSH discovery output into a NetworkDevice object."""
         try:
@@ -68,8 +195,9 @@ class NetworkSiteMap:
                 if 'cpu' in discovery_data:
                     cpu_info = discovery_data['cpu']
                     device.cpu_model = cpu_info.get('model')
+                    # ssh_discover_system reports nproc as 'count'
                     try:
-                        device.cpu_cores = int(cpu_info.get('cores', 0))
+                        device.cpu_cores = int(cpu_info.get('cores', cpu_info.get('count', 0)))
                     except (ValueError, TypeError):
                         device.cpu_cores = None
                 
@@ -85,10 +213,15 @@ class NetworkSiteMap:
                 if 'disk' in discovery_data:
                     disk_info = discovery_data['disk']
                     device.disk_filesystem = disk_info.get('filesystem')
-                    device.disk_size = disk_info.get('size')
+                    # ssh_discover_system reports df -B1 byte counts with 'total' and no percentage
+                    device.disk_size = disk_info.get('size', disk_info.get('total'))
                     device.disk_used = disk_info.get('used')
                     device.disk_available = disk_info.get('available')
                     device.disk_use_percent = disk_info.get('use_percent')
+                    if device.disk_use_percent is None:
+                        ratio = resources.resource_columns(asdict(device))['disk_use_ratio']
+                        if ratio is not None:
+                            device.disk_use_percent = f"{round(ratio * 100)}%"
                     device.disk_mount = disk_info.get('mount')
                 
                 # Network interfaces (store as JSON)
@@ -114,165 +247,395 @@ class NetworkSiteMap:
                 error_message=f'JSON parse error: {str(e)}'
             )
     
+    @staticmethod
+    def _write_version(versions: Dict[str, int]) -> int:
+        """Combine the data version scopes into one counter that moves on any write."""
+        return sum(versions.values())
+    
+    @property
+    def write_version(self) -> int:
+        """Current write version of the database, counting writes from every process."""
+        return self._write_version(self.db_adapter.get_data_versions())
+    
+    def _cached_analysis(self, name: str, version: int) -> Optional[Dict[str, Any]]:
+        """Get the memoized result computed at this write version, if any."""
+        with self._analysis_lock:
+            entry = self._analysis_cache.get(name)
+            if entry and entry[0] == version:
+                return entry[1]
+            return None
+    
+    def _store_analysis(self, name: str, version: int, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Stamp a fresh result and memoize it for the version it was computed at."""
+        result['computed_at'] = datetime.now().isoformat()
+        result['write_version'] = version
+        with self._analysis_lock:
+            self._analysis_cache[name] = (version, result)
+        return result
+    
+    def _memoized(self, name: str, compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Return the memoized result for the current write version, computing it on a miss."""
+        version = self._write_version(self.db_adapter.get_data_versions())
+        result = self._cached_analysis(name, version)
+        if result is not None:
+            return result
+        return self._store_analysis(name, version, compute())
+    
+    async def _memoized_async(
+        self,
+        name: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Async counterpart of _memoized."""
+        version = self._write_version(await self.async_db.get_data_versions())
+        result = self._cached_analysis(name, version)
+        if result is not None:
+            return result
+        return self._store_analysis(name, version, await compute())
+    
     def store_device(self, device: NetworkDevice) -> int:
         """Store or update a device in the database."""
         device_data = asdict(device)
         return self.db_adapter.store_device(device_data)
     
+    def store_devices_bulk(self, devices: List[NetworkDevice]) -> List[int]:
+        """Upsert many devices in one transaction; returns ids in input order."""
+        return self.db_adapter.store_devices_bulk([asdict(device) for device in devices])
+    
+    def update_device_status(self, device_id: int, status: str) -> bool:
+        """Set a device's status (e.g. "decommissioned"); returns False if it doesn't exist."""
+        return self.db_adapter.update_device_status(device_id, status)
+    
+    def _lookup_device(self, key: Tuple[str, Any]) -> Optional[Dict[str, Any]]:
+        """Resolve a (lookup method, value) key through the device cache."""
+        if self.device_cache is None:
+            return getattr(self.db_adapter, key[0])(key[1])
+        
+        self.device_cache.sync(self.db_adapter.get_data_versions()['devices'])
+        hit, device = self.device_cache.get(key)
+        if hit:
+            return device
+        generation = self.device_cache.generation
+        device = getattr(self.db_adapter, key[0])(key[1])
+        self.device_cache.put(key, device, generation)
+        return device
+    
+    async def _lookup_device_async(self, key: Tuple[str, Any]) -> Optional[Dict[str, Any]]:
+        """Resolve a (lookup method, value) key through the device cache off the event loop."""
+        if self.device_cache is None:
+            return await self.async_db.run(key[0], key[1])
+        
+        self.device_cache.sync((await self.async_db.get_data_versions())['devices'])
+        hit, device = self.device_cache.get(key)
+        if hit:
+            return device
+        generation = self.device_cache.generation
+        device = await self.async_db.run(key[0], key[1])
+        self.device_cache.put(key, device, generation)
+        return device
+    
+    def get_device(self, device_id: int) -> Optional[Dict[str, Any]]:
+        """Get one device by id."""
+        return self._lookup_device(('get_device', device_id))
+    
+    def get_device_by_ip(self, connection_ip: str) -> Optional[Dict[str, Any]]:
+        """Get the most recently seen device with this connection IP."""
+        return self._lookup_device(('get_device_by_ip', connection_ip))
+    
+    def get_device_by_hostname(self, hostname: str) -> Optional[Dict[str, Any]]:
+        """Get the most recently seen device with this hostname."""
+        return self._lookup_device(('get_device_by_hostname', hostname))
+    
     def store_discovery_history(self, device_id: int, discovery_data: str) -> None:
         """Store discovery data in history for change tracking."""
-        data_hash = calculate_data_hash(discovery_data)
+        data_hash, metrics = hash_snapshot(discovery_data, self.volatile_fields)
+        # Unchanged snapshots are dropped by the history index; metrics are always kept
         self.db_adapter.store_discovery_history(device_id, discovery_data, data_hash)
+        if metrics:
+            self.db_adapter.store_device_metrics(device_id, metrics)
     
     def get_all_devices(self) -> List[Dict[str, Any]]:
         """Get all devices from the database."""
         return self.db_adapter.get_all_devices()
     
+    def _page_request(
+        self,
+        limit: int,
+        cursor: Optional[str],
+        search: Optional[str]
+    ) -> Tuple[int, Optional[Tuple[str, int]], Optional[List[SearchTerm]]]:
+        """Clamp the page size, decode the cursor and parse the search query."""
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        after = decode_cursor(cursor) if cursor else None
+        return limit, after, parse_search(search) if search else None
+    
+    def _page_result(self, rows: List[Dict[str, Any]], limit: int, total: int) -> Dict[str, Any]:
+        """Trim the look-ahead row and turn it into the next cursor."""
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor(last['hostname'], last['id'])
+        return {'total_devices': total, 'devices': rows[:limit], 'next_cursor': next_cursor}
+    
+    def get_devices_page(
+        self,
+        fields: Optional[List[str]] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        search: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Get one page of devices with only the requested fields, plus the next cursor.
+        
+        ``search`` takes the device_search grammar, e.g. ``os:ubuntu cores>=8 seen<1d``.
+        """
+        limit, after, terms = self._page_request(limit, cursor, search)
+        # Fetch one extra row to learn whether another page follows
+        rows = self.db_adapter.get_devices_page(fields, limit + 1, after, filters, terms)
+        return self._page_result(rows, limit, self.db_adapter.count_devices(filters, terms))
+    
+    def iter_devices(self, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Stream all devices without loading the whole fleet into memory."""
+        return self.db_adapter.iter_devices(batch_size)
+    
+    def find_hardware(self, kind: str, criteria: Dict[str, Any], limit: int = 100) -> List[Dict[str, Any]]:
+        """Find devices with matching USB, PCI or block hardware."""
+        return self.db_adapter.find_hardware(kind, criteria, limit)
+    
+    def search_history(
+        self,
+        query: str,
+        device_id: Optional[int] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Find stored snapshots containing every term of a full-text query."""
+        return self.db_adapter.search_history(parse_history_query(query), device_id, limit)
+    
     def get_device_changes(self, device_id: int, limit: int = 10) -> List[Dict[str, Any]]:
         """Get change history for a specific device."""
         return self.db_adapter.get_device_changes(device_id, limit)
     
+    def get_device_metrics(self, device_id: int, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get recent volatile metric samples (uptime, usage) for a device."""
+        return self.db_adapter.get_device_metrics(device_id, limit)
+    
+    async def store_device_async(self, device: NetworkDevice) -> int:
+        """Store or update a device without blocking the event loop."""
+        return await self.async_db.store_device(asdict(device))
+    
+    async def store_devices_bulk_async(self, devices: List[NetworkDevice]) -> List[int]:
+        """Upsert many devices in one transaction without blocking the event loop."""
+        return await self.async_db.store_devices_bulk([asdict(device) for device in devices])
+    
+    async def update_device_status_async(self, device_id: int, status: str) -> bool:
+        """Set a device's status without blocking the event loop."""
+        return await self.async_db.update_device_status(device_id, status)
+    
+    async def get_device_async(self, device_id: int) -> Optional[Dict[str, Any]]:
+        """Get one device by id without blocking the event loop."""
+        return await self._lookup_device_async(('get_device', device_id))
+    
+    async def get_device_by_ip_async(self, connection_ip: str) -> Optional[Dict[str, Any]]:
+        """Get a device by connection IP without blocking the event loop."""
+        return await self._lookup_device_async(('get_device_by_ip', connection_ip))
+    
+    async def get_device_by_hostname_async(self, hostname: str) -> Optional[Dict[str, Any]]:
+        """Get a device by hostname without blocking the event loop."""
+        return await self._lookup_device_async(('get_device_by_hostname', hostname))
+    
+    async def store_discovery_history_async(self, device_id: int, discovery_data: str) -> None:
+        """Store discovery history without blocking the event loop."""
+        data_hash, metrics = hash_snapshot(discovery_data, self.volatile_fields)
+        await self.async_db.store_discovery_history(device_id, discovery_data, data_hash)
+        if metrics:
+            await self.async_db.store_device_metrics(device_id, metrics)
+    
+    async def get_all_devices_async(self) -> List[Dict[str, Any]]:
+        """Get all devices without blocking the event loop."""
+        return await self.async_db.get_all_devices()
+    
+    async def iter_devices_async(self, batch_size: int = 500) -> AsyncIterator[Dict[str, Any]]:
+        """Stream all devices in batches without blocking the event loop."""
+        async for device in self.async_db.iter_devices(batch_size):
+            yield device
+    
+    async def get_devices_page_async(
+        self,
+        fields: Optional[List[str]] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        search: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Get one page of devices without blocking the event loop."""
+        limit, after, terms = self._page_request(limit, cursor, search)
+        rows = await self.async_db.get_devices_page(fields, limit + 1, after, filters, terms)
+        return self._page_result(rows, limit, await self.async_db.count_devices(filters, terms))
+    
+    async def find_hardware_async(
+        self,
+        kind: str,
+        criteria: Dict[str, Any],
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Find devices with matching hardware without blocking the event loop."""
+        return await self.async_db.find_hardware(kind, criteria, limit)
+    
+    async def search_history_async(
+        self,
+        query: str,
+        device_id: Optional[int] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Full-text search stored snapshots without blocking the event loop."""
+        return await self.async_db.search_history(parse_history_query(query), device_id, limit)
+    
+    async def get_device_changes_async(self, device_id: int, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get change history for a device without blocking the event loop."""
+        return await self.async_db.get_device_changes(device_id, limit)
+    
+    async def reencode_history_async(
+        self,
+        device_id: Optional[int] = None,
+        compression: Optional[str] = None,
+        keyframe_interval: Optional[int] = None
+    ) -> Dict[str, int]:
+        """Re-encode stored history as keyframes plus deltas without blocking the event loop."""
+        config = get_config().database
+        codec = HistoryCodec(
+            compression=compression or config.history_compression,
+            keyframe_interval=keyframe_interval or config.history_keyframe_interval
+        )
+        return await self.async_db.reencode_history(device_id, codec)
+    
+    async def analyze_network_topology_async(self) -> Dict[str, Any]:
+        """Analyze the network topology without blocking the event loop (memoized per write version)."""
+        return await self._memoized_async('topology', self._compute_topology_async)
+    
+    async def _compute_topology_async(self) -> Dict[str, Any]:
+        """Run the topology queries on DB worker threads."""
+        return self._format_topology(
+            await self.async_db.get_topology_summary(),
+            await self.async_db.find_devices_by_resources(HIGH_DISK_USAGE),
+            await self.async_db.find_devices_by_resources(LOW_RESOURCES)
+        )
+    
+    async def suggest_deployments_async(self) -> Dict[str, Any]:
+        """Suggest deployment locations without blocking the event loop (memoized per write version)."""
+        return await self._memoized_async('suggestions', self._compute_suggestions_async)
+    
+    async def _compute_suggestions_async(self) -> Dict[str, Any]:
+        """Run the deployment queries on DB worker threads."""
+        return self._format_suggestions(
+            await self.async_db.find_devices_by_resources(LOAD_BALANCER_CANDIDATES),
+            await self.async_db.find_devices_by_resources(DATABASE_CANDIDATES),
+            await self.async_db.find_devices_by_resources([]),
+            await self.async_db.find_devices_by_resources(UPGRADE_CANDIDATES)
+        )
+    
     def analyze_network_topology(self) -> Dict[str, Any]:
-        """Analyze the network topology and provide insights."""
-        devices = self.get_all_devices()
-        
-        analysis = {
-            'total_devices': len(devices),
-            'online_devices': len([d for d in devices if d['status'] == 'success']),
-            'offline_devices': len([d for d in devices if d['status'] == 'error']),
-            'operating_systems': {},
-            'cpu_architectures': {},
-            'network_segments': {},
+        """Analyze the network topology and provide insights (memoized per write version)."""
+        return self._memoized('topology', self._compute_topology)
+    
+    def _compute_topology(self) -> Dict[str, Any]:
+        """Run the topology queries."""
+        return self._format_topology(
+            self.db_adapter.get_topology_summary(),
+            self.db_adapter.find_devices_by_resources(HIGH_DISK_USAGE),
+            self.db_adapter.find_devices_by_resources(LOW_RESOURCES)
+        )
+    
+    def _format_topology(
+        self,
+        summary: Dict[str, Dict[str, int]],
+        high_disk: List[Dict[str, Any]],
+        low_resources: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Build the topology analysis from SQL aggregates and resource matches."""
+        return {
+            'total_devices': sum(summary['status'].values()),
+            'online_devices': summary['status'].get('success', 0),
+            'offline_devices': summary['status'].get('error', 0),
+            'operating_systems': summary['os'],
+            'cpu_architectures': summary['cpu'],
+            'network_segments': summary['segment'],
             'resource_utilization': {
+                'disk_usage_histogram': summary['disk_usage'],
                 'high_memory_usage': [],
-                'high_disk_usage': [],
-                'low_resources': []
+                'high_disk_usage': [
+                    {'hostname': d['hostname'], 'usage': f"{round(d['disk_use_ratio'] * 100)}%"}
+                    for d in high_disk
+                ],
+                'low_resources': [
+                    {
+                        'hostname': d['hostname'],
+                        'cpu_cores': d['cpu_cores'],
+                        'memory': format_size(d['memory_total_bytes'])
+                    }
+                    for d in low_resources
+                ]
             }
         }
-        
-        for device in devices:
-            if device['status'] != 'success':
-                continue
-            
-            # OS distribution
-            os_info = device.get('os_info', 'Unknown')
-            analysis['operating_systems'][os_info] = analysis['operating_systems'].get(os_info, 0) + 1
-            
-            # CPU models
-            cpu_model = device.get('cpu_model', 'Unknown')
-            analysis['cpu_architectures'][cpu_model] = analysis['cpu_architectures'].get(cpu_model, 0) + 1
-            
-            # Network segments (by IP prefix)
-            connection_ip = device.get('connection_ip', '')
-            if '.' in connection_ip:
-                network_prefix = '.'.join(connection_ip.split('.')[:3]) + '.0/24'
-                analysis['network_segments'][network_prefix] = analysis['network_segments'].get(network_prefix, 0) + 1
-            
-            # Resource utilization analysis
-            if device.get('disk_use_percent'):
-                try:
-                    disk_usage = int(device['disk_use_percent'].rstrip('%'))
-                    if disk_usage > 80:
-                        analysis['resource_utilization']['high_disk_usage'].append({
-                            'hostname': device['hostname'],
-                            'usage': device['disk_use_percent']
-                        })
-                except (ValueError, AttributeError):
-                    pass
-            
-            # Identify resource-constrained devices
-            if device.get('cpu_cores') and device.get('cpu_cores') <= 2:
-                if device.get('memory_total'):
-                    memory_gb = self._parse_memory_gb(device['memory_total'])
-                    if memory_gb <= 2:
-                        analysis['resource_utilization']['low_resources'].append({
-                            'hostname': device['hostname'],
-                            'cpu_cores': device['cpu_cores'],
-                            'memory': device['memory_total']
-                        })
-        
-        return analysis
-    
-    def _parse_memory_gb(self, memory_str: str) -> float:
-        """Parse memory string and return value in GB."""
-        if not memory_str:
-            return 0.0
-        
-        memory_str = str(memory_str).strip()
-        if memory_str.endswith('Gi'):
-            try:
-                return float(memory_str.rstrip('Gi'))
-            except (ValueError, AttributeError):
-                return 0.0
-        elif memory_str.endswith('G'):
-            try:
-                return float(memory_str.rstrip('G'))
-            except (ValueError, AttributeError):
-                return 0.0
-        else:
-            return 0.0
     
     def suggest_deployments(self) -> Dict[str, Any]:
-        """Suggest optimal deployment locations based on current network state."""
-        devices = self.get_all_devices()
-        online_devices = [d for d in devices if d['status'] == 'success']
-        
-        suggestions = {
-            'load_balancer_candidates': [],
-            'database_candidates': [],
-            'monitoring_targets': [],
-            'upgrade_recommendations': []
+        """Suggest optimal deployment locations based on current network state (memoized per write version)."""
+        return self._memoized('suggestions', self._compute_suggestions)
+    
+    def _compute_suggestions(self) -> Dict[str, Any]:
+        """Run the deployment queries."""
+        return self._format_suggestions(
+            self.db_adapter.find_devices_by_resources(LOAD_BALANCER_CANDIDATES),
+            self.db_adapter.find_devices_by_resources(DATABASE_CANDIDATES),
+            self.db_adapter.find_devices_by_resources([]),
+            self.db_adapter.find_devices_by_resources(UPGRADE_CANDIDATES)
+        )
+    
+    def _format_suggestions(
+        self,
+        load_balancers: List[Dict[str, Any]],
+        databases: List[Dict[str, Any]],
+        online: List[Dict[str, Any]],
+        upgrades: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Build deployment suggestions from resource-matched device rows."""
+        return {
+            'load_balancer_candidates': [
+                {
+                    'hostname': d['hostname'],
+                    'reason': f"{d['cpu_cores']} cores, {format_size(d['memory_total_bytes'])} RAM"
+                }
+                for d in load_balancers
+            ],
+            'database_candidates': [
+                {
+                    'hostname': d['hostname'],
+                    'reason': (
+                        f"Low disk usage ({round(d['disk_use_ratio'] * 100)}%), "
+                        f"{format_size(d['memory_total_bytes'])} RAM"
+                    )
+                }
+                for d in databases
+            ],
+            # All online devices should be monitored
+            'monitoring_targets': [
+                {
+                    'hostname': d['hostname'],
+                    'connection_ip': d['connection_ip'],
+                    'os': d['os_info'] or 'Unknown'
+                }
+                for d in online
+            ],
+            'upgrade_recommendations': [
+                {
+                    'hostname': d['hostname'],
+                    'reason': (
+                        f"Limited resources: {d['cpu_cores']} cores, "
+                        f"{format_size(d['memory_total_bytes'])} RAM"
+                    )
+                }
+                for d in upgrades
+            ]
         }
-        
-        for device in online_devices:
-            hostname = device['hostname']
-            
-            # Load balancer candidates (high CPU, good memory)
-            cpu_cores = device.get('cpu_cores') or 0
-            if cpu_cores >= 4:
-                memory_gb = self._parse_memory_gb(device.get('memory_total'))
-                
-                if memory_gb >= 4:
-                    suggestions['load_balancer_candidates'].append({
-                        'hostname': hostname,
-                        'reason': f"{cpu_cores} cores, {device['memory_total']} RAM"
-                    })
-            
-            # Database candidates (good disk space, memory)
-            if device.get('disk_use_percent'):
-                try:
-                    disk_usage = int(device['disk_use_percent'].rstrip('%'))
-                    if disk_usage < 50:  # Plenty of disk space
-                        memory_gb = self._parse_memory_gb(device.get('memory_total'))
-                        
-                        if memory_gb >= 8:
-                            suggestions['database_candidates'].append({
-                                'hostname': hostname,
-                                'reason': f"Low disk usage ({device['disk_use_percent']}), {device['memory_total']} RAM"
-                            })
-                except (ValueError, AttributeError):
-                    pass
-            
-            # Monitoring targets (all online devices should be monitored)
-            suggestions['monitoring_targets'].append({
-                'hostname': hostname,
-                'connection_ip': device['connection_ip'],
-                'os': device.get('os_info', 'Unknown')
-            })
-            
-            # Upgrade recommendations
-            cpu_cores = device.get('cpu_cores') or 0
-            if cpu_cores <= 2:
-                memory_gb = self._parse_memory_gb(device.get('memory_total'))
-                
-                if memory_gb <= 4:
-                    suggestions['upgrade_recommendations'].append({
-                        'hostname': hostname,
-                        'reason': f"Limited resources: {cpu_cores} cores, {device.get('memory_total', 'Unknown')} RAM"
-                    })
-        
-        return suggestions
-
 
 async def discover_and_store(
     sitemap: NetworkSiteMap,
@@ -290,8 +653,8 @@ async def discover_and_store(
     
     # Parse and store the result
     device = sitemap.parse_discovery_output(discovery_result)
-    device_id = sitemap.store_device(device)
-    sitemap.store_discovery_history(device_id, discovery_result)
+    device_id = await sitemap.store_device_async(device)
+    await sitemap.store_discovery_history_async(device_id, discovery_result)
     
     return json.dumps({
         'status': 'success',
@@ -304,32 +667,100 @@ async def discover_and_store(
 
 async def bulk_discover_and_store(
     sitemap: NetworkSiteMap,
-    targets: List[Dict[str, Any]]
+    targets: List[Dict[str, Any]],
+    max_concurrency: Optional[int] = None,
+    per_host_timeout: Optional[float] = None
 ) -> str:
-    """Discover multiple devices and store them in the site map."""
-    results = []
+    """Discover multiple devices concurrently and store them in the site map."""
+    from .ssh_tools import ssh_discover_system
+    
+    if max_concurrency is None or per_host_timeout is None:
+        config = get_config()
+        if max_concurrency is None:
+            max_concurrency = config.discovery_batch_size
+        if per_host_timeout is None:
+            per_host_timeout = config.discovery_timeout
+    
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
     
-    for target in targets:
+    async def discover_target(target: Dict[str, Any]) -> Any:
+        """Run one bounded, time-limited discovery; returns raw output or an exception."""
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(
+                    ssh_discover_system(
+                        target['hostname'],
+                        target['username'],
+                        target.get('password'),
+                        target.get('key_path'),
+                        target.get('port', 22)
+                    ),
+                    timeout=per_host_timeout
+                )
+            except asyncio.TimeoutError:
+                return TimeoutError(f"Discovery timed out after {per_host_timeout}s")
+            except Exception as e:
+                return e
+    
+    # Fan out the SSH work; gather keeps results in target order
+    discoveries = await asyncio.gather(*(discover_target(target) for target in targets))
+    
+    # Then parse everything and write the devices in one upsert batch
+    results: List[Optional[Dict[str, Any]]] = [None] * len(targets)
+    parsed = []
+    for index, (target, discovery_result) in enumerate(zip(targets, discoveries)):
+        if isinstance(discovery_result, Exception):
+            results[index] = {
+                'status': 'error',
+                'hostname': target.get('hostname', 'unknown'),
+                'error': str(discovery_result)
+            }
+            continue
+        
         try:
-            result = await discover_and_store(
-                sitemap,
-                target['hostname'],
-                target['username'],
-                target.get('password'),
-                target.get('key_path'),
-                target.get('port', 22)
-            )
-            results.append(json.loads(result))
+            parsed.append((index, sitemap.parse_discovery_output(discovery_result), discovery_result))
         except Exception as e:
-            results.append({
+            results[index] = {
                 'status': 'error',
                 'hostname': target.get('hostname', 'unknown'),
                 'error': str(e)
-            })
+            }
+    
+    device_ids: List[int] = []
+    if parsed:
+        try:
+            device_ids = await sitemap.store_devices_bulk_async([device for _, device, _ in parsed])
+        except Exception as e:
+            for index, _, _ in parsed:
+                results[index] = {
+                    'status': 'error',
+                    'hostname': targets[index].get('hostname', 'unknown'),
+                    'error': str(e)
+                }
+            parsed = []
+    
+    for (index, device, discovery_result), device_id in zip(parsed, device_ids):
+        try:
+            await sitemap.store_discovery_history_async(device_id, discovery_result)
+            results[index] = {
+                'status': 'success',
+                'device_id': device_id,
+                'hostname': device.hostname,
+                'discovery_status': device.status,
+                'stored_at': datetime.now().isoformat()
+            }
+        except Exception as e:
+            results[index] = {
+                'status': 'error',
+                'hostname': targets[index].get('hostname', 'unknown'),
+                'error': str(e)
+            }
     
     return json.dumps({
         'status': 'success',
         'total_targets': len(targets),
+        'max_concurrency': max_concurrency,
+        'per_host_timeout': per_host_timeout,
         'results': results,
         'completed_at': datetime.now().isoformat()
-    }, indent=2)
\ No newline at end of file
+    }, indent=2)
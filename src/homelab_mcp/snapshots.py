@@ -0,0 +1,95 @@
+"""Canonical form, hashing and volatile-field handling for discovery snapshots."""
+
+import copy
+import hashlib
+import json
+from typing import Any, Dict, Optional, Tuple
+
+# Paths inside a snapshot's "data" object that change on every run.
+# A bare path is excluded from the hash; "path=N" buckets numbers to multiples of N.
+DEFAULT_VOLATILE_FIELDS = 'uptime,memory.used,disk.used,disk.available'
+
+# Volatile field path -> bucket size (None means excluded)
+VolatileFields = Dict[str, Optional[float]]
+
+
+def parse_volatile_fields(spec: str) -> VolatileFields:
+    """Parse a volatile field spec like ``"uptime,disk.used=1073741824"``."""
+    fields: VolatileFields = {}
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        path, _, bucket = item.partition('=')
+        try:
+            fields[path.strip()] = float(bucket) if bucket.strip() else None
+        except ValueError:
+            continue
+    return fields
+
+
+def split_snapshot(
+    snapshot: Dict[str, Any],
+    volatile_fields: Optional[VolatileFields] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Split a discovery snapshot into its stable part and its volatile metrics.
+    
+    The stable part has excluded fields removed and bucketed fields rounded
+    down; the metrics dict maps each volatile path found to its raw value.
+    """
+    if volatile_fields is None:
+        volatile_fields = parse_volatile_fields(DEFAULT_VOLATILE_FIELDS)
+    
+    stable = copy.deepcopy(snapshot)
+    metrics: Dict[str, Any] = {}
+    data = stable.get('data')
+    if not isinstance(data, dict):
+        return stable, metrics
+    
+    for path, bucket in volatile_fields.items():
+        *parents, leaf = path.split('.')
+        
+        # Walk to the object holding the leaf
+        node = data
+        for key in parents:
+            node = node.get(key) if isinstance(node, dict) else None
+        if not isinstance(node, dict) or leaf not in node:
+            continue
+        
+        value = node[leaf]
+        metrics[path] = value
+        if bucket and isinstance(value, (int, float)) and not isinstance(value, bool):
+            node[leaf] = int(value // bucket * bucket)
+        else:
+            del node[leaf]
+    
+    return stable, metrics
+
+
+def canonical_json(snapshot: Any) -> str:
+    """Serialize a snapshot with sorted keys and no insignificant whitespace."""
+    return json.dumps(snapshot, sort_keys=True, separators=(',', ':'))
+
+
+def hash_snapshot(
+    discovery_data: str,
+    volatile_fields: Optional[VolatileFields] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """Get the canonical hash of a raw snapshot's stable part plus its volatile metrics."""
+    try:
+        snapshot = json.loads(discovery_data)
+    except (json.JSONDecodeError, TypeError):
+        return hashlib.sha256(discovery_data.encode()).hexdigest(), {}
+    
+    metrics: Dict[str, Any] = {}
+    if isinstance(snapshot, dict):
+        snapshot, metrics = split_snapshot(snapshot, volatile_fields)
+    return hashlib.sha256(canonical_json(snapshot).encode()).hexdigest(), metrics
+
+
+def canonical_data_hash(
+    discovery_data: str,
+    volatile_fields: Optional[VolatileFields] = None
+) -> str:
+    """Hash the stable part of a discovery snapshot, ignoring key order and volatile fields."""
+    return hash_snapshot(discovery_data, volatile_fields)[0]
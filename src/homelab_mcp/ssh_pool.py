@@ -0,0 +1,220 @@
+"""Process-wide pool of reusable SSH connections."""
+
+import asyncio
+import hashlib
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import asyncssh
+
+from .config import get_config
+
+# Pool key: (host, port, username, client_keys, password digest)
+PoolKey = Tuple[str, int, str, Tuple[str, ...], str]
+
+# Transport failures after which a connection can't be trusted and must not be
+# reused; a command exiting non-zero (asyncssh.ProcessError) leaves it healthy
+CONNECTION_ERRORS = (
+    asyncssh.DisconnectError, OSError, asyncio.TimeoutError, asyncio.CancelledError
+)
+
+
+@dataclass
+class PooledConnection:
+    """An SSH connection plus the bookkeeping the pool needs for it."""
+    conn: Any
+    key: PoolKey
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class SSHConnectionPool:
+    """Reuses SSH connections keyed by (host, port, user, key).
+    
+    Idle connections are closed after ``idle_ttl`` seconds, each host is
+    limited to ``max_per_host`` simultaneously checked-out connections, and
+    connections idle for longer than ``health_check_after`` seconds are probed
+    before reuse and transparently replaced if they are dead. A nested checkout
+    for a connection the task already holds shares it instead of taking a
+    second slot, so nesting can't deadlock at the per-host limit.
+    """
+    
+    def __init__(
+        self,
+        idle_ttl: float = 300.0,
+        max_per_host: int = 4,
+        health_check_after: float = 30.0
+    ):
+        self.idle_ttl = idle_ttl
+        self.max_per_host = max_per_host
+        self.health_check_after = health_check_after
+        
+        self._idle: Dict[PoolKey, List[PooledConnection]] = {}
+        self._host_slots: Dict[Tuple[str, int], asyncio.Semaphore] = {}
+        self._stats = {'created': 0, 'reused': 0, 'discarded': 0, 'evicted': 0}
+        # Connections checked out by the current task, by key
+        self._held: ContextVar[Dict[PoolKey, PooledConnection]] = ContextVar(
+            f'ssh_pool_held_{id(self)}', default={}
+        )
+    
+    @staticmethod
+    def make_key(connect_kwargs: Dict[str, Any]) -> PoolKey:
+        """Build the pool key for a set of asyncssh.connect() arguments."""
+        password = connect_kwargs.get('password')
+        password_digest = hashlib.sha256(password.encode()).hexdigest() if password else ''
+        client_keys = tuple(str(k) for k in connect_kwargs.get('client_keys') or ())
+        return (
+            connect_kwargs['host'],
+            int(connect_kwargs.get('port', 22)),
+            connect_kwargs.get('username', ''),
+            client_keys,
+            password_digest
+        )
+    
+    @asynccontextmanager
+    async def connection(self, **connect_kwargs) -> AsyncIterator[Any]:
+        """Check out a connection for the duration of an ``async with`` block."""
+        key = self.make_key(connect_kwargs)
+        held = self._held.get()
+        if key in held:
+            # The outer checkout owns the connection and decides its fate
+            yield held[key].conn
+            return
+        
+        host_slot = self._host_slots.setdefault(
+            (key[0], key[1]), asyncio.Semaphore(self.max_per_host)
+        )
+        
+        async with host_slot:
+            pooled = await self._acquire(key, connect_kwargs)
+            token = self._held.set({**held, key: pooled})
+            try:
+                yield pooled.conn
+            except CONNECTION_ERRORS:
+                # Broken or abandoned mid-command: don't hand it out again
+                self._discard(pooled)
+                raise
+            except BaseException:
+                self._release(pooled)
+                raise
+            else:
+                self._release(pooled)
+            finally:
+                self._held.reset(token)
+    
+    async def _acquire(self, key: PoolKey, connect_kwargs: Dict[str, Any]) -> PooledConnection:
+        """Reuse a healthy idle connection for key, or open a new one."""
+        self._evict_expired()
+        
+        idle = self._idle.get(key, [])
+        while idle:
+            pooled = idle.pop()
+            if await self._is_healthy(pooled):
+                self._stats['reused'] += 1
+                return pooled
+            self._discard(pooled)
+        
+        conn = await asyncssh.connect(**connect_kwargs)
+        self._stats['created'] += 1
+        return PooledConnection(conn=conn, key=key)
+    
+    async def _is_healthy(self, pooled: PooledConnection) -> bool:
+        """Check that a pooled connection is still usable."""
+        try:
+            if pooled.conn.is_closed():
+                return False
+        except Exception:
+            return False
+        
+        if time.monotonic() - pooled.last_used < self.health_check_after:
+            return True
+        
+        # Idle for a while: make sure the transport still answers
+        try:
+            result = await pooled.conn.run('true', check=False, timeout=5)
+            return result.exit_status == 0
+        except Exception:
+            return False
+    
+    def _release(self, pooled: PooledConnection) -> None:
+        """Return a connection to the idle list."""
+        pooled.last_used = time.monotonic()
+        self._idle.setdefault(pooled.key, []).append(pooled)
+    
+    def _discard(self, pooled: PooledConnection) -> None:
+        """Close a connection without returning it to the pool."""
+        self._stats['discarded'] += 1
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+    
+    def _evict_expired(self) -> None:
+        """Close idle connections that have outlived the idle TTL."""
+        now = time.monotonic()
+        for key in list(self._idle):
+            keep = []
+            for pooled in self._idle[key]:
+                if now - pooled.last_used > self.idle_ttl:
+                    self._stats['evicted'] += 1
+                    try:
+                        pooled.conn.close()
+                    except Exception:
+                        pass
+                else:
+                    keep.append(pooled)
+            if keep:
+                self._idle[key] = keep
+            else:
+                del self._idle[key]
+    
+    async def close_all(self) -> None:
+        """Close every idle connection in the pool."""
+        for idle in self._idle.values():
+            for pooled in idle:
+                try:
+                    pooled.conn.close()
+                    await pooled.conn.wait_closed()
+                except Exception:
+                    pass
+        self._idle.clear()
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Get pool counters plus the current number of idle connections."""
+        stats = dict(self._stats)
+        stats['idle'] = sum(len(idle) for idle in self._idle.values())
+        return stats
+
+
+_pool: Optional[SSHConnectionPool] = None
+_pool_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_ssh_pool() -> SSHConnectionPool:
+    """Get the process-wide SSH connection pool for the running event loop."""
+    global _pool, _pool_loop
+    loop = asyncio.get_running_loop()
+    
+    # Connections are bound to the loop that opened them
+    if _pool is None or _pool_loop is not loop:
+        config = get_config()
+        _pool = SSHConnectionPool(
+            idle_ttl=config.ssh_pool_idle_ttl,
+            max_per_host=config.ssh_pool_max_per_host
+        )
+        _pool_loop = loop
+    return _pool
+
+
+def ssh_connection(
+    host: str,
+    username: str,
+    port: int = 22,
+    **connect_kwargs
+):
+    """Check out a pooled SSH connection: ``async with ssh_connection(...) as conn``."""
+    connect_kwargs.setdefault('known_hosts', None)
+    return get_ssh_pool().connection(host=host, port=port, username=username, **connect_kwargs)
@@ -7,6 +7,8 @@ import socket
 from pathlib import Path
 from typing import Dict, List, Optional, Any, cast
 
+from .ssh_pool import ssh_connection
+
 # Get the path for storing SSH keys
 SSH_KEY_DIR = Path.home() / ".ssh" / "mcp"
 
@@ -44,6 +46,26 @@ async def ensure_mcp_ssh_key() -> str:
     return str(key_path)
 
 
+async def run_remote_command(
+    conn: asyncssh.SSHClientConnection,
+    command: str,
+    **kwargs
+) -> asyncssh.SSHCompletedProcess:
+    """Run a remote command, terminating the remote process if the caller is cancelled."""
+    process = await conn.create_process(command, **kwargs)
+    try:
+        return await process.wait(check=False)
+    except asyncio.CancelledError:
+        # Signal the remote process and close the channel so it doesn't
+        # keep running (and holding the connection) after we give up
+        try:
+            process.send_signal('TERM')
+        except Exception:
+            pass
+        process.close()
+        raise
+
+
 async def setup_remote_mcp_admin(
     hostname: str, 
     username: str, 
@@ -266,12 +288,224 @@ async def verify_mcp_admin_access(hostname: str, port: int = 22) -> str:
         }, indent=2)
 
 
+# Discovery probes in execution order: (section name, remote command)
+DISCOVERY_PROBES = [
+    ('hostname', 'hostname'),
+    ('cpu_count', 'nproc'),
+    ('cpu_model', 'grep "model name" /proc/cpuinfo | head -1'),
+    ('memory', 'free -b'),
+    ('disk', 'df -B1 /'),
+    ('network', 'ip -j addr show 2>/dev/null'),
+    ('uptime', 'uptime -p'),
+    ('os', 'cat /etc/os-release | grep PRETTY_NAME'),
+    ('usb', 'lsusb 2>/dev/null'),
+    ('pci', 'lspci 2>/dev/null'),
+    ('block', 'lsblk -J -o NAME,SIZE,TYPE,MOUNTPOINT,MODEL 2>/dev/null'),
+]
+
+# Delimits each probe's output in the composite discovery script
+PROBE_MARKER = '@@MCP_PROBE'
+
+
+def build_discovery_script() -> str:
+    """Build a POSIX shell script that runs every discovery probe in one session."""
+    lines = []
+    for name, command in DISCOVERY_PROBES:
+        lines.append(f"echo '{PROBE_MARKER} BEGIN {name}'")
+        lines.append(f"{{ {command}; }} 2>/dev/null; rc=$?")
+        lines.append(f'echo; echo "{PROBE_MARKER} END {name} $rc"')
+    return '\n'.join(lines) + '\n'
+
+
+def parse_probe_output(output: str) -> Dict[str, str]:
+    """Split composite probe output into sections that succeeded with output."""
+    sections = {}
+    current = None
+    buffer: List[str] = []
+    
+    for line in output.split('\n'):
+        if line.startswith(PROBE_MARKER + ' '):
+            parts = line.split()
+            if len(parts) >= 3 and parts[1] == 'BEGIN':
+                current, buffer = parts[2], []
+            elif len(parts) >= 4 and parts[1] == 'END' and parts[2] == current:
+                text = '\n'.join(buffer).strip()
+                if parts[3] == '0' and text:
+                    sections[current] = text
+                current = None
+            continue
+        if current is not None:
+            buffer.append(line)
+    
+    return sections
+
+
+async def _run_probes_sequentially(conn: asyncssh.SSHClientConnection) -> Dict[str, str]:
+    """Run each discovery probe as its own command (one round trip per probe)."""
+    sections = {}
+    for name, command in DISCOVERY_PROBES:
+        result = await conn.run(command, check=False)
+        if result.exit_status == 0 and result.stdout:
+            sections[name] = cast(str, result.stdout).strip()
+    return sections
+
+
+def parse_discovery_sections(sections: Dict[str, str]) -> Dict[str, Any]:
+    """Parse raw probe output sections into the discovery data schema."""
+    system_info = {}
+    
+    # Get CPU info
+    cpu_info = {}
+    if sections.get('cpu_count'):
+        cpu_info['count'] = int(sections['cpu_count'])
+    
+    if sections.get('cpu_model'):
+        model_line = sections['cpu_model']
+        if ':' in model_line:
+            cpu_info['model'] = model_line.split(':', 1)[1].strip()
+    
+    if cpu_info:
+        system_info['cpu'] = cpu_info
+    
+    # Get memory info
+    if sections.get('memory'):
+        for line in sections['memory'].split('\n'):
+            if line.startswith('Mem:'):
+                parts = line.split()
+                if len(parts) >= 3:
+                    system_info['memory'] = {
+                        'total': int(parts[1]),
+                        'used': int(parts[2])
+                    }
+                    break
+    
+    # Get disk usage
+    if sections.get('disk'):
+        lines = sections['disk'].split('\n')
+        if len(lines) > 1:
+            # Skip header, get data line
+            parts = lines[1].split()
+            if len(parts) >= 4:
+                system_info['disk'] = {
+                    'total': int(parts[1]),
+                    'used': int(parts[2]),
+                    'available': int(parts[3])
+                }
+    
+    # Get network interfaces
+    if sections.get('network'):
+        network_info = []
+        try:
+            interfaces = json.loads(sections['network'])
+            for iface in interfaces:
+                if iface.get('ifname') and iface['ifname'] != 'lo':
+                    iface_info = {
+                        'name': iface['ifname'],
+                        'state': iface.get('operstate', 'unknown'),
+                        'addresses': []
+                    }
+                    for addr_info in iface.get('addr_info', []):
+                        if addr_info.get('family') in ['inet', 'inet6']:
+                            iface_info['addresses'].append(addr_info.get('local'))
+                    if iface_info['addresses']:
+                        network_info.append(iface_info)
+            system_info['network'] = network_info
+        except json.JSONDecodeError:
+            # Fallback to basic parsing if JSON output not supported
+            pass
+    
+    # Get system uptime
+    if sections.get('uptime'):
+        system_info['uptime'] = sections['uptime']
+    
+    # Get OS information
+    if sections.get('os'):
+        os_line = sections['os']
+        if '=' in os_line:
+            system_info['os'] = os_line.split('=', 1)[1].strip('"')
+    
+    # Get USB devices
+    usb_devices = []
+    for line in sections.get('usb', '').split('\n'):
+        if line:
+            # Parse lsusb output: Bus 001 Device 001: ID 1d6b:0002 Linux Foundation 2.0 root hub
+            parts = line.split(' ', 6)
+            if len(parts) >= 7:
+                device_info = {
+                    'bus': parts[1],
+                    'device': parts[3].rstrip(':'),
+                    'vendor_id': parts[5].split(':')[0],
+                    'product_id': parts[5].split(':')[1],
+                    'description': parts[6] if len(parts) > 6 else 'Unknown'
+                }
+                usb_devices.append(device_info)
+    if usb_devices:
+        system_info['usb_devices'] = usb_devices
+    
+    # Get PCI devices
+    pci_devices = []
+    for line in sections.get('pci', '').split('\n'):
+        if line:
+            # Parse lspci output: 00:00.0 Host bridge: Intel Corporation Device 4660 (rev 02)
+            parts = line.split(' ', 2)
+            if len(parts) >= 3:
+                device_info = {
+                    'slot': parts[0],
+                    'class': parts[1].rstrip(':'),
+                    'description': parts[2]
+                }
+                # Identify important device types
+                if 'network' in parts[1].lower() or 'ethernet' in parts[2].lower() or 'wireless' in parts[2].lower():
+                    device_info['type'] = 'network'
+                elif 'vga' in parts[1].lower() or 'display' in parts[1].lower():
+                    device_info['type'] = 'graphics'
+                elif 'usb' in parts[1].lower() or 'usb' in parts[2].lower():
+                    device_info['type'] = 'usb_controller'
+                elif 'sata' in parts[1].lower() or 'storage' in parts[1].lower():
+                    device_info['type'] = 'storage'
+                pci_devices.append(device_info)
+    if pci_devices:
+        system_info['pci_devices'] = pci_devices
+    
+    # Get block devices (drives)
+    block_devices = []
+    if sections.get('block'):
+        try:
+            lsblk_data = json.loads(sections['block'])
+            if 'blockdevices' in lsblk_data:
+                for device in lsblk_data['blockdevices']:
+                    if device.get('type') == 'disk':
+                        device_info = {
+                            'name': device.get('name'),
+                            'size': device.get('size'),
+                            'model': device.get('model', 'Unknown'),
+                            'partitions': []
+                        }
+                        # Add partition info if available
+                        if 'children' in device:
+                            for child in device['children']:
+                                if child.get('type') == 'part':
+                                    device_info['partitions'].append({
+                                        'name': child.get('name'),
+                                        'size': child.get('size'),
+                                        'mountpoint': child.get('mountpoint')
+                                    })
+                        block_devices.append(device_info)
+        except json.JSONDecodeError:
+            pass
+    if block_devices:
+        system_info['block_devices'] = block_devices
+    
+    return system_info
+
+
 async def ssh_discover_system(
     hostname: str, 
     username: str, 
     password: Optional[str] = None, 
     key_path: Optional[str] = None,
-    port: int = 22
+    port: int = 22,
+    single_round_trip: bool = True
 ) -> str:
     """SSH into a system and gather hardware/system information."""
     try:
@@ -298,170 +532,22 @@ async def ssh_discover_system(
         else:
             raise ValueError("Either password or key_path must be provided")
         
-        async with await asyncssh.connect(**connect_kwargs) as conn:
-            system_info = {}
-            
-            # Get actual hostname from the remote system
-            hostname_result = await conn.run('hostname', check=False)
-            actual_hostname = hostname  # Default to the IP/hostname we connected with
-            if hostname_result.exit_status == 0 and hostname_result.stdout:
-                actual_hostname = cast(str, hostname_result.stdout).strip()
-            
-            # Get CPU info
-            cpu_info = {}
-            cpu_result = await conn.run('nproc', check=False)
-            if cpu_result.exit_status == 0 and cpu_result.stdout:
-                cpu_info['count'] = int(cast(str, cpu_result.stdout).strip())
-            
-            cpu_model_result = await conn.run('grep "model name" /proc/cpuinfo | head -1', check=False)
-            if cpu_model_result.exit_status == 0 and cpu_model_result.stdout:
-                model_line = cast(str, cpu_model_result.stdout).strip()
-                if ':' in model_line:
-                    cpu_info['model'] = model_line.split(':', 1)[1].strip()
-            
-            if cpu_info:
-                system_info['cpu'] = cpu_info
-            
-            # Get memory info
-            mem_result = await conn.run('free -b', check=False)
-            if mem_result.exit_status == 0 and mem_result.stdout:
-                lines = cast(str, mem_result.stdout).strip().split('\n')
-                for line in lines:
-                    if line.startswith('Mem:'):
-                        parts = line.split()
-                        if len(parts) >= 3:
-                            system_info['memory'] = {
-                                'total': int(parts[1]),
-                                'used': int(parts[2])
-                            }
-                            break
-            
-            # Get disk usage
-            disk_result = await conn.run('df -B1 /', check=False)
-            if disk_result.exit_status == 0 and disk_result.stdout:
-                lines = cast(str, disk_result.stdout).strip().split('\n')
-                if len(lines) > 1:
-                    # Skip header, get data line
-                    parts = lines[1].split()
-                    if len(parts) >= 4:
-                        system_info['disk'] = {
-                            'total': int(parts[1]),
-                            'used': int(parts[2]),
-                            'available': int(parts[3])
-                        }
-            
-            # Get network interfaces
-            network_info = []
-            # Try modern ip command first
-            ip_result = await conn.run('ip -j addr show 2>/dev/null', check=False)
-            if ip_result.exit_status == 0 and ip_result.stdout:
-                try:
-                    interfaces = json.loads(cast(str, ip_result.stdout))
-                    for iface in interfaces:
-                        if iface.get('ifname') and iface['ifname'] != 'lo':
-                            iface_info = {
-                                'name': iface['ifname'],
-                                'state': iface.get('operstate', 'unknown'),
-                                'addresses': []
-                            }
-                            for addr_info in iface.get('addr_info', []):
-                                if addr_info.get('family') in ['inet', 'inet6']:
-                                    iface_info['addresses'].append(addr_info.get('local'))
-                            if iface_info['addresses']:
-                                network_info.append(iface_info)
-                    system_info['network'] = network_info
-                except json.JSONDecodeError:
-                    # Fallback to basic parsing if JSON output not supported
-                    pass
-            
-            # Get system uptime
-            uptime_result = await conn.run('uptime -p', check=False)
-            if uptime_result.exit_status == 0 and uptime_result.stdout:
-                system_info['uptime'] = cast(str, uptime_result.stdout).strip()
-            
-            # Get OS information
-            os_result = await conn.run('cat /etc/os-release | grep PRETTY_NAME', check=False)
-            if os_result.exit_status == 0 and os_result.stdout:
-                os_line = cast(str, os_result.stdout).strip()
-                if '=' in os_line:
-                    system_info['os'] = os_line.split('=', 1)[1].strip('"')
-            
-            # Get USB devices
-            usb_devices = []
-            lsusb_result = await conn.run('lsusb 2>/dev/null', check=False)
-            if lsusb_result.exit_status == 0 and lsusb_result.stdout:
-                for line in cast(str, lsusb_result.stdout).strip().split('\n'):
-                    if line:
-                        # Parse lsusb output: Bus 001 Device 001: ID 1d6b:0002 Linux Foundation 2.0 root hub
-                        parts = line.split(' ', 6)
-                        if len(parts) >= 7:
-                            device_info = {
-                                'bus': parts[1],
-                                'device': parts[3].rstrip(':'),
-                                'vendor_id': parts[5].split(':')[0],
-                                'product_id': parts[5].split(':')[1],
-                                'description': parts[6] if len(parts) > 6 else 'Unknown'
-                            }
-                            usb_devices.append(device_info)
-            if usb_devices:
-                system_info['usb_devices'] = usb_devices
-            
-            # Get PCI devices
-            pci_devices = []
-            lspci_result = await conn.run('lspci 2>/dev/null', check=False)
-            if lspci_result.exit_status == 0 and lspci_result.stdout:
-                for line in cast(str, lspci_result.stdout).strip().split('\n'):
-                    if line:
-                        # Parse lspci output: 00:00.0 Host bridge: Intel Corporation Device 4660 (rev 02)
-                        parts = line.split(' ', 2)
-                        if len(parts) >= 3:
-                            device_info = {
-                                'slot': parts[0],
-                                'class': parts[1].rstrip(':'),
-                                'description': parts[2]
-                            }
-                            # Identify important device types
-                            if 'network' in parts[1].lower() or 'ethernet' in parts[2].lower() or 'wireless' in parts[2].lower():
-                                device_info['type'] = 'network'
-                            elif 'vga' in parts[1].lower() or 'display' in parts[1].lower():
-                                device_info['type'] = 'graphics'
-                            elif 'usb' in parts[1].lower() or 'usb' in parts[2].lower():
-                                device_info['type'] = 'usb_controller'
-                            elif 'sata' in parts[1].lower() or 'storage' in parts[1].lower():
-                                device_info['type'] = 'storage'
-                            pci_devices.append(device_info)
-            if pci_devices:
-                system_info['pci_devices'] = pci_devices
-            
-            # Get block devices (drives)
-            block_devices = []
-            lsblk_result = await conn.run('lsblk -J -o NAME,SIZE,TYPE,MOUNTPOINT,MODEL 2>/dev/null', check=False)
-            if lsblk_result.exit_status == 0 and lsblk_result.stdout:
-                try:
-                    lsblk_data = json.loads(cast(str, lsblk_result.stdout))
-                    if 'blockdevices' in lsblk_data:
-                        for device in lsblk_data['blockdevices']:
-                            if device.get('type') == 'disk':
-                                device_info = {
-                                    'name': device.get('name'),
-                                    'size': device.get('size'),
-                                    'model': device.get('model', 'Unknown'),
-                                    'partitions': []
-                                }
-                                # Add partition info if available
-                                if 'children' in device:
-                                    for child in device['children']:
-                                        if child.get('type') == 'part':
-                                            device_info['partitions'].append({
-                                                'name': child.get('name'),
-                                                'size': child.get('size'),
-                                                'mountpoint': child.get('mountpoint')
-                                            })
-                                block_devices.append(device_info)
-                except json.JSONDecodeError:
-                    pass
-            if block_devices:
-                system_info['block_devices'] = block_devices
+        async with ssh_connection(**connect_kwargs) as conn:
+            sections: Dict[str, str] = {}
+            
+            if single_round_trip:
+                # Ship every probe as one script: one channel, one round trip
+                probe_result = await conn.run('sh -s', input=build_discovery_script(), check=False)
+                if probe_result.stdout:
+                    sections = parse_probe_output(cast(str, probe_result.stdout))
+            
+            if not sections:
+                # No usable composite output (e.g. no POSIX sh): one command per probe
+                sections = await _run_probes_sequentially(conn)
+        
+        # Actual hostname from the remote system, defaulting to the IP/hostname we connected with
+        actual_hostname = sections.get('hostname', hostname)
+        system_info = parse_discovery_sections(sections)
         
         return json.dumps({
             "status": "success",
@@ -530,7 +616,7 @@ async def ssh_execute_command(
         connect_kwargs['password'] = password
     
     try:
-        async with asyncssh.connect(**connect_kwargs) as conn:
+        async with ssh_connection(**connect_kwargs) as conn:
             # Prepare the command with sudo if requested
             if sudo:
                 if username == 'mcp_admin':
@@ -542,8 +628,8 @@ async def ssh_execute_command(
             else:
                 full_command = command
             
-            # Execute the command
-            result = await conn.run(full_command, check=False)
+            # Execute the command (cancellation is forwarded to the remote process)
+            result = await run_remote_command(conn, full_command)
             
             output = []
             if result.stdout:
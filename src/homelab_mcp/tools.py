@@ -1,10 +1,16 @@
 """Tool definitions and execution for the Homelab MCP server."""
 
 import json
-from typing import Any, Dict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
 
+from .config import get_config
 from .ssh_tools import ssh_discover_system, setup_remote_mcp_admin, verify_mcp_admin_access
-from .sitemap import NetworkSiteMap, discover_and_store, bulk_discover_and_store
+from .database import DEVICE_FILTER_FIELDS, DEVICE_PAGE_FIELDS
+from .hardware import HARDWARE_CRITERIA, HARDWARE_KINDS
+from .sitemap import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NetworkSiteMap, discover_and_store, bulk_discover_and_store
+)
 
 
 # Tool registry
@@ -137,19 +143,169 @@ TOOLS = {
                         },
                         "required": ["hostname", "username"]
                     }
+                },
+                "max_concurrency": {
+                    "type": "integer",
+                    "description": "Maximum number of hosts discovered at the same time (default: DISCOVERY_BATCH_SIZE)"
+                },
+                "per_host_timeout": {
+                    "type": "number",
+                    "description": "Seconds allowed for each host's discovery before it is reported as timed out (default: DISCOVERY_TIMEOUT)"
                 }
             },
             "required": ["targets"]
         }
     },
     "get_network_sitemap": {
-        "description": "Get all discovered devices from the network site map database",
+        "description": "Get discovered devices from the network site map database, one page at a time",
         "inputSchema": {
             "type": "object",
-            "properties": {},
+            "properties": {
+                "fields": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": list(DEVICE_PAGE_FIELDS)},
+                    "description": "Device fields to return (default: all); id and hostname are always included"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": f"Maximum devices per page (default: {DEFAULT_PAGE_SIZE}, max: {MAX_PAGE_SIZE})",
+                    "default": DEFAULT_PAGE_SIZE,
+                    "minimum": 1,
+                    "maximum": MAX_PAGE_SIZE
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "next_cursor from the previous page"
+                },
+                "filter": {
+                    "type": "object",
+                    "description": f"Exact-match filters on {', '.join(DEVICE_FILTER_FIELDS)}",
+                    "properties": {
+                        field: {"type": "integer" if field == "cpu_cores" else "string"}
+                        for field in DEVICE_FILTER_FIELDS
+                    },
+                    "additionalProperties": False
+                }
+            },
             "required": []
         }
     },
+    "search_devices": {
+        "description": "Search discovered devices by OS, resources, subnet, status and last-seen age, one page at a time",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": (
+                        "Space-separated terms, all of which must match: os:<prefix>, "
+                        "cores/memory/disk with < <= > >= or : (e.g. cores>=8, memory>=16G, disk<50%), "
+                        "subnet:<cidr>, status:<status>, seen<age (e.g. seen<1h, seen>7d)"
+                    )
+                },
+                "fields": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": list(DEVICE_PAGE_FIELDS)},
+                    "description": "Device fields to return (default: all); id and hostname are always included"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": f"Maximum devices per page (default: {DEFAULT_PAGE_SIZE}, max: {MAX_PAGE_SIZE})",
+                    "default": DEFAULT_PAGE_SIZE,
+                    "minimum": 1,
+                    "maximum": MAX_PAGE_SIZE
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "next_cursor from the previous page"
+                }
+            },
+            "required": ["query"]
+        }
+    },
+    "find_hardware": {
+        "description": (
+            "Find devices with specific USB, PCI or block hardware from the indexed inventory, "
+            "e.g. a Coral USB TPU (kind=usb, vendor_id=18d1, product_id=9302) or a GPU (kind=pci, device_type=graphics)"
+        ),
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "kind": {
+                    "type": "string",
+                    "enum": list(HARDWARE_KINDS),
+                    "description": "Hardware inventory to search"
+                },
+                "vendor_id": {
+                    "type": "string",
+                    "description": "USB vendor ID in hex (e.g. 18d1)"
+                },
+                "product_id": {
+                    "type": "string",
+                    "description": "USB product ID in hex (e.g. 9302)"
+                },
+                "pci_class": {
+                    "type": "string",
+                    "description": "PCI class as lspci prints it (e.g. 'VGA compatible controller')"
+                },
+                "device_type": {
+                    "type": "string",
+                    "enum": ["network", "graphics", "usb_controller", "storage"],
+                    "description": "PCI device type"
+                },
+                "model": {
+                    "type": "string",
+                    "description": "Block device model prefix (case-insensitive)"
+                },
+                "min_size": {
+                    "type": "string",
+                    "description": "Minimum block device size (e.g. 1T, 500G)"
+                },
+                "max_size": {
+                    "type": "string",
+                    "description": "Maximum block device size"
+                },
+                "description": {
+                    "type": "string",
+                    "description": "Substring of the USB or PCI description (e.g. 'Coral')"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum matches to return (default: 100)",
+                    "default": 100
+                }
+            },
+            "required": ["kind"]
+        }
+    },
+    "search_history": {
+        "description": (
+            "Full-text search over every stored discovery snapshot, e.g. which hosts ever reported "
+            "an interface, package or address; returns ranked device and timestamp hits"
+        ),
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": (
+                        "Words that must all appear in the snapshot; quote words that must appear "
+                        "together (e.g. enp3s0 \"10.0.5\")"
+                    )
+                },
+                "device_id": {
+                    "type": "integer",
+                    "description": "Only search this device's history"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum hits to return (default: 50)",
+                    "default": 50
+                }
+            },
+            "required": ["query"]
+        }
+    },
     "analyze_network_topology": {
         "description": "Analyze the network topology and provide insights about the discovered devices",
         "inputSchema": {
@@ -184,6 +340,27 @@ TOOLS = {
             "required": ["device_id"]
         }
     },
+    "reencode_discovery_history": {
+        "description": "Re-encode stored discovery history as compressed keyframes plus JSON-patch deltas",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "device_id": {
+                    "type": "integer",
+                    "description": "Only re-encode this device's history (default: all devices)"
+                },
+                "compression": {
+                    "type": "string",
+                    "enum": ["none", "zlib", "zstd"],
+                    "description": "Payload compression (default: HISTORY_COMPRESSION or zlib)"
+                },
+                "keyframe_interval": {
+                    "type": "integer",
+                    "description": "Store a full keyframe every N rows (default: HISTORY_KEYFRAME_INTERVAL or 20)"
+                }
+            }
+        }
+    },
     "deploy_infrastructure": {
         "description": "Deploy new infrastructure based on AI recommendations or user specifications",
         "inputSchema": {
@@ -965,265 +1142,457 @@ def get_available_tools() -> Dict[str, Dict[str, Any]]:
     return TOOLS.copy()
 
 
+# Process-lifetime shared instances, created on first use
+_sitemap: Optional[NetworkSiteMap] = None
+_service_installer = None
+
+
+def get_sitemap() -> NetworkSiteMap:
+    """Get the shared NetworkSiteMap, opening the database on first use."""
+    global _sitemap
+    if _sitemap is None:
+        _sitemap = NetworkSiteMap(**get_config().database.get_database_params())
+    return _sitemap
+
+
+def get_service_installer():
+    """Get the shared ServiceInstaller, loading service templates on first use."""
+    global _service_installer
+    if _service_installer is None:
+        from .service_installer import ServiceInstaller
+        _service_installer = ServiceInstaller()
+    return _service_installer
+
+
+def reset_shared_instances() -> None:
+    """Drop the shared sitemap and installer so they are recreated on next use."""
+    global _sitemap, _service_installer
+    _sitemap = None
+    _service_installer = None
+
+
+ToolHandler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+# Tool name -> handler coroutine
+TOOL_HANDLERS: Dict[str, ToolHandler] = {}
+
+
+def tool_handler(tool_name: str) -> Callable[[ToolHandler], ToolHandler]:
+    """Register a coroutine as the handler for a tool."""
+    def register(handler: ToolHandler) -> ToolHandler:
+        TOOL_HANDLERS[tool_name] = handler
+        return handler
+    return register
+
+
+def _text_content(text: str) -> Dict[str, Any]:
+    """Wrap tool output in an MCP text content block."""
+    return {"content": [{"type": "text", "text": text}]}
+
+
 async def execute_tool(tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
     """Execute a tool by name with the given arguments."""
-    # Initialize sitemap instance
-    sitemap = NetworkSiteMap()
-    
-    if tool_name == "ssh_discover":
-        result = await ssh_discover_system(**arguments)
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "setup_mcp_admin":
-        result = await setup_remote_mcp_admin(**arguments)
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "verify_mcp_admin":
-        result = await verify_mcp_admin_access(**arguments)
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "discover_and_map":
-        result = await discover_and_store(sitemap, **arguments)
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "bulk_discover_and_map":
-        result = await bulk_discover_and_store(sitemap, arguments["targets"])
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "get_network_sitemap":
-        devices = sitemap.get_all_devices()
-        result = json.dumps({
-            "status": "success",
-            "total_devices": len(devices),
-            "devices": devices
-        }, indent=2)
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "analyze_network_topology":
-        analysis = sitemap.analyze_network_topology()
-        result = json.dumps({
-            "status": "success",
-            "analysis": analysis
-        }, indent=2)
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "suggest_deployments":
-        suggestions = sitemap.suggest_deployments()
-        result = json.dumps({
-            "status": "success",
-            "suggestions": suggestions
-        }, indent=2)
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "get_device_changes":
-        changes = sitemap.get_device_changes(
-            arguments["device_id"],
-            arguments.get("limit", 10)
-        )
-        result = json.dumps({
-            "status": "success",
-            "device_id": arguments["device_id"],
-            "changes": changes
-        }, indent=2)
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "deploy_infrastructure":
-        from .infrastructure_crud import deploy_infrastructure_plan
-        result = await deploy_infrastructure_plan(
-            deployment_plan=arguments["deployment_plan"],
-            validate_only=arguments.get("validate_only", False)
-        )
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "update_device_config":
-        from .infrastructure_crud import update_device_configuration
-        result = await update_device_configuration(
-            device_id=arguments["device_id"],
-            config_changes=arguments["config_changes"],
-            backup_before_change=arguments.get("backup_before_change", True),
-            validate_only=arguments.get("validate_only", False)
-        )
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "decommission_device":
-        from .infrastructure_crud import decommission_network_device
-        result = await decommission_network_device(
-            device_id=arguments["device_id"],
-            migration_plan=arguments.get("migration_plan"),
-            force_removal=arguments.get("force_removal", False),
-            validate_only=arguments.get("validate_only", False)
-        )
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "scale_services":
-        from .infrastructure_crud import scale_infrastructure_services
-        result = await scale_infrastructure_services(
-            scaling_plan=arguments["scaling_plan"],
-            validate_only=arguments.get("validate_only", False)
-        )
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "validate_infrastructure_changes":
-        from .infrastructure_crud import validate_infrastructure_plan
-        result = await validate_infrastructure_plan(
-            change_plan=arguments["change_plan"],
-            validation_level=arguments.get("validation_level", "comprehensive")
-        )
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "create_infrastructure_backup":
-        from .infrastructure_crud import create_infrastructure_backup
-        result = await create_infrastructure_backup(
-            backup_scope=arguments.get("backup_scope", "full"),
-            device_ids=arguments.get("device_ids"),
-            include_data=arguments.get("include_data", False),
-            backup_name=arguments.get("backup_name")
-        )
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "rollback_infrastructure_changes":
-        from .infrastructure_crud import rollback_infrastructure_to_backup
-        result = await rollback_infrastructure_to_backup(
-            backup_id=arguments["backup_id"],
-            rollback_scope=arguments.get("rollback_scope", "full"),
-            device_ids=arguments.get("device_ids"),
-            validate_only=arguments.get("validate_only", False)
-        )
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "deploy_vm":
-        from .vm_operations import deploy_vm
-        result = await deploy_vm(
-            device_id=arguments["device_id"],
-            platform=arguments["platform"],
-            vm_name=arguments["vm_name"],
-            vm_config=arguments.get("vm_config", {})
-        )
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "control_vm":
-        from .vm_operations import control_vm_state
-        result = await control_vm_state(
-            device_id=arguments["device_id"],
-            platform=arguments["platform"],
-            vm_name=arguments["vm_name"],
-            action=arguments["action"]
-        )
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "get_vm_status":
-        from .vm_operations import get_vm_status
-        result = await get_vm_status(
-            device_id=arguments["device_id"],
-            platform=arguments["platform"],
-            vm_name=arguments["vm_name"]
-        )
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "list_vms":
-        from .vm_operations import list_vms_on_device
-        result = await list_vms_on_device(
-            device_id=arguments["device_id"],
-            platforms=arguments.get("platforms")
-        )
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "get_vm_logs":
-        from .vm_operations import get_vm_logs
-        result = await get_vm_logs(
-            device_id=arguments["device_id"],
-            platform=arguments["platform"],
-            vm_name=arguments["vm_name"],
-            lines=arguments.get("lines", 100)
-        )
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "remove_vm":
-        from .vm_operations import remove_vm
-        result = await remove_vm(
-            device_id=arguments["device_id"],
-            platform=arguments["platform"],
-            vm_name=arguments["vm_name"],
-            force=arguments.get("force", False)
-        )
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "ssh_execute_command":
-        from .ssh_tools import ssh_execute_command
-        result = await ssh_execute_command(**arguments)
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "update_mcp_admin_groups":
-        from .ssh_tools import update_mcp_admin_groups
-        result = await update_mcp_admin_groups(**arguments)
-        return {"content": [{"type": "text", "text": result}]}
-    
-    elif tool_name == "list_available_services":
-        from .service_installer import ServiceInstaller
-        installer = ServiceInstaller()
-        services = installer.get_available_services()
-        result = {
-            "available_services": services,
-            "count": len(services)
-        }
-        return {"content": [{"type": "text", "text": json.dumps(result, indent=2)}]}
-    
-    elif tool_name == "get_service_info":
-        from .service_installer import ServiceInstaller
-        installer = ServiceInstaller()
-        service_info = installer.get_service_info(arguments["service_name"])
-        if service_info:
-            return {"content": [{"type": "text", "text": json.dumps(service_info, indent=2)}]}
-        else:
-            return {"content": [{"type": "text", "text": f"Service '{arguments['service_name']}' not found"}]}
-    
-    elif tool_name == "check_service_requirements":
-        from .service_installer import ServiceInstaller
-        installer = ServiceInstaller()
-        result = await installer.check_service_requirements(**arguments)
-        return {"content": [{"type": "text", "text": json.dumps(result, indent=2)}]}
-    
-    elif tool_name == "install_service":
-        from .service_installer import ServiceInstaller
-        installer = ServiceInstaller()
-        result = await installer.install_service(**arguments)
-        return {"content": [{"type": "text", "text": json.dumps(result, indent=2)}]}
-    
-    elif tool_name == "get_service_status":
-        from .service_installer import ServiceInstaller
-        installer = ServiceInstaller()
-        result = await installer.get_service_status(**arguments)
-        return {"content": [{"type": "text", "text": json.dumps(result, indent=2)}]}
-    
-    elif tool_name == "plan_terraform_service":
-        from .service_installer import ServiceInstaller
-        installer = ServiceInstaller()
-        result = await installer.plan_terraform_service(**arguments)
-        return {"content": [{"type": "text", "text": json.dumps(result, indent=2)}]}
-    
-    elif tool_name == "destroy_terraform_service":
-        from .service_installer import ServiceInstaller
-        installer = ServiceInstaller()
-        result = await installer.destroy_terraform_service(**arguments)
-        return {"content": [{"type": "text", "text": json.dumps(result, indent=2)}]}
-    
-    elif tool_name == "refresh_terraform_service":
-        from .service_installer import ServiceInstaller
-        installer = ServiceInstaller()
-        result = await installer.refresh_terraform_service(**arguments)
-        return {"content": [{"type": "text", "text": json.dumps(result, indent=2)}]}
-    
-    elif tool_name == "check_ansible_service":
-        from .service_installer import ServiceInstaller
-        installer = ServiceInstaller()
-        result = await installer.check_ansible_service(**arguments)
-        return {"content": [{"type": "text", "text": json.dumps(result, indent=2)}]}
-    
-    elif tool_name == "run_ansible_playbook":
-        from .service_installer import ServiceInstaller
-        installer = ServiceInstaller()
-        result = await installer.run_ansible_playbook(**arguments)
-        return {"content": [{"type": "text", "text": json.dumps(result, indent=2)}]}
-    
+    handler = TOOL_HANDLERS.get(tool_name)
+    if handler is None:
+        raise ValueError(f"Unknown tool: {tool_name}")
+    return await handler(arguments)
+
+
+# SSH tools
+
+@tool_handler("ssh_discover")
+async def _ssh_discover(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    return _text_content(await ssh_discover_system(**arguments))
+
+
+@tool_handler("setup_mcp_admin")
+async def _setup_mcp_admin(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    return _text_content(await setup_remote_mcp_admin(**arguments))
+
+
+@tool_handler("verify_mcp_admin")
+async def _verify_mcp_admin(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    return _text_content(await verify_mcp_admin_access(**arguments))
+
+
+@tool_handler("ssh_execute_command")
+async def _ssh_execute_command(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    from .ssh_tools import ssh_execute_command
+    return _text_content(await ssh_execute_command(**arguments))
+
+
+@tool_handler("update_mcp_admin_groups")
+async def _update_mcp_admin_groups(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    from .ssh_tools import update_mcp_admin_groups
+    return _text_content(await update_mcp_admin_groups(**arguments))
+
+
+# Sitemap tools
+
+@tool_handler("discover_and_map")
+async def _discover_and_map(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    return _text_content(await discover_and_store(get_sitemap(), **arguments))
+
+
+@tool_handler("bulk_discover_and_map")
+async def _bulk_discover_and_map(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    result = await bulk_discover_and_store(
+        get_sitemap(),
+        arguments["targets"],
+        max_concurrency=arguments.get("max_concurrency"),
+        per_host_timeout=arguments.get("per_host_timeout")
+    )
+    return _text_content(result)
+
+
+@tool_handler("search_devices")
+async def _search_devices(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    page = await get_sitemap().get_devices_page_async(
+        fields=arguments.get("fields"),
+        limit=arguments.get("limit", DEFAULT_PAGE_SIZE),
+        cursor=arguments.get("cursor"),
+        search=arguments["query"]
+    )
+    result = json.dumps({
+        "status": "success",
+        "query": arguments["query"],
+        "total_matches": page["total_devices"],
+        "returned": len(page["devices"]),
+        "next_cursor": page["next_cursor"],
+        "devices": page["devices"]
+    }, separators=(",", ":"))
+    return _text_content(result)
+
+
+@tool_handler("find_hardware")
+async def _find_hardware(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    kind = arguments["kind"]
+    criteria = {
+        key: arguments[key]
+        for key in HARDWARE_CRITERIA.get(kind, ())
+        if arguments.get(key) is not None
+    }
+    matches = await get_sitemap().find_hardware_async(kind, criteria, arguments.get("limit", 100))
+    result = json.dumps({
+        "status": "success",
+        "kind": kind,
+        "criteria": criteria,
+        "hosts": sorted({match["hostname"] for match in matches}),
+        "total_matches": len(matches),
+        "matches": matches
+    }, indent=2)
+    return _text_content(result)
+
+
+@tool_handler("search_history")
+async def _search_history(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    hits = await get_sitemap().search_history_async(
+        arguments["query"],
+        device_id=arguments.get("device_id"),
+        limit=arguments.get("limit", 50)
+    )
+    result = json.dumps({
+        "status": "success",
+        "query": arguments["query"],
+        "hosts": sorted({hit["hostname"] for hit in hits}),
+        "total_hits": len(hits),
+        "hits": hits
+    }, indent=2)
+    return _text_content(result)
+
+
+@tool_handler("get_network_sitemap")
+async def _get_network_sitemap(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    page = await get_sitemap().get_devices_page_async(
+        fields=arguments.get("fields"),
+        limit=arguments.get("limit", DEFAULT_PAGE_SIZE),
+        cursor=arguments.get("cursor"),
+        filters=arguments.get("filter")
+    )
+    # Pages can be large, so skip the indentation other tools use
+    result = json.dumps({
+        "status": "success",
+        "total_devices": page["total_devices"],
+        "returned": len(page["devices"]),
+        "next_cursor": page["next_cursor"],
+        "devices": page["devices"]
+    }, separators=(",", ":"))
+    return _text_content(result)
+
+
+def _cache_age_seconds(result: Dict[str, Any]) -> Optional[float]:
+    """Seconds since a memoized sitemap result was computed."""
+    computed_at = result.get("computed_at")
+    if not isinstance(computed_at, str):
+        return None
+    return round((datetime.now() - datetime.fromisoformat(computed_at)).total_seconds(), 3)
+
+
+@tool_handler("analyze_network_topology")
+async def _analyze_network_topology(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    analysis = await get_sitemap().analyze_network_topology_async()
+    result = json.dumps({
+        "status": "success",
+        "analysis": analysis,
+        "cache_age_seconds": _cache_age_seconds(analysis)
+    }, indent=2)
+    return _text_content(result)
+
+
+@tool_handler("suggest_deployments")
+async def _suggest_deployments(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    suggestions = await get_sitemap().suggest_deployments_async()
+    result = json.dumps({
+        "status": "success",
+        "suggestions": suggestions,
+        "cache_age_seconds": _cache_age_seconds(suggestions)
+    }, indent=2)
+    return _text_content(result)
+
+
+@tool_handler("get_device_changes")
+async def _get_device_changes(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    changes = await get_sitemap().get_device_changes_async(
+        arguments["device_id"],
+        arguments.get("limit", 10)
+    )
+    result = json.dumps({
+        "status": "success",
+        "device_id": arguments["device_id"],
+        "changes": changes
+    }, indent=2)
+    return _text_content(result)
+
+
+@tool_handler("reencode_discovery_history")
+async def _reencode_discovery_history(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    stats = await get_sitemap().reencode_history_async(
+        device_id=arguments.get("device_id"),
+        compression=arguments.get("compression"),
+        keyframe_interval=arguments.get("keyframe_interval")
+    )
+    result = json.dumps({
+        "status": "success",
+        **stats
+    }, indent=2)
+    return _text_content(result)
+
+
+# Infrastructure CRUD tools
+
+@tool_handler("deploy_infrastructure")
+async def _deploy_infrastructure(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    from .infrastructure_crud import deploy_infrastructure_plan
+    result = await deploy_infrastructure_plan(
+        deployment_plan=arguments["deployment_plan"],
+        validate_only=arguments.get("validate_only", False)
+    )
+    return _text_content(result)
+
+
+@tool_handler("update_device_config")
+async def _update_device_config(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    from .infrastructure_crud import update_device_configuration
+    result = await update_device_configuration(
+        device_id=arguments["device_id"],
+        config_changes=arguments["config_changes"],
+        backup_before_change=arguments.get("backup_before_change", True),
+        validate_only=arguments.get("validate_only", False)
+    )
+    return _text_content(result)
+
+
+@tool_handler("decommission_device")
+async def _decommission_device(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    from .infrastructure_crud import decommission_network_device
+    result = await decommission_network_device(
+        device_id=arguments["device_id"],
+        migration_plan=arguments.get("migration_plan"),
+        force_removal=arguments.get("force_removal", False),
+        validate_only=arguments.get("validate_only", False)
+    )
+    return _text_content(result)
+
+
+@tool_handler("scale_services")
+async def _scale_services(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    from .infrastructure_crud import scale_infrastructure_services
+    result = await scale_infrastructure_services(
+        scaling_plan=arguments["scaling_plan"],
+        validate_only=arguments.get("validate_only", False)
+    )
+    return _text_content(result)
+
+
+@tool_handler("validate_infrastructure_changes")
+async def _validate_infrastructure_changes(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    from .infrastructure_crud import validate_infrastructure_plan
+    result = await validate_infrastructure_plan(
+        change_plan=arguments["change_plan"],
+        validation_level=arguments.get("validation_level", "comprehensive")
+    )
+    return _text_content(result)
+
+
+@tool_handler("create_infrastructure_backup")
+async def _create_infrastructure_backup(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    from .infrastructure_crud import create_infrastructure_backup
+    result = await create_infrastructure_backup(
+        backup_scope=arguments.get("backup_scope", "full"),
+        device_ids=arguments.get("device_ids"),
+        include_data=arguments.get("include_data", False),
+        backup_name=arguments.get("backup_name")
+    )
+    return _text_content(result)
+
+
+@tool_handler("rollback_infrastructure_changes")
+async def _rollback_infrastructure_changes(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    from .infrastructure_crud import rollback_infrastructure_to_backup
+    result = await rollback_infrastructure_to_backup(
+        backup_id=arguments["backup_id"],
+        rollback_scope=arguments.get("rollback_scope", "full"),
+        device_ids=arguments.get("device_ids"),
+        validate_only=arguments.get("validate_only", False)
+    )
+    return _text_content(result)
+
+
+# VM tools
+
+@tool_handler("deploy_vm")
+async def _deploy_vm(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    from .vm_operations import deploy_vm
+    result = await deploy_vm(
+        device_id=arguments["device_id"],
+        platform=arguments["platform"],
+        vm_name=arguments["vm_name"],
+        vm_config=arguments.get("vm_config", {})
+    )
+    return _text_content(result)
+
+
+@tool_handler("control_vm")
+async def _control_vm(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    from .vm_operations import control_vm_state
+    result = await control_vm_state(
+        device_id=arguments["device_id"],
+        platform=arguments["platform"],
+        vm_name=arguments["vm_name"],
+        action=arguments["action"]
+    )
+    return _text_content(result)
+
+
+@tool_handler("get_vm_status")
+async def _get_vm_status(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    from .vm_operations import get_vm_status
+    result = await get_vm_status(
+        device_id=arguments["device_id"],
+        platform=arguments["platform"],
+        vm_name=arguments["vm_name"]
+    )
+    return _text_content(result)
+
+
+@tool_handler("list_vms")
+async def _list_vms(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    from .vm_operations import list_vms_on_device
+    result = await list_vms_on_device(
+        device_id=arguments["device_id"],
+        platforms=arguments.get("platforms")
+    )
+    return _text_content(result)
+
+
+@tool_handler("get_vm_logs")
+async def _get_vm_logs(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    from .vm_operations import get_vm_logs
+    result = await get_vm_logs(
+        device_id=arguments["device_id"],
+        platform=arguments["platform"],
+        vm_name=arguments["vm_name"],
+        lines=arguments.get("lines", 100)
+    )
+    return _text_content(result)
+
+
+@tool_handler("remove_vm")
+async def _remove_vm(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    from .vm_operations import remove_vm
+    result = await remove_vm(
+        device_id=arguments["device_id"],
+        platform=arguments["platform"],
+        vm_name=arguments["vm_name"],
+        force=arguments.get("force", False)
+    )
+    return _text_content(result)
+
+
+# Service installation tools
+
+@tool_handler("list_available_services")
+async def _list_available_services(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    services = get_service_installer().get_available_services()
+    result = {
+        "available_services": services,
+        "count": len(services)
+    }
+    return _text_content(json.dumps(result, indent=2))
+
+
+@tool_handler("get_service_info")
+async def _get_service_info(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    service_info = get_service_installer().get_service_info(arguments["service_name"])
+    if service_info:
+        return _text_content(json.dumps(service_info, indent=2))
     else:
-        raise ValueError(f"Unknown tool: {tool_name}")
\ No newline at end of file
+        return _text_content(f"Service '{arguments['service_name']}' not found")
+
+
+@tool_handler("check_service_requirements")
+async def _check_service_requirements(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    result = await get_service_installer().check_service_requirements(**arguments)
+    return _text_content(json.dumps(result, indent=2))
+
+
+@tool_handler("install_service")
+async def _install_service(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    result = await get_service_installer().install_service(**arguments)
+    return _text_content(json.dumps(result, indent=2))
+
+
+@tool_handler("get_service_status")
+async def _get_service_status(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    result = await get_service_installer().get_service_status(**arguments)
+    return _text_content(json.dumps(result, indent=2))
+
+
+@tool_handler("plan_terraform_service")
+async def _plan_terraform_service(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    result = await get_service_installer().plan_terraform_service(**arguments)
+    return _text_content(json.dumps(result, indent=2))
+
+
+@tool_handler("destroy_terraform_service")
+async def _destroy_terraform_service(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    result = await get_service_installer().destroy_terraform_service(**arguments)
+    return _text_content(json.dumps(result, indent=2))
+
+
+@tool_handler("refresh_terraform_service")
+async def _refresh_terraform_service(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    result = await get_service_installer().refresh_terraform_service(**arguments)
+    return _text_content(json.dumps(result, indent=2))
+
+
+@tool_handler("check_ansible_service")
+async def _check_ansible_service(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    result = await get_service_installer().check_ansible_service(**arguments)
+    return _text_content(json.dumps(result, indent=2))
+
+
+@tool_handler("run_ansible_playbook")
+async def _run_ansible_playbook(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    result = await get_service_installer().run_ansible_playbook(**arguments)
+    return _text_content(json.dumps(result, indent=2))
@@ -1,30 +1,31 @@
 """VM operations for MCP integration."""
 
 import asyncio
-import asyncssh
 import json
 from typing import Dict, List, Optional, Any
 from .vm_providers import get_vm_provider
 from .sitemap import NetworkSiteMap
+from .ssh_pool import ssh_connection
+from .tools import get_sitemap
 
 
 class VMManager:
     """Manager for VM operations across different platforms."""
     
     def __init__(self):
-        self.sitemap = NetworkSiteMap()
+        # Share the server's sitemap so its device cache and write tracking apply
+        self.sitemap: NetworkSiteMap = get_sitemap()
     
     async def get_device_connection_info(self, device_id: int) -> Optional[Dict[str, Any]]:
         """Get SSH connection info for a device from the sitemap."""
-        devices = self.sitemap.get_all_devices()
-        for device in devices:
-            if device.get('id') == device_id:
-                return {
-                    'hostname': device.get('connection_ip', device.get('hostname')),
-                    'username': 'mcp_admin',  # Use the admin account we set up
-                    'port': 22
-                }
-        return None
+        device = await self.sitemap.get_device_async(device_id)
+        if device is None:
+            return None
+        return {
+            'hostname': device.get('connection_ip', device.get('hostname')),
+            'username': 'mcp_admin',  # Use the admin account we set up
+            'port': 22
+        }
 
 
 async def deploy_vm(
@@ -46,7 +47,7 @@ async def deploy_vm(
         
         provider = get_vm_provider(platform)
         
-        async with asyncssh.connect(
+        async with ssh_connection(
             connection_info['hostname'],
             username=connection_info['username'],
             known_hosts=None
@@ -89,7 +90,7 @@ async def control_vm_state(
         
         provider = get_vm_provider(platform)
         
-        async with asyncssh.connect(
+        async with ssh_connection(
             connection_info['hostname'],
             username=connection_info['username'],
             known_hosts=None
@@ -131,7 +132,7 @@ async def get_vm_status(
         
         provider = get_vm_provider(platform)
         
-        async with asyncssh.connect(
+        async with ssh_connection(
             connection_info['hostname'],
             username=connection_info['username'],
             known_hosts=None
@@ -173,7 +174,7 @@ async def list_vms_on_device(
         if platforms is None:
             platforms = ['docker', 'lxd']
         
-        async with asyncssh.connect(
+        async with ssh_connection(
             connection_info['hostname'],
             username=connection_info['username'],
             known_hosts=None
@@ -249,7 +250,7 @@ async def get_vm_logs(
         
         provider = get_vm_provider(platform)
         
-        async with asyncssh.connect(
+        async with ssh_connection(
             connection_info['hostname'],
             username=connection_info['username'],
             known_hosts=None
@@ -292,7 +293,7 @@ async def remove_vm(
         
         provider = get_vm_provider(platform)
         
-        async with asyncssh.connect(
+        async with ssh_connection(
             connection_info['hostname'],
             username=connection_info['username'],
             known_hosts=None
@@ -4,6 +4,8 @@ import asyncio
 from abc import ABC, abstractmethod
 from typing import Dict, List, Optional, Any
 
+from ..ssh_tools import run_remote_command
+
 
 class VMProvider(ABC):
     """Abstract base class for VM/container providers."""
@@ -87,7 +89,7 @@ class VMProvider(ABC):
     async def _run_command(self, conn, command: str) -> Dict[str, Any]:
         """Run a command and return structured result."""
         try:
-            result = await conn.run(command)
+            result = await run_remote_command(conn, command)
             return {
                 "exit_status": result.exit_status,
                 "stdout": result.stdout,
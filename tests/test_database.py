@@ -1,20 +1,28 @@
 """Tests for database abstraction layer."""
 
 import json
+import sqlite3
+import asyncio
 import pytest
 import tempfile
+import threading
 import os
+import time
 from unittest.mock import MagicMock, patch
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from src.homelab_mcp.database import (
     SQLiteAdapter, 
     PostgreSQLAdapter,
+    AsyncDatabaseAdapter,
+    get_async_database_adapter,
     get_database_adapter,
     calculate_data_hash,
     POSTGRESQL_AVAILABLE
 )
-from src.homelab_mcp.config import DatabaseConfig
+from src.homelab_mcp.config import DatabaseConfig, MCPConfig
+from src.homelab_mcp.device_search import compile_search, parse_search
+from src.homelab_mcp.history_codec import HistoryCodec, unpack
 
 
 class TestSQLiteAdapter:
@@ -26,8 +34,9 @@ class TestSQLiteAdapter:
         with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as tmp:
             db_path = tmp.name
         yield db_path
-        if os.path.exists(db_path):
-            os.unlink(db_path)
+        for path in (db_path, f'{db_path}-wal', f'{db_path}-shm'):
+            if os.path.exists(path):
+                os.unlink(path)
     
     @pytest.fixture
     def adapter(self, temp_db):
@@ -111,6 +120,119 @@ class TestSQLiteAdapter:
         assert len(devices) == 1
         assert devices[0]['cpu_cores'] == 8
     
+    def test_store_devices_bulk(self, adapter):
+        """Test bulk upsert of new and existing devices in one call."""
+        now = datetime.now().isoformat()
+        existing_id = adapter.store_device({
+            'hostname': 'server-1', 'connection_ip': '192.168.1.1',
+            'last_seen': now, 'status': 'error'
+        })
+        
+        device_ids = adapter.store_devices_bulk([
+            {'hostname': 'server-1', 'connection_ip': '192.168.1.1', 'last_seen': now,
+             'status': 'success', 'cpu_cores': 4},
+            {'hostname': 'server-2', 'connection_ip': '192.168.1.2', 'last_seen': now,
+             'status': 'success', 'network_interfaces': [{'name': 'eth0'}]}
+        ])
+        
+        assert device_ids[0] == existing_id
+        assert device_ids[1] != existing_id
+        
+        devices = {d['hostname']: d for d in adapter.get_all_devices()}
+        assert len(devices) == 2
+        assert devices['server-1']['status'] == 'success'
+        assert devices['server-1']['cpu_cores'] == 4
+        assert devices['server-2']['network_interfaces'] == [{'name': 'eth0'}]
+        assert adapter.store_devices_bulk([]) == []
+    
+    def test_history_dedup_migration(self, temp_db):
+        """Test that init_schema collapses legacy duplicate history rows and then enforces uniqueness."""
+        adapter = SQLiteAdapter(temp_db)
+        adapter.init_schema()
+        device_id = adapter.store_device({
+            'hostname': 'test-server', 'connection_ip': '192.168.1.10',
+            'last_seen': datetime.now().isoformat(), 'status': 'success'
+        })
+        
+        # Simulate a database created before the unique index existed
+        cursor = adapter.connection.cursor()
+        cursor.execute('DROP INDEX idx_history_device_hash')
+        for data, data_hash in [('{"v": 1}', 'h1'), ('{"v": 1}', 'h1'), ('{"v": 2}', 'h2'), ('{"v": 1}', 'h1')]:
+            cursor.execute(
+                'INSERT INTO discovery_history (device_id, discovery_data, data_hash) VALUES (?, ?, ?)',
+                (device_id, data, data_hash)
+            )
+        adapter.connection.commit()
+        
+        adapter.init_schema()
+        
+        rows = adapter.execute_query('SELECT id, data_hash FROM discovery_history ORDER BY id')
+        assert [row['data_hash'] for row in rows] == ['h1', 'h2']
+        assert rows[0]['id'] == 1
+        
+        # Re-storing a known snapshot is a no-op, a new one is kept
+        adapter.store_discovery_history(device_id, '{"v": 1}', 'h1')
+        adapter.store_discovery_history(device_id, '{"v": 3}', 'h3')
+        assert len(adapter.get_device_changes(device_id)) == 3
+        
+        adapter.close()
+    
+    def test_history_stored_as_keyframes_and_deltas(self, adapter):
+        """Test that history is delta-encoded and rebuilt transparently."""
+        adapter.history_codec = HistoryCodec(compression='zlib', keyframe_interval=3)
+        device_id = adapter.store_device({
+            'hostname': 'test-server', 'connection_ip': '192.168.1.10',
+            'last_seen': datetime.now().isoformat(), 'status': 'success'
+        })
+        
+        snapshots = [
+            {'hostname': 'test-server', 'data': {'os': f'Ubuntu 22.04.{i}', 'pci_devices': ['a', 'b']}}
+            for i in range(5)
+        ]
+        for i, snapshot in enumerate(snapshots):
+            adapter.store_discovery_history(device_id, json.dumps(snapshot, indent=2), f'hash{i}')
+        
+        rows = adapter.execute_query('SELECT encoding, discovery_data FROM discovery_history ORDER BY id')
+        assert [row['encoding'] for row in rows] == [
+            'keyframe+zlib', 'delta+zlib', 'delta+zlib', 'keyframe+zlib', 'delta+zlib'
+        ]
+        assert all(row['discovery_data'] is None for row in rows)
+        
+        # Newest first, and a window that starts mid-chain
+        changes = adapter.get_device_changes(device_id, limit=3)
+        assert [c['data'] for c in changes] == snapshots[:1:-1]
+        assert [c['data'] for c in adapter.get_device_changes(device_id)] == snapshots[::-1]
+    
+    def test_reencode_legacy_history(self, adapter):
+        """Test re-encoding full-JSON rows written before delta encoding."""
+        device_id = adapter.store_device({
+            'hostname': 'test-server', 'connection_ip': '192.168.1.10',
+            'last_seen': datetime.now().isoformat(), 'status': 'success'
+        })
+        snapshots = [
+            {'hostname': 'test-server', 'data': {'os': 'Ubuntu', 'usb': list(range(50)), 'rev': i}}
+            for i in range(4)
+        ]
+        cursor = adapter.connection.cursor()
+        for i, snapshot in enumerate(snapshots):
+            cursor.execute(
+                'INSERT INTO discovery_history (device_id, discovery_data, data_hash) VALUES (?, ?, ?)',
+                (device_id, json.dumps(snapshot, indent=2), f'hash{i}')
+            )
+        adapter.connection.commit()
+        
+        stats = adapter.reencode_history(codec=HistoryCodec(compression='none', keyframe_interval=10))
+        
+        assert stats['devices'] == 1
+        assert stats['rows'] == 4
+        assert stats['bytes_after'] < stats['bytes_before']
+        assert [c['data'] for c in adapter.get_device_changes(device_id)] == snapshots[::-1]
+        
+        # New writes continue the re-encoded chain
+        newest = dict(snapshots[-1], rev=99)
+        adapter.store_discovery_history(device_id, json.dumps(newest), 'hash99')
+        assert adapter.get_device_changes(device_id, limit=1)[0]['data'] == newest
+    
     def test_discovery_history(self, adapter):
         """Test discovery history functionality."""
         # Store a device first
@@ -137,6 +259,407 @@ class TestSQLiteAdapter:
         changes = adapter.get_device_changes(device_id)
         assert len(changes) == 1
 
+    
+    def test_resource_columns_filled_at_ingest(self, temp_db):
+        """Test that typed resource columns are stored and queryable."""
+        adapter = SQLiteAdapter(temp_db)
+        adapter.init_schema()
+        adapter.store_devices_bulk([
+            {
+                'hostname': 'big', 'connection_ip': '192.168.1.10',
+                'last_seen': datetime.now().isoformat(), 'status': 'success',
+                'cpu_cores': 16, 'memory_total': '64G', 'disk_use_percent': '20%'
+            },
+            {
+                'hostname': 'small', 'connection_ip': '192.168.2.11',
+                'last_seen': datetime.now().isoformat(), 'status': 'success',
+                'cpu_cores': 1, 'memory_total': 1073741824
+            },
+            {
+                'hostname': 'down', 'connection_ip': '192.168.1.12',
+                'last_seen': datetime.now().isoformat(), 'status': 'error'
+            }
+        ])
+        
+        big = adapter.find_devices_by_resources([('memory_total_bytes', '>=', 32 * 1024 ** 3)])
+        assert [d['hostname'] for d in big] == ['big']
+        assert big[0]['disk_use_ratio'] == 0.2
+        assert adapter.find_devices_by_resources([('disk_use_ratio', '>', 0)])[0]['hostname'] == 'big'
+        
+        summary = adapter.get_topology_summary()
+        assert summary['status'] == {'success': 2, 'error': 1}
+        assert summary['segment'] == {'192.168.1.0/24': 1, '192.168.2.0/24': 1}
+        assert summary['os'] == {'Unknown': 2}
+    
+    def test_device_lookups(self, temp_db):
+        """Test indexed lookups by id, IP and hostname, and status updates."""
+        adapter = SQLiteAdapter(temp_db)
+        adapter.init_schema()
+        device_id = adapter.store_device({
+            'hostname': 'nas',
+            'connection_ip': '192.168.1.20',
+            'last_seen': datetime.now().isoformat(),
+            'status': 'success',
+            'network_interfaces': '[{"name": "eth0"}]'
+        })
+        
+        device = adapter.get_device(device_id)
+        assert device['hostname'] == 'nas'
+        assert device['network_interfaces'] == [{'name': 'eth0'}]
+        assert adapter.get_device_by_ip('192.168.1.20')['id'] == device_id
+        assert adapter.get_device_by_hostname('nas')['id'] == device_id
+        assert adapter.get_device(device_id + 1) is None
+        assert adapter.get_device_by_ip('10.0.0.1') is None
+        
+        assert adapter.update_device_status(device_id, 'decommissioned') is True
+        assert adapter.get_device(device_id)['status'] == 'decommissioned'
+        assert adapter.update_device_status(device_id + 1, 'decommissioned') is False
+    
+    def test_devices_page_projection_keyset_and_filters(self, temp_db):
+        """Test that pages select only requested fields and resume after the cursor key."""
+        adapter = SQLiteAdapter(temp_db)
+        adapter.init_schema()
+        for i, hostname in enumerate(['web', 'db', 'web', 'cache']):
+            adapter.store_device({
+                'hostname': hostname, 'connection_ip': f'10.0.0.{i}',
+                'last_seen': datetime.now().isoformat(),
+                'status': 'error' if hostname == 'cache' else 'success'
+            })
+        
+        first = adapter.get_devices_page(fields=['status'], limit=2)
+        assert [set(d) for d in first] == [{'id', 'hostname', 'status'}] * 2
+        assert [d['hostname'] for d in first] == ['cache', 'db']
+        
+        rest = adapter.get_devices_page(limit=10, after=(first[-1]['hostname'], first[-1]['id']))
+        assert [(d['hostname'], d['connection_ip']) for d in rest] == [('web', '10.0.0.0'), ('web', '10.0.0.2')]
+        
+        online = adapter.get_devices_page(filters={'status': 'success'})
+        assert [d['hostname'] for d in online] == ['db', 'web', 'web']
+        assert adapter.count_devices({'status': 'success'}) == 3
+        assert adapter.count_devices() == 4
+        
+        with pytest.raises(ValueError, match="Unknown device fields"):
+            adapter.get_devices_page(fields=['password'])
+        with pytest.raises(ValueError, match="Unsupported device filter"):
+            adapter.count_devices({'1=1; --': 'x'})
+    
+    def test_search_devices(self, temp_db):
+        """Test that search terms filter in SQL and the OS term is served by its index."""
+        adapter = SQLiteAdapter(temp_db)
+        adapter.init_schema()
+        now = datetime.now()
+        adapter.store_devices_bulk([
+            {'hostname': 'db', 'connection_ip': '192.168.10.5', 'last_seen': now.isoformat(),
+             'status': 'success', 'os_info': 'Ubuntu 22.04', 'cpu_cores': 16, 'disk_use_percent': '20%'},
+            {'hostname': 'old', 'connection_ip': '192.168.10.6',
+             'last_seen': (now - timedelta(days=30)).isoformat(),
+             'status': 'success', 'os_info': 'ubuntu 18.04', 'cpu_cores': 8, 'disk_use_percent': '10%'},
+            {'hostname': 'pi', 'connection_ip': '192.168.10.7', 'last_seen': now.isoformat(),
+             'status': 'success', 'os_info': 'Ubuntu 22.04', 'cpu_cores': 4, 'disk_use_percent': '20%'},
+            {'hostname': 'nas', 'connection_ip': '192.168.11.5', 'last_seen': now.isoformat(),
+             'status': 'success', 'os_info': 'Ubuntu 22.04', 'cpu_cores': 8, 'disk_use_percent': '20%'},
+            {'hostname': 'fedora', 'connection_ip': '192.168.10.8', 'last_seen': now.isoformat(),
+             'status': 'success', 'os_info': 'Fedora 39', 'cpu_cores': 8, 'disk_use_percent': '20%'}
+        ])
+        
+        terms = parse_search('os:ubuntu cores>=8 disk<50% subnet:192.168.10.0/24')
+        assert [d['hostname'] for d in adapter.get_devices_page(search=terms)] == ['db', 'old']
+        assert adapter.count_devices(search=terms + parse_search('seen<1d')) == 1
+        
+        where, params = compile_search(parse_search('os:ubuntu'), 'sqlite')
+        plan = adapter.execute_query(f'EXPLAIN QUERY PLAN SELECT id FROM devices WHERE {where}', tuple(params))
+        assert 'idx_devices_os_lower' in plan[0]['detail']
+    
+    def test_hardware_inventory_indexed_at_ingest(self, temp_db):
+        """Test that new snapshots replace the device's hardware rows and lookups use indexes."""
+        adapter = SQLiteAdapter(temp_db)
+        adapter.init_schema()
+        device_id = adapter.store_device({
+            'hostname': 'nvr', 'connection_ip': '10.0.0.9',
+            'last_seen': datetime.now().isoformat(), 'status': 'success'
+        })
+        coral = {'bus': '002', 'device': '003', 'vendor_id': '18d1', 'product_id': '9302', 'description': 'Google Inc.'}
+        keyboard = {'bus': '001', 'device': '002', 'vendor_id': '046d', 'product_id': 'c31c', 'description': 'Logitech'}
+        for usb_devices in ([keyboard], [keyboard, coral]):
+            snapshot = json.dumps({'hostname': 'nvr', 'data': {'usb_devices': usb_devices}})
+            adapter.store_discovery_history(device_id, snapshot, calculate_data_hash(snapshot))
+        
+        matches = adapter.find_hardware('usb', {'vendor_id': '18D1', 'product_id': '9302'})
+        assert [(m['hostname'], m['device_id'], m['description']) for m in matches] == [('nvr', device_id, 'Google Inc.')]
+        assert len(adapter.find_hardware('usb', {})) == 2
+        
+        plan = adapter.execute_query(
+            "EXPLAIN QUERY PLAN SELECT id FROM hardware_usb WHERE vendor_id = ? AND product_id = ?",
+            ('18d1', '9302')
+        )
+        assert 'idx_hardware_usb_ids' in plan[0]['detail']
+    
+    def test_find_hardware_description_wildcards_are_literal(self, temp_db):
+        """Test that '%' and '_' in a description search only match those characters."""
+        adapter = SQLiteAdapter(temp_db)
+        adapter.init_schema()
+        device_id = adapter.store_device({
+            'hostname': 'hub', 'connection_ip': '10.0.0.4',
+            'last_seen': datetime.now().isoformat(), 'status': 'success'
+        })
+        snapshot = json.dumps({'data': {'usb_devices': [
+            {'bus': '001', 'device': '002', 'vendor_id': '05e3', 'product_id': '0610', 'description': 'usb_hub 100%'},
+            {'bus': '001', 'device': '003', 'vendor_id': '05e3', 'product_id': '0612', 'description': 'usbxhub 1000'}
+        ]}})
+        adapter.store_discovery_history(device_id, snapshot, calculate_data_hash(snapshot))
+        
+        assert [m['product_id'] for m in adapter.find_hardware('usb', {'description': 'usb_hub'})] == ['0610']
+        assert [m['product_id'] for m in adapter.find_hardware('usb', {'description': '100%'})] == ['0610']
+    
+    def test_hardware_inventory_follows_return_to_earlier_snapshot(self, temp_db):
+        """Test that a snapshot history already holds still resets the inventory (A -> B -> A)."""
+        adapter = SQLiteAdapter(temp_db)
+        adapter.init_schema()
+        device_id = adapter.store_device({
+            'hostname': 'nvr', 'connection_ip': '10.0.0.9',
+            'last_seen': datetime.now().isoformat(), 'status': 'success'
+        })
+        tpu = {'bus': '002', 'device': '004', 'vendor_id': '1a6e', 'product_id': '089a', 'description': 'Coral'}
+        for usb_devices in ([tpu], [], [tpu]):
+            snapshot = json.dumps({'hostname': 'nvr', 'data': {'usb_devices': usb_devices}})
+            adapter.store_discovery_history(device_id, snapshot, calculate_data_hash(snapshot))
+        
+        assert [m['device_id'] for m in adapter.find_hardware('usb', {'vendor_id': '1a6e'})] == [device_id]
+        assert len(adapter.get_device_changes(device_id, limit=10)) == 2
+    
+    def test_failed_history_write_rolls_back_inventory(self, temp_db):
+        """Test that an encode failure leaves neither the new inventory nor an open transaction."""
+        adapter = SQLiteAdapter(temp_db)
+        adapter.init_schema()
+        device_id = adapter.store_device({
+            'hostname': 'nvr', 'connection_ip': '10.0.0.9',
+            'last_seen': datetime.now().isoformat(), 'status': 'success'
+        })
+        snapshot = json.dumps({'data': {'usb_devices': [
+            {'bus': '002', 'device': '004', 'vendor_id': '1a6e', 'product_id': '089a', 'description': 'Coral'}
+        ]}})
+        
+        with patch.object(adapter.history_codec, 'encode', side_effect=RuntimeError("encode failed")):
+            with pytest.raises(RuntimeError, match="encode failed"):
+                adapter.store_discovery_history(device_id, snapshot, calculate_data_hash(snapshot))
+        
+        assert not adapter.connection.in_transaction
+        assert adapter.find_hardware('usb', {'vendor_id': '1a6e'}) == []
+    
+    def test_hardware_inventory_backfilled_from_history(self, temp_db):
+        """Test that databases created before the inventory tables get them filled from history."""
+        adapter = SQLiteAdapter(temp_db)
+        adapter.init_schema()
+        device_id = adapter.store_device({
+            'hostname': 'gpu-box', 'connection_ip': '10.0.0.3',
+            'last_seen': datetime.now().isoformat(), 'status': 'success'
+        })
+        snapshot = json.dumps({'data': {'pci_devices': [
+            {'slot': '01:00.0', 'class': 'VGA compatible controller', 'type': 'graphics', 'description': 'NVIDIA'}
+        ]}})
+        adapter.store_discovery_history(device_id, snapshot, calculate_data_hash(snapshot))
+        for table in ('hardware_usb', 'hardware_pci', 'hardware_block'):
+            adapter.connection.execute(f'DROP TABLE {table}')
+        adapter.connection.commit()
+        adapter.close()
+        
+        adapter = SQLiteAdapter(temp_db)
+        adapter.init_schema()
+        
+        assert [m['hostname'] for m in adapter.find_hardware('pci', {'device_type': 'graphics'})] == ['gpu-box']
+    
+    def test_search_history_ranks_snapshots(self, temp_db):
+        """Test that history search matches every phrase across a device's stored snapshots."""
+        adapter = SQLiteAdapter(temp_db)
+        adapter.init_schema()
+        device_id = adapter.store_device({
+            'hostname': 'nas', 'connection_ip': '10.0.0.5',
+            'last_seen': datetime.now().isoformat(), 'status': 'success'
+        })
+        for address in ('10.0.5.23', '192.168.1.4'):
+            snapshot = json.dumps({'data': {'network_interfaces': [{'name': 'enp3s0', 'addresses': [address]}]}})
+            adapter.store_discovery_history(device_id, snapshot, calculate_data_hash(snapshot))
+        # Re-storing a known snapshot must not index it twice
+        adapter.store_discovery_history(device_id, snapshot, calculate_data_hash(snapshot))
+        
+        hits = adapter.search_history(['enp3s0', '10 0 5'])
+        assert [(h['hostname'], h['device_id']) for h in hits] == [('nas', device_id)]
+        assert hits[0]['history_id'] == 1
+        assert len(adapter.search_history(['enp3s0'])) == 2
+        assert adapter.search_history(['enp3s0'], device_id=device_id + 1) == []
+        
+        # Databases from before the index get it filled from stored history
+        adapter.connection.execute('DROP TABLE history_fts')
+        adapter.connection.commit()
+        adapter.close()
+        adapter = SQLiteAdapter(temp_db)
+        adapter.init_schema()
+        assert [h['history_id'] for h in adapter.search_history(['192 168 1 4'])] == [2]
+    
+    def test_storage_profiles(self, temp_db):
+        """Test that the tuned profile enables WAL with a separate read connection."""
+        adapter = SQLiteAdapter(temp_db, profile='tuned')
+        adapter.init_schema()
+        
+        assert adapter.connection.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert adapter.connection.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+        assert adapter.connection.execute('PRAGMA busy_timeout').fetchone()[0] == 5000
+        adapter.store_device({
+            'hostname': 'a', 'connection_ip': '10.0.0.1',
+            'last_seen': datetime.now().isoformat(), 'status': 'success'
+        })
+        assert adapter.count_devices() == 1
+        assert adapter.read_connection is not None
+        assert adapter.read_connection is not adapter.connection
+        adapter.close()
+        
+        default = SQLiteAdapter(temp_db, profile='default')
+        assert default.count_devices() == 1
+        assert default.read_connection is None
+        default.close()
+        
+        with pytest.raises(ValueError, match="Unknown SQLite profile"):
+            SQLiteAdapter(temp_db, profile='turbo')
+    
+    def test_iter_devices_streams_in_batches(self, temp_db):
+        """Test that iteration yields every device while fetching batch_size rows per step."""
+        adapter = SQLiteAdapter(temp_db)
+        adapter.init_schema()
+        adapter.store_devices_bulk([
+            {'hostname': f'host-{i}', 'connection_ip': f'10.0.0.{i}',
+             'last_seen': datetime.now().isoformat(), 'status': 'success',
+             'network_interfaces': '[]'}
+            for i in range(5)
+        ])
+        
+        devices = adapter.iter_devices(batch_size=2)
+        first = next(devices)
+        assert first['hostname'] == 'host-0'
+        assert first['network_interfaces'] == []
+        assert [d['hostname'] for d in devices] == [f'host-{i}' for i in range(1, 5)]
+        assert adapter.get_all_devices() == list(adapter.iter_devices())
+    
+    def test_topology_counters_follow_writes(self, temp_db):
+        """Test that counters replace a device's old contribution on every write."""
+        adapter = SQLiteAdapter(temp_db)
+        adapter.init_schema()
+        device = {
+            'hostname': 'web', 'connection_ip': '10.0.1.5',
+            'last_seen': datetime.now().isoformat(), 'status': 'success',
+            'os_info': 'Ubuntu 22.04', 'cpu_model': 'Xeon', 'disk_use_percent': '45%'
+        }
+        device_id = adapter.store_device(device)
+        adapter.store_device({**device, 'os_info': 'Ubuntu 24.04', 'disk_use_percent': '91%'})
+        
+        summary = adapter.get_topology_summary()
+        assert summary['status'] == {'success': 1}
+        assert summary['os'] == {'Ubuntu 24.04': 1}
+        assert summary['segment'] == {'10.0.1.0/24': 1}
+        assert summary['disk_usage'] == {'90-100%': 1}
+        
+        adapter.update_device_status(device_id, 'error')
+        summary = adapter.get_topology_summary()
+        assert summary['status'] == {'error': 1}
+        assert summary['os'] == {} and summary['cpu'] == {}
+        
+        # Incremental counts agree with a full rebuild
+        adapter.rebuild_topology_counters()
+        assert adapter.get_topology_summary() == summary
+    
+    def test_data_versions_count_writes_from_any_connection(self, temp_db):
+        """Test that the trigger-kept data versions move on device and history writes by anyone."""
+        adapter = SQLiteAdapter(temp_db)
+        adapter.init_schema()
+        assert adapter.get_data_versions() == {'devices': 0, 'history': 0}
+        
+        device_id = adapter.store_device({
+            'hostname': 'web', 'connection_ip': '10.0.1.5',
+            'last_seen': datetime.now().isoformat(), 'status': 'success'
+        })
+        versions = adapter.get_data_versions()
+        assert versions['devices'] > 0 and versions['history'] == 0
+        
+        other = sqlite3.connect(temp_db)
+        other.execute("UPDATE devices SET status = 'error' WHERE id = ?", (device_id,))
+        other.commit()
+        other.close()
+        assert adapter.get_data_versions()['devices'] == versions['devices'] + 1
+        
+        adapter.store_discovery_history(device_id, '{"hostname": "web"}', 'abc123')
+        assert adapter.get_data_versions()['history'] > 0
+    
+    def test_device_metrics_pruned_to_retention(self, temp_db):
+        """Test that only the newest DEVICE_METRICS_RETENTION samples are kept per device."""
+        with patch.dict(os.environ, {'DEVICE_METRICS_RETENTION': '3'}):
+            adapter = SQLiteAdapter(temp_db)
+        adapter.init_schema()
+        web = adapter.store_device({
+            'hostname': 'web', 'connection_ip': '10.0.1.5',
+            'last_seen': datetime.now().isoformat(), 'status': 'success'
+        })
+        db = adapter.store_device({
+            'hostname': 'db', 'connection_ip': '10.0.1.6',
+            'last_seen': datetime.now().isoformat(), 'status': 'success'
+        })
+        
+        adapter.store_device_metrics(db, {'uptime': 'up 1 day'})
+        for sample in range(5):
+            adapter.store_device_metrics(web, {'sample': sample})
+        
+        kept = adapter.get_device_metrics(web)
+        assert [row['metrics']['sample'] for row in kept] == [4, 3, 2]
+        assert len(adapter.get_device_metrics(db)) == 1
+    
+    def test_topology_counters_built_for_existing_devices(self, temp_db):
+        """Test that init_schema fills a missing counters table from the devices table."""
+        adapter = SQLiteAdapter(temp_db)
+        adapter.init_schema()
+        adapter.store_devices_bulk([
+            {'hostname': f'host-{i}', 'connection_ip': f'192.168.{i % 2}.{i}',
+             'last_seen': datetime.now().isoformat(), 'status': 'success'}
+            for i in range(1, 5)
+        ])
+        expected = adapter.get_topology_summary()
+        adapter.connection.execute('DROP TABLE topology_counters')
+        adapter.connection.commit()
+        
+        adapter.init_schema()
+        
+        assert adapter.get_topology_summary() == expected
+        assert expected['segment'] == {'192.168.0.0/24': 2, '192.168.1.0/24': 2}
+    
+    def test_resource_columns_backfilled_on_old_schema(self, temp_db):
+        """Test that init_schema adds and fills resource columns on an older database."""
+        conn = sqlite3.connect(temp_db)
+        conn.execute('''
+            CREATE TABLE devices (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                hostname TEXT NOT NULL, connection_ip TEXT NOT NULL,
+                last_seen TEXT NOT NULL, status TEXT NOT NULL,
+                cpu_model TEXT, cpu_cores INTEGER,
+                memory_total TEXT, memory_used TEXT, memory_free TEXT, memory_available TEXT,
+                disk_filesystem TEXT, disk_size TEXT, disk_used TEXT, disk_available TEXT,
+                disk_use_percent TEXT, disk_mount TEXT, network_interfaces TEXT,
+                uptime TEXT, os_info TEXT, error_message TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(hostname, connection_ip)
+            )
+        ''')
+        conn.execute(
+            "INSERT INTO devices (hostname, connection_ip, last_seen, status, cpu_cores, memory_total, disk_use_percent) "
+            "VALUES ('legacy', '10.0.0.1', '2024-01-01', 'success', 4, '16G', '85%')"
+        )
+        conn.commit()
+        conn.close()
+        
+        adapter = SQLiteAdapter(temp_db)
+        adapter.init_schema()
+        
+        device = adapter.get_all_devices()[0]
+        assert device['memory_total_bytes'] == 16 * 1024 ** 3
+        assert device['disk_use_ratio'] == 0.85
+
 
 @pytest.mark.skipif(not POSTGRESQL_AVAILABLE, reason="psycopg2 not available")
 class TestPostgreSQLAdapter:
@@ -174,8 +697,6 @@ class TestPostgreSQLAdapter:
     def test_store_device_jsonb(self, mock_connection):
         """Test storing device with JSONB format."""
         mock_conn, mock_cursor = mock_connection
-        mock_cursor.fetchone.return_value = None  # No existing device
-        mock_cursor.fetchone.return_value = [1]   # Return device ID
         
         adapter = PostgreSQLAdapter()
         adapter.connection = mock_conn
@@ -191,11 +712,488 @@ class TestPostgreSQLAdapter:
             'network_interfaces': json.dumps([{'name': 'eth0'}])
         }
         
-        device_id = adapter.store_device(device_data)
+        with patch('src.homelab_mcp.database.psycopg2.extras.execute_values') as mock_execute_values:
+            mock_execute_values.return_value = [(1,)]
+            device_id = adapter.store_device(device_data)
         
-        # Verify INSERT was called with JSONB data
-        assert mock_cursor.execute.call_count >= 2  # SELECT + INSERT
-        mock_conn.commit.assert_called()
+        # Single upsert carrying the JSONB payload, then one commit
+        assert device_id == 1
+        query, rows = mock_execute_values.call_args[0][1:3]
+        assert 'ON CONFLICT (hostname, connection_ip) DO UPDATE' in query
+        system_info = json.loads(rows[0][4])
+        assert system_info['cpu'] == {'model': 'Intel Core i7', 'cores': 8}
+        assert json.loads(rows[0][5]) == [{'name': 'eth0'}]
+        mock_conn.commit.assert_called_once()
+    
+    def test_store_discovery_history_first_row_is_keyframe(self, mock_connection):
+        """Test that a device's first snapshot is stored as an encoded keyframe."""
+        mock_conn, mock_cursor = mock_connection
+        mock_cursor.fetchone.return_value = None  # Snapshot not seen before
+        mock_cursor.fetchall.return_value = []    # No existing chain
+        
+        adapter = PostgreSQLAdapter()
+        adapter.connection = mock_conn
+        adapter.store_discovery_history(1, '{"hostname": "test-server"}', 'abc123')
+        
+        query, params = mock_cursor.execute.call_args[0]
+        assert 'ON CONFLICT (device_id, data_hash) DO NOTHING' in query
+        assert params[2].startswith('keyframe')
+        assert unpack(params[2], params[3]) == ('keyframe', {'hostname': 'test-server'})
+        assert "to_tsvector('simple', %s)" in query
+        assert params[4] == 'hostname test server'
+        mock_conn.commit.assert_called_once()
+    
+    def test_store_discovery_history_known_snapshot_resets_inventory(self, mock_connection):
+        """Test that returning to an older snapshot replaces the inventory without a new history row."""
+        mock_conn, mock_cursor = mock_connection
+        mock_cursor.fetchone.side_effect = [{'data_hash': 'hash-b'}, {'?column?': 1}]
+        snapshot = json.dumps({'data': {'usb_devices': [
+            {'bus': '002', 'device': '004', 'vendor_id': '1a6e', 'product_id': '089a', 'description': 'Coral'}
+        ]}})
+        
+        adapter = PostgreSQLAdapter()
+        adapter.connection = mock_conn
+        adapter.store_discovery_history(1, snapshot, 'hash-a')
+        
+        queries = [call[0][0] for call in mock_cursor.execute.call_args_list]
+        assert any('DELETE FROM hardware_usb' in query for query in queries)
+        assert not any('INSERT INTO discovery_history' in query for query in queries)
+        usb_rows = [call[0][1] for call in mock_cursor.executemany.call_args_list
+                    if 'hardware_usb' in call[0][0]]
+        assert usb_rows == [[(1, '1a6e', '089a', '002', '004', 'Coral')]]
+        mock_conn.commit.assert_called_once()
+        
+        # Rediscovering the newest snapshot touches neither history nor inventory
+        mock_cursor.reset_mock()
+        mock_cursor.fetchone.side_effect = [{'data_hash': 'hash-a'}]
+        adapter.store_discovery_history(1, snapshot, 'hash-a')
+        assert not any('hardware_usb' in call[0][0] for call in mock_cursor.execute.call_args_list)
+    
+    def test_load_discovery_history_copies_through_staging(self, mock_connection):
+        """Test that history is bulk-loaded with COPY and deduplicated on insert."""
+        mock_conn, mock_cursor = mock_connection
+        mock_cursor.rowcount = 1
+        
+        adapter = PostgreSQLAdapter()
+        adapter.connection = mock_conn
+        rows = [{
+            'data_hash': 'abc', 'discovery_data': None, 'encoding': 'keyframe',
+            'payload': b'\x00\x01', 'discovered_at': '2024-01-01 00:00:00'
+        }]
+        loaded = adapter.load_discovery_history(3, rows, [{'hostname': 'nas'}])
+        
+        copy_sql, buffer = mock_cursor.copy_expert.call_args[0]
+        assert copy_sql.startswith('COPY history_load')
+        assert buffer.getvalue() == 'abc\t\\N\tkeyframe\t\\\\x0001\t2024-01-01 00:00:00\thostname nas\t0\n'
+        insert_sql = [call[0][0] for call in mock_cursor.execute.call_args_list if 'FROM history_load' in call[0][0]]
+        assert 'ON CONFLICT (device_id, data_hash) DO NOTHING' in insert_sql[0]
+        assert loaded == 1
+        mock_conn.commit.assert_called_once()
+    
+    def test_load_device_metrics_copies_through_staging(self, mock_connection):
+        """Test that metrics are bulk-loaded with COPY, skipping samples already stored."""
+        mock_conn, mock_cursor = mock_connection
+        mock_cursor.rowcount = 2
+        
+        adapter = PostgreSQLAdapter()
+        adapter.connection = mock_conn
+        rows = [
+            {'metrics': '{"uptime": "up 1 day"}', 'collected_at': '2024-01-01 00:00:00'},
+            {'metrics': {'uptime': 'up 2 days'}, 'collected_at': datetime(2024, 1, 2)}
+        ]
+        loaded = adapter.load_device_metrics(3, rows)
+        
+        copy_sql, buffer = mock_cursor.copy_expert.call_args[0]
+        assert copy_sql.startswith('COPY metrics_load (metrics, collected_at, seq)')
+        assert buffer.getvalue() == (
+            '{"uptime": "up 1 day"}\t2024-01-01 00:00:00\t0\n'
+            '{"uptime": "up 2 days"}\t2024-01-02T00:00:00\t1\n'
+        )
+        insert_sql = [call[0][0] for call in mock_cursor.execute.call_args_list if 'FROM metrics_load' in call[0][0]]
+        assert 'WHERE NOT EXISTS' in insert_sql[0]
+        assert loaded == 2
+        mock_conn.commit.assert_called_once()
+    
+    def test_metrics_digests_match_across_representations(self, mock_connection):
+        """Test that JSONB/TIMESTAMP samples digest like the same samples stored as SQLite text."""
+        mock_conn, mock_cursor = mock_connection
+        adapter = PostgreSQLAdapter()
+        adapter.connection = mock_conn
+        
+        mock_cursor.__iter__.return_value = iter([
+            (3, {'uptime': 'up 1 day', 'load': 0.5}, datetime(2024, 1, 1, 12, 0, 0))
+        ])
+        from_postgresql = adapter.get_metrics_digests([3, 4])
+        mock_cursor.__iter__.return_value = iter([
+            (3, '{"load": 0.5, "uptime": "up 1 day"}', '2024-01-01 12:00:00')
+        ])
+        from_text = adapter.get_metrics_digests([3, 4])
+        
+        assert from_postgresql == from_text
+        assert from_postgresql[3] != from_postgresql[4]
+    
+    def test_search_history_uses_tsvector(self, mock_connection):
+        """Test that PostgreSQL history search ANDs one phrase query per phrase."""
+        mock_conn, mock_cursor = mock_connection
+        mock_cursor.fetchall.return_value = [{
+            'history_id': 4, 'device_id': 2, 'hostname': 'nas', 'connection_ip': '10.0.0.5',
+            'discovered_at': datetime(2024, 1, 2, 3, 4, 5), 'score': 0.3
+        }]
+        
+        adapter = PostgreSQLAdapter()
+        adapter.connection = mock_conn
+        hits = adapter.search_history(['enp3s0', '10 0 5'], device_id=2, limit=5)
+        
+        query, params = mock_cursor.execute.call_args[0]
+        assert "phraseto_tsquery('simple', %s) && phraseto_tsquery('simple', %s)" in query
+        assert 'h.search_vector @@ q.query' in query
+        assert params == ['enp3s0', '10 0 5', 2, 5]
+        assert hits[0]['discovered_at'] == '2024-01-02T03:04:05'
+    
+    def test_store_devices_bulk_dedupes_and_maps_ids(self, mock_connection):
+        """Test that bulk upserts send each key once and return ids in input order."""
+        mock_conn, mock_cursor = mock_connection
+        
+        adapter = PostgreSQLAdapter()
+        adapter.connection = mock_conn
+        
+        now = datetime.now().isoformat()
+        devices = [
+            {'hostname': 'a', 'connection_ip': '10.0.0.1', 'last_seen': now, 'status': 'success'},
+            {'hostname': 'b', 'connection_ip': '10.0.0.2', 'last_seen': now, 'status': 'success'},
+            {'hostname': 'a', 'connection_ip': '10.0.0.1', 'last_seen': now, 'status': 'error'}
+        ]
+        
+        with patch('src.homelab_mcp.database.psycopg2.extras.execute_values') as mock_execute_values:
+            mock_execute_values.return_value = [(7,), (8,)]
+            device_ids = adapter.store_devices_bulk(devices)
+        
+        rows = mock_execute_values.call_args[0][2]
+        assert [(row[0], row[3]) for row in rows] == [('a', 'error'), ('b', 'success')]
+        assert device_ids == [7, 8, 7]
+        mock_conn.commit.assert_called_once()
+    
+    def test_store_devices_bulk_rolls_back_on_error(self, mock_connection):
+        """Test that a failed batch is rolled back as a whole."""
+        mock_conn, mock_cursor = mock_connection
+        
+        adapter = PostgreSQLAdapter()
+        adapter.connection = mock_conn
+        
+        with patch('src.homelab_mcp.database.psycopg2.extras.execute_values') as mock_execute_values:
+            mock_execute_values.side_effect = Exception("invalid input syntax for type inet")
+            with pytest.raises(Exception, match="inet"):
+                adapter.store_devices_bulk([{
+                    'hostname': 'a', 'connection_ip': 'unknown',
+                    'last_seen': datetime.now().isoformat(), 'status': 'error'
+                }])
+        
+        mock_conn.rollback.assert_called_once()
+        mock_conn.commit.assert_not_called()
+    
+    def test_get_device_by_ip_uses_inet_comparison(self, mock_connection):
+        """Test IP lookups compare as INET and skip the query for non-addresses."""
+        mock_conn, mock_cursor = mock_connection
+        mock_cursor.fetchone.return_value = None
+        
+        adapter = PostgreSQLAdapter()
+        adapter.connection = mock_conn
+        
+        assert adapter.get_device_by_ip('not-an-ip') is None
+        mock_cursor.execute.assert_not_called()
+        
+        assert adapter.get_device_by_ip('192.168.1.20') is None
+        query, params = mock_cursor.execute.call_args[0]
+        assert 'connection_ip = %s::inet' in query
+        assert params == ('192.168.1.20',)
+    
+    def test_get_devices_page_projects_jsonb_fields(self, mock_connection):
+        """Test that PostgreSQL pages select JSONB paths and bind filters and the keyset."""
+        mock_conn, mock_cursor = mock_connection
+        mock_cursor.fetchall.return_value = [
+            {'id': 7, 'hostname': 'web', 'os_info': 'Ubuntu', 'last_seen': datetime(2024, 1, 2, 3, 4, 5)}
+        ]
+        
+        adapter = PostgreSQLAdapter()
+        adapter.connection = mock_conn
+        devices = adapter.get_devices_page(
+            fields=['os_info', 'last_seen'], limit=51, after=('db', 3),
+            filters={'connection_ip': '10.0.0.5'}
+        )
+        
+        query, params = mock_cursor.execute.call_args[0]
+        assert "system_info->'os' AS os_info" in query
+        assert 'connection_ip = %s::inet AND (hostname, id) > (%s, %s)' in query
+        assert 'ORDER BY hostname, id LIMIT %s' in query
+        assert params == ['10.0.0.5', 'db', 3, 51]
+        assert devices[0]['last_seen'] == '2024-01-02T03:04:05'
+        
+        with pytest.raises(ValueError, match="connection_ip"):
+            adapter.count_devices({'connection_ip': 'not-an-ip'})
+    
+    def test_iter_devices_uses_named_cursor(self, mock_connection):
+        """Test that PostgreSQL iteration uses a server-side cursor sized by batch_size."""
+        mock_conn, mock_cursor = mock_connection
+        mock_cursor.__iter__.return_value = iter([
+            {'id': 1, 'hostname': 'web', 'system_info': {'os': 'Ubuntu'}}
+        ])
+        
+        adapter = PostgreSQLAdapter()
+        adapter.connection = mock_conn
+        devices = list(adapter.iter_devices(batch_size=250))
+        
+        assert mock_conn.cursor.call_args.kwargs['name'].startswith('iter_devices_')
+        assert mock_cursor.itersize == 250
+        assert devices[0]['os_info'] == 'Ubuntu'
+        mock_cursor.close.assert_called_once()
+    
+    def test_find_devices_by_resources_binds_values(self, mock_connection):
+        """Test that resource conditions become bound parameters on the typed columns."""
+        mock_conn, mock_cursor = mock_connection
+        mock_cursor.fetchall.return_value = []
+        
+        adapter = PostgreSQLAdapter()
+        adapter.connection = mock_conn
+        adapter.find_devices_by_resources([('cpu_cores', '>=', 4), ('disk_use_ratio', '<', 0.5)])
+        
+        query, params = mock_cursor.execute.call_args[0]
+        assert "cpu_cores >= %s AND disk_use_ratio < %s" in query
+        assert params == [4, 0.5]
+    
+    def test_calls_check_out_pooled_connections(self, mock_connection):
+        """Test that without a bound connection each call borrows one from the shared pool."""
+        mock_conn, mock_cursor = mock_connection
+        mock_conn.closed = 0
+        mock_cursor.fetchall.return_value = []
+        
+        with patch('src.homelab_mcp.pg_pool.psycopg2') as pool_psycopg2:
+            pool_psycopg2.connect.return_value = mock_conn
+            adapter = PostgreSQLAdapter({'host': 'pool-test', 'database': 'test'})
+            adapter.find_devices_by_resources([('cpu_cores', '>=', 4)])
+            adapter.find_devices_by_resources([('cpu_cores', '>=', 8)])
+            
+            # The connection goes back to the pool after each call, committed
+            assert adapter.connection is None
+            stats = adapter.pool.get_stats()
+            assert stats['checkouts'] == 2
+            assert stats['created'] == 1
+            assert mock_conn.commit.call_count == 2
+            
+            pool = adapter.pool
+            adapter.close()
+            assert pool.closed
+    
+    def test_calls_between_generator_items_get_their_own_connection(self, mock_connection):
+        """Test that a suspended iterator's checkout isn't reused, or committed, by other calls."""
+        connections = []
+        
+        def connect(**kwargs):
+            conn = MagicMock()
+            conn.closed = 0
+            cursor = conn.cursor.return_value
+            cursor.__iter__.return_value = iter([
+                {'id': i, 'hostname': f'host-{i}', 'system_info': {}} for i in range(2)
+            ])
+            cursor.fetchall.return_value = []
+            connections.append(conn)
+            return conn
+        
+        with patch('src.homelab_mcp.pg_pool.psycopg2') as pool_psycopg2:
+            pool_psycopg2.connect.side_effect = connect
+            adapter = PostgreSQLAdapter({'host': 'generator-test', 'database': 'test'})
+            devices = adapter.iter_devices(batch_size=1)
+            
+            assert next(devices)['hostname'] == 'host-0'
+            assert adapter.connection is None
+            adapter.find_devices_by_resources([('cpu_cores', '>=', 4)])
+            
+            iterating, other = connections
+            iterating.commit.assert_not_called()
+            other.commit.assert_called_once()
+            assert [d['hostname'] for d in devices] == ['host-1']
+            iterating.commit.assert_called_once()
+            adapter.close()
+    
+    def test_close_returns_pooled_connections_through_the_pool(self, mock_connection):
+        """Test that closing mid-operation leaves the checkout to the pool and keeps its counts right."""
+        mock_conn, mock_cursor = mock_connection
+        mock_conn.closed = 0
+        
+        with patch('src.homelab_mcp.pg_pool.psycopg2') as pool_psycopg2:
+            pool_psycopg2.connect.return_value = mock_conn
+            adapter = PostgreSQLAdapter({'host': 'close-test', 'database': 'test'})
+            pool = adapter.pool
+            
+            # A caller's close lands while an operation still holds its checkout
+            mock_cursor.fetchall.side_effect = lambda: adapter.close() or []
+            adapter.find_devices_by_resources([('cpu_cores', '>=', 4)])
+            
+            stats = pool.get_stats()
+            assert pool.closed
+            assert (stats['size'], stats['in_use'], stats['discarded']) == (0, 0, 0)
+            mock_conn.commit.assert_called_once()
+            mock_conn.close.assert_called_once()
+        
+        explicit = MagicMock()
+        adapter = PostgreSQLAdapter({'host': 'close-test', 'database': 'test'})
+        adapter.connection = explicit
+        adapter.close()
+        explicit.close.assert_called_once()
+        assert adapter.connection is None
+
+
+class TestAsyncDatabaseAdapter:
+    """Test the async database layer."""
+    
+    @pytest.fixture
+    def temp_db(self):
+        """Create a temporary database file."""
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as tmp:
+            db_path = tmp.name
+        yield db_path
+        for path in (db_path, f'{db_path}-wal', f'{db_path}-shm'):
+            if os.path.exists(path):
+                os.unlink(path)
+    
+    @pytest.mark.asyncio
+    async def test_sqlite_round_trip_on_worker_thread(self, temp_db):
+        """Test that SQLite calls run on the dedicated DB thread."""
+        adapter = SQLiteAdapter(temp_db)
+        adapter.init_schema()
+        async_db = get_async_database_adapter(adapter)
+        
+        device_id = await async_db.store_device({
+            'hostname': 'test-server',
+            'connection_ip': '192.168.1.10',
+            'last_seen': datetime.now().isoformat(),
+            'status': 'success'
+        })
+        await async_db.store_discovery_history(device_id, '{"a": 1}', calculate_data_hash('{"a": 1}'))
+        
+        devices = await async_db.get_all_devices()
+        streamed = [d async for d in async_db.iter_devices(batch_size=1)]
+        changes = await async_db.get_device_changes(device_id)
+        rows = await async_db.run('execute_query', 'SELECT 1 AS one')
+        
+        assert async_db.max_workers == 1
+        assert [d['hostname'] for d in devices] == ['test-server']
+        assert [d['id'] for d in streamed] == [device_id]
+        assert changes[0]['data'] == {'a': 1}
+        assert rows == [{'one': 1}]
+        
+        await async_db.close()
+    
+    @pytest.mark.asyncio
+    async def test_sqlite_reads_run_on_reader_threads(self, temp_db):
+        """Test that under WAL reads use their own connections while writes stay on the writer."""
+        adapter = SQLiteAdapter(temp_db, profile='tuned')
+        adapter.init_schema()
+        async_db = get_async_database_adapter(adapter)
+        
+        device_id = await async_db.store_device({
+            'hostname': 'test-server', 'connection_ip': '192.168.1.10',
+            'last_seen': datetime.now().isoformat(), 'status': 'success'
+        })
+        reader_threads = set()
+        original_call = async_db._call
+        
+        def record_thread(method, *args):
+            if method == 'get_device':
+                reader_threads.add(threading.current_thread().name)
+            return original_call(method, *args)
+        
+        async_db._call = record_thread
+        device = await async_db.get_device(device_id)
+        
+        assert device['hostname'] == 'test-server'
+        assert reader_threads and all(name.startswith('mcp-db-read') for name in reader_threads)
+        reader = async_db._worker_adapters[0]
+        assert reader is not adapter and reader.connection is None
+        with pytest.raises(sqlite3.OperationalError, match='readonly'):
+            reader._reader().execute('DELETE FROM devices')
+        
+        await async_db.close()
+    
+    @pytest.mark.asyncio
+    async def test_slow_call_does_not_block_event_loop(self):
+        """Test that a slow DB call leaves the event loop free for other work."""
+        adapter = MagicMock()
+        worker_threads = []
+        
+        def slow_get_all_devices():
+            worker_threads.append(threading.current_thread())
+            time.sleep(0.2)
+            return []
+        
+        adapter.get_all_devices.side_effect = slow_get_all_devices
+        async_db = AsyncDatabaseAdapter(adapter)
+        
+        ticks = 0
+        
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+        
+        ticker_task = asyncio.create_task(ticker())
+        await async_db.get_all_devices()
+        ticker_task.cancel()
+        
+        assert ticks >= 5
+        assert worker_threads[0] is not threading.current_thread()
+        
+        await async_db.close()
+    
+    @pytest.mark.asyncio
+    async def test_pooled_workers_use_their_own_adapters(self):
+        """Test that multi-worker mode gives each thread its own adapter."""
+        created = []
+        barrier = threading.Barrier(2, timeout=5)
+        
+        def factory():
+            adapter = MagicMock()
+            
+            def query(query, params=None):
+                # Both workers must be inside a query at once
+                barrier.wait()
+                return [{'adapter': id(adapter)}]
+            
+            adapter.execute_query.side_effect = query
+            created.append(adapter)
+            return adapter
+        
+        async_db = AsyncDatabaseAdapter(MagicMock(), max_workers=2, adapter_factory=factory)
+        results = await asyncio.gather(
+            async_db.execute_query('SELECT 1'),
+            async_db.execute_query('SELECT 1')
+        )
+        
+        assert len(created) == 2
+        assert results[0] != results[1]
+        
+        await async_db.close()
+        for adapter in created:
+            adapter.close.assert_called_once()
+    
+    def test_multiple_workers_require_factory(self):
+        """Test that sharing one connection across workers is rejected."""
+        with pytest.raises(ValueError, match="adapter_factory"):
+            AsyncDatabaseAdapter(MagicMock(), max_workers=2)
+    
+    @pytest.mark.skipif(not POSTGRESQL_AVAILABLE, reason="psycopg2 not available")
+    def test_postgresql_gets_worker_pool(self):
+        """Test that PostgreSQL adapters get a pool of per-thread connections."""
+        adapter = PostgreSQLAdapter({'host': 'localhost', 'database': 'test'})
+        
+        with patch.dict(os.environ, {'DB_ASYNC_WORKERS': '3'}):
+            async_db = get_async_database_adapter(adapter)
+        
+        assert async_db.max_workers == 3
+        worker_adapter = async_db._adapter_factory()
+        assert isinstance(worker_adapter, PostgreSQLAdapter)
+        assert worker_adapter is not adapter
+        assert worker_adapter.connection_params == adapter.connection_params
 
 
 class TestDatabaseFactory:
@@ -300,6 +1298,44 @@ class TestDatabaseConfig:
             config = DatabaseConfig()
             config.db_type = 'postgresql'
             assert config.is_postgresql_configured()
+    
+    def test_metrics_retention_validated(self):
+        """Test that a negative metrics retention is reported by validate."""
+        with patch.dict(os.environ, {'DEVICE_METRICS_RETENTION': '-1'}):
+            errors = MCPConfig().validate()
+        assert "DEVICE_METRICS_RETENTION must not be negative" in errors
+    
+    def test_storage_settings_from_env(self):
+        """Test that the SQLite profile and history codec come from config and reach the adapter."""
+        env_vars = {
+            'SQLITE_PROFILE': 'Default',
+            'HISTORY_COMPRESSION': 'NONE',
+            'HISTORY_KEYFRAME_INTERVAL': '5'
+        }
+        
+        with patch.dict(os.environ, env_vars):
+            config = MCPConfig()
+            adapter = SQLiteAdapter(':memory:')
+        
+        assert config.validate() == []
+        assert (config.database.sqlite_profile, config.database.history_compression) == ('default', 'none')
+        assert adapter.profile == 'default'
+        assert (adapter.history_codec.compression, adapter.history_codec.keyframe_interval) == ('none', 5)
+    
+    def test_storage_settings_validated(self):
+        """Test that an unknown profile or compression and a non-positive keyframe interval are reported."""
+        env_vars = {
+            'SQLITE_PROFILE': 'turbo',
+            'HISTORY_COMPRESSION': 'lz4',
+            'HISTORY_KEYFRAME_INTERVAL': '0'
+        }
+        
+        with patch.dict(os.environ, env_vars):
+            errors = MCPConfig().validate()
+        
+        assert "SQLITE_PROFILE must be one of: default, tuned" in errors
+        assert "HISTORY_COMPRESSION must be one of: none, zlib, zstd" in errors
+        assert "HISTORY_KEYFRAME_INTERVAL must be greater than 0" in errors
 
 
 class TestUtilityFunctions:
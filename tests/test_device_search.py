@@ -0,0 +1,73 @@
+"""Tests for the device search grammar."""
+
+import ipaddress
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.homelab_mcp.device_search import compile_search, ipv4_int, parse_search
+
+
+def test_parse_search_terms():
+    """Test parsing each field type into typed values."""
+    terms = parse_search('os:"Ubuntu 22" cores>=8 memory>16G disk<50% subnet:10.0.0.7/24 status:success seen<2h')
+    
+    assert terms == [
+        ('os', '=', 'ubuntu 22'),
+        ('cores', '>=', 8),
+        ('memory', '>', 16 * 1024 ** 3),
+        ('disk', '<', 0.5),
+        ('subnet', '=', ipaddress.ip_network('10.0.0.0/24')),
+        ('status', '=', 'success'),
+        ('seen', '<', timedelta(hours=2))
+    ]
+
+
+@pytest.mark.parametrize("query, message", [
+    ("color:blue", "Unknown search field"),
+    ("cores>=many", "Invalid value for cores"),
+    ("os>ubuntu", "only supports"),
+    ("ubuntu", "Invalid search term"),
+    ('os:"unterminated', "Invalid search query")
+])
+def test_parse_search_rejects_bad_terms(query, message):
+    """Test that malformed queries raise ValueError."""
+    with pytest.raises(ValueError, match=message):
+        parse_search(query)
+
+
+def test_compile_sqlite():
+    """Test that SQLite terms use index-friendly ranges with bound values."""
+    now = datetime(2024, 1, 2, 12, 0, 0)
+    where, params = compile_search(
+        parse_search('os:ubuntu cores>=8 subnet:192.168.10.0/24 seen<1h'), 'sqlite', now
+    )
+    
+    assert where == (
+        'lower(os_info) >= ? AND lower(os_info) < ? AND cpu_cores >= ? '
+        'AND connection_ipv4 BETWEEN ? AND ? AND last_seen > ?'
+    )
+    assert params == [
+        'ubuntu', 'ubuntv', 8,
+        ipv4_int('192.168.10.0'), ipv4_int('192.168.10.255'),
+        '2024-01-02T11:00:00'
+    ]
+
+
+def test_compile_postgresql():
+    """Test that PostgreSQL terms use the JSONB expression and INET operators."""
+    now = datetime(2024, 1, 2, 12, 0, 0)
+    where, params = compile_search(
+        parse_search('os:my_os subnet:fd00::/64 seen>7d'), 'postgresql', now
+    )
+    
+    assert where == (
+        "lower(system_info->>'os') LIKE %s AND connection_ip <<= %s::inet AND last_seen < %s"
+    )
+    assert params == ['my\\_os%', 'fd00::/64', now - timedelta(days=7)]
+
+
+def test_ipv6_subnet_needs_postgresql():
+    """Test that SQLite, which only stores integer IPv4 addresses, rejects IPv6 subnets."""
+    with pytest.raises(ValueError, match="IPv6"):
+        compile_search(parse_search('subnet:fd00::/64'), 'sqlite')
@@ -0,0 +1,91 @@
+"""Tests for hardware inventory extraction and lookups."""
+
+import pytest
+
+from src.homelab_mcp.hardware import compile_hardware_query, extract_inventory
+
+
+def make_snapshot():
+    """Build a discovery snapshot with USB, PCI and block devices."""
+    return {
+        "status": "success",
+        "hostname": "nvr",
+        "data": {
+            "usb_devices": [
+                {"bus": "002", "device": "003", "vendor_id": "18D1", "product_id": "9302",
+                 "description": "Google Inc."}
+            ],
+            "pci_devices": [
+                {"slot": "01:00.0", "class": "VGA compatible controller", "type": "graphics",
+                 "description": "NVIDIA Corporation GA106 [GeForce RTX 3060]"}
+            ],
+            "block_devices": [
+                {"name": "nvme0n1", "size": "1.8T", "model": "Samsung SSD 980 PRO 2TB", "partitions": []}
+            ]
+        }
+    }
+
+
+def test_extract_inventory():
+    """Test that hardware lists are normalized into table rows."""
+    inventory = extract_inventory(make_snapshot())
+    
+    assert inventory["usb"] == [("18d1", "9302", "002", "003", "Google Inc.")]
+    assert inventory["pci"] == [
+        ("01:00.0", "vga compatible controller", "graphics", "NVIDIA Corporation GA106 [GeForce RTX 3060]")
+    ]
+    assert inventory["block"] == [("nvme0n1", "Samsung SSD 980 PRO 2TB", "1.8T", int(1.8 * 1024 ** 4))]
+
+
+def test_extract_inventory_without_hardware():
+    """Test that error snapshots and raw data yield an empty inventory."""
+    assert extract_inventory({"status": "error"}) == {"usb": [], "pci": [], "block": []}
+    assert extract_inventory({"raw_data": "x"}) == {"usb": [], "pci": [], "block": []}
+
+
+def test_compile_hardware_query():
+    """Test that criteria become bound conditions for each dialect."""
+    query, params = compile_hardware_query("block", {"model": "Samsung", "min_size": "1T"}, "postgresql")
+    
+    assert "FROM hardware_block h JOIN devices d" in query
+    assert "lower(h.model) LIKE %s AND h.size_bytes >= %s" in query
+    assert params == ["samsung%", 1024 ** 4]
+    
+    query, params = compile_hardware_query("usb", {"vendor_id": "18D1"}, "sqlite")
+    assert "h.vendor_id = ?" in query
+    assert params == ["18d1"]
+
+
+@pytest.mark.parametrize("dialect", ["sqlite", "postgresql"])
+def test_compile_hardware_query_escapes_description_wildcards(dialect):
+    """Test that '%' and '_' in a description search match literally on both backends."""
+    query, params = compile_hardware_query("usb", {"description": "100%_Hub"}, dialect)
+    
+    assert "lower(h.description) LIKE" in query
+    assert "ESCAPE '\\'" in query
+    assert params == ["%100\\%\\_hub%"]
+
+
+@pytest.mark.parametrize("model, where, params", [
+    ("", "1 = 1", []),
+    ("wd\U0010ffff", "lower(h.model) >= ? AND lower(h.model) < ?", ["wd\U0010ffff", "we"]),
+    ("\U0010ffff", "lower(h.model) >= ?", ["\U0010ffff"]),
+    ("x\ud7ff", "lower(h.model) >= ? AND lower(h.model) < ?", ["x\ud7ff", "x\ue000"])
+])
+def test_compile_hardware_query_model_prefix_edges(model, where, params):
+    """Test that empty and maximal-code-point model prefixes compile to valid ranges."""
+    query, bound = compile_hardware_query("block", {"model": model}, "sqlite")
+    
+    assert f"WHERE {where}\n" in query
+    assert bound == params
+
+
+@pytest.mark.parametrize("kind, criteria, message", [
+    ("gpu", {}, "Unknown hardware kind"),
+    ("usb", {"model": "x"}, "Unsupported usb criteria"),
+    ("block", {"min_size": "huge"}, "Invalid size")
+])
+def test_compile_hardware_query_rejects_bad_input(kind, criteria, message):
+    """Test that unknown kinds, criteria and sizes raise ValueError."""
+    with pytest.raises(ValueError, match=message):
+        compile_hardware_query(kind, criteria, "sqlite")
@@ -0,0 +1,72 @@
+"""Tests for discovery history delta encoding."""
+
+import pytest
+
+from src.homelab_mcp.history_codec import (
+    HistoryCodec,
+    apply_patch,
+    decode_chain,
+    make_patch,
+    pack,
+    unpack
+)
+
+
+def test_patch_round_trip():
+    """Test that applying a diff reproduces the new document."""
+    old = {
+        "hostname": "server",
+        "data": {"os": "Ubuntu 22.04", "a/b": 1, "tilde~": 2, "usb": ["x", "y"], "gone": True}
+    }
+    new = {
+        "hostname": "server",
+        "data": {"os": "Ubuntu 24.04", "a/b": 3, "tilde~": 2, "usb": ["x"], "added": {"k": 1}}
+    }
+    
+    patch = make_patch(old, new)
+    
+    assert apply_patch(old, patch) == new
+    assert old["data"]["os"] == "Ubuntu 22.04"  # Source not mutated
+    assert {"op": "remove", "path": "/data/gone"} in patch
+    assert {"op": "replace", "path": "/data/a~1b", "value": 3} in patch
+
+
+def test_patch_of_identical_documents_is_empty():
+    """Test that unchanged snapshots produce no operations."""
+    snapshot = {"data": {"cpu": {"count": 4}}}
+    
+    assert make_patch(snapshot, dict(snapshot)) == []
+
+
+@pytest.mark.parametrize("compression", ["none", "zlib", "zstd"])
+def test_pack_round_trip(compression):
+    """Test packing with each compression setting."""
+    value = {"data": {"pci_devices": ["00:02.0 VGA"] * 20}}
+    
+    encoding, payload = pack("keyframe", value, compression)
+    
+    assert encoding.startswith("keyframe")
+    assert unpack(encoding, payload) == ("keyframe", value)
+
+
+def test_codec_inserts_keyframes_at_interval():
+    """Test that long chains are broken up by periodic keyframes."""
+    codec = HistoryCodec(compression="none", keyframe_interval=3)
+    snapshots = [{"rev": i} for i in range(7)]
+    rows = [
+        {"encoding": encoding, "payload": payload, "discovery_data": None}
+        for encoding, payload in codec.reencode(
+            [{"encoding": None, "payload": None, "discovery_data": s} for s in snapshots]
+        )
+    ]
+    
+    assert [row["encoding"] for row in rows] == [
+        "keyframe", "delta", "delta", "keyframe", "delta", "delta", "keyframe"
+    ]
+    assert decode_chain(rows) == snapshots
+
+
+def test_unsupported_compression():
+    """Test that unknown compression names are rejected."""
+    with pytest.raises(ValueError, match="compression"):
+        HistoryCodec(compression="lzma")
@@ -0,0 +1,28 @@
+"""Tests for discovery history full-text documents and queries."""
+
+import pytest
+
+from src.homelab_mcp.history_search import fts5_match, parse_history_query, search_text
+
+
+def test_search_text_flattens_keys_and_values():
+    """Test that nested keys and scalar values become lowercase tokens."""
+    snapshot = {
+        "hostname": "NAS-01",
+        "data": {"network_interfaces": [{"name": "enp3s0", "addresses": ["10.0.5.23/24"]}], "gpu": None}
+    }
+    
+    assert search_text(snapshot) == "hostname nas 01 data network interfaces name enp3s0 addresses 10 0 5 23 24 gpu"
+
+
+def test_parse_history_query_keeps_quoted_phrases():
+    """Test that quoted terms stay together as one phrase."""
+    assert parse_history_query('enp3s0 "10.0.5"') == ["enp3s0", "10 0 5"]
+    assert fts5_match(["enp3s0", "10 0 5"]) == '"enp3s0" AND "10 0 5"'
+
+
+@pytest.mark.parametrize("query", ["", "  ...  ", '"unterminated'])
+def test_parse_history_query_rejects_empty_or_invalid(query):
+    """Test that queries without searchable terms are rejected."""
+    with pytest.raises(ValueError, match="history query"):
+        parse_history_query(query)
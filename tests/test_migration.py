@@ -0,0 +1,369 @@
+"""Tests for database migration utilities."""
+
+import json
+import os
+import tempfile
+import sqlite3
+import threading
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from src.homelab_mcp.database import SQLiteAdapter, calculate_data_hash
+from src.homelab_mcp.migration import DatabaseMigrator, migrate_sqlite_to_postgresql
+
+
+@pytest.fixture
+def temp_db_paths():
+    """Create two temporary database files for source and target."""
+    paths = []
+    for _ in range(2):
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as tmp:
+            paths.append(tmp.name)
+    yield paths
+    for path in paths:
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+@pytest.fixture
+def source(temp_db_paths):
+    """Create a source database with a few devices and some history."""
+    adapter = SQLiteAdapter(temp_db_paths[0])
+    adapter.init_schema()
+    
+    for i in range(5):
+        device_id = adapter.store_device({
+            'hostname': f'server-{i}',
+            'connection_ip': f'192.168.1.{i + 10}',
+            'last_seen': datetime.now().isoformat(),
+            'status': 'success',
+            'cpu_cores': 4,
+            'os_info': 'Ubuntu 22.04'
+        })
+        discovery_data = json.dumps({'hostname': f'server-{i}'})
+        adapter.store_discovery_history(device_id, discovery_data, calculate_data_hash(discovery_data))
+    
+    yield adapter
+    adapter.close()
+
+
+@pytest.fixture
+def target(temp_db_paths):
+    """Create an empty target database."""
+    adapter = SQLiteAdapter(temp_db_paths[1])
+    adapter.init_schema()
+    yield adapter
+    adapter.close()
+
+
+class TestDatabaseMigrator:
+    """Test the DatabaseMigrator class."""
+    
+    def test_migrate_devices_in_batches(self, source, target):
+        """Test that devices and history are migrated through bulk upserts."""
+        migrator = DatabaseMigrator(source, target)
+        bulk_calls = []
+        store_devices_bulk = target.store_devices_bulk
+        
+        def counting_bulk(devices):
+            bulk_calls.append(len(devices))
+            return store_devices_bulk(devices)
+        
+        target.store_devices_bulk = counting_bulk
+        migrated, errors = migrator.migrate_devices(batch_size=2)
+        
+        assert (migrated, errors) == (5, 0)
+        assert bulk_calls == [2, 2, 1]
+        assert len(target.get_all_devices()) == 5
+        for device in target.get_all_devices():
+            assert len(target.get_device_changes(device['id'])) == 1
+        assert migrator.verify_migration()
+    
+    def test_verify_migration_pinpoints_differing_ranges(self, source, target):
+        """Test that only chunks containing a changed, missing or extra device are reported."""
+        migrator = DatabaseMigrator(source, target)
+        migrator.migrate_devices()
+        assert migrator.verify_migration(chunk_size=2)
+        
+        target.execute_query("UPDATE devices SET os_info = 'Debian 12' WHERE hostname = 'server-3'")
+        target.connection.commit()
+        assert not migrator.verify_migration(chunk_size=2)
+        assert migrator.mismatched_ranges == [{
+            'first_key': ['server-2', '192.168.1.12'],
+            'last_key': ['server-3', '192.168.1.13'],
+            'missing': [], 'extra': [], 'changed': [('server-3', '192.168.1.13')]
+        }]
+        
+        target.execute_query("DELETE FROM devices WHERE hostname = 'server-0'")
+        target.connection.commit()
+        assert not migrator.verify_migration(chunk_size=2)
+        assert migrator.mismatched_ranges[0]['missing'] == [('server-0', '192.168.1.10')]
+        assert len(migrator.mismatched_ranges) == 2
+    
+    def test_verify_migration_compares_history(self, source, target):
+        """Test that a device whose history differs fails verification."""
+        migrator = DatabaseMigrator(source, target)
+        migrator.migrate_devices()
+        
+        device_id = target.get_device_by_hostname('server-1')['id']
+        discovery_data = json.dumps({'hostname': 'server-1', 'extra': True})
+        target.store_discovery_history(device_id, discovery_data, calculate_data_hash(discovery_data))
+        
+        assert not migrator.verify_migration()
+        assert migrator.mismatched_ranges[0]['changed'] == [('server-1', '192.168.1.11')]
+    
+    def test_verify_migration_compares_metrics(self, source, target):
+        """Test that a device whose metrics samples differ fails verification."""
+        device_id = source.get_device_by_hostname('server-3')['id']
+        source.store_device_metrics(device_id, {'uptime': 'up 1 day', 'memory.used': '2G'})
+        migrator = DatabaseMigrator(source, target)
+        migrator.migrate_devices()
+        assert migrator.verify_migration()
+        
+        target.execute_query("UPDATE device_metrics SET metrics = '{\"uptime\": \"up 2 days\"}'")
+        target.connection.commit()
+        
+        assert not migrator.verify_migration()
+        assert migrator.mismatched_ranges[0]['changed'] == [('server-3', '192.168.1.13')]
+    
+    def test_migrate_devices_is_idempotent(self, source, target):
+        """Test that re-running the migration updates rather than duplicates."""
+        migrator = DatabaseMigrator(source, target)
+        migrator.migrate_devices()
+        migrator.migrate_devices()
+        
+        assert len(target.get_all_devices()) == 5
+    
+    def test_migrate_devices_copies_metrics(self, source, target):
+        """Test that metrics samples are copied with their timestamps and not duplicated on rerun."""
+        device_id = source.get_device_by_hostname('server-1')['id']
+        for used in ('1G', '2G', '3G'):
+            source.store_device_metrics(device_id, {'memory.used': used})
+        source.connection.execute(
+            "UPDATE device_metrics SET collected_at = '2024-01-0' || id || ' 00:00:00'"
+        )
+        source.connection.commit()
+        
+        migrator = DatabaseMigrator(source, target)
+        migrator.migrate_devices(batch_size=2)
+        migrator.migrate_devices(batch_size=2)
+        
+        target_id = target.get_device_by_hostname('server-1')['id']
+        assert target.get_device_metrics(target_id) == source.get_device_metrics(device_id)
+        assert [m['metrics']['memory.used'] for m in target.get_device_metrics(target_id)] == ['3G', '2G', '1G']
+    
+    def test_failed_batch_falls_back_to_single_rows(self, source):
+        """Test that a failing batch is retried per device so only bad rows error."""
+        target = MagicMock()
+        target.store_devices_bulk.side_effect = Exception("batch rejected")
+        target.store_device.side_effect = [1, Exception("bad row"), 3, 4, 5]
+        target.load_discovery_history.return_value = 1
+        
+        migrator = DatabaseMigrator(source, target)
+        migrated, errors = migrator.migrate_devices()
+        
+        assert (migrated, errors) == (4, 1)
+        assert target.store_device.call_count == 5
+    
+    def test_interrupted_migration_resumes_from_checkpoint(self, source, target, temp_db_paths):
+        """Test that a rerun skips batches recorded in the checkpoint and copies full history."""
+        checkpoint_path = temp_db_paths[1] + '.checkpoint'
+        device_id = source.get_device_by_hostname('server-4')['id']
+        for i in range(3):
+            discovery_data = json.dumps({'hostname': 'server-4', 'data': {'usb_devices': [], 'rev': i}})
+            source.store_discovery_history(device_id, discovery_data, calculate_data_hash(discovery_data))
+        
+        migrator = DatabaseMigrator(source, target)
+        original = migrator._migrate_batch
+        calls = []
+        
+        def fail_third_batch(batch):
+            calls.append([d['hostname'] for d in batch])
+            if len(calls) == 3:
+                raise KeyboardInterrupt
+            return original(batch)
+        
+        migrator._migrate_batch = fail_third_batch
+        with pytest.raises(KeyboardInterrupt):
+            migrator.migrate_devices(batch_size=2, checkpoint_path=checkpoint_path)
+        with open(checkpoint_path) as f:
+            assert json.load(f)['devices'] == 4
+        
+        migrator = DatabaseMigrator(source, target)
+        try:
+            migrated, errors = migrator.migrate_devices(batch_size=2, checkpoint_path=checkpoint_path)
+        finally:
+            os.unlink(checkpoint_path)
+        
+        assert (migrated, errors) == (5, 0)
+        assert migrator.rows_per_second > 0
+        target_id = target.get_device_by_hostname('server-4')['id']
+        changes = target.get_device_changes(target_id, limit=10)
+        assert [c['data'].get('data', {}).get('rev') for c in changes] == [2, 1, 0, None]
+        assert [h['hostname'] for h in target.search_history(['server 4', 'rev 2'])] == ['server-4']
+    
+    def test_failed_history_is_an_error_and_retried_on_resume(self, source, target, temp_db_paths):
+        """Test that a device whose history fails isn't counted or checkpointed past."""
+        checkpoint_path = temp_db_paths[1] + '.checkpoint'
+        failing_id = source.get_device_by_hostname('server-2')['id']
+        original = source.iter_history_rows
+        
+        def history_fails_for_server_2(device_id, *args):
+            if device_id == failing_id:
+                raise RuntimeError("read failed")
+            return original(device_id, *args)
+        
+        source.iter_history_rows = history_fails_for_server_2
+        migrator = DatabaseMigrator(source, target)
+        assert migrator.migrate_devices(batch_size=2, checkpoint_path=checkpoint_path) == (4, 1)
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+        assert checkpoint['after'][0] == 'server-1'
+        assert (checkpoint['devices'], checkpoint['errors']) == (2, 0)
+        
+        source.iter_history_rows = original
+        try:
+            migrated, errors = DatabaseMigrator(source, target).migrate_devices(
+                batch_size=2, checkpoint_path=checkpoint_path
+            )
+        finally:
+            os.unlink(checkpoint_path)
+        
+        assert (migrated, errors) == (5, 0)
+        target_id = target.get_device_by_hostname('server-2')['id']
+        assert len(target.get_device_changes(target_id)) == 1
+        assert DatabaseMigrator(source, target).verify_migration()
+    
+    def test_replicate_applies_writes_made_during_and_after_copy(self, source, target):
+        """Test that captured device and history writes reach the target and are acknowledged."""
+        migrator = DatabaseMigrator(source, target)
+        original = migrator.migrate_devices
+        
+        def copy_then_write(*args, **kwargs):
+            result = original(*args, **kwargs)
+            # Lands after server-0's batch was copied
+            source.store_device({
+                'hostname': 'server-0', 'connection_ip': '192.168.1.10',
+                'last_seen': datetime.now().isoformat(), 'status': 'error'
+            })
+            return result
+        
+        migrator.migrate_devices = copy_then_write
+        stop = threading.Event()
+        stop.set()
+        assert migrator.replicate(stop=stop) == 1
+        assert target.get_device_by_hostname('server-0')['status'] == 'error'
+        
+        device_id = source.get_device_by_hostname('server-2')['id']
+        for rev in range(2):
+            discovery_data = json.dumps({'hostname': 'server-2', 'rev': rev})
+            source.store_discovery_history(device_id, discovery_data, calculate_data_hash(discovery_data))
+        source.store_device({'hostname': 'server-9', 'connection_ip': '192.168.1.99',
+                             'last_seen': datetime.now().isoformat(), 'status': 'success'})
+        
+        source.store_device_metrics(device_id, {'uptime': 'up 2 days'})
+        
+        assert migrator.apply_pending_changes(batch_size=2) == 4
+        assert source.read_changes() == []
+        target_id = target.get_device_by_hostname('server-2')['id']
+        assert [c['data'].get('rev') for c in target.get_device_changes(target_id)] == [1, 0, None]
+        assert [m['metrics'] for m in target.get_device_metrics(target_id)] == [{'uptime': 'up 2 days'}]
+        assert migrator.verify_migration()
+        
+        source.disable_change_capture()
+        source.store_device({'hostname': 'server-10', 'connection_ip': '192.168.1.100',
+                             'last_seen': datetime.now().isoformat(), 'status': 'success'})
+        assert source.execute_query("SELECT name FROM sqlite_master WHERE name = 'change_log'") == []
+    
+    def test_replicate_follows_return_to_earlier_inventory(self, source, target):
+        """Test that returning to an earlier snapshot (A -> B -> A) resets the replica's inventory."""
+        migrator = DatabaseMigrator(source, target)
+        source.enable_change_capture()
+        migrator.migrate_devices()
+        
+        device_id = source.get_device_by_hostname('server-1')['id']
+        tpu = {'bus': '002', 'device': '004', 'vendor_id': '1a6e', 'product_id': '089a', 'description': 'Coral'}
+        for usb_devices in ([tpu], [], [tpu]):
+            discovery_data = json.dumps({'hostname': 'server-1', 'data': {'usb_devices': usb_devices}})
+            source.store_discovery_history(device_id, discovery_data, calculate_data_hash(discovery_data))
+            migrator.apply_pending_changes()
+        
+        assert [m['hostname'] for m in target.find_hardware('usb', {'vendor_id': '1a6e'})] == ['server-1']
+        assert source.read_changes() == []
+
+
+@patch('src.homelab_mcp.migration.PostgreSQLAdapter')
+def test_migrate_database_with_original_schema(mock_postgres, temp_db_paths):
+    """Test that a sitemap.db written before the schema upgrades migrates with its history."""
+    conn = sqlite3.connect(temp_db_paths[0])
+    conn.executescript('''
+        CREATE TABLE devices (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            hostname TEXT NOT NULL, connection_ip TEXT NOT NULL,
+            last_seen TEXT NOT NULL, status TEXT NOT NULL,
+            cpu_model TEXT, cpu_cores INTEGER,
+            memory_total TEXT, memory_used TEXT, memory_free TEXT, memory_available TEXT,
+            disk_filesystem TEXT, disk_size TEXT, disk_used TEXT, disk_available TEXT,
+            disk_use_percent TEXT, disk_mount TEXT, network_interfaces TEXT,
+            uptime TEXT, os_info TEXT, error_message TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(hostname, connection_ip)
+        );
+        CREATE TABLE discovery_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            device_id INTEGER, discovery_data TEXT, data_hash TEXT,
+            discovered_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (device_id) REFERENCES devices (id)
+        );
+    ''')
+    conn.execute(
+        "INSERT INTO devices (hostname, connection_ip, last_seen, status, memory_total) "
+        "VALUES ('legacy', '10.0.0.2', ?, 'success', '8G')",
+        (datetime.now().isoformat(),)
+    )
+    for rev in range(2):
+        discovery_data = json.dumps({'hostname': 'legacy', 'rev': rev})
+        conn.execute(
+            "INSERT INTO discovery_history (device_id, discovery_data, data_hash) VALUES (1, ?, ?)",
+            (discovery_data, calculate_data_hash(discovery_data))
+        )
+    conn.commit()
+    conn.close()
+    
+    # Stand in a SQLite target for PostgreSQL so the whole CLI path runs
+    target = SQLiteAdapter(temp_db_paths[1])
+    mock_postgres.return_value = target
+    
+    assert migrate_sqlite_to_postgresql(
+        temp_db_paths[0], {'host': 'db', 'port': 5432, 'database': 'homelab'}
+    )
+    
+    reopened = SQLiteAdapter(temp_db_paths[1])
+    device = reopened.get_device_by_hostname('legacy')
+    assert device['memory_total_bytes'] == 8 * 1024 ** 3
+    assert [c['data']['rev'] for c in reopened.get_device_changes(device['id'])] == [1, 0]
+    reopened.close()
+
+
+@pytest.mark.parametrize("interrupted_step", ["migrate_devices", "tail_changes"])
+@patch('src.homelab_mcp.migration.PostgreSQLAdapter')
+def test_replicate_cli_always_disables_change_capture(mock_postgres, temp_db_paths, source, interrupted_step):
+    """Test that Ctrl+C during the copy or the tail still drops the capture triggers."""
+    mock_postgres.return_value = SQLiteAdapter(temp_db_paths[1])
+    
+    with patch.object(DatabaseMigrator, interrupted_step, side_effect=KeyboardInterrupt):
+        if interrupted_step == 'migrate_devices':
+            with pytest.raises(KeyboardInterrupt):
+                migrate_sqlite_to_postgresql(
+                    temp_db_paths[0], {'host': 'db', 'port': 5432, 'database': 'homelab'}, replicate=True
+                )
+        else:
+            assert migrate_sqlite_to_postgresql(
+                temp_db_paths[0], {'host': 'db', 'port': 5432, 'database': 'homelab'}, replicate=True
+            )
+    
+    reopened = SQLiteAdapter(temp_db_paths[0])
+    assert reopened.execute_query("SELECT name FROM sqlite_master WHERE name = 'change_log'") == []
+    reopened.close()
@@ -0,0 +1,123 @@
+"""Tests for the PostgreSQL connection pool."""
+
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.homelab_mcp.pg_pool import (
+    PostgreSQLConnectionPool,
+    acquire_pg_pool,
+    release_pg_pool
+)
+
+
+def make_conn(**kwargs):
+    """Create a mock psycopg2 connection that reports itself open."""
+    conn = MagicMock()
+    conn.closed = 0
+    return conn
+
+
+@pytest.fixture
+def mock_connect():
+    """Patch psycopg2.connect to hand out a fresh mock connection per call."""
+    with patch('src.homelab_mcp.pg_pool.psycopg2') as mock_psycopg2:
+        mock_psycopg2.connect.side_effect = make_conn
+        yield mock_psycopg2.connect
+
+
+class TestPostgreSQLConnectionPool:
+    """Test PostgreSQLConnectionPool behaviour."""
+    
+    def test_reuses_connections_and_sets_statement_timeout(self, mock_connect):
+        """Test that sequential checkouts share a connection opened with the timeout option."""
+        pool = PostgreSQLConnectionPool({'host': 'db'}, min_size=0, statement_timeout_ms=5000)
+        
+        with pool.connection() as conn1:
+            pass
+        with pool.connection() as conn2:
+            pass
+        
+        assert conn1 is conn2
+        mock_connect.assert_called_once_with(host='db', options='-c statement_timeout=5000')
+        stats = pool.get_stats()
+        assert (stats['created'], stats['reused'], stats['checkouts']) == (1, 1, 2)
+        assert (stats['size'], stats['idle'], stats['in_use']) == (1, 1, 0)
+    
+    def test_each_checkout_is_a_transaction(self, mock_connect):
+        """Test that a block commits on success and rolls back when it raises."""
+        pool = PostgreSQLConnectionPool({'host': 'db'})
+        
+        with pool.connection() as conn:
+            pass
+        conn.commit.assert_called_once()
+        
+        with pytest.raises(ValueError):
+            with pool.connection() as conn:
+                raise ValueError("bad query")
+        conn.rollback.assert_called_once()
+        assert pool.get_stats()['rollbacks'] == 1
+        assert pool.get_stats()['idle'] == 1
+    
+    def test_warm_opens_min_size(self, mock_connect):
+        """Test that warming fills the pool up to min_size once."""
+        pool = PostgreSQLConnectionPool({'host': 'db'}, min_size=3, max_size=5)
+        
+        pool.warm()
+        pool.warm()
+        
+        assert mock_connect.call_count == 3
+        assert pool.get_stats()['idle'] == 3
+    
+    def test_full_pool_waits_then_times_out(self, mock_connect):
+        """Test that checkouts beyond max_size wait for a release and time out if none comes."""
+        pool = PostgreSQLConnectionPool({'host': 'db'}, max_size=1, acquire_timeout=0.05)
+        
+        with pool.connection():
+            with pytest.raises(TimeoutError, match="max_size=1"):
+                with pool.connection():
+                    pass
+        
+        released = threading.Event()
+        
+        def hold_briefly():
+            with pool.connection():
+                released.wait(1)
+        
+        pool.acquire_timeout = 5
+        holder = threading.Thread(target=hold_briefly)
+        holder.start()
+        threading.Timer(0.05, released.set).start()
+        with pool.connection():
+            pass
+        holder.join()
+        
+        stats = pool.get_stats()
+        assert stats['timeouts'] == 1
+        assert stats['waits'] >= 1
+        assert stats['size'] == 1
+    
+    def test_broken_connections_are_replaced(self, mock_connect):
+        """Test that connections closed by the server are dropped instead of reused."""
+        pool = PostgreSQLConnectionPool({'host': 'db'}, min_size=0)
+        
+        with pool.connection() as conn1:
+            conn1.closed = 1
+        with pool.connection() as conn2:
+            pass
+        
+        assert conn2 is not conn1
+        assert pool.get_stats()['discarded'] == 1
+        assert pool.get_stats()['size'] == 1
+    
+    def test_shared_pool_closes_with_last_user(self, mock_connect):
+        """Test that adapters with the same parameters share one pool until all release it."""
+        params = {'host': 'shared-db', 'password': 'secret'}
+        pool = acquire_pg_pool(params)
+        assert acquire_pg_pool(dict(params)) is pool
+        assert acquire_pg_pool({**params, 'password': 'other'}) is not pool
+        
+        release_pg_pool(pool)
+        assert not pool.closed
+        release_pg_pool(pool)
+        assert pool.closed
@@ -0,0 +1,72 @@
+"""Tests for device resource normalization."""
+
+import pytest
+
+from src.homelab_mcp.resources import (
+    GIB,
+    compile_resource_conditions,
+    format_size,
+    parse_ratio,
+    parse_size_bytes,
+    resource_columns
+)
+
+
+@pytest.mark.parametrize("value,expected", [
+    (8589934592, 8589934592),
+    ("8589934592", 8589934592),
+    ("16G", 16 * GIB),
+    ("15Gi", 15 * GIB),
+    ("1.5T", int(1.5 * 1024 * GIB)),
+    ("512 MiB", 512 * 1024 ** 2),
+    ("lots", None),
+    (None, None)
+])
+def test_parse_size_bytes(value, expected):
+    """Test sizes from free/df in raw bytes and human-readable form."""
+    assert parse_size_bytes(value) == expected
+
+
+def test_parse_ratio():
+    """Test percentages and ratios normalize to 0-1."""
+    assert parse_ratio("45%") == 0.45
+    assert parse_ratio(80) == 0.8
+    assert parse_ratio(0.25) == 0.25
+    assert parse_ratio("n/a") is None
+
+
+def test_resource_columns_from_raw_bytes():
+    """Test ssh_discover_system style byte counts, with the ratio derived from used/size."""
+    columns = resource_columns({
+        "cpu_cores": "4",
+        "memory_total": 8 * GIB,
+        "disk_size": 100 * GIB,
+        "disk_used": 85 * GIB
+    })
+    
+    assert columns == {
+        "cpu_cores": 4,
+        "memory_total_bytes": 8 * GIB,
+        "disk_total_bytes": 100 * GIB,
+        "disk_use_ratio": 0.85
+    }
+
+
+def test_compile_resource_conditions():
+    """Test that conditions compile to bound parameters and reject unknown columns."""
+    where, params = compile_resource_conditions(
+        [("cpu_cores", ">=", 4), ("memory_total_bytes", "<", GIB)], "?"
+    )
+    
+    assert where == "cpu_cores >= ? AND memory_total_bytes < ?"
+    assert params == [4, GIB]
+    assert compile_resource_conditions([], "%s") == ("1 = 1", [])
+    with pytest.raises(ValueError):
+        compile_resource_conditions([("hostname; DROP TABLE devices", "=", 1)], "?")
+
+
+def test_format_size():
+    """Test human-readable sizes for analytics output."""
+    assert format_size(16 * GIB) == "16.0Gi"
+    assert format_size(512) == "512B"
+    assert format_size(None) == "Unknown"
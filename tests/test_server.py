@@ -59,7 +59,7 @@ async def test_tools_list():
     assert "tools" in response["result"]
     
     tools = response["result"]["tools"]
-    assert len(tools) == 34  # All tools including SSH, sitemap, infrastructure, VM, service, and Ansible tools
+    assert len(tools) == 38  # All tools including SSH, sitemap, infrastructure, VM, service, and Ansible tools
     
     # Check tool names and descriptions
     tool_names = [tool.get("description") for tool in tools]
@@ -138,4 +138,117 @@ async def test_ssh_discover_tool_missing_params():
     
     assert response["jsonrpc"] == "2.0"
     assert response["id"] == 6
-    assert "error" in response or "error" in json.loads(response["result"]["content"][0]["text"])
\ No newline at end of file
+    assert "error" in response or "error" in json.loads(response["result"]["content"][0]["text"])
+
+def _feed_lines(messages):
+    """Build a StreamReader pre-loaded with newline-delimited JSON messages."""
+    import asyncio
+    reader = asyncio.StreamReader()
+    for message in messages:
+        reader.feed_data((json.dumps(message) + "\n").encode())
+    reader.feed_eof()
+    return reader
+
+
+@pytest.mark.asyncio
+@patch('src.homelab_mcp.server.execute_tool')
+async def test_slow_tool_does_not_block_other_requests(mock_execute_tool, capsys):
+    """Test that a long-running tool call doesn't delay tools/list."""
+    import asyncio
+    
+    async def slow_tool(name, args):
+        await asyncio.sleep(0.2)
+        return {"content": [{"type": "text", "text": "done"}]}
+    
+    mock_execute_tool.side_effect = slow_tool
+    server = HomelabMCPServer(max_concurrent_requests=4, tool_concurrency_limits={})
+    
+    reader = _feed_lines([
+        {"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+         "params": {"name": "install_service", "arguments": {}}},
+        {"jsonrpc": "2.0", "id": 2, "method": "tools/list", "params": {}}
+    ])
+    await server.process_stream(reader)
+    
+    lines = capsys.readouterr().out.strip().split("\n")
+    responses = [json.loads(line) for line in lines]
+    
+    # Both requests answered, fast one first
+    assert [r["id"] for r in responses] == [2, 1]
+    assert responses[1]["result"]["content"][0]["text"] == "done"
+
+
+@pytest.mark.asyncio
+@patch('src.homelab_mcp.server.execute_tool')
+async def test_per_tool_concurrency_limit(mock_execute_tool, capsys):
+    """Test that per-tool limits cap simultaneous executions of one tool."""
+    import asyncio
+    
+    running = 0
+    peak = 0
+    
+    async def tracked_tool(name, args):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        return {"content": []}
+    
+    mock_execute_tool.side_effect = tracked_tool
+    server = HomelabMCPServer(
+        max_concurrent_requests=8,
+        tool_concurrency_limits={"install_service": 1}
+    )
+    
+    reader = _feed_lines([
+        {"jsonrpc": "2.0", "id": i, "method": "tools/call",
+         "params": {"name": "install_service", "arguments": {}}}
+        for i in range(3)
+    ])
+    await server.process_stream(reader)
+    
+    responses = capsys.readouterr().out.strip().split("\n")
+    assert len(responses) == 3
+    assert peak == 1
+
+
+@pytest.mark.asyncio
+@patch('src.homelab_mcp.server.execute_tool')
+async def test_cancelled_notification_stops_request(mock_execute_tool, capsys):
+    """Test that notifications/cancelled cancels the matching tool task."""
+    import asyncio
+    
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+    
+    async def long_tool(name, args):
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+    
+    mock_execute_tool.side_effect = long_tool
+    server = HomelabMCPServer(max_concurrent_requests=4, tool_concurrency_limits={})
+    
+    reader = asyncio.StreamReader()
+    reader.feed_data((json.dumps({
+        "jsonrpc": "2.0", "id": 7, "method": "tools/call",
+        "params": {"name": "install_service", "arguments": {}}
+    }) + "\n").encode())
+    serving = asyncio.create_task(server.process_stream(reader))
+    
+    await asyncio.wait_for(started.wait(), timeout=1)
+    reader.feed_data((json.dumps({
+        "jsonrpc": "2.0", "method": "notifications/cancelled",
+        "params": {"requestId": 7, "reason": "user aborted"}
+    }) + "\n").encode())
+    reader.feed_eof()
+    await asyncio.wait_for(serving, timeout=1)
+    
+    assert cancelled.is_set()
+    # Cancelled requests get no response
+    assert capsys.readouterr().out == ""
+    assert server.cancel_request(7) is False
@@ -213,6 +213,30 @@ class TestNetworkSiteMap:
         changes = sitemap.get_device_changes(device_id)
         assert len(changes) == 1
     
+    def test_volatile_changes_go_to_metrics_not_history(self, sitemap, sample_ssh_discovery_success):
+        """Test that uptime/usage churn is kept as metrics without growing history."""
+        device = sitemap.parse_discovery_output(sample_ssh_discovery_success)
+        device_id = sitemap.store_device(device)
+        
+        later_run = json.loads(sample_ssh_discovery_success)
+        later_run["data"]["uptime"] = "up 6 days, 1 hour"
+        later_run["data"]["memory"]["used"] = "9G"
+        later_run["data"]["disk"]["used"] = "410G"
+        
+        sitemap.store_discovery_history(device_id, sample_ssh_discovery_success)
+        sitemap.store_discovery_history(device_id, json.dumps(later_run, indent=2))
+        
+        assert len(sitemap.get_device_changes(device_id)) == 1
+        metrics = sitemap.get_device_metrics(device_id)
+        assert len(metrics) == 2
+        assert metrics[0]["metrics"]["memory.used"] == "9G"
+        
+        # A structural change still lands in history
+        upgraded = json.loads(sample_ssh_discovery_success)
+        upgraded["data"]["os"] = "Ubuntu 24.04 LTS"
+        sitemap.store_discovery_history(device_id, json.dumps(upgraded))
+        assert len(sitemap.get_device_changes(device_id)) == 2
+    
     def test_analyze_network_topology_empty(self, sitemap):
         """Test network analysis with no devices."""
         analysis = sitemap.analyze_network_topology()
@@ -282,6 +306,128 @@ class TestNetworkSiteMap:
         assert len(suggestions["database_candidates"]) == 1
         assert suggestions["database_candidates"][0]["hostname"] == "high-spec-server"
         assert len(suggestions["monitoring_targets"]) == 1
+    
+    def test_device_lookup_cache_invalidated_on_write(self, sitemap, sample_ssh_discovery_success):
+        """Test that cached lookups skip the database until a device write."""
+        device = sitemap.parse_discovery_output(sample_ssh_discovery_success)
+        device_id = sitemap.store_device(device)
+        
+        with patch.object(sitemap.db_adapter, 'get_device', wraps=sitemap.db_adapter.get_device) as get_device:
+            assert sitemap.get_device(device_id)['hostname'] == "test-server"
+            sitemap.get_device(device_id)['hostname'] = "mutated"
+            assert sitemap.get_device(device_id)['hostname'] == "test-server"
+            assert get_device.call_count == 1
+            
+            sitemap.update_device_status(device_id, "decommissioned")
+            assert sitemap.get_device(device_id)['status'] == "decommissioned"
+            assert get_device.call_count == 2
+        
+        assert sitemap.get_device_by_ip("192.168.1.100")['id'] == device_id
+        assert sitemap.get_device_by_hostname("missing") is None
+    
+    def test_devices_page_cursor_walk(self, sitemap):
+        """Test walking every device page by page with the opaque cursor."""
+        sitemap.store_devices_bulk([
+            NetworkDevice(
+                hostname=f"host-{i:02d}", connection_ip=f"10.0.0.{i}",
+                last_seen=datetime.now().isoformat(), status="success"
+            )
+            for i in range(5)
+        ])
+        
+        seen = []
+        cursor = None
+        while True:
+            page = sitemap.get_devices_page(fields=["connection_ip"], limit=2, cursor=cursor)
+            assert page["total_devices"] == 5
+            seen.extend(d["hostname"] for d in page["devices"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        
+        assert seen == [f"host-{i:02d}" for i in range(5)]
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            sitemap.get_devices_page(cursor="not a cursor")
+    
+    def test_device_cache_disabled(self, temp_db):
+        """Test that a zero cache size always reads through to the database."""
+        sitemap = NetworkSiteMap(db_path=temp_db, db_type='sqlite', device_cache_size=0)
+        
+        assert sitemap.device_cache is None
+        assert sitemap.get_device(1) is None
+    
+    def test_analysis_memoized_until_next_write(self, sitemap, sample_ssh_discovery_success):
+        """Test that repeated analysis between writes reuses the cached result."""
+        device = sitemap.parse_discovery_output(sample_ssh_discovery_success)
+        device_id = sitemap.store_device(device)
+        
+        with patch.object(sitemap.db_adapter, 'get_topology_summary',
+                          wraps=sitemap.db_adapter.get_topology_summary) as summary:
+            first = sitemap.analyze_network_topology()
+            assert sitemap.analyze_network_topology() is first
+            assert summary.call_count == 1
+            assert first["write_version"] == sitemap.write_version
+            assert "computed_at" in first
+            
+            sitemap.store_discovery_history(device_id, sample_ssh_discovery_success)
+            sitemap.analyze_network_topology()
+            assert summary.call_count == 2
+            
+            sitemap.store_device(device)
+            second = sitemap.analyze_network_topology()
+            assert summary.call_count == 3
+            assert second["total_devices"] == 1
+        
+        suggestions = sitemap.suggest_deployments()
+        assert sitemap.suggest_deployments() is suggestions
+    
+    def test_caches_see_writes_from_another_instance(self, sitemap, temp_db, sample_ssh_discovery_success):
+        """Test that writes through a second sitemap on the same database invalidate this one's caches."""
+        device_id = sitemap.store_device(sitemap.parse_discovery_output(sample_ssh_discovery_success))
+        assert sitemap.get_device(device_id)['status'] == "success"
+        assert sitemap.analyze_network_topology()["online_devices"] == 1
+        
+        other = NetworkSiteMap(db_path=temp_db, db_type='sqlite')
+        other.update_device_status(device_id, "decommissioned")
+        
+        assert sitemap.get_device(device_id)['status'] == "decommissioned"
+        assert sitemap.analyze_network_topology()["online_devices"] == 0
+        assert sitemap.suggest_deployments()["monitoring_targets"] == []
+    
+    def test_analytics_with_ssh_discover_system_output(self, sitemap):
+        """Test that raw byte counts from ssh_discover_system feed the analytics."""
+        gib = 1024 ** 3
+        small_host = {
+            "status": "success",
+            "hostname": "pi",
+            "connection_ip": "10.0.0.5",
+            "data": {
+                "cpu": {"count": 2, "model": "Cortex-A72"},
+                "memory": {"total": 2 * gib, "used": gib},
+                "disk": {"total": 100 * gib, "used": 90 * gib, "available": 10 * gib},
+                "os": "Raspbian"
+            }
+        }
+        
+        device = sitemap.parse_discovery_output(json.dumps(small_host))
+        assert device.cpu_cores == 2
+        assert device.disk_size == 100 * gib
+        assert device.disk_use_percent == "90%"
+        sitemap.store_device(device)
+        
+        analysis = sitemap.analyze_network_topology()
+        suggestions = sitemap.suggest_deployments()
+        
+        assert analysis["network_segments"] == {"10.0.0.0/24": 1}
+        assert analysis["cpu_architectures"] == {"Cortex-A72": 1}
+        assert analysis["resource_utilization"]["high_disk_usage"] == [
+            {"hostname": "pi", "usage": "90%"}
+        ]
+        assert analysis["resource_utilization"]["low_resources"] == [
+            {"hostname": "pi", "cpu_cores": 2, "memory": "2.0Gi"}
+        ]
+        assert [s["hostname"] for s in suggestions["upgrade_recommendations"]] == ["pi"]
+        assert suggestions["load_balancer_candidates"] == []
 
 
 class TestAsyncFunctions:
@@ -319,15 +465,27 @@ class TestAsyncFunctions:
         assert devices[0]["hostname"] == "test-server"
     
     @pytest.mark.asyncio
-    @patch('src.homelab_mcp.sitemap.discover_and_store')
-    async def test_bulk_discover_and_store(self, mock_discover_and_store, temp_db):
+    async def test_async_methods_match_sync(self, sitemap, sample_ssh_discovery_success):
+        """Test that the async sitemap methods read and write the same data."""
+        device = sitemap.parse_discovery_output(sample_ssh_discovery_success)
+        device_id = await sitemap.store_device_async(device)
+        await sitemap.store_discovery_history_async(device_id, sample_ssh_discovery_success)
+        
+        assert await sitemap.get_all_devices_async() == sitemap.get_all_devices()
+        assert await sitemap.get_devices_page_async(limit=1) == sitemap.get_devices_page(limit=1)
+        assert await sitemap.get_device_changes_async(device_id) == sitemap.get_device_changes(device_id)
+        assert await sitemap.analyze_network_topology_async() == sitemap.analyze_network_topology()
+        assert await sitemap.suggest_deployments_async() == sitemap.suggest_deployments()
+        assert await sitemap.get_device_async(device_id) == sitemap.get_device(device_id)
+        assert await sitemap.get_device_by_ip_async("192.168.1.100") == sitemap.get_device(device_id)
+        assert await sitemap.get_device_by_hostname_async("test-server") == sitemap.get_device(device_id)
+    
+    @pytest.mark.asyncio
+    @patch('src.homelab_mcp.ssh_tools.ssh_discover_system')
+    async def test_bulk_discover_and_store(self, mock_ssh_discover, temp_db, sample_ssh_discovery_success):
         """Test bulk_discover_and_store function."""
         # Mock successful discovery
-        mock_discover_and_store.return_value = json.dumps({
-            "status": "success",
-            "device_id": 1,
-            "hostname": "test-host"
-        })
+        mock_ssh_discover.return_value = sample_ssh_discovery_success
         
         sitemap = NetworkSiteMap(db_path=temp_db, db_type='sqlite')
         targets = [
@@ -338,20 +496,24 @@ class TestAsyncFunctions:
         result = await bulk_discover_and_store(sitemap, targets)
         
         # Verify both targets were processed
-        assert mock_discover_and_store.call_count == 2
+        assert mock_ssh_discover.call_count == 2
         
         result_data = json.loads(result)
         assert result_data["status"] == "success"
         assert result_data["total_targets"] == 2
         assert len(result_data["results"]) == 2
+        assert all(r["status"] == "success" for r in result_data["results"])
+        
+        # Results were stored
+        assert len(sitemap.get_all_devices()) == 1
     
     @pytest.mark.asyncio
-    @patch('src.homelab_mcp.sitemap.discover_and_store')
-    async def test_bulk_discover_and_store_with_errors(self, mock_discover_and_store, temp_db):
+    @patch('src.homelab_mcp.ssh_tools.ssh_discover_system')
+    async def test_bulk_discover_and_store_with_errors(self, mock_ssh_discover, temp_db, sample_ssh_discovery_success):
         """Test bulk discovery handling errors."""
         # Mock one success, one failure
-        mock_discover_and_store.side_effect = [
-            json.dumps({"status": "success", "device_id": 1, "hostname": "host1"}),
+        mock_ssh_discover.side_effect = [
+            sample_ssh_discovery_success,
             Exception("Connection failed")
         ]
         
@@ -372,6 +534,93 @@ class TestAsyncFunctions:
         assert result_data["results"][0]["status"] == "success"
         assert result_data["results"][1]["status"] == "error"
         assert "Connection failed" in result_data["results"][1]["error"]
+    
+    @pytest.mark.asyncio
+    @patch('src.homelab_mcp.ssh_tools.ssh_discover_system')
+    async def test_bulk_discover_is_concurrent_and_bounded(self, mock_ssh_discover, temp_db):
+        """Test that bulk discovery overlaps hosts up to max_concurrency, in target order."""
+        import asyncio
+        
+        active = 0
+        peak = 0
+        
+        async def slow_discovery(hostname, username, password, key_path, port):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            # Later targets finish first to check ordering
+            await asyncio.sleep(0.05 if hostname == "host0" else 0.01)
+            active -= 1
+            return json.dumps({
+                "status": "success",
+                "hostname": hostname,
+                "connection_ip": f"10.0.0.{hostname[-1]}",
+                "data": {}
+            })
+        
+        mock_ssh_discover.side_effect = slow_discovery
+        sitemap = NetworkSiteMap(db_path=temp_db, db_type='sqlite')
+        targets = [{"hostname": f"host{i}", "username": "u"} for i in range(6)]
+        
+        result = await bulk_discover_and_store(sitemap, targets, max_concurrency=3)
+        result_data = json.loads(result)
+        
+        assert peak == 3
+        assert [r["hostname"] for r in result_data["results"]] == [f"host{i}" for i in range(6)]
+        assert len(sitemap.get_all_devices()) == 6
+    
+    @pytest.mark.asyncio
+    @patch('src.homelab_mcp.ssh_tools.ssh_discover_system')
+    async def test_bulk_discover_writes_devices_in_one_batch(self, mock_ssh_discover, temp_db):
+        """Test that bulk discovery upserts all devices with a single bulk write."""
+        async def discovery(hostname, username, password, key_path, port):
+            return json.dumps({
+                "status": "success",
+                "hostname": hostname,
+                "connection_ip": f"10.0.0.{hostname[-1]}",
+                "data": {}
+            })
+        
+        mock_ssh_discover.side_effect = discovery
+        sitemap = NetworkSiteMap(db_path=temp_db, db_type='sqlite')
+        targets = [{"hostname": f"host{i}", "username": "u"} for i in range(4)]
+        
+        with patch.object(sitemap.db_adapter, 'store_device', side_effect=AssertionError("per-row write")), \
+             patch.object(sitemap.db_adapter, 'store_devices_bulk',
+                          wraps=sitemap.db_adapter.store_devices_bulk) as mock_bulk:
+            result = await bulk_discover_and_store(sitemap, targets)
+        
+        result_data = json.loads(result)
+        device_ids = [r["device_id"] for r in result_data["results"]]
+        
+        mock_bulk.assert_called_once()
+        assert len(set(device_ids)) == 4
+        assert len(sitemap.get_all_devices()) == 4
+    
+    @pytest.mark.asyncio
+    @patch('src.homelab_mcp.ssh_tools.ssh_discover_system')
+    async def test_bulk_discover_per_host_timeout(self, mock_ssh_discover, temp_db, sample_ssh_discovery_success):
+        """Test that a hung host times out without holding up the others."""
+        import asyncio
+        
+        async def discovery(hostname, *args):
+            if hostname == "hung":
+                await asyncio.sleep(10)
+            return sample_ssh_discovery_success
+        
+        mock_ssh_discover.side_effect = discovery
+        sitemap = NetworkSiteMap(db_path=temp_db, db_type='sqlite')
+        targets = [
+            {"hostname": "hung", "username": "u"},
+            {"hostname": "ok", "username": "u"}
+        ]
+        
+        result = await bulk_discover_and_store(sitemap, targets, per_host_timeout=0.1)
+        results = json.loads(result)["results"]
+        
+        assert results[0]["status"] == "error"
+        assert "timed out" in results[0]["error"]
+        assert results[1]["status"] == "success"
 
 
 class TestDatabaseOperations:
@@ -420,7 +669,7 @@ class TestDatabaseOperations:
         # Store multiple different discovery results
         for i in range(5):
             modified_data = json.loads(sample_ssh_discovery_success)
-            modified_data["data"]["memory"]["used"] = f"{i+4}G"
+            modified_data["data"]["os"] = f"Ubuntu 22.04.{i}"
             sitemap.store_discovery_history(device_id, json.dumps(modified_data))
         
         # Test limit
@@ -0,0 +1,80 @@
+"""Tests for discovery snapshot hashing."""
+
+import json
+
+from src.homelab_mcp.snapshots import (
+    canonical_data_hash,
+    hash_snapshot,
+    parse_volatile_fields,
+    split_snapshot
+)
+
+
+def make_snapshot(uptime="up 3 days", memory_used=1024, disk_used=5000, os_name="Ubuntu 22.04"):
+    """Build a discovery snapshot like ssh_discover_system returns."""
+    return {
+        "status": "success",
+        "hostname": "server",
+        "connection_ip": "192.168.1.10",
+        "data": {
+            "cpu": {"count": 4, "model": "Intel"},
+            "memory": {"total": 8192, "used": memory_used},
+            "disk": {"total": 100000, "used": disk_used, "available": 100000 - disk_used},
+            "uptime": uptime,
+            "os": os_name
+        }
+    }
+
+
+def test_parse_volatile_fields():
+    """Test parsing excluded and bucketed field specs."""
+    fields = parse_volatile_fields("uptime, disk.used=1024,,memory.used=oops")
+    
+    assert fields == {"uptime": None, "disk.used": 1024.0}
+
+
+def test_split_snapshot_excludes_and_buckets():
+    """Test that volatile fields are removed or bucketed and reported as metrics."""
+    snapshot = make_snapshot(disk_used=5000)
+    stable, metrics = split_snapshot(snapshot, {"uptime": None, "disk.used": 1024})
+    
+    assert "uptime" not in stable["data"]
+    assert stable["data"]["disk"]["used"] == 4096
+    assert metrics == {"uptime": "up 3 days", "disk.used": 5000}
+    # Input is left untouched
+    assert snapshot["data"]["uptime"] == "up 3 days"
+
+
+def test_hash_ignores_key_order_and_volatile_fields():
+    """Test that only structural changes alter the canonical hash."""
+    base = make_snapshot()
+    reordered = json.dumps(dict(reversed(list(base.items()))))
+    later_run = json.dumps(make_snapshot(uptime="up 4 days", memory_used=2048, disk_used=5100))
+    upgraded = json.dumps(make_snapshot(os_name="Ubuntu 24.04"))
+    
+    base_hash = canonical_data_hash(json.dumps(base, indent=2))
+    
+    assert canonical_data_hash(reordered) == base_hash
+    assert canonical_data_hash(later_run) == base_hash
+    assert canonical_data_hash(upgraded) != base_hash
+
+
+def test_hash_snapshot_returns_metrics():
+    """Test that hashing also hands back the volatile metrics with default fields."""
+    _, metrics = hash_snapshot(json.dumps(make_snapshot()))
+    
+    assert metrics == {
+        "uptime": "up 3 days",
+        "memory.used": 1024,
+        "disk.used": 5000,
+        "disk.available": 95000
+    }
+
+
+def test_non_json_falls_back_to_raw_hash():
+    """Test that non-JSON data is hashed as-is."""
+    data_hash, metrics = hash_snapshot("not json")
+    
+    assert len(data_hash) == 64
+    assert metrics == {}
+    assert canonical_data_hash("not json") != canonical_data_hash("not json!")
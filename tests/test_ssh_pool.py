@@ -0,0 +1,163 @@
+"""Tests for the SSH connection pool."""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.homelab_mcp.ssh_pool import SSHConnectionPool, get_ssh_pool
+
+
+def make_conn():
+    """Create a mock SSH connection that reports itself open."""
+    conn = MagicMock()
+    conn.is_closed.return_value = False
+    conn.run = AsyncMock(return_value=MagicMock(exit_status=0))
+    return conn
+
+
+@pytest.mark.asyncio
+class TestSSHConnectionPool:
+    """Test SSHConnectionPool behaviour."""
+    
+    @patch('src.homelab_mcp.ssh_pool.asyncssh.connect', new_callable=AsyncMock)
+    async def test_reuses_connection_for_same_key(self, mock_connect):
+        """Test that sequential checkouts to one host share a connection."""
+        mock_connect.side_effect = lambda **kwargs: make_conn()
+        pool = SSHConnectionPool()
+        
+        async with pool.connection(host="h1", port=22, username="mcp_admin") as conn1:
+            pass
+        async with pool.connection(host="h1", port=22, username="mcp_admin") as conn2:
+            pass
+        
+        assert conn1 is conn2
+        assert mock_connect.call_count == 1
+        assert pool.get_stats()["reused"] == 1
+    
+    @patch('src.homelab_mcp.ssh_pool.asyncssh.connect', new_callable=AsyncMock)
+    async def test_different_credentials_get_separate_connections(self, mock_connect):
+        """Test that the pool key includes user and password."""
+        mock_connect.side_effect = lambda **kwargs: make_conn()
+        pool = SSHConnectionPool()
+        
+        async with pool.connection(host="h1", username="admin", password="a") as conn1:
+            pass
+        async with pool.connection(host="h1", username="admin", password="b") as conn2:
+            pass
+        async with pool.connection(host="h1", username="other", password="a") as conn3:
+            pass
+        
+        assert len({id(conn1), id(conn2), id(conn3)}) == 3
+        assert mock_connect.call_count == 3
+    
+    @patch('src.homelab_mcp.ssh_pool.asyncssh.connect', new_callable=AsyncMock)
+    async def test_closed_connection_is_replaced(self, mock_connect):
+        """Test transparent reconnect when a pooled connection has died."""
+        mock_connect.side_effect = lambda **kwargs: make_conn()
+        pool = SSHConnectionPool()
+        
+        async with pool.connection(host="h1", username="u") as conn1:
+            pass
+        conn1.is_closed.return_value = True
+        
+        async with pool.connection(host="h1", username="u") as conn2:
+            pass
+        
+        assert conn2 is not conn1
+        assert mock_connect.call_count == 2
+    
+    @patch('src.homelab_mcp.ssh_pool.asyncssh.connect', new_callable=AsyncMock)
+    async def test_idle_connections_expire(self, mock_connect):
+        """Test that connections idle past the TTL are closed."""
+        mock_connect.side_effect = lambda **kwargs: make_conn()
+        pool = SSHConnectionPool(idle_ttl=0)
+        
+        async with pool.connection(host="h1", username="u") as conn1:
+            pass
+        await asyncio.sleep(0.01)
+        async with pool.connection(host="h1", username="u") as conn2:
+            pass
+        
+        assert conn2 is not conn1
+        conn1.close.assert_called_once()
+        assert pool.get_stats()["evicted"] == 1
+    
+    @patch('src.homelab_mcp.ssh_pool.asyncssh.connect', new_callable=AsyncMock)
+    async def test_connection_error_discards_connection(self, mock_connect):
+        """Test that a connection that failed mid-use isn't handed out again."""
+        mock_connect.side_effect = lambda **kwargs: make_conn()
+        pool = SSHConnectionPool()
+        
+        with pytest.raises(OSError):
+            async with pool.connection(host="h1", username="u") as conn1:
+                raise OSError("connection reset")
+        
+        conn1.close.assert_called_once()
+        assert pool.get_stats()["idle"] == 0
+    
+    @patch('src.homelab_mcp.ssh_pool.asyncssh.connect', new_callable=AsyncMock)
+    async def test_failed_command_keeps_connection(self, mock_connect):
+        """Test that a command exiting non-zero doesn't cost the pooled connection."""
+        import asyncssh
+        mock_connect.side_effect = lambda **kwargs: make_conn()
+        pool = SSHConnectionPool()
+        
+        with pytest.raises(asyncssh.ProcessError):
+            async with pool.connection(host="h1", username="u") as conn1:
+                raise asyncssh.ProcessError(None, 'false', None, 1, None, 1, '', '')
+        async with pool.connection(host="h1", username="u") as conn2:
+            pass
+        
+        assert conn2 is conn1
+        conn1.close.assert_not_called()
+        
+        with pytest.raises(asyncssh.ConnectionLost):
+            async with pool.connection(host="h1", username="u"):
+                raise asyncssh.ConnectionLost("connection lost")
+        conn1.close.assert_called_once()
+    
+    @patch('src.homelab_mcp.ssh_pool.asyncssh.connect', new_callable=AsyncMock)
+    async def test_max_per_host_limit(self, mock_connect):
+        """Test that checkouts beyond max_per_host wait for a free slot."""
+        mock_connect.side_effect = lambda **kwargs: make_conn()
+        pool = SSHConnectionPool(max_per_host=2)
+        
+        active = 0
+        peak = 0
+        
+        async def use():
+            nonlocal active, peak
+            async with pool.connection(host="h1", username="u"):
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.02)
+                active -= 1
+        
+        await asyncio.gather(*(use() for _ in range(5)))
+        
+        assert peak == 2
+        assert mock_connect.call_count == 2
+    
+    @patch('src.homelab_mcp.ssh_pool.asyncssh.connect', new_callable=AsyncMock)
+    async def test_nested_checkout_shares_held_connection(self, mock_connect):
+        """Test that a nested checkout of the same connection doesn't wait for a second slot."""
+        mock_connect.side_effect = lambda **kwargs: make_conn()
+        pool = SSHConnectionPool(max_per_host=1)
+        
+        async def nested():
+            async with pool.connection(host="h1", username="u") as outer:
+                async with pool.connection(host="h1", username="u") as inner:
+                    pass
+            return outer, inner
+        
+        outer, inner = await asyncio.wait_for(nested(), timeout=1)
+        
+        assert inner is outer
+        assert mock_connect.call_count == 1
+        assert pool.get_stats()["idle"] == 1
+
+
+@pytest.mark.asyncio
+async def test_get_ssh_pool_is_shared_within_loop():
+    """Test that the process-wide pool is a singleton per event loop."""
+    assert get_ssh_pool() is get_ssh_pool()
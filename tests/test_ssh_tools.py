@@ -16,7 +16,7 @@ from src.homelab_mcp.ssh_tools import (
 @pytest.mark.asyncio
 @patch('src.homelab_mcp.ssh_tools.asyncssh.connect')
 async def test_ssh_discover_success(mock_connect):
-    """Test successful SSH discovery."""
+    """Test successful SSH discovery in sequential (one command per probe) mode."""
     # Mock command results - in the order they are executed by ssh_discover_system
     # Only the commands that will actually be executed when CPU model succeeds on first try
     hostname_result = MagicMock()
@@ -89,23 +89,18 @@ Mem:     8266850304  2254479360  4182536704   128974848  1829834240  5677662208"
     
     mock_conn.run = mock_run
     
-    # Create an async context manager that returns mock_conn
-    async def mock_context_mgr():
-        class MockContext:
-            async def __aenter__(self):
-                return mock_conn
-            async def __aexit__(self, exc_type, exc_val, exc_tb):
-                return None
-        return MockContext()
+    # The connection pool awaits connect() and holds on to the connection
+    async def mock_open_connection(**kwargs):
+        return mock_conn
     
-    # Make connect return the async context manager
-    mock_connect.side_effect = lambda **kwargs: mock_context_mgr()
+    mock_connect.side_effect = mock_open_connection
     
-    # Execute discovery
+    # Execute discovery one command at a time
     result = await ssh_discover_system(
         hostname="test-host",
         username="test-user",
-        password="test-pass"
+        password="test-pass",
+        single_round_trip=False
     )
     
     # Parse result
@@ -716,4 +711,116 @@ async def test_setup_remote_mcp_admin_no_force_update(mock_connect, mock_path, m
     
     # Verify success
     assert result_data["status"] == "success"
-    assert result_data["mcp_admin_setup"]["ssh_key"] == "SSH key already exists"
\ No newline at end of file
+    assert result_data["mcp_admin_setup"]["ssh_key"] == "SSH key already exists"
+
+@pytest.mark.asyncio
+async def test_run_remote_command_cancellation_signals_remote_process():
+    """Test that cancelling a remote command terminates the remote process."""
+    import asyncio
+    from src.homelab_mcp.ssh_tools import run_remote_command
+    
+    process = MagicMock()
+    
+    async def never_finishes(check=False):
+        await asyncio.sleep(10)
+    
+    process.wait = never_finishes
+    mock_conn = MagicMock()
+    mock_conn.create_process = AsyncMock(return_value=process)
+    
+    task = asyncio.create_task(run_remote_command(mock_conn, "terraform apply"))
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    task.cancel()
+    
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    
+    process.send_signal.assert_called_once_with('TERM')
+    process.close.assert_called_once()
+
+
+def _probe_section(name, body, rc=0):
+    """Render one section of composite discovery output."""
+    return f"@@MCP_PROBE BEGIN {name}\n{body}\n\n@@MCP_PROBE END {name} {rc}\n"
+
+
+@pytest.mark.asyncio
+@patch('src.homelab_mcp.ssh_tools.asyncssh.connect')
+async def test_ssh_discover_single_round_trip(mock_connect):
+    """Test that discovery runs all probes in one command and keeps the schema."""
+    probe_output = "".join([
+        _probe_section("hostname", "raspberrypi"),
+        _probe_section("cpu_count", "4"),
+        _probe_section("cpu_model", "model name\t: Intel Core i5"),
+        _probe_section("memory", "              total        used        free\n"
+                                 "Mem:     8266850304  2254479360  4182536704"),
+        _probe_section("disk", "Filesystem      1B-blocks        Used    Available Use% Mounted on\n"
+                               "/dev/sda1     21474836480  5905580032  14970068992  30% /"),
+        _probe_section("network", json.dumps([
+            {"ifname": "lo", "addr_info": [{"family": "inet", "local": "127.0.0.1"}]},
+            {"ifname": "eth0", "operstate": "UP",
+             "addr_info": [{"family": "inet", "local": "192.168.1.100"}]}
+        ])),
+        _probe_section("uptime", "up 2 days, 3 hours"),
+        _probe_section("os", 'PRETTY_NAME="Ubuntu 22.04.3 LTS"'),
+        _probe_section("usb", "Bus 001 Device 002: ID 1a6e:089a Global Unichip Corp."),
+        _probe_section("pci", "", rc=127),
+        _probe_section("block", json.dumps({"blockdevices": [
+            {"name": "sda", "size": "20G", "type": "disk", "model": "Samsung SSD"}
+        ]}))
+    ])
+    
+    probe_result = MagicMock()
+    probe_result.exit_status = 0
+    probe_result.stdout = probe_output
+    
+    mock_conn = AsyncMock()
+    mock_conn.run = AsyncMock(return_value=probe_result)
+    
+    async def mock_open_connection(**kwargs):
+        return mock_conn
+    
+    mock_connect.side_effect = mock_open_connection
+    
+    result = await ssh_discover_system(
+        hostname="test-host",
+        username="test-user",
+        password="test-pass"
+    )
+    result_data = json.loads(result)
+    
+    # Exactly one remote command for the whole discovery
+    assert mock_conn.run.call_count == 1
+    assert "@@MCP_PROBE" in mock_conn.run.call_args.kwargs["input"]
+    
+    assert result_data["status"] == "success"
+    assert result_data["hostname"] == "raspberrypi"
+    data = result_data["data"]
+    assert data["cpu"] == {"count": 4, "model": "Intel Core i5"}
+    assert data["memory"] == {"total": 8266850304, "used": 2254479360}
+    assert data["disk"]["available"] == 14970068992
+    assert [iface["name"] for iface in data["network"]] == ["eth0"]
+    assert data["os"] == "Ubuntu 22.04.3 LTS"
+    assert data["usb_devices"][0]["vendor_id"] == "1a6e"
+    assert "pci_devices" not in data  # failed probe is skipped
+    assert data["block_devices"][0]["model"] == "Samsung SSD"
+
+
+def test_discovery_script_runs_under_posix_sh():
+    """Test that the composite probe script is valid shell and parses back."""
+    import shutil
+    import subprocess
+    from src.homelab_mcp.ssh_tools import build_discovery_script, parse_probe_output
+    
+    if not shutil.which("sh"):
+        pytest.skip("sh not available")
+    
+    completed = subprocess.run(
+        ["sh", "-s"], input=build_discovery_script(),
+        capture_output=True, text=True, timeout=30
+    )
+    sections = parse_probe_output(completed.stdout)
+    
+    assert sections.get("hostname")
+    assert sections.get("cpu_count", "").isdigit()
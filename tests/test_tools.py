@@ -2,15 +2,25 @@
 
 import json
 import pytest
+from datetime import datetime, timedelta
 from unittest.mock import AsyncMock, MagicMock, patch
+from src.homelab_mcp import tools as tools_module
 from src.homelab_mcp.tools import get_available_tools, execute_tool
 
 
+@pytest.fixture(autouse=True)
+def reset_shared_instances():
+    """Make every test build its own sitemap/installer so patches take effect."""
+    tools_module.reset_shared_instances()
+    yield
+    tools_module.reset_shared_instances()
+
+
 def test_get_available_tools():
     """Test getting available tools."""
     tools = get_available_tools()
     
-    assert len(tools) == 34  # All tools including SSH, sitemap, infrastructure, VM, service, and Ansible tools
+    assert len(tools) == 38  # All tools including SSH, sitemap, infrastructure, VM, service, and Ansible tools
     assert "ssh_discover" in tools
     assert "setup_mcp_admin" in tools
     assert "verify_mcp_admin" in tools
@@ -19,6 +29,9 @@ def test_get_available_tools():
     assert "discover_and_map" in tools
     assert "bulk_discover_and_map" in tools
     assert "get_network_sitemap" in tools
+    assert "search_devices" in tools
+    assert "find_hardware" in tools
+    assert "search_history" in tools
     assert "analyze_network_topology" in tools
     assert "suggest_deployments" in tools
     assert "get_device_changes" in tools
@@ -140,14 +153,21 @@ async def test_execute_bulk_discover_and_map(mock_bulk_discover):
         {"hostname": "host2", "username": "user2"}
     ]
     
-    result = await execute_tool("bulk_discover_and_map", {"targets": targets})
+    result = await execute_tool("bulk_discover_and_map", {
+        "targets": targets,
+        "max_concurrency": 5,
+        "per_host_timeout": 30
+    })
     
     assert "content" in result
     assert len(result["content"]) > 0
     assert result["content"][0]["type"] == "text"
     
-    # Verify the function was called with targets
-    mock_bulk_discover.assert_called_once_with(mock_bulk_discover.call_args[0][0], targets)
+    # Verify the function was called with targets and concurrency settings
+    mock_bulk_discover.assert_called_once_with(
+        mock_bulk_discover.call_args[0][0], targets,
+        max_concurrency=5, per_host_timeout=30
+    )
 
 
 @pytest.mark.asyncio
@@ -156,10 +176,14 @@ async def test_execute_get_network_sitemap(mock_sitemap_class):
     """Test executing get_network_sitemap tool."""
     # Mock the sitemap instance and its methods
     mock_sitemap = MagicMock()
-    mock_sitemap.get_all_devices.return_value = [
-        {"id": 1, "hostname": "test-server", "status": "success"},
-        {"id": 2, "hostname": "test-server2", "status": "error"}
-    ]
+    mock_sitemap.get_devices_page_async = AsyncMock(return_value={
+        "total_devices": 2,
+        "next_cursor": None,
+        "devices": [
+            {"id": 1, "hostname": "test-server", "status": "success"},
+            {"id": 2, "hostname": "test-server2", "status": "error"}
+        ]
+    })
     mock_sitemap_class.return_value = mock_sitemap
     
     result = await execute_tool("get_network_sitemap", {})
@@ -173,6 +197,99 @@ async def test_execute_get_network_sitemap(mock_sitemap_class):
     assert response_data["status"] == "success"
     assert response_data["total_devices"] == 2
     assert len(response_data["devices"]) == 2
+    mock_sitemap.get_devices_page_async.assert_awaited_once_with(
+        fields=None, limit=100, cursor=None, filters=None
+    )
+
+
+@pytest.mark.asyncio
+@patch('src.homelab_mcp.tools.NetworkSiteMap')
+async def test_execute_find_hardware(mock_sitemap_class):
+    """Test that find_hardware passes only the criteria for its kind."""
+    mock_sitemap = MagicMock()
+    mock_sitemap.find_hardware_async = AsyncMock(return_value=[
+        {"device_id": 1, "hostname": "nvr", "vendor_id": "18d1", "product_id": "9302"},
+        {"device_id": 2, "hostname": "frigate", "vendor_id": "18d1", "product_id": "9302"}
+    ])
+    mock_sitemap_class.return_value = mock_sitemap
+    
+    result = await execute_tool("find_hardware", {
+        "kind": "usb", "vendor_id": "18d1", "product_id": "9302", "model": "ignored"
+    })
+    
+    response_data = json.loads(result["content"][0]["text"])
+    assert response_data["hosts"] == ["frigate", "nvr"]
+    assert response_data["total_matches"] == 2
+    mock_sitemap.find_hardware_async.assert_awaited_once_with(
+        "usb", {"vendor_id": "18d1", "product_id": "9302"}, 100
+    )
+
+
+@pytest.mark.asyncio
+@patch('src.homelab_mcp.tools.NetworkSiteMap')
+async def test_execute_search_history(mock_sitemap_class):
+    """Test that search_history passes the query through and lists the hosts hit."""
+    mock_sitemap = MagicMock()
+    mock_sitemap.search_history_async = AsyncMock(return_value=[
+        {"history_id": 9, "device_id": 2, "hostname": "nas", "discovered_at": "2024-01-02", "score": 1.5},
+        {"history_id": 3, "device_id": 2, "hostname": "nas", "discovered_at": "2024-01-01", "score": 1.2}
+    ])
+    mock_sitemap_class.return_value = mock_sitemap
+    
+    result = await execute_tool("search_history", {"query": 'enp3s0 "10.0.5"'})
+    
+    response_data = json.loads(result["content"][0]["text"])
+    assert response_data["hosts"] == ["nas"]
+    assert response_data["total_hits"] == 2
+    mock_sitemap.search_history_async.assert_awaited_once_with(
+        'enp3s0 "10.0.5"', device_id=None, limit=50
+    )
+
+
+@pytest.mark.asyncio
+@patch('src.homelab_mcp.tools.NetworkSiteMap')
+async def test_execute_search_devices(mock_sitemap_class):
+    """Test that search_devices passes the query through and reports matches."""
+    mock_sitemap = MagicMock()
+    mock_sitemap.get_devices_page_async = AsyncMock(return_value={
+        "total_devices": 1,
+        "next_cursor": None,
+        "devices": [{"id": 4, "hostname": "db", "os_info": "Ubuntu 22.04"}]
+    })
+    mock_sitemap_class.return_value = mock_sitemap
+    
+    result = await execute_tool("search_devices", {"query": "os:ubuntu cores>=8", "limit": 10})
+    
+    response_data = json.loads(result["content"][0]["text"])
+    assert response_data["total_matches"] == 1
+    assert response_data["devices"][0]["hostname"] == "db"
+    mock_sitemap.get_devices_page_async.assert_awaited_once_with(
+        fields=None, limit=10, cursor=None, search="os:ubuntu cores>=8"
+    )
+
+
+@pytest.mark.asyncio
+@patch('src.homelab_mcp.tools.NetworkSiteMap')
+async def test_execute_get_network_sitemap_passes_page_arguments(mock_sitemap_class):
+    """Test that projection, paging and filter arguments reach the sitemap."""
+    mock_sitemap = MagicMock()
+    mock_sitemap.get_devices_page_async = AsyncMock(return_value={
+        "total_devices": 30,
+        "next_cursor": "abc",
+        "devices": [{"id": 3, "hostname": "web", "status": "success"}]
+    })
+    mock_sitemap_class.return_value = mock_sitemap
+    
+    result = await execute_tool("get_network_sitemap", {
+        "fields": ["status"], "limit": 1, "cursor": "xyz", "filter": {"status": "success"}
+    })
+    
+    response_data = json.loads(result["content"][0]["text"])
+    assert response_data["returned"] == 1
+    assert response_data["next_cursor"] == "abc"
+    mock_sitemap.get_devices_page_async.assert_awaited_once_with(
+        fields=["status"], limit=1, cursor="xyz", filters={"status": "success"}
+    )
 
 
 @pytest.mark.asyncio
@@ -181,13 +298,13 @@ async def test_execute_analyze_network_topology(mock_sitemap_class):
     """Test executing analyze_network_topology tool."""
     # Mock the sitemap instance and its methods
     mock_sitemap = MagicMock()
-    mock_sitemap.analyze_network_topology.return_value = {
+    mock_sitemap.analyze_network_topology_async = AsyncMock(return_value={
         "total_devices": 3,
         "online_devices": 2,
         "offline_devices": 1,
         "operating_systems": {"Ubuntu 22.04": 2},
         "network_segments": {"192.168.1.0/24": 3}
-    }
+    })
     mock_sitemap_class.return_value = mock_sitemap
     
     result = await execute_tool("analyze_network_topology", {})
@@ -201,6 +318,26 @@ async def test_execute_analyze_network_topology(mock_sitemap_class):
     assert response_data["status"] == "success"
     assert "analysis" in response_data
     assert response_data["analysis"]["total_devices"] == 3
+    assert response_data["cache_age_seconds"] is None  # Mock result carries no timestamp
+
+
+@pytest.mark.asyncio
+@patch('src.homelab_mcp.tools.NetworkSiteMap')
+async def test_analyze_network_topology_reports_cache_age(mock_sitemap_class):
+    """Test that memoized analysis results are returned with their age."""
+    computed_at = (datetime.now() - timedelta(seconds=30)).isoformat()
+    mock_sitemap = MagicMock()
+    mock_sitemap.analyze_network_topology_async = AsyncMock(return_value={
+        "total_devices": 1,
+        "computed_at": computed_at,
+        "write_version": 4
+    })
+    mock_sitemap_class.return_value = mock_sitemap
+    
+    result = await execute_tool("analyze_network_topology", {})
+    
+    response_data = json.loads(result["content"][0]["text"])
+    assert 30 <= response_data["cache_age_seconds"] < 60
 
 
 @pytest.mark.asyncio
@@ -209,7 +346,7 @@ async def test_execute_suggest_deployments(mock_sitemap_class):
     """Test executing suggest_deployments tool."""
     # Mock the sitemap instance and its methods
     mock_sitemap = MagicMock()
-    mock_sitemap.suggest_deployments.return_value = {
+    mock_sitemap.suggest_deployments_async = AsyncMock(return_value={
         "load_balancer_candidates": [
             {"hostname": "high-spec-server", "reason": "8 cores, 16G RAM"}
         ],
@@ -220,7 +357,7 @@ async def test_execute_suggest_deployments(mock_sitemap_class):
             {"hostname": "server1", "connection_ip": "192.168.1.10"}
         ],
         "upgrade_recommendations": []
-    }
+    })
     mock_sitemap_class.return_value = mock_sitemap
     
     result = await execute_tool("suggest_deployments", {})
@@ -242,7 +379,7 @@ async def test_execute_get_device_changes(mock_sitemap_class):
     """Test executing get_device_changes tool."""
     # Mock the sitemap instance and its methods
     mock_sitemap = MagicMock()
-    mock_sitemap.get_device_changes.return_value = [
+    mock_sitemap.get_device_changes_async = AsyncMock(return_value=[
         {
             "data": {"hostname": "test-server", "status": "success"},
             "discovered_at": "2024-01-01T12:00:00"
@@ -251,7 +388,7 @@ async def test_execute_get_device_changes(mock_sitemap_class):
             "data": {"hostname": "test-server", "status": "success"},
             "discovered_at": "2024-01-01T11:00:00"
         }
-    ]
+    ])
     mock_sitemap_class.return_value = mock_sitemap
     
     result = await execute_tool("get_device_changes", {"device_id": 1, "limit": 5})
@@ -632,3 +769,93 @@ def test_vm_tool_schemas():
     assert "vm_name" in remove_tool["inputSchema"]["properties"]
     assert "force" in remove_tool["inputSchema"]["properties"]
     assert remove_tool["inputSchema"]["required"] == ["device_id", "platform", "vm_name"]
+
+
+def test_every_tool_has_a_handler():
+    """Test that the dispatch table covers exactly the advertised tools."""
+    assert set(tools_module.TOOL_HANDLERS) == set(get_available_tools())
+
+
+@pytest.mark.asyncio
+async def test_execute_unknown_tool():
+    """Test that unknown tools are rejected."""
+    with pytest.raises(ValueError, match="Unknown tool"):
+        await execute_tool("no_such_tool", {})
+
+
+@pytest.mark.asyncio
+@patch('src.homelab_mcp.tools.NetworkSiteMap')
+async def test_sitemap_shared_across_calls(mock_sitemap_class):
+    """Test that sitemap tools reuse one NetworkSiteMap instead of reconnecting per call."""
+    mock_sitemap = MagicMock()
+    mock_sitemap.get_devices_page_async = AsyncMock(
+        return_value={"total_devices": 0, "next_cursor": None, "devices": []}
+    )
+    mock_sitemap.analyze_network_topology_async = AsyncMock(return_value={})
+    mock_sitemap_class.return_value = mock_sitemap
+    
+    await execute_tool("get_network_sitemap", {})
+    await execute_tool("analyze_network_topology", {})
+    await execute_tool("get_network_sitemap", {})
+    
+    mock_sitemap_class.assert_called_once()
+    assert mock_sitemap.get_devices_page_async.await_count == 2
+
+
+@pytest.mark.asyncio
+@patch('src.homelab_mcp.tools.ssh_discover_system')
+@patch('src.homelab_mcp.tools.NetworkSiteMap')
+async def test_ssh_tools_do_not_open_sitemap(mock_sitemap_class, mock_ssh_discover):
+    """Test that tools which don't need the database never create a sitemap."""
+    mock_ssh_discover.return_value = json.dumps({"status": "success"})
+    
+    await execute_tool("ssh_discover", {"hostname": "192.168.1.100", "username": "admin"})
+    
+    mock_sitemap_class.assert_not_called()
+
+
+@pytest.mark.asyncio
+@patch('src.homelab_mcp.service_installer.ServiceInstaller')
+async def test_service_installer_shared_across_calls(mock_installer_class):
+    """Test that service tools load templates once and reuse the installer."""
+    mock_installer = MagicMock()
+    mock_installer.get_available_services.return_value = ["jellyfin"]
+    mock_installer_class.return_value = mock_installer
+    
+    await execute_tool("list_available_services", {})
+    await execute_tool("list_available_services", {})
+    
+    mock_installer_class.assert_called_once()
+
+
+@pytest.mark.asyncio
+@patch('src.homelab_mcp.tools.NetworkSiteMap')
+async def test_execute_reencode_discovery_history(mock_sitemap_class):
+    """Test executing reencode_discovery_history tool."""
+    mock_sitemap = MagicMock()
+    mock_sitemap.reencode_history_async = AsyncMock(return_value={
+        "devices": 2, "rows": 40, "bytes_before": 120000, "bytes_after": 9000
+    })
+    mock_sitemap_class.return_value = mock_sitemap
+    
+    result = await execute_tool("reencode_discovery_history", {"compression": "zlib"})
+    
+    response_data = json.loads(result["content"][0]["text"])
+    assert response_data["status"] == "success"
+    assert response_data["rows"] == 40
+    mock_sitemap.reencode_history_async.assert_awaited_once_with(
+        device_id=None, compression="zlib", keyframe_interval=None
+    )
+
+
+@patch('src.homelab_mcp.tools.NetworkSiteMap')
+def test_managers_share_the_tools_sitemap(mock_sitemap_class):
+    """Test that VM and infrastructure managers reuse the shared sitemap instead of opening their own."""
+    from src.homelab_mcp.infrastructure_crud import InfrastructureManager
+    from src.homelab_mcp.vm_operations import VMManager
+    
+    shared = tools_module.get_sitemap()
+    
+    assert InfrastructureManager().sitemap is shared
+    assert VMManager().sitemap is shared
+    mock_sitemap_class.assert_called_once()
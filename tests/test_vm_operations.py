@@ -21,23 +21,18 @@ class TestVMManager:
     def test_get_device_connection_info_found(self, mock_sitemap_class):
         """Test getting connection info for existing device."""
         mock_sitemap = MagicMock()
-        mock_sitemap.get_all_devices.return_value = [
-            {
-                "id": 1,
-                "hostname": "pi-server",
-                "connection_ip": "192.168.1.100"
-            },
-            {
-                "id": 2,
-                "hostname": "mini-pc",
-                "connection_ip": "192.168.1.101"
-            }
-        ]
+        mock_sitemap.get_device_async = AsyncMock(return_value={
+            "id": 1,
+            "hostname": "pi-server",
+            "connection_ip": "192.168.1.100"
+        })
         mock_sitemap_class.return_value = mock_sitemap
         self.manager.sitemap = mock_sitemap
         
         result = asyncio.run(self.manager.get_device_connection_info(1))
         
+        mock_sitemap.get_device_async.assert_awaited_once_with(1)
+        mock_sitemap.get_all_devices.assert_not_called()
         assert result is not None
         assert result["hostname"] == "192.168.1.100"
         assert result["username"] == "mcp_admin"
@@ -47,9 +42,7 @@ class TestVMManager:
     def test_get_device_connection_info_not_found(self, mock_sitemap_class):
         """Test getting connection info for non-existent device."""
         mock_sitemap = MagicMock()
-        mock_sitemap.get_all_devices.return_value = [
-            {"id": 1, "hostname": "pi-server"}
-        ]
+        mock_sitemap.get_device_async = AsyncMock(return_value=None)
         mock_sitemap_class.return_value = mock_sitemap
         self.manager.sitemap = mock_sitemap
         
@@ -64,7 +57,7 @@ class TestVMOperations:
     
     @patch('src.homelab_mcp.vm_operations.VMManager')
     @patch('src.homelab_mcp.vm_operations.get_vm_provider')
-    @patch('src.homelab_mcp.vm_operations.asyncssh.connect')
+    @patch('src.homelab_mcp.vm_operations.ssh_connection')
     async def test_deploy_vm_success(self, mock_connect, mock_get_provider, mock_manager_class):
         """Test successful VM deployment."""
         # Setup mocks
@@ -115,7 +108,7 @@ class TestVMOperations:
     
     @patch('src.homelab_mcp.vm_operations.VMManager')
     @patch('src.homelab_mcp.vm_operations.get_vm_provider')
-    @patch('src.homelab_mcp.vm_operations.asyncssh.connect')
+    @patch('src.homelab_mcp.vm_operations.ssh_connection')
     async def test_control_vm_state_success(self, mock_connect, mock_get_provider, mock_manager_class):
         """Test successful VM state control."""
         # Setup mocks
@@ -152,7 +145,7 @@ class TestVMOperations:
     
     @patch('src.homelab_mcp.vm_operations.VMManager')
     @patch('src.homelab_mcp.vm_operations.get_vm_provider')
-    @patch('src.homelab_mcp.vm_operations.asyncssh.connect')
+    @patch('src.homelab_mcp.vm_operations.ssh_connection')
     async def test_get_vm_status_success(self, mock_connect, mock_get_provider, mock_manager_class):
         """Test successful VM status retrieval."""
         # Setup mocks
@@ -188,7 +181,7 @@ class TestVMOperations:
     
     @patch('src.homelab_mcp.vm_operations.VMManager')
     @patch('src.homelab_mcp.vm_operations.get_vm_provider')
-    @patch('src.homelab_mcp.vm_operations.asyncssh.connect')
+    @patch('src.homelab_mcp.vm_operations.ssh_connection')
     async def test_list_vms_on_device_success(self, mock_connect, mock_get_provider, mock_manager_class):
         """Test successful VM listing on device."""
         # Setup mocks
@@ -226,7 +219,7 @@ class TestVMOperations:
     
     @patch('src.homelab_mcp.vm_operations.VMManager')
     @patch('src.homelab_mcp.vm_operations.get_vm_provider')
-    @patch('src.homelab_mcp.vm_operations.asyncssh.connect')
+    @patch('src.homelab_mcp.vm_operations.ssh_connection')
     async def test_get_vm_logs_success(self, mock_connect, mock_get_provider, mock_manager_class):
         """Test successful VM log retrieval."""
         # Setup mocks
@@ -263,7 +256,7 @@ class TestVMOperations:
     
     @patch('src.homelab_mcp.vm_operations.VMManager')
     @patch('src.homelab_mcp.vm_operations.get_vm_provider')
-    @patch('src.homelab_mcp.vm_operations.asyncssh.connect')
+    @patch('src.homelab_mcp.vm_operations.ssh_connection')
     async def test_remove_vm_success(self, mock_connect, mock_get_provider, mock_manager_class):
         """Test successful VM removal."""
         # Setup mocks
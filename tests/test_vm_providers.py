@@ -8,6 +8,15 @@ from src.homelab_mcp.vm_providers.docker_provider import DockerProvider
 from src.homelab_mcp.vm_providers.lxd_provider import LXDProvider
 
 
+def serve_processes_from_run(conn):
+    """Answer create_process with the results mocked on conn.run, as run_remote_command reads them."""
+    async def create_process(command, **kwargs):
+        process = MagicMock()
+        process.wait = AsyncMock(return_value=await conn.run(command, **kwargs))
+        return process
+    conn.create_process = create_process
+
+
 def test_get_vm_provider():
     """Test VM provider factory function."""
     # Test Docker provider
@@ -34,6 +43,7 @@ class TestDockerProvider:
         """Set up test fixtures."""
         self.provider = DockerProvider()
         self.mock_conn = AsyncMock()
+        serve_processes_from_run(self.mock_conn)
     
     @pytest.mark.asyncio
     async def test_deploy_vm_success(self):
@@ -171,6 +181,7 @@ class TestLXDProvider:
         """Set up test fixtures."""
         self.provider = LXDProvider()
         self.mock_conn = AsyncMock()
+        serve_processes_from_run(self.mock_conn)
     
     @pytest.mark.asyncio
     async def test_deploy_vm_success(self):
@@ -277,6 +288,7 @@ class TestVMProviderBase:
         """Test the control_vm method dispatcher."""
         provider = DockerProvider()
         mock_conn = AsyncMock()
+        serve_processes_from_run(mock_conn)
         
         # Mock successful start
         mock_conn.run = AsyncMock(return_value=MagicMock(
@@ -293,4 +305,29 @@ class TestVMProviderBase:
         # Test invalid action
         result = await provider.control_vm(mock_conn, "test", "invalid")
         assert result["status"] == "error"
-        assert "Unknown action" in result["message"]
\ No newline at end of file
+        assert "Unknown action" in result["message"]
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_command_terminates_remote_process(self):
+        """Test that cancelling a provider operation signals its remote command."""
+        import asyncio
+        
+        process = MagicMock()
+        
+        async def never_finishes(check=False):
+            await asyncio.sleep(10)
+        
+        process.wait = never_finishes
+        mock_conn = MagicMock()
+        mock_conn.create_process = AsyncMock(return_value=process)
+        
+        task = asyncio.create_task(DockerProvider().stop_vm(mock_conn, "test"))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        task.cancel()
+        
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        
+        mock_conn.create_process.assert_awaited_once_with("docker stop test")
+        process.send_signal.assert_called_once_with('TERM')